@@ -1,9 +1,11 @@
 import argparse
 import json
+import os
 import sys
 
+from adbw.adb import transport_target
 from adbw.app import main
-from adbw.api import run_json_command
+from adbw.api import STREAM_COMMANDS, run_json_command, stream_json_command, write_json
 from adbw.errors import AdbWizardError
 
 
@@ -11,11 +13,13 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="adb-cli-py")
     parser.add_argument("--json", action="store_true", help="Run in non-interactive JSON/API mode.")
     parser.add_argument("--cmd", help="Command id for JSON/API mode.")
-    parser.add_argument("--serial", help="Target device serial for JSON/API mode.")
+    parser.add_argument("--serial", help="Target device serial, alias or model for JSON/API mode.")
+    parser.add_argument("--transport-id", help="Target device by adb transport id (adb -t) for JSON/API mode.")
     parser.add_argument(
         "--params",
         help="Command params as JSON object string or comma-separated key=value pairs.",
     )
+    parser.add_argument("--force", action="store_true", help="Bypass the workflow step result cache.")
     return parser.parse_args()
 
 
@@ -25,11 +29,20 @@ if __name__ == "__main__":
         if args.json:
             if not args.cmd:
                 raise AdbWizardError("--cmd is required when --json is used.")
-            payload = run_json_command(cmd=args.cmd, serial=args.serial, params_raw=args.params)
-            print(json.dumps(payload, indent=2))
-            sys.exit(0)
+            serial = transport_target(args.transport_id) if args.transport_id else args.serial
+            if args.cmd in STREAM_COMMANDS:
+                sys.exit(stream_json_command(args.cmd, serial, args.params, sys.stdout, force=args.force))
+            payload = run_json_command(cmd=args.cmd, serial=serial, params_raw=args.params, force=args.force)
+            write_json(payload, sys.stdout)
+            sys.exit(0 if payload.get("ok", True) else 1)
         main()
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into `head`); stop quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
     except KeyboardInterrupt:
+        if args.json and args.cmd in STREAM_COMMANDS:
+            sys.exit(130)
         print("\nInterrupted. Exiting.")
     except AdbWizardError as e:
         if args.json:
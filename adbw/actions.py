@@ -1,8 +1,14 @@
+import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from .adb import adb_cmd, run, run_streaming
+from .adb import adb_cmd, run, run_capture, run_streaming, target_filename
+from .bugreport import BugreportReader
 from .devices import get_device_ip
+from .discovery import DEFAULT_PORTS, discover
+from .errors import AdbWizardError
+from .wifi import WifiManager, active_manager, connect_endpoint, load_endpoints, register_endpoint, unregister_endpoint
 
 
 def install_split_apks(adb_path: str, serial: str) -> None:
@@ -69,11 +75,9 @@ def launch_app(adb_path: str, serial: str) -> None:
 
 def save_logcat_snapshot(adb_path: str, serial: str) -> None:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"logcat_{serial}_{timestamp}.txt"
-    out = run(adb_cmd(adb_path, serial, "logcat", "-d"), check=False).stdout
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(out)
-    print(f"Saved logcat snapshot to: {filename}")
+    filename = f"logcat_{target_filename(serial)}_{timestamp}.txt"
+    result = run_capture(adb_cmd(adb_path, serial, "logcat", "-d"), filename, check=False)
+    print(f"Saved logcat snapshot to: {filename} ({result.line_count} lines, {result.bytes_read} bytes)")
 
 
 def tail_filtered_logcat(adb_path: str, serial: str) -> None:
@@ -90,16 +94,57 @@ def tail_filtered_logcat(adb_path: str, serial: str) -> None:
 
 def collect_bugreport_bundle(adb_path: str, serial: str) -> None:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    bundle_dir = f"adb_bundle_{serial}_{timestamp}"
+    bundle_dir = f"adb_bundle_{target_filename(serial)}_{timestamp}"
     os.makedirs(bundle_dir, exist_ok=True)
     logcat_path = os.path.join(bundle_dir, "logcat.txt")
-    with open(logcat_path, "w", encoding="utf-8") as f:
-        f.write(run(adb_cmd(adb_path, serial, "logcat", "-d"), check=False).stdout)
-    print("Collecting bugreport (this may take a while)...")
-    run(adb_cmd(adb_path, serial, "bugreport", bundle_dir), check=False)
+    print("Collecting logcat and bugreport (this may take a while)...")
+    # dumpstate runs for minutes; the logcat dump finishes alongside it.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        logcat = pool.submit(run_capture, adb_cmd(adb_path, serial, "logcat", "-d"), logcat_path, check=False)
+        bugreport = pool.submit(run, adb_cmd(adb_path, serial, "bugreport", bundle_dir), check=False)
+        logcat.result()
+        bugreport.result()
     print(f"Saved diagnostics bundle under: {bundle_dir}")
 
 
+def _latest_bugreport() -> str:
+    found = glob.glob("bugreport*.zip") + glob.glob(os.path.join("adb_bundle_*", "bugreport*.zip"))
+    return max(found, key=os.path.getmtime) if found else ""
+
+
+def view_bugreport_sections() -> None:
+    default = _latest_bugreport()
+    path = input(f"Bugreport zip [{default}]: ").strip().strip('"') or default
+    if not path or not os.path.isfile(path):
+        print("Bugreport zip not found.")
+        return
+    try:
+        with BugreportReader(path) as reader:
+            sections = reader.sections()
+            text = input("Filter section titles (blank = all): ").strip().lower()
+            shown = [s for s in sections if text in s.title.lower()]
+            if not shown:
+                print("No matching sections.")
+                return
+            for i, section in enumerate(shown, start=1):
+                print(f"{i}) {section.title} ({section.size / 1024:.1f} KiB)")
+            choice = input("Section number: ").strip()
+            if not choice.isdigit() or not (1 <= int(choice) <= len(shown)):
+                print("Invalid choice.")
+                return
+            section = shown[int(choice) - 1]
+            out = input("Save to file (blank = print): ").strip()
+            body = reader.read(section).decode("utf-8", "replace")
+            if out:
+                with open(out, "w", encoding="utf-8") as f:
+                    f.write(body)
+                print(f"Saved {section.title} to {out}")
+            else:
+                print(body)
+    except AdbWizardError as e:
+        print(e)
+
+
 def connect_over_wifi(adb_path: str, serial: str) -> None:
     port = input("TCP port (default 5555): ").strip() or "5555"
     run(adb_cmd(adb_path, serial, "tcpip", port))
@@ -110,8 +155,70 @@ def connect_over_wifi(adb_path: str, serial: str) -> None:
         print("Device IP is required.")
         return
     endpoint = f"{ip}:{port}"
-    run([adb_path, "connect", endpoint], check=False)
-    print(f"Connect command sent for {endpoint}")
+    error = connect_endpoint(adb_path, endpoint)
+    print(f"Connected to {endpoint}" if not error else f"Connect to {endpoint} failed: {error}")
+    offer_endpoint_registration(endpoint)
+
+
+def offer_endpoint_registration(endpoint: str) -> None:
+    if endpoint in load_endpoints():
+        return
+    answer = input("Keep this endpoint connected (health probe + auto-reconnect)? [y/N]: ").strip().lower()
+    if answer in ("y", "yes"):
+        register_endpoint(endpoint)
+        manager = active_manager()
+        if manager is not None:
+            manager.probe_now()
+        print(f"Registered {endpoint}")
+
+
+def manage_wifi_endpoints(adb_path: str) -> None:
+    while True:
+        manager = active_manager()
+        statuses = manager.status() if manager is not None else []
+        if manager is None or not statuses:
+            # No background manager (or nothing probed yet): run one round now.
+            statuses = WifiManager(adb_path).probe()
+        print("\nWi-Fi endpoints")
+        if not statuses:
+            print("(none registered)")
+        for st in statuses:
+            latency = f"{st.latency_ms:.0f} ms" if st.latency_ms is not None else "-"
+            extra = f", last error: {st.last_error}" if st.state != "live" and st.last_error else ""
+            print(
+                f"- {st.endpoint}{f' ({st.label})' if st.label else ''}: {st.state}, latency {latency}, "
+                f"reconnects {st.reconnects}{extra}"
+            )
+        print("1) Register endpoint")
+        print("2) Remove endpoint")
+        print("3) Probe now")
+        print("0) Back")
+        choice = input("> ").strip()
+        if choice == "0":
+            return
+        if choice == "1":
+            endpoint = input("Endpoint ip:port: ").strip()
+            if not endpoint:
+                continue
+            if ":" not in endpoint:
+                endpoint += ":5555"
+            label = input("Label (optional): ").strip()
+            register_endpoint(endpoint, label)
+            error = connect_endpoint(adb_path, endpoint)
+            print(f"Registered {endpoint}" + (f" (not reachable yet: {error})" if error else ""))
+        elif choice == "2":
+            endpoint = input("Endpoint to remove: ").strip()
+            if endpoint in load_endpoints():
+                unregister_endpoint(endpoint)
+                print(f"Removed {endpoint}")
+            else:
+                print("Endpoint not registered.")
+                continue
+        elif choice != "3":
+            print("Unknown option.")
+            continue
+        if manager is not None:
+            manager.probe()
 
 
 def disconnect_wifi(adb_path: str) -> None:
@@ -123,3 +230,30 @@ def disconnect_wifi(adb_path: str) -> None:
         run([adb_path, "disconnect"], check=False)
         print("Disconnected all Wi-Fi adb endpoints.")
 
+
+def discover_wifi_devices(adb_path: str, serial: str) -> None:
+    ip = get_device_ip(adb_path, serial)
+    default_subnet = f"{ip.rsplit('.', 1)[0]}.0/24" if ip.count(".") == 3 else ""
+    if default_subnet:
+        prompt = f"Subnet to scan (default {default_subnet}, '-' = mDNS only): "
+    else:
+        prompt = "Subnet to scan (blank = mDNS only): "
+    subnet = input(prompt).strip() or default_subnet
+    if subnet == "-":
+        subnet = ""
+    ports = input(f"Ports (e.g. 5555 or 5555-5585, default {DEFAULT_PORTS}): ").strip() or DEFAULT_PORTS
+    register = input("Register connected endpoints for auto-reconnect? [y/N]: ").strip().lower() in ("y", "yes")
+    print("Discovering (mDNS + TCP probe)...")
+    try:
+        report = discover(adb_path, register=register, subnet=subnet, ports=ports)
+    except AdbWizardError as e:
+        print(f"Discovery failed: {e}")
+        return
+    print(f"Probed {report.scanned} host:port pairs in {report.scan_sec:.1f}s; connect took {report.connect_sec:.1f}s")
+    if not report.endpoints:
+        print("No endpoints found.")
+        return
+    for e in report.endpoints:
+        latency = f"{e.latency_ms:.0f} ms" if e.latency_ms is not None else "-"
+        outcome = "connected" if e.connected else f"not connected ({e.error})"
+        print(f"- {e.endpoint} [{e.source}{f' {e.name}' if e.name else ''}] tcp {latency}: {outcome}")
@@ -1,18 +1,27 @@
+import asyncio
+import codecs
+import hashlib
 import os
 import platform
 import re
 import shutil
 import subprocess
 import tempfile
+import threading
 import time
 import urllib.error
 import urllib.request
 import zipfile
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import IO, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
+from . import metrics
+from .breaker import CircuitBreaker, backoff_delay
 from .config import LOCAL_PLATFORM_TOOLS_DIR, Settings
 from .errors import AdbWizardError
+from .governor import ConcurrencyGovernor, lane_for_kind
 
 RUNTIME_DRY_RUN = False
 RUNTIME_DEBUG_LOGGING = False
@@ -22,6 +31,15 @@ RUNTIME_ACTION_TRANSCRIPT_ENABLED = False
 RUNTIME_ACTION_TRANSCRIPT_FILE = "adb_cli_py_transcript.log"
 RUNTIME_ADB_RETRY_COUNT = 3
 RUNTIME_COMMAND_TIMEOUT_SEC = 120
+RUNTIME_BACKOFF_BASE_SEC = 0.5
+RUNTIME_BACKOFF_MAX_SEC = 8.0
+
+CIRCUIT_OPEN_RETURNCODE = 125
+CAPTURE_CHUNK_SIZE = 64 * 1024
+CAPTURE_STDERR_LIMIT = 64 * 1024
+CAPTURE_MAX_PENDING_LINE = 1024 * 1024
+DEVICE_BREAKER = CircuitBreaker()
+ADB_GOVERNOR = ConcurrencyGovernor()
 
 
 def set_runtime_options(settings: Settings) -> None:
@@ -33,6 +51,8 @@ def set_runtime_options(settings: Settings) -> None:
     global RUNTIME_ACTION_TRANSCRIPT_FILE
     global RUNTIME_ADB_RETRY_COUNT
     global RUNTIME_COMMAND_TIMEOUT_SEC
+    global RUNTIME_BACKOFF_BASE_SEC
+    global RUNTIME_BACKOFF_MAX_SEC
     RUNTIME_DRY_RUN = settings.dry_run
     RUNTIME_DEBUG_LOGGING = settings.debug_logging
     RUNTIME_DEBUG_LOG_FILE = settings.debug_log_file or "adb_cli_py_debug.log"
@@ -41,6 +61,24 @@ def set_runtime_options(settings: Settings) -> None:
     RUNTIME_ACTION_TRANSCRIPT_FILE = settings.action_transcript_file or "adb_cli_py_transcript.log"
     RUNTIME_ADB_RETRY_COUNT = max(1, min(10, int(settings.adb_retry_count)))
     RUNTIME_COMMAND_TIMEOUT_SEC = max(5, min(3600, int(settings.command_timeout_sec)))
+    RUNTIME_BACKOFF_BASE_SEC = max(0.0, min(60.0, float(settings.adb_retry_backoff_base_sec)))
+    RUNTIME_BACKOFF_MAX_SEC = max(RUNTIME_BACKOFF_BASE_SEC, min(300.0, float(settings.adb_retry_backoff_max_sec)))
+    DEVICE_BREAKER.configure(
+        max(0, int(settings.circuit_breaker_threshold)),
+        max(1.0, float(settings.circuit_breaker_cooldown_sec)),
+    )
+    ADB_GOVERNOR.configure(
+        max(0, int(settings.adb_max_concurrent)),
+        max(0, int(settings.adb_max_per_device)),
+        max(0, int(settings.adb_max_heavy)),
+        max(0, int(settings.adb_max_heavy_per_device)),
+        max(0.0, float(settings.adb_rate_per_device)),
+    )
+    metrics.configure(settings.metrics_enabled, settings.metrics_textfile)
+
+
+def command_timeout_sec() -> int:
+    return RUNTIME_COMMAND_TIMEOUT_SEC
 
 
 def redact_sensitive_text(text: str) -> str:
@@ -98,6 +136,13 @@ def is_transient_adb_failure(stdout: str, stderr: str) -> bool:
     return any(token in text for token in transient_signals)
 
 
+def is_device_unreachable(stdout: str, stderr: str) -> bool:
+    if is_transient_adb_failure(stdout, stderr):
+        return True
+    text = f"{stdout}\n{stderr}".lower()
+    return "device '" in text and "not found" in text
+
+
 def command_failure_suggestion(stdout: str, stderr: str) -> str:
     text = f"{stdout}\n{stderr}".lower()
     if "unauthorized" in text:
@@ -113,31 +158,247 @@ def command_failure_suggestion(stdout: str, stderr: str) -> str:
     return "Suggestion: run again with debug logging enabled to capture full command output."
 
 
-def run(cmd: List[str], check: bool = True) -> subprocess.CompletedProcess:
+def is_adb_executable(path: str) -> bool:
+    return "adb" in os.path.basename(path).lower()
+
+
+_ADB_GLOBAL_OPTIONS_WITH_VALUE = ("-s", "-t", "-H", "-P", "-L")
+
+
+# A device target is either a serial or "transport_id:<n>" (adb's own
+# `devices -l` spelling), which adb_cmd turns into `-t <n>`. Transport ids
+# tell apart devices that share a serial.
+TRANSPORT_PREFIX = "transport_id:"
+
+
+def transport_target(transport_id: str) -> str:
+    transport_id = str(transport_id).strip()
+    if not transport_id.isdigit():
+        raise AdbWizardError(f"Invalid transport id: {transport_id}")
+    return f"{TRANSPORT_PREFIX}{transport_id}"
+
+
+def target_filename(target: str) -> str:
+    # A target as part of a file name. Transport targets and Wi-Fi serials
+    # ("10.0.0.5:5555") contain ":", which Windows does not allow.
+    return re.sub(r'[<>:"/\\|?*]', "_", target)
+
+
+# Transport id -> the target the last `adb devices -l` listed that device
+# under: its serial, or "transport_id:<n>" while another device shares the
+# serial. `-t N` and `-s SERIAL` for one device then share governor slots and
+# circuit breaker state.
+_TRANSPORT_TARGETS: Dict[str, str] = {}
+
+
+def note_transports(targets: Dict[str, str]) -> None:
+    global _TRANSPORT_TARGETS
+    _TRANSPORT_TARGETS = dict(targets)
+
+
+def device_key(target: str) -> str:
+    # Unknown transport ids stay as they are.
+    if target.startswith(TRANSPORT_PREFIX):
+        return _TRANSPORT_TARGETS.get(target[len(TRANSPORT_PREFIX) :], target)
+    return target
+
+
+def command_serial(cmd: List[str]) -> str:
+    if len(cmd) >= 3 and is_adb_executable(cmd[0]):
+        if cmd[1] == "-s":
+            return cmd[2]
+        if cmd[1] == "-t":
+            return device_key(f"{TRANSPORT_PREFIX}{cmd[2]}")
+    return ""
+
+
+def command_kind(cmd: List[str]) -> str:
+    if not cmd:
+        return "unknown"
+    if not is_adb_executable(cmd[0]):
+        return os.path.basename(cmd[0])
+    args = cmd[1:]
+    while args and (args[0] in _ADB_GLOBAL_OPTIONS_WITH_VALUE or args[0] in ("-d", "-e", "-a")):
+        args = args[2:] if args[0] in _ADB_GLOBAL_OPTIONS_WITH_VALUE else args[1:]
+    if not args:
+        return "adb"
+    if args[0] != "shell":
+        return args[0]
+    words = " ".join(a for a in args[1:] if not a.startswith("-")).split()
+    return os.path.basename(words[0]) if words else "shell"
+
+
+def note_device_state(serial: str, state: str) -> None:
+    if state == "device":
+        DEVICE_BREAKER.reset(serial)
+
+
+def _note_device_outcome(serial: str, proc: subprocess.CompletedProcess, timed_out: bool) -> None:
+    if not serial:
+        return
+    if proc.returncode != 0 and (timed_out or is_device_unreachable(proc.stdout, proc.stderr)):
+        if DEVICE_BREAKER.record_failure(serial):
+            log_debug(f"CIRCUIT open serial={serial}")
+        return
+    DEVICE_BREAKER.record_success(serial)
+
+
+def _circuit_open_result(cmd: List[str], serial: str, check: bool) -> subprocess.CompletedProcess:
     command_text = " ".join(cmd)
-    is_adb_command = bool(cmd) and ("adb" in os.path.basename(cmd[0]).lower())
+    message = (
+        f"Device {serial} is failing repeatedly; skipping for up to {DEVICE_BREAKER.cooldown_sec:g}s "
+        "(circuit breaker open)."
+    )
+    log_debug(f"CIRCUIT_OPEN command={command_text}")
+    append_transcript(f"CIRCUIT_OPEN command={command_text}")
+    if metrics.ENABLED:
+        metrics.inc("adbw_circuit_open_rejections_total", {"serial": serial})
+    if check:
+        raise AdbWizardError(
+            f"{message}\nCommand not run: {command_text}\n"
+            "Suggestion: reconnect the device; it is retried automatically once it shows up as 'device' again."
+        )
+    return subprocess.CompletedProcess(cmd, CIRCUIT_OPEN_RETURNCODE, "", message)
+
+
+def command_lane(cmd: List[str]) -> str:
+    return lane_for_kind(command_kind(cmd))
+
+
+def _record_wait(cmd: List[str], serial: str, lane: str, waited: float) -> None:
+    if waited >= 0.001:
+        log_debug(f"QUEUED lane={lane} serial={serial} wait={waited:.3f}s command={' '.join(cmd)}")
+    if metrics.ENABLED:
+        metrics.observe("adbw_adb_queue_wait_seconds", {"lane": lane, "serial": serial}, waited)
+
+
+# Only finite adb commands take a slot. Long-lived streams (logcat -f, shell
+# sessions, sampler loops) are not governed: they would hold it while they run.
+@contextmanager
+def command_slot(cmd: List[str], serial: str) -> Iterator[None]:
+    if not cmd or not is_adb_executable(cmd[0]):
+        yield
+        return
+    lane = command_lane(cmd)
+    with ADB_GOVERNOR.slot(serial, lane) as waited:
+        _record_wait(cmd, serial, lane, waited)
+        yield
+
+
+@asynccontextmanager
+async def async_command_slot(cmd: List[str], serial: str) -> AsyncIterator[None]:
+    if not cmd or not is_adb_executable(cmd[0]):
+        yield
+        return
+    lane = command_lane(cmd)
+    async with ADB_GOVERNOR.async_slot(serial, lane) as waited:
+        _record_wait(cmd, serial, lane, waited)
+        yield
+
+
+def _byte_len(text: str) -> int:
+    # Output arrives decoded; count it as UTF-8 bytes to match run_capture's
+    # raw byte counts. ASCII, the common case, needs no copy.
+    return len(text) if text.isascii() else len(text.encode("utf-8", errors="replace"))
+
+
+def _record_attempt(
+    cmd: List[str],
+    serial: str,
+    attempt: int,
+    proc: subprocess.CompletedProcess,
+    started: float,
+    timed_out: bool,
+    kind: str = "",
+) -> None:
+    if metrics.ENABLED:
+        metrics.record_command(
+            kind or command_kind(cmd),
+            command_serial(cmd),
+            proc.returncode,
+            time.perf_counter() - started,
+            _byte_len(proc.stdout),
+            _byte_len(proc.stderr),
+            timed_out,
+        )
+    _note_device_outcome(serial, proc, timed_out)
+    log_debug(
+        f"RESULT attempt={attempt} returncode={proc.returncode} stdout={proc.stdout.strip()} stderr={proc.stderr.strip()}"
+    )
+    append_transcript(
+        f"RUN attempt={attempt} command={' '.join(cmd)} rc={proc.returncode}\nSTDOUT:{proc.stdout}\nSTDERR:{proc.stderr}"
+    )
+
+
+def record_command_result(
+    cmd: List[str], proc: subprocess.CompletedProcess, started: float, timed_out: bool = False
+) -> None:
+    # For commands run outside run(), e.g. over a reused shell session.
+    _record_attempt(cmd, command_serial(cmd), 1, proc, started, timed_out)
+
+
+def _retry_delay(
+    cmd: List[str], serial: str, attempt: int, max_attempts: int, proc: subprocess.CompletedProcess
+) -> Optional[float]:
+    # Backoff before the next attempt, or None when the failure is final.
+    if (
+        attempt < max_attempts
+        and is_transient_adb_failure(proc.stdout, proc.stderr)
+        and DEVICE_BREAKER.state(serial) == "closed"
+    ):
+        delay = backoff_delay(attempt, RUNTIME_BACKOFF_BASE_SEC, RUNTIME_BACKOFF_MAX_SEC)
+        print(f"Transient adb error (attempt {attempt}/{max_attempts}), retrying in {delay:.1f}s...")
+        if metrics.ENABLED:
+            metrics.record_retry(command_kind(cmd), serial)
+        return delay
+    return None
+
+
+def _command_failed(cmd: List[str], proc: subprocess.CompletedProcess) -> AdbWizardError:
+    suggestion = command_failure_suggestion(proc.stdout, proc.stderr)
+    return AdbWizardError(
+        f"Command failed ({proc.returncode}): {' '.join(cmd)}\n"
+        f"STDOUT:\n{proc.stdout}\nSTDERR:\n{proc.stderr}\n{suggestion}"
+    )
+
+
+def _dry_run(cmd: List[str], mode: str = "") -> None:
+    command_text = " ".join(cmd)
+    label = f"DRY_RUN {mode}" if mode else "DRY_RUN"
+    print(f"[DRY RUN] {command_text}")
+    log_debug(f"{label} command={command_text}")
+    append_transcript(f"{label} command={command_text}")
+
+
+def run(cmd: List[str], check: bool = True, kind: str = "") -> subprocess.CompletedProcess:
+    # `kind` overrides the metrics label taken from the command itself.
+    command_text = " ".join(cmd)
+    is_adb_command = bool(cmd) and is_adb_executable(cmd[0])
     max_attempts = RUNTIME_ADB_RETRY_COUNT if is_adb_command else 1
+    serial = command_serial(cmd) if is_adb_command else ""
     last_proc: Optional[subprocess.CompletedProcess] = None
 
     for attempt in range(1, max_attempts + 1):
         if RUNTIME_DRY_RUN:
-            print(f"[DRY RUN] {command_text}")
-            log_debug(f"DRY_RUN command={command_text}")
-            append_transcript(f"DRY_RUN command={command_text}")
+            _dry_run(cmd)
             return subprocess.CompletedProcess(cmd, 0, "", "")
 
-        log_debug(f"RUN attempt={attempt} command={command_text}")
-        try:
-            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=RUNTIME_COMMAND_TIMEOUT_SEC)
-        except subprocess.TimeoutExpired:
-            proc = subprocess.CompletedProcess(cmd, 124, "", f"Command timed out after {RUNTIME_COMMAND_TIMEOUT_SEC}s")
+        if serial and not DEVICE_BREAKER.allow(serial):
+            return _circuit_open_result(cmd, serial, check)
+
+        with command_slot(cmd, serial):
+            log_debug(f"RUN attempt={attempt} command={command_text}")
+            started = time.perf_counter()
+            timed_out = False
+            try:
+                proc = subprocess.run(cmd, capture_output=True, text=True, timeout=RUNTIME_COMMAND_TIMEOUT_SEC)
+            except subprocess.TimeoutExpired:
+                proc = subprocess.CompletedProcess(
+                    cmd, 124, "", f"Command timed out after {RUNTIME_COMMAND_TIMEOUT_SEC}s"
+                )
+                timed_out = True
+        _record_attempt(cmd, serial, attempt, proc, started, timed_out, kind)
         last_proc = proc
-        log_debug(
-            f"RESULT attempt={attempt} returncode={proc.returncode} stdout={proc.stdout.strip()} stderr={proc.stderr.strip()}"
-        )
-        append_transcript(
-            f"RUN attempt={attempt} command={command_text} rc={proc.returncode}\nSTDOUT:{proc.stdout}\nSTDERR:{proc.stderr}"
-        )
 
         if proc.returncode == 0:
             return proc
@@ -145,36 +406,466 @@ def run(cmd: List[str], check: bool = True) -> subprocess.CompletedProcess:
         if not check:
             return proc
 
-        if is_adb_command and attempt < max_attempts and is_transient_adb_failure(proc.stdout, proc.stderr):
-            print(f"Transient adb error (attempt {attempt}/{max_attempts}), retrying...")
-            time.sleep(1.0)
+        delay = _retry_delay(cmd, serial, attempt, max_attempts, proc) if is_adb_command else None
+        if delay is not None:
+            time.sleep(delay)
             continue
 
-        suggestion = command_failure_suggestion(proc.stdout, proc.stderr)
-        raise AdbWizardError(
-            f"Command failed ({proc.returncode}): {command_text}\n"
-            f"STDOUT:\n{proc.stdout}\nSTDERR:\n{proc.stderr}\n{suggestion}"
-        )
+        raise _command_failed(cmd, proc)
 
     if last_proc is None:
         raise AdbWizardError("Command failed before execution.")
     return last_proc
 
 
+async def _async_kill(child: asyncio.subprocess.Process) -> None:
+    if child.returncode is None:
+        try:
+            child.kill()
+        except ProcessLookupError:
+            pass
+        await child.wait()
+
+
+async def _async_exec(cmd: List[str]) -> Tuple[subprocess.CompletedProcess, bool]:
+    child = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        out, err = await asyncio.wait_for(child.communicate(), RUNTIME_COMMAND_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        await _async_kill(child)
+        return subprocess.CompletedProcess(cmd, 124, "", f"Command timed out after {RUNTIME_COMMAND_TIMEOUT_SEC}s"), True
+    finally:
+        # Also reached on task cancellation: never leave the child running.
+        await _async_kill(child)
+    stdout = out.decode("utf-8", errors="replace").replace("\r\n", "\n")
+    stderr = err.decode("utf-8", errors="replace").replace("\r\n", "\n")
+    return subprocess.CompletedProcess(cmd, child.returncode, stdout, stderr), False
+
+
+async def async_run(cmd: List[str], check: bool = True) -> subprocess.CompletedProcess:
+    command_text = " ".join(cmd)
+    is_adb_command = bool(cmd) and is_adb_executable(cmd[0])
+    max_attempts = RUNTIME_ADB_RETRY_COUNT if is_adb_command else 1
+    serial = command_serial(cmd) if is_adb_command else ""
+    last_proc: Optional[subprocess.CompletedProcess] = None
+
+    for attempt in range(1, max_attempts + 1):
+        if RUNTIME_DRY_RUN:
+            _dry_run(cmd)
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        if serial and not DEVICE_BREAKER.allow(serial):
+            return _circuit_open_result(cmd, serial, check)
+
+        async with async_command_slot(cmd, serial):
+            log_debug(f"RUN attempt={attempt} command={command_text}")
+            started = time.perf_counter()
+            proc, timed_out = await _async_exec(cmd)
+        _record_attempt(cmd, serial, attempt, proc, started, timed_out)
+        last_proc = proc
+
+        if proc.returncode == 0 or not check:
+            return proc
+
+        delay = _retry_delay(cmd, serial, attempt, max_attempts, proc) if is_adb_command else None
+        if delay is not None:
+            await asyncio.sleep(delay)
+            continue
+
+        raise _command_failed(cmd, proc)
+
+    if last_proc is None:
+        raise AdbWizardError("Command failed before execution.")
+    return last_proc
+
+
+async def async_run_many(
+    cmds: List[List[str]], check: bool = True, limit: int = 32
+) -> List[Union[subprocess.CompletedProcess, BaseException]]:
+    # Runs many commands on one loop with at most `limit` children alive.
+    # Exceptions are returned in place so one failing device does not cancel
+    # the rest of the fleet.
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def one(cmd: List[str]) -> subprocess.CompletedProcess:
+        async with semaphore:
+            return await async_run(cmd, check=check)
+
+    return await asyncio.gather(*(one(c) for c in cmds), return_exceptions=True)
+
+
+@dataclass
+class CaptureResult:
+    cmd: List[str]
+    returncode: int
+    stderr: str = ""
+    bytes_read: int = 0
+    line_count: int = 0
+    sha256: str = ""
+    timed_out: bool = False
+
+
+CaptureSink = Union[str, IO, Callable[[Union[str, bytes]], object]]
+
+
+def _capture_once(
+    cmd: List[str], sink: CaptureSink, binary: bool, transform: Optional[Callable[[str], str]]
+) -> CaptureResult:
+    own_file: Optional[IO] = None
+    if isinstance(sink, str):
+        own_file = open(sink, "wb") if binary else open(sink, "w", encoding="utf-8")
+        write = own_file.write
+    elif callable(sink):
+        write = sink
+    else:
+        write = sink.write
+
+    digest = hashlib.sha256()
+    total = 0
+    lines = 0
+    stderr_tail = bytearray()
+    timed_out = threading.Event()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert proc.stdout is not None and proc.stderr is not None
+
+    def drain_stderr() -> None:
+        for chunk in iter(lambda: proc.stderr.read(8192), b""):
+            stderr_tail.extend(chunk)
+            if len(stderr_tail) > CAPTURE_STDERR_LIMIT:
+                del stderr_tail[: len(stderr_tail) - CAPTURE_STDERR_LIMIT]
+
+    def kill_on_timeout() -> None:
+        timed_out.set()
+        proc.kill()
+
+    def emit(text: str) -> None:
+        text = text.replace("\r\n", "\n")
+        write(transform(text) if transform else text)
+
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+    timer = threading.Timer(RUNTIME_COMMAND_TIMEOUT_SEC, kill_on_timeout)
+    timer.daemon = True
+    timer.start()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    try:
+        # Only complete lines are decoded/transformed so redaction never sees a
+        # token split across chunk boundaries.
+        for chunk in iter(lambda: proc.stdout.read1(CAPTURE_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            total += len(chunk)
+            lines += chunk.count(b"\n")
+            if binary:
+                write(chunk)
+                continue
+            text = pending + decoder.decode(chunk)
+            cut = text.rfind("\n") + 1
+            if cut == 0 and len(text) > CAPTURE_MAX_PENDING_LINE:
+                cut = len(text)
+            pending = text[cut:]
+            if cut:
+                emit(text[:cut])
+        if not binary:
+            text = pending + decoder.decode(b"", final=True)
+            if text:
+                emit(text)
+        proc.wait()
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        stderr_thread.join()
+        proc.stdout.close()
+        proc.stderr.close()
+        if own_file is not None:
+            own_file.close()
+
+    stderr = stderr_tail.decode("utf-8", errors="replace")
+    returncode = proc.returncode
+    if timed_out.is_set():
+        returncode = 124
+        stderr = f"Command timed out after {RUNTIME_COMMAND_TIMEOUT_SEC}s"
+    return CaptureResult(cmd, returncode, stderr, total, lines, digest.hexdigest(), timed_out.is_set())
+
+
+# Like run(), but stdout is streamed in chunks into `sink` (a path, a file
+# object or a callable) instead of being buffered, so memory stays bounded no
+# matter how large the output is. Text mode normalises CRLF and applies
+# `transform` (e.g. redaction) to whole lines; binary mode writes raw bytes.
+def run_capture(
+    cmd: List[str],
+    sink: CaptureSink,
+    check: bool = True,
+    binary: bool = False,
+    transform: Optional[Callable[[str], str]] = None,
+) -> CaptureResult:
+    command_text = " ".join(cmd)
+    is_adb_command = bool(cmd) and is_adb_executable(cmd[0])
+    max_attempts = RUNTIME_ADB_RETRY_COUNT if is_adb_command else 1
+    serial = command_serial(cmd) if is_adb_command else ""
+    result: Optional[CaptureResult] = None
+
+    for attempt in range(1, max_attempts + 1):
+        if RUNTIME_DRY_RUN:
+            _dry_run(cmd, "capture")
+            return CaptureResult(cmd, 0, sha256=hashlib.sha256().hexdigest())
+
+        if serial and not DEVICE_BREAKER.allow(serial):
+            rejected = _circuit_open_result(cmd, serial, check)
+            return CaptureResult(cmd, rejected.returncode, rejected.stderr)
+
+        with command_slot(cmd, serial):
+            log_debug(f"RUN capture attempt={attempt} command={command_text}")
+            started = time.perf_counter()
+            result = _capture_once(cmd, sink, binary, transform)
+        if metrics.ENABLED:
+            metrics.record_command(
+                command_kind(cmd),
+                serial,
+                result.returncode,
+                time.perf_counter() - started,
+                result.bytes_read,
+                _byte_len(result.stderr),
+                result.timed_out,
+            )
+        _note_device_outcome(serial, subprocess.CompletedProcess(cmd, result.returncode, "", result.stderr), result.timed_out)
+        log_debug(
+            f"RESULT capture attempt={attempt} returncode={result.returncode} bytes={result.bytes_read} "
+            f"lines={result.line_count} sha256={result.sha256} stderr={result.stderr.strip()}"
+        )
+        append_transcript(
+            f"RUN capture attempt={attempt} command={command_text} rc={result.returncode} "
+            f"bytes={result.bytes_read} sha256={result.sha256}\nSTDERR:{result.stderr}"
+        )
+
+        if result.returncode == 0 or not check:
+            return result
+
+        # Output already handed to the sink cannot be taken back, so only
+        # retry when the failed attempt produced nothing.
+        if (
+            is_adb_command
+            and attempt < max_attempts
+            and result.bytes_read == 0
+            and is_transient_adb_failure("", result.stderr)
+            and DEVICE_BREAKER.state(serial) == "closed"
+        ):
+            delay = backoff_delay(attempt, RUNTIME_BACKOFF_BASE_SEC, RUNTIME_BACKOFF_MAX_SEC)
+            print(f"Transient adb error (attempt {attempt}/{max_attempts}), retrying in {delay:.1f}s...")
+            if metrics.ENABLED:
+                metrics.record_retry(command_kind(cmd), serial)
+            time.sleep(delay)
+            continue
+
+        suggestion = command_failure_suggestion("", result.stderr)
+        raise AdbWizardError(
+            f"Command failed ({result.returncode}): {command_text}\n"
+            f"STDERR:\n{result.stderr}\n{suggestion}"
+        )
+
+    if result is None:
+        raise AdbWizardError("Command failed before execution.")
+    return result
+
+
 def run_streaming(cmd: List[str]) -> None:
     command_text = " ".join(cmd)
     if RUNTIME_DRY_RUN:
-        print(f"[DRY RUN] {command_text}")
-        log_debug(f"DRY_RUN streaming command={command_text}")
-        append_transcript(f"DRY_RUN streaming command={command_text}")
+        _dry_run(cmd, "streaming")
+        return
+    serial = command_serial(cmd)
+    if serial and not DEVICE_BREAKER.allow(serial):
+        print(_circuit_open_result(cmd, serial, check=False).stderr)
         return
     log_debug(f"RUN streaming command={command_text}")
     append_transcript(f"RUN streaming command={command_text}")
+    started = time.perf_counter()
+    returncode = 0
+    timed_out = False
     try:
-        subprocess.run(cmd, timeout=RUNTIME_COMMAND_TIMEOUT_SEC)
+        returncode = subprocess.run(cmd, timeout=RUNTIME_COMMAND_TIMEOUT_SEC).returncode
     except subprocess.TimeoutExpired:
+        returncode = 124
+        timed_out = True
+        print(f"Streaming command timed out after {RUNTIME_COMMAND_TIMEOUT_SEC}s")
+        append_transcript(f"TIMEOUT streaming command={command_text}")
+    except KeyboardInterrupt:
+        returncode = 130
+        raise
+    finally:
+        if metrics.ENABLED:
+            metrics.record_command(
+                command_kind(cmd), command_serial(cmd), returncode, time.perf_counter() - started, timed_out=timed_out
+            )
+
+
+async def async_run_streaming(cmd: List[str], on_line: Optional[Callable[[str], object]] = None) -> int:
+    # Without on_line the child writes straight to the terminal, as with
+    # run_streaming; with it, each decoded line is handed to the callback.
+    command_text = " ".join(cmd)
+    if RUNTIME_DRY_RUN:
+        _dry_run(cmd, "streaming")
+        return 0
+    serial = command_serial(cmd)
+    if serial and not DEVICE_BREAKER.allow(serial):
+        message = _circuit_open_result(cmd, serial, check=False).stderr
+        if on_line is None:
+            print(message)
+        else:
+            on_line(message)
+        return CIRCUIT_OPEN_RETURNCODE
+    log_debug(f"RUN streaming command={command_text}")
+    append_transcript(f"RUN streaming command={command_text}")
+    started = time.perf_counter()
+    returncode = 130
+    timed_out = False
+    child = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE if on_line is not None else None
+    )
+
+    async def pump() -> int:
+        if on_line is not None:
+            assert child.stdout is not None
+            async for raw in child.stdout:
+                on_line(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        return await child.wait()
+
+    try:
+        returncode = await asyncio.wait_for(pump(), RUNTIME_COMMAND_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        returncode = 124
+        timed_out = True
         print(f"Streaming command timed out after {RUNTIME_COMMAND_TIMEOUT_SEC}s")
         append_transcript(f"TIMEOUT streaming command={command_text}")
+    finally:
+        await _async_kill(child)
+        if metrics.ENABLED:
+            metrics.record_command(
+                command_kind(cmd), command_serial(cmd), returncode, time.perf_counter() - started, timed_out=timed_out
+            )
+    return returncode
+
+
+@dataclass
+class StreamResult:
+    cmd: List[str]
+    returncode: Optional[int] = None
+    stderr: str = ""
+    lines: int = 0
+    # eof, max_lines, max_duration, dry_run or circuit_open
+    reason: str = "eof"
+    duration_sec: float = 0.0
+
+
+# Like run_streaming, but every stdout line is handed to `on_line` on this
+# thread before the next one is read. A slow consumer therefore stops the
+# reads, the pipe fills and adb itself pauses, so memory stays bounded. Stops
+# after `max_lines` lines or `max_duration_sec` seconds (0 = no limit); the
+# child is then killed and `returncode` is None. Exceptions from `on_line`
+# (e.g. BrokenPipeError) stop the child and propagate.
+def run_line_stream(
+    cmd: List[str], on_line: Callable[[str], object], max_lines: int = 0, max_duration_sec: float = 0.0
+) -> StreamResult:
+    command_text = " ".join(cmd)
+    result = StreamResult(cmd)
+    if RUNTIME_DRY_RUN:
+        log_debug(f"DRY_RUN stream command={command_text}")
+        append_transcript(f"DRY_RUN stream command={command_text}")
+        result.returncode, result.reason = 0, "dry_run"
+        return result
+    serial = command_serial(cmd)
+    if serial and not DEVICE_BREAKER.allow(serial):
+        rejected = _circuit_open_result(cmd, serial, check=False)
+        result.returncode, result.stderr, result.reason = rejected.returncode, rejected.stderr, "circuit_open"
+        return result
+    log_debug(f"RUN stream command={command_text} max_lines={max_lines} max_duration={max_duration_sec:g}")
+    append_transcript(f"RUN stream command={command_text}")
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert proc.stdout is not None and proc.stderr is not None
+    stderr_tail = bytearray()
+    expired = threading.Event()
+
+    def drain_stderr() -> None:
+        for chunk in iter(lambda: proc.stderr.read(8192), b""):
+            stderr_tail.extend(chunk)
+            if len(stderr_tail) > CAPTURE_STDERR_LIMIT:
+                del stderr_tail[: len(stderr_tail) - CAPTURE_STDERR_LIMIT]
+
+    def expire() -> None:
+        expired.set()
+        proc.kill()
+
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+    timer: Optional[threading.Timer] = None
+    if max_duration_sec > 0:
+        timer = threading.Timer(max_duration_sec, expire)
+        timer.daemon = True
+        timer.start()
+    try:
+        for raw in proc.stdout:
+            # Lines still buffered in the pipe after the deadline are dropped.
+            if expired.is_set():
+                break
+            result.lines += 1
+            on_line(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+            if max_lines and result.lines >= max_lines:
+                result.reason = "max_lines"
+                break
+        if expired.is_set() and result.reason == "eof":
+            result.reason = "max_duration"
+        if result.reason == "eof":
+            result.returncode = proc.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        stderr_thread.join()
+        proc.stdout.close()
+        proc.stderr.close()
+        result.duration_sec = time.perf_counter() - started
+        if metrics.ENABLED:
+            rc = result.returncode if result.returncode is not None else 0
+            metrics.record_command(command_kind(cmd), serial, rc, result.duration_sec)
+    result.stderr = stderr_tail.decode("utf-8", errors="replace")
+    return result
+
+
+def spawn_streaming(
+    cmd: List[str], stdout: Optional[int] = None, stdin: Optional[int] = None, stderr: Optional[int] = None
+) -> Optional[subprocess.Popen]:
+    # Like run_streaming, but returns immediately so the caller can keep the
+    # stream attached to the terminal (or read it via stdout=PIPE) while
+    # doing other work.
+    command_text = " ".join(cmd)
+    if RUNTIME_DRY_RUN:
+        _dry_run(cmd, "streaming")
+        return None
+    serial = command_serial(cmd)
+    if serial and not DEVICE_BREAKER.allow(serial):
+        print(_circuit_open_result(cmd, serial, check=False).stderr)
+        return None
+    log_debug(f"RUN streaming command={command_text}")
+    append_transcript(f"RUN streaming command={command_text}")
+    if stderr is None and stdout is not None:
+        stderr = subprocess.DEVNULL
+    return subprocess.Popen(cmd, stdin=stdin, stdout=stdout, stderr=stderr)
+
+
+def stop_streaming(proc: Optional[subprocess.Popen]) -> None:
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
 
 
 def local_adb_path() -> str:
@@ -253,7 +944,9 @@ def ensure_adb(force_install: bool = False, prefer_project_local: bool = False)
 
 def adb_cmd(adb_path: str, serial: Optional[str], *args: str) -> List[str]:
     cmd = [adb_path]
-    if serial:
+    if serial and serial.startswith(TRANSPORT_PREFIX):
+        cmd += ["-t", serial[len(TRANSPORT_PREFIX) :]]
+    elif serial:
         cmd += ["-s", serial]
     cmd += list(args)
     return cmd
@@ -1,58 +1,78 @@
-import importlib.util
 import gzip
 import json
 import os
 import time
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional
-
-from .adb import adb_cmd, redact_if_enabled, run, run_streaming
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple
+
+from .adb import (
+    DEVICE_BREAKER,
+    adb_cmd,
+    redact_if_enabled,
+    run,
+    run_capture,
+    run_streaming,
+    spawn_streaming,
+    stop_streaming,
+    target_filename,
+)
+from .actions import offer_endpoint_registration
+from .batch import ShellBatch, run_shell_batch
 from .devices import Device, list_devices
+from .errors import AdbWizardError
+from .farm import FarmJob, JobAction, Requirements, jobs_from_specs, probe_devices, run_jobs, shell_action
+from .forwards import (
+    ForwardResult,
+    apply_forwards_on_devices,
+    current_rules,
+    parse_rule,
+    parse_rules,
+)
+from .logmux import DEFAULT_REORDER_WINDOW_SEC, LogcatMux
+from .logstore import LOG_DB_FILE, LogStore, format_log_row, parse_since
+from .sampler import DEFAULT_RING_SIZE, sample_process
+from .state import read_json, update_json, write_json
+from .telemetry import record_telemetry
+from .watch import BuildWatcher
+from .wifi import connect_endpoint
+from .workflows import (
+    DEFAULT_MAX_PARALLEL_STEPS,
+    STEP_ACTIONS,
+    STEP_PARAMS,
+    WorkflowReport,
+    execute_workflow,
+    format_workflow_report,
+    normalize_steps,
+    resolve_targets,
+)
 
 WORKFLOWS_FILE = ".adb_cli_py_workflows.json"
 PROFILES_FILE = ".adb_cli_py_profiles.json"
 ALIASES_FILE = ".adb_cli_py_aliases.json"
-PLUGINS_DIR = "plugins"
-
-
-def _read_json(path: str, default: Any) -> Any:
-    if not os.path.exists(path):
-        return default
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (OSError, json.JSONDecodeError):
-        return default
-
-
-def _write_json(path: str, data: Any) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-        f.write("\n")
 
 
 def load_workflows() -> List[Dict[str, Any]]:
-    return _read_json(WORKFLOWS_FILE, [])
+    return read_json(WORKFLOWS_FILE, [])
 
 
 def save_workflows(workflows: List[Dict[str, Any]]) -> None:
-    _write_json(WORKFLOWS_FILE, workflows)
+    write_json(WORKFLOWS_FILE, workflows)
 
 
 def load_profiles() -> Dict[str, Dict[str, str]]:
-    return _read_json(PROFILES_FILE, {})
+    return read_json(PROFILES_FILE, {})
 
 
 def save_profiles(profiles: Dict[str, Dict[str, str]]) -> None:
-    _write_json(PROFILES_FILE, profiles)
+    write_json(PROFILES_FILE, profiles)
 
 
 def load_aliases() -> Dict[str, str]:
-    return _read_json(ALIASES_FILE, {})
+    return read_json(ALIASES_FILE, {})
 
 
 def save_aliases(aliases: Dict[str, str]) -> None:
-    _write_json(ALIASES_FILE, aliases)
+    write_json(ALIASES_FILE, aliases)
 
 
 def select_profile(profiles: Dict[str, Dict[str, str]]) -> Optional[str]:
@@ -80,13 +100,14 @@ def create_or_update_profile() -> None:
     activity = input(f"Activity [{existing.get('activity', '')}]: ").strip() or existing.get("activity", "")
     log_tag = input(f"Log tag [{existing.get('log_tag', '*')}]: ").strip() or existing.get("log_tag", "*")
     apk_path = input(f"APK path [{existing.get('apk_path', '')}]: ").strip() or existing.get("apk_path", "")
-    profiles[name] = {
+    profile = {
+        **existing,
         "package_name": package_name,
         "activity": activity,
         "log_tag": log_tag,
         "apk_path": apk_path,
     }
-    save_profiles(profiles)
+    update_json(PROFILES_FILE, {}, lambda profiles: profiles.__setitem__(name, profile))
     print(f"Saved profile: {name}")
 
 
@@ -95,8 +116,7 @@ def delete_profile() -> None:
     name = select_profile(profiles)
     if not name:
         return
-    profiles.pop(name, None)
-    save_profiles(profiles)
+    update_json(PROFILES_FILE, {}, lambda profiles: profiles.pop(name, None))
     print(f"Deleted profile: {name}")
 
 
@@ -108,40 +128,80 @@ def view_profiles() -> None:
     for name in sorted(profiles):
         p = profiles[name]
         print(f"- {name}: package={p.get('package_name','')}, activity={p.get('activity','')}, log_tag={p.get('log_tag','*')}, apk_path={p.get('apk_path','')}")
+        for set_name, rules in sorted(p.get("forward_sets", {}).items()):
+            print(f"    forward set {set_name}: {len(rules)} rule(s)")
+
+
+def find_forward_set(profile_name: str, set_name: str) -> List[str]:
+    profile = load_profiles().get(profile_name)
+    if profile is None:
+        raise AdbWizardError(f"Profile not found: {profile_name}")
+    rules = profile.get("forward_sets", {}).get(set_name)
+    if rules is None:
+        raise AdbWizardError(f"Forward set not found in profile {profile_name}: {set_name}")
+    return rules
+
+
+def save_forward_set(profile_name: str, set_name: str, rules: List[str]) -> None:
+    def mutate(profiles: Dict[str, Any]) -> None:
+        profiles.setdefault(profile_name, {}).setdefault("forward_sets", {})[set_name] = rules
+
+    update_json(PROFILES_FILE, {}, mutate)
 
 
 def build_workflow() -> None:
-    workflows = load_workflows()
     name = input("Workflow name: ").strip()
     if not name:
         print("Workflow name is required.")
         return
-    steps: List[Dict[str, str]] = []
-    print("Add steps: install_apk | clear_data | launch_app | tail_filtered_logcat")
+    steps: List[Dict[str, Any]] = []
+    print(f"Add steps: {' | '.join(STEP_ACTIONS)}")
+    print("Each step runs after the previous one unless you list other dependencies.")
     while True:
         action = input("Step action (blank to finish): ").strip()
         if not action:
             break
-        if action not in ("install_apk", "clear_data", "launch_app", "tail_filtered_logcat"):
+        if action not in STEP_ACTIONS:
             print("Unknown action.")
             continue
-        step: Dict[str, str] = {"action": action}
-        if action == "install_apk":
-            step["apk_path"] = input("apk_path: ").strip()
-        if action in ("clear_data", "launch_app"):
-            step["package"] = input("package: ").strip()
-        if action == "launch_app":
-            step["activity"] = input("activity (optional): ").strip()
+        step: Dict[str, Any] = {"id": "", "action": action}
+        for param in STEP_PARAMS.get(action, []):
+            step[param] = input(f"{param}: ").strip()
         if action == "tail_filtered_logcat":
-            step["tag"] = input("tag (default *): ").strip() or "*"
-            step["priority"] = input("priority [V/D/I/W/E/F/S] (default I): ").strip().upper() or "I"
+            step["tag"] = step.get("tag") or "*"
+            step["priority"] = (step.get("priority") or "I").upper()
+        default_id = f"step{len(steps) + 1}"
+        step["id"] = input(f"Step id (default {default_id}): ").strip() or default_id
+        previous = steps[-1]["id"] if steps else ""
+        needs_raw = input(f"Depends on step ids, comma-separated (default: {previous or 'none'}, '-' for none): ").strip()
+        if needs_raw == "-":
+            step["needs"] = []
+        elif needs_raw:
+            step["needs"] = [n.strip() for n in needs_raw.split(",") if n.strip()]
+        else:
+            step["needs"] = [previous] if previous else []
+        retries = input("Retries on failure (default 0): ").strip()
+        if retries.isdigit() and int(retries) > 0:
+            step["retries"] = int(retries)
         steps.append(step)
     if not steps:
         print("No steps added.")
         return
-    workflows = [w for w in workflows if w.get("name") != name]
-    workflows.append({"name": name, "steps": steps})
-    save_workflows(workflows)
+    wf: Dict[str, Any] = {"name": name, "steps": steps}
+    try:
+        normalize_steps(wf)
+    except AdbWizardError as e:
+        print(f"Workflow not saved: {e}")
+        return
+    targets = input("Default targets (blank = current device, 'all', or comma-separated serials/aliases): ").strip()
+    if targets:
+        wf["targets"] = targets if targets == "all" else [t.strip() for t in targets.split(",") if t.strip()]
+
+    def replace(workflows: List[Dict[str, Any]]) -> None:
+        workflows[:] = [w for w in workflows if w.get("name") != name]
+        workflows.append(wf)
+
+    update_json(WORKFLOWS_FILE, [], replace)
     print(f"Saved workflow: {name}")
 
 
@@ -152,7 +212,36 @@ def list_workflows() -> None:
         return
     for i, wf in enumerate(workflows, start=1):
         step_names = ", ".join(s.get("action", "?") for s in wf.get("steps", []))
-        print(f"{i}) {wf.get('name','unnamed')} [{step_names}]")
+        targets = wf.get("targets")
+        target_text = f" targets={targets if isinstance(targets, str) else ','.join(targets)}" if targets else ""
+        print(f"{i}) {wf.get('name','unnamed')} [{step_names}]{target_text}")
+
+
+def find_workflow(name: str) -> Optional[Dict[str, Any]]:
+    for wf in load_workflows():
+        if wf.get("name") == name:
+            return wf
+    return None
+
+
+def run_workflow_on_targets(
+    adb_path: str,
+    wf: Dict[str, Any],
+    current_serial: str,
+    targets: Any = None,
+    max_parallel: int = 0,
+    log: Callable[[str], None] = print,
+    interactive: bool = True,
+    force: bool = False,
+) -> WorkflowReport:
+    if targets is None:
+        targets = wf.get("targets", "current")
+    connected = [d.target for d in list_devices(adb_path) if d.state == "device"]
+    serials = resolve_targets(targets, current_serial, connected, load_aliases())
+    parallel = max_parallel or int(wf.get("max_parallel", 0) or 0) or DEFAULT_MAX_PARALLEL_STEPS
+    return execute_workflow(
+        adb_path, wf, serials, max_parallel_steps=parallel, log=log, interactive=interactive, force=force
+    )
 
 
 def run_workflow(adb_path: str, serial: str) -> None:
@@ -166,39 +255,25 @@ def run_workflow(adb_path: str, serial: str) -> None:
         print("Invalid choice.")
         return
     wf = workflows[int(choice) - 1]
+    default_targets = wf.get("targets", "current")
+    print("Targets:")
+    print(f"1) Workflow default ({default_targets if isinstance(default_targets, str) else ','.join(default_targets)})")
+    print(f"2) Current device ({serial})")
+    print("3) All connected devices")
+    target_choice = input("> ").strip() or "1"
+    targets = {"1": None, "2": "current", "3": "all"}.get(target_choice)
+    if target_choice not in ("1", "2", "3"):
+        print("Invalid choice.")
+        return
+    force = input("Ignore cached step results and rerun everything? [y/N]: ").strip().lower() == "y"
     print(f"Running workflow: {wf.get('name','unnamed')}")
-    for step in wf.get("steps", []):
-        action = step.get("action", "")
-        if action == "install_apk":
-            apk_path = step.get("apk_path", "")
-            if not apk_path:
-                print("Skipped install_apk (missing apk_path).")
-                continue
-            run(adb_cmd(adb_path, serial, "install", "-r", apk_path))
-        elif action == "clear_data":
-            package = step.get("package", "")
-            if package:
-                run(adb_cmd(adb_path, serial, "shell", "pm", "clear", package))
-        elif action == "launch_app":
-            package = step.get("package", "")
-            activity = step.get("activity", "")
-            if not package:
-                print("Skipped launch_app (missing package).")
-                continue
-            if activity:
-                run(adb_cmd(adb_path, serial, "shell", "am", "start", "-n", f"{package}/{activity}"))
-            else:
-                run(adb_cmd(adb_path, serial, "shell", "monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1"))
-        elif action == "tail_filtered_logcat":
-            tag = step.get("tag", "*")
-            priority = step.get("priority", "I")
-            try:
-                run_streaming(adb_cmd(adb_path, serial, "logcat", f"{tag}:{priority}", "*:S"))
-            except KeyboardInterrupt:
-                print()
-        else:
-            print(f"Unknown step action: {action}")
-    print("Workflow complete.")
+    try:
+        report = run_workflow_on_targets(adb_path, wf, serial, targets=targets, force=force)
+    except AdbWizardError as e:
+        print(f"Workflow not run: {e}")
+        return
+    print(format_workflow_report(report))
+    print("Workflow complete." if report.ok else "Workflow finished with failures.")
 
 
 def run_dev_loop(adb_path: str, serial: str, active_profile: str = "") -> None:
@@ -227,63 +302,199 @@ def run_dev_loop(adb_path: str, serial: str, active_profile: str = "") -> None:
     package = input(f"Package [{package}]: ").strip() or package
     activity = input(f"Activity [{activity}]: ").strip() or activity
     tag = input(f"Log tag [{tag}]: ").strip() or tag
+    watch = False
+    if apk_path:
+        watch = input("Watch APK and redeploy on each new build? [y/N]: ").strip().lower() in ("y", "yes")
+    _print_dev_timings(1, _dev_iteration(adb_path, serial, apk_path, package, activity))
+    logcat = adb_cmd(adb_path, serial, "logcat", f"{tag}:I", "*:S")
+    if not watch:
+        print("Starting filtered logcat. Press Ctrl+C to stop.")
+        try:
+            run_streaming(logcat)
+        except KeyboardInterrupt:
+            print()
+        return
+    _watch_dev_loop(adb_path, serial, apk_path, package, activity, logcat)
+
+
+def _dev_iteration(adb_path: str, serial: str, apk_path: str, package: str, activity: str) -> List[Tuple[str, float]]:
+    timings: List[Tuple[str, float]] = []
+
+    def phase(name: str, cmd: List[str], check: bool = False) -> None:
+        started = time.perf_counter()
+        try:
+            run(cmd, check=check)
+        finally:
+            timings.append((name, time.perf_counter() - started))
+
     if apk_path:
-        run(adb_cmd(adb_path, serial, "install", "-r", apk_path))
+        phase("install", adb_cmd(adb_path, serial, "install", "-r", apk_path), check=True)
     if package:
-        run(adb_cmd(adb_path, serial, "shell", "pm", "clear", package), check=False)
+        phase("clear", adb_cmd(adb_path, serial, "shell", "pm", "clear", package))
         if activity:
-            run(adb_cmd(adb_path, serial, "shell", "am", "start", "-n", f"{package}/{activity}"), check=False)
+            phase("launch", adb_cmd(adb_path, serial, "shell", "am", "start", "-n", f"{package}/{activity}"))
         else:
-            run(adb_cmd(adb_path, serial, "shell", "monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1"), check=False)
-    print("Starting filtered logcat. Press Ctrl+C to stop.")
+            phase("launch", adb_cmd(adb_path, serial, "shell", "monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1"))
+    return timings
+
+
+def _print_dev_timings(iteration: int, timings: List[Tuple[str, float]]) -> None:
+    if not timings:
+        return
+    parts = "  ".join(f"{name} {seconds:.2f}s" for name, seconds in timings)
+    print(f"[dev loop #{iteration}] {parts}  total {sum(t for _, t in timings):.2f}s")
+
+
+def _watch_dev_loop(
+    adb_path: str, serial: str, apk_path: str, package: str, activity: str, logcat: List[str]
+) -> None:
+    watcher = BuildWatcher(apk_path)
+    print(f"Watching {apk_path} for new builds. Filtered logcat stays attached. Press Ctrl+C to stop.")
+    proc = spawn_streaming(logcat)
+    iteration = 1
     try:
-        run_streaming(adb_cmd(adb_path, serial, "logcat", f"{tag}:I", "*:S"))
+        while True:
+            if proc is not None and proc.poll() is not None:
+                print("Logcat stream ended; reattaching.")
+                time.sleep(1)
+                proc = spawn_streaming(logcat)
+            if not watcher.poll():
+                time.sleep(watcher.poll_sec)
+                continue
+            iteration += 1
+            print(f"New build detected: {apk_path}")
+            timings: List[Tuple[str, float]] = [("settle", watcher.settle_duration)]
+            try:
+                timings.extend(_dev_iteration(adb_path, serial, apk_path, package, activity))
+            except AdbWizardError as e:
+                print(f"Deploy failed, waiting for the next build: {str(e).splitlines()[0] if str(e) else e}")
+            _print_dev_timings(iteration, timings)
     except KeyboardInterrupt:
         print()
+    finally:
+        stop_streaming(proc)
+
+
+class _JsonObjectWriter:
+    # Writes a flat JSON object of string values in the same layout as
+    # json.dump(..., indent=2), letting large values be streamed in pieces.
+    def __init__(self, f: IO) -> None:
+        self.f = f
+        self.first = True
+        f.write("{")
+
+    def _key(self, key: str) -> None:
+        self.f.write("\n  " if self.first else ",\n  ")
+        self.first = False
+        self.f.write(f"{json.dumps(key)}: ")
+
+    def field(self, key: str, value: str) -> None:
+        self._key(key)
+        self.f.write(json.dumps(value))
+
+    def begin_string(self, key: str) -> None:
+        self._key(key)
+        self.f.write('"')
+
+    def string_chunk(self, text: str) -> None:
+        self.f.write(json.dumps(text)[1:-1])
+
+    def end_string(self) -> None:
+        self.f.write('"')
+
+    def close(self) -> None:
+        self.f.write("\n}\n")
+
+
+def _capture_json_fields(
+    writer: _JsonObjectWriter,
+    adb_path: str,
+    serial: str,
+    fields: Dict[str, str],
+    text_file: Optional[IO] = None,
+    single_line: Tuple[str, ...] = (),
+) -> None:
+    # All fields come from one coalesced `adb shell`. Output arrives in field
+    # order, so each value is streamed straight into the writer; fields in
+    # `single_line` are stripped like a one-line value.
+    keys = list(fields)
+    opened = [-1]
+
+    def open_through(index: int) -> None:
+        while opened[0] < index:
+            if opened[0] >= 0:
+                writer.end_string()
+                if text_file is not None:
+                    text_file.write("\n\n")
+            opened[0] += 1
+            writer.begin_string(keys[opened[0]])
+            if text_file is not None:
+                text_file.write(f"## {keys[opened[0]]}\n")
+
+    def sink_for(index: int) -> Callable[[str], None]:
+        def sink(chunk: str) -> None:
+            open_through(index)
+            writer.string_chunk(chunk)
+            if text_file is not None:
+                text_file.write(chunk)
+
+        return sink
+
+    with ShellBatch(adb_path, serial) as batch:
+        for index, key in enumerate(keys):
+            strip = key in single_line
+            transform = (lambda text: redact_if_enabled(text.strip())) if strip else redact_if_enabled
+            batch.submit(fields[key], sink=sink_for(index), transform=transform)
+    open_through(len(keys) - 1)
+    writer.end_string()
+    if text_file is not None:
+        text_file.write("\n\n")
 
 
 def export_health_report(adb_path: str, serial: str) -> None:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base = f"health_report_{serial}_{timestamp}"
+    base = f"health_report_{target_filename(serial)}_{timestamp}"
     text_path = f"{base}.txt"
     json_path = f"{base}.json"
-    data: Dict[str, Any] = {
-        "serial": serial,
-        "timestamp": timestamp,
-        "getprop_model": run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.product.model"), check=False).stdout.strip(),
-        "getprop_brand": run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.product.brand"), check=False).stdout.strip(),
-        "android_version": run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.build.version.release"), check=False).stdout.strip(),
-        "api_level": run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.build.version.sdk"), check=False).stdout.strip(),
-        "storage_df": run(adb_cmd(adb_path, serial, "shell", "df", "-h"), check=False).stdout,
-        "battery": run(adb_cmd(adb_path, serial, "shell", "dumpsys", "battery"), check=False).stdout,
-        "thermal": run(adb_cmd(adb_path, serial, "shell", "dumpsys", "thermalservice"), check=False).stdout,
-        "ip_route": run(adb_cmd(adb_path, serial, "shell", "ip", "route"), check=False).stdout,
+    single_line = ("getprop_model", "getprop_brand", "android_version", "api_level")
+    fields = {
+        "getprop_model": "getprop ro.product.model",
+        "getprop_brand": "getprop ro.product.brand",
+        "android_version": "getprop ro.build.version.release",
+        "api_level": "getprop ro.build.version.sdk",
+        "storage_df": "df -h",
+        "battery": "dumpsys battery",
+        "thermal": "dumpsys thermalservice",
+        "ip_route": "ip route",
     }
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(json.loads(redact_if_enabled(json.dumps(data))), f, indent=2)
-        f.write("\n")
-    with open(text_path, "w", encoding="utf-8") as f:
-        for k, v in data.items():
-            f.write(redact_if_enabled(f"## {k}\n{v}\n\n"))
+    with open(json_path, "w", encoding="utf-8") as jf, open(text_path, "w", encoding="utf-8") as tf:
+        writer = _JsonObjectWriter(jf)
+        for key, value in (("serial", serial), ("timestamp", timestamp)):
+            value = redact_if_enabled(value)
+            writer.field(key, value)
+            tf.write(f"## {key}\n{value}\n\n")
+        _capture_json_fields(writer, adb_path, serial, fields, text_file=tf, single_line=single_line)
+        writer.close()
     print(f"Wrote reports: {text_path}, {json_path}")
 
 
 def snapshot_device_state(adb_path: str, serial: str) -> None:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    path = f"device_snapshot_{serial}_{timestamp}.json"
-    data = {
-        "serial": serial,
-        "timestamp": timestamp,
-        "packages_all": run(adb_cmd(adb_path, serial, "shell", "pm", "list", "packages"), check=False).stdout,
-        "packages_user": run(adb_cmd(adb_path, serial, "shell", "pm", "list", "packages", "-3"), check=False).stdout,
-        "getprop": run(adb_cmd(adb_path, serial, "shell", "getprop"), check=False).stdout,
-        "settings_global": run(adb_cmd(adb_path, serial, "shell", "settings", "list", "global"), check=False).stdout,
-        "settings_system": run(adb_cmd(adb_path, serial, "shell", "settings", "list", "system"), check=False).stdout,
-        "settings_secure": run(adb_cmd(adb_path, serial, "shell", "settings", "list", "secure"), check=False).stdout,
+    path = f"device_snapshot_{target_filename(serial)}_{timestamp}.json"
+    fields = {
+        "packages_all": "pm list packages",
+        "packages_user": "pm list packages -3",
+        "getprop": "getprop",
+        "settings_global": "settings list global",
+        "settings_system": "settings list system",
+        "settings_secure": "settings list secure",
     }
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(json.loads(redact_if_enabled(json.dumps(data))), f, indent=2)
-        f.write("\n")
+        writer = _JsonObjectWriter(f)
+        writer.field("serial", redact_if_enabled(serial))
+        writer.field("timestamp", timestamp)
+        _capture_json_fields(writer, adb_path, serial, fields)
+        writer.close()
     print(f"Snapshot saved: {path}")
 
 
@@ -395,34 +606,105 @@ def intent_deeplink_runner(adb_path: str, serial: str) -> None:
 def process_service_inspector(adb_path: str, serial: str) -> None:
     package = input("Package filter (optional): ").strip()
     if package:
-        ps = run(adb_cmd(adb_path, serial, "shell", "ps", "-A"), check=False).stdout
+        ps, pidof, services = (
+            p.stdout
+            for p in run_shell_batch(
+                adb_path, serial, ["ps -A", f"pidof {package}", f"dumpsys activity services {package}"]
+            )
+        )
         matched = [ln for ln in ps.splitlines() if package in ln]
         print("\n".join(matched) if matched else "(no matching processes)")
-        pidof = run(adb_cmd(adb_path, serial, "shell", "pidof", package), check=False).stdout.strip()
+        pidof = pidof.strip()
         if pidof:
             print(f"pidof: {pidof}")
-        services = run(adb_cmd(adb_path, serial, "shell", "dumpsys", "activity", "services", package), check=False).stdout
         print(services[:4000] if services else "(no services output)")
         return
     out = run(adb_cmd(adb_path, serial, "shell", "ps", "-A"), check=False).stdout
     print(out)
 
 
+def process_resource_sampler(adb_path: str, serial: str) -> None:
+    package = input("Package to sample: ").strip()
+    if not package:
+        print("Package is required.")
+        return
+    try:
+        interval = max(0.2, float(input("Interval seconds (default 1): ").strip() or "1"))
+        duration = max(0.0, float(input("Duration seconds (0 = until Ctrl+C, default 60): ").strip() or "60"))
+        capacity = max(1, int(input(f"Ring buffer size (default {DEFAULT_RING_SIZE}): ").strip() or DEFAULT_RING_SIZE))
+    except ValueError:
+        print("Invalid number.")
+        return
+    count = int(duration / interval) if duration else 0
+
+    def show(sample: Any) -> None:
+        if sample is None:
+            print(f"{package}: not running")
+            return
+        print(
+            f"pid {sample.pid} cpu {sample.cpu_pct:6.1f}%  rss {sample.rss_kb / 1024:7.1f} MB  "
+            f"pss {sample.pss_kb / 1024:7.1f} MB  threads {sample.threads}"
+        )
+
+    print("Sampling over one shell session. Press Ctrl+C to stop early.")
+    sampler = sample_process(adb_path, serial, package, interval, count, capacity, on_sample=show)
+    if not sampler.samples:
+        print("No samples collected.")
+        return
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    base = f"proc_samples_{target_filename(serial)}_{package}_{timestamp}"
+    sampler.export_csv(f"{base}.csv")
+    sampler.export_json(f"{base}.json", {"serial": serial, "package": package, "interval_sec": interval})
+    print(json.dumps(sampler.summary(), indent=2))
+    print(f"Saved {base}.csv and {base}.json")
+
+
+def battery_thermal_recorder(adb_path: str, serial: str) -> None:
+    try:
+        interval = max(1.0, float(input("Interval seconds (default 10): ").strip() or "10"))
+        duration = max(0.0, float(input("Duration minutes (0 = until Ctrl+C, default 30): ").strip() or "30"))
+    except ValueError:
+        print("Invalid number.")
+        return
+    count = int(duration * 60 / interval) if duration else 0
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_dir = f"telemetry_{target_filename(serial)}_{timestamp}"
+
+    def show(record: Dict[str, Any]) -> None:
+        status = record.get("thermal_status")
+        print(
+            f"level {record.get('level')}%  temp {record.get('temperature_c')} C  "
+            f"thermal status {int(status) if status is not None else '-'}"
+        )
+
+    print("Recording over one shell session. Press Ctrl+C to stop early.")
+    recorder = record_telemetry(adb_path, serial, out_dir, interval, count, on_record=show)
+    if not recorder.samples:
+        print("No samples collected.")
+        return
+    print(json.dumps(recorder.summary(), indent=2))
+    print(f"Saved telemetry chunks and summary.json in {out_dir}/")
+
+
+def _dns_lines(text: str) -> str:
+    return "".join(ln for ln in text.splitlines(keepends=True) if "dns" in ln.lower())
+
+
 def network_diagnostics_pack(adb_path: str, serial: str) -> None:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    path = f"network_diag_{serial}_{timestamp}.txt"
-    props = run(adb_cmd(adb_path, serial, "shell", "getprop"), check=False).stdout
-    dns_lines = "\n".join(ln for ln in props.splitlines() if "dns" in ln.lower())
-    sections = {
-        "ip_addr": run(adb_cmd(adb_path, serial, "shell", "ip", "addr"), check=False).stdout,
-        "ip_route": run(adb_cmd(adb_path, serial, "shell", "ip", "route"), check=False).stdout,
-        "dns_props": dns_lines,
-        "ping_google": run(adb_cmd(adb_path, serial, "shell", "ping", "-c", "2", "8.8.8.8"), check=False).stdout,
-        "connectivity": run(adb_cmd(adb_path, serial, "shell", "dumpsys", "connectivity"), check=False).stdout,
-    }
+    path = f"network_diag_{target_filename(serial)}_{timestamp}.txt"
+    sections = [
+        ("ip_addr", adb_cmd(adb_path, serial, "shell", "ip", "addr"), redact_if_enabled),
+        ("ip_route", adb_cmd(adb_path, serial, "shell", "ip", "route"), redact_if_enabled),
+        ("dns_props", adb_cmd(adb_path, serial, "shell", "getprop"), lambda t: redact_if_enabled(_dns_lines(t))),
+        ("ping_google", adb_cmd(adb_path, serial, "shell", "ping", "-c", "2", "8.8.8.8"), redact_if_enabled),
+        ("connectivity", adb_cmd(adb_path, serial, "shell", "dumpsys", "connectivity"), redact_if_enabled),
+    ]
     with open(path, "w", encoding="utf-8") as f:
-        for key, value in sections.items():
-            f.write(redact_if_enabled(f"## {key}\n{value}\n\n"))
+        for key, cmd, transform in sections:
+            f.write(f"## {key}\n")
+            run_capture(cmd, f, check=False, transform=transform)
+            f.write("\n\n")
     print(f"Saved network diagnostics: {path}")
 
 
@@ -460,6 +742,43 @@ def interactive_package_search(adb_path: str, serial: str) -> None:
         print("Unknown option.")
 
 
+def multi_device_logcat(adb_path: str) -> None:
+    devices = [d for d in list_devices(adb_path) if d.state == "device"]
+    if len(devices) < 2:
+        print("Connect at least two authorized devices for a merged logcat.")
+        return
+    labels = {serial: alias for alias, serial in load_aliases().items()}
+    for i, d in enumerate(devices, start=1):
+        print(f"{i}) {labels.get(d.target, d.target)} ({d.target})")
+    raw = input("Devices (comma-separated numbers, blank = all): ").strip()
+    if raw:
+        picks = [p.strip() for p in raw.split(",") if p.strip()]
+        if not all(p.isdigit() and 1 <= int(p) <= len(devices) for p in picks):
+            print("Invalid choice.")
+            return
+        devices = [devices[int(p) - 1] for p in dict.fromkeys(picks)]
+    spec = input("Filter spec (e.g. MyTag:D *:S, blank = all): ").strip()
+    window_raw = input(f"Reorder window seconds [{DEFAULT_REORDER_WINDOW_SEC}]: ").strip()
+    try:
+        window = float(window_raw) if window_raw else DEFAULT_REORDER_WINDOW_SEC
+    except ValueError:
+        window = DEFAULT_REORDER_WINDOW_SEC
+    mux = LogcatMux(
+        adb_path,
+        [(d.target, labels.get(d.target, d.target)) for d in devices],
+        window_sec=window,
+        logcat_args=spec.split(),
+    )
+    print("Measuring device clock offsets...")
+    print("Streaming merged logcat. Press Ctrl+C to stop.")
+    try:
+        mux.run()
+    except KeyboardInterrupt:
+        print()
+    for serial, offset in mux.offsets.items():
+        print(f"- {labels.get(serial, serial)}: {mux.counts.get(serial, 0)} lines, clock offset {offset:+.3f}s")
+
+
 def manage_device_aliases(adb_path: str) -> None:
     aliases = load_aliases()
     while True:
@@ -483,15 +802,13 @@ def manage_device_aliases(adb_path: str) -> None:
             alias = input("Alias: ").strip()
             serial = input("Serial: ").strip()
             if alias and serial:
-                aliases[alias] = serial
-                save_aliases(aliases)
+                aliases = update_json(ALIASES_FILE, {}, lambda current: current.__setitem__(alias, serial))
                 print("Alias saved.")
             continue
         if choice == "3":
             alias = input("Alias to remove: ").strip()
             if alias in aliases:
-                aliases.pop(alias, None)
-                save_aliases(aliases)
+                aliases = update_json(ALIASES_FILE, {}, lambda current: current.pop(alias, None))
                 print("Alias removed.")
             else:
                 print("Alias not found.")
@@ -519,18 +836,14 @@ def scheduled_log_capture(adb_path: str, serial: str) -> None:
     except ValueError:
         interval = 30
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_dir = f"scheduled_logs_{serial}_{timestamp}"
+    out_dir = f"scheduled_logs_{target_filename(serial)}_{timestamp}"
     os.makedirs(out_dir, exist_ok=True)
     end_at = datetime.now().timestamp() + total_seconds
     chunk = 1
     while datetime.now().timestamp() < end_at:
-        chunk_path = os.path.join(out_dir, f"logcat_chunk_{chunk:03d}.txt")
-        raw = run(adb_cmd(adb_path, serial, "logcat", "-d"), check=False).stdout
-        with open(chunk_path, "w", encoding="utf-8") as f:
-            f.write(redact_if_enabled(raw))
-        with open(chunk_path, "rb") as src, gzip.open(f"{chunk_path}.gz", "wb") as dst:
-            dst.write(src.read())
-        os.remove(chunk_path)
+        chunk_path = os.path.join(out_dir, f"logcat_chunk_{chunk:03d}.txt.gz")
+        with gzip.open(chunk_path, "wt", encoding="utf-8") as dst:
+            run_capture(adb_cmd(adb_path, serial, "logcat", "-d"), dst, check=False, transform=redact_if_enabled)
         run(adb_cmd(adb_path, serial, "logcat", "-c"), check=False)
         chunk += 1
         if datetime.now().timestamp() < end_at:
@@ -538,6 +851,42 @@ def scheduled_log_capture(adb_path: str, serial: str) -> None:
     print(f"Scheduled logs saved in: {out_dir}")
 
 
+def ingest_logs_to_store() -> None:
+    raw = input("Log files or folders to ingest (comma-separated, default .): ").strip() or "."
+    serial = input("Serial override (blank = from file names): ").strip()
+    paths = [p.strip() for p in raw.split(",") if p.strip()]
+    with LogStore(LOG_DB_FILE) as store:
+        results = store.ingest_paths(paths, serial)
+        for r in results:
+            state = "unchanged" if r["skipped"] else f"{r['lines']} lines in {r['duration_sec']:.2f}s"
+            print(f"- {r['path']} [{r['serial']}]: {state}")
+        stats = store.stats()
+    print(f"Log store {stats['path']}: {stats['lines']} lines from {stats['sources']} file(s).")
+
+
+def query_log_store() -> None:
+    if not os.path.exists(LOG_DB_FILE):
+        print("Log store is empty. Ingest logs first.")
+        return
+    text = input("Message text (e.g. FATAL EXCEPTION, blank = any): ").strip()
+    package = input("Package (blank = any): ").strip()
+    serial = input("Serial (blank = all devices): ").strip()
+    level = input("Level V/D/I/W/E/F (blank = any): ").strip()
+    since_raw = input("Time window (e.g. 1d, 12h, blank = all): ").strip()
+    try:
+        since_sec = parse_since(since_raw) if since_raw else None
+    except AdbWizardError as e:
+        print(e)
+        return
+    started = time.perf_counter()
+    with LogStore(LOG_DB_FILE) as store:
+        rows = store.query(text=text, serial=serial, package=package, level=level, since_sec=since_sec)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for row in reversed(rows):
+        print(format_log_row(row))
+    print(f"{len(rows)} row(s) in {elapsed_ms:.1f} ms")
+
+
 def prerequisite_health_check(adb_path: str) -> None:
     print("Prerequisite health check")
     print(f"- Current working directory: {os.getcwd()}")
@@ -558,39 +907,119 @@ def manage_port_forwarding(adb_path: str, serial: str) -> None:
         print("3) Remove forward")
         print("4) Add reverse (remote->local)")
         print("5) Remove reverse")
+        print("6) Save forward set to a profile")
+        print("7) Apply forward set from a profile (add/remove only the difference)")
         print("0) Back")
         choice = input("> ").strip()
         if choice == "0":
             return
         if choice == "1":
-            out = run([adb_path, "-s", serial, "forward", "--list"], check=False).stdout
+            out = run(adb_cmd(adb_path, serial, "forward", "--list"), check=False).stdout
             print(out or "(none)")
             continue
         if choice == "2":
             local = input("Local (e.g. tcp:8081): ").strip()
             remote = input("Remote (e.g. tcp:8081): ").strip()
             if local and remote:
-                run([adb_path, "-s", serial, "forward", local, remote], check=False)
+                run(adb_cmd(adb_path, serial, "forward", local, remote), check=False)
             continue
         if choice == "3":
             local = input("Local to remove (e.g. tcp:8081): ").strip()
             if local:
-                run([adb_path, "-s", serial, "forward", "--remove", local], check=False)
+                run(adb_cmd(adb_path, serial, "forward", "--remove", local), check=False)
             continue
         if choice == "4":
             remote = input("Remote (e.g. tcp:8081): ").strip()
             local = input("Local (e.g. tcp:8081): ").strip()
             if remote and local:
-                run([adb_path, "-s", serial, "reverse", remote, local], check=False)
+                run(adb_cmd(adb_path, serial, "reverse", remote, local), check=False)
             continue
         if choice == "5":
             remote = input("Remote to remove (e.g. tcp:8081): ").strip()
             if remote:
-                run([adb_path, "-s", serial, "reverse", "--remove", remote], check=False)
+                run(adb_cmd(adb_path, serial, "reverse", "--remove", remote), check=False)
+            continue
+        if choice == "6":
+            _define_forward_set(adb_path, serial)
+            continue
+        if choice == "7":
+            _apply_forward_set(adb_path, serial)
             continue
         print("Unknown option.")
 
 
+def _define_forward_set(adb_path: str, serial: str) -> None:
+    profile = input("Profile name: ").strip()
+    set_name = input("Forward set name (e.g. metro): ").strip()
+    if not profile or not set_name:
+        print("Profile and set name are required.")
+        return
+    if input("Start from this device's current forwards/reverses? [y/N]: ").strip().lower() in ("y", "yes"):
+        try:
+            rules = [str(rule) for rule in current_rules(adb_path, serial)]
+        except AdbWizardError as e:
+            print(e)
+            return
+        for rule in rules:
+            print(f"  {rule}")
+    else:
+        rules = []
+    print("Add rules as 'forward <local> <remote>' or 'reverse <remote> <local>' (blank line to finish):")
+    while True:
+        line = input("rule> ").strip()
+        if not line:
+            break
+        try:
+            rules.append(str(parse_rule(line)))
+        except AdbWizardError as e:
+            print(e)
+    if not rules:
+        print("No rules; nothing saved.")
+        return
+    save_forward_set(profile, set_name, rules)
+    print(f"Saved forward set {set_name} ({len(rules)} rule(s)) to profile {profile}.")
+
+
+def _print_forward_result(result: ForwardResult, prefix: str = "") -> None:
+    for rule in result.removed:
+        print(f"{prefix}- {rule}")
+    for rule in result.added:
+        print(f"{prefix}+ {rule}")
+    for error in result.errors:
+        print(f"{prefix}! {error}")
+    print(f"{prefix}{len(result.added)} added, {len(result.removed)} removed, {result.unchanged} already in place.")
+
+
+def _apply_forward_set(adb_path: str, serial: str) -> None:
+    profiles = load_profiles()
+    with_sets = {name: p for name, p in profiles.items() if p.get("forward_sets")}
+    profile = select_profile(with_sets)
+    if not profile:
+        return
+    set_names = sorted(with_sets[profile]["forward_sets"])
+    for i, name in enumerate(set_names, start=1):
+        print(f"{i}) {name}")
+    choice = input("Select forward set number: ").strip()
+    if not choice.isdigit() or not (1 <= int(choice) <= len(set_names)):
+        print("Invalid choice.")
+        return
+    try:
+        rules = parse_rules(find_forward_set(profile, set_names[int(choice) - 1]))
+    except AdbWizardError as e:
+        print(e)
+        return
+    prune = input("Also remove forwards/reverses not in the set? [y/N]: ").strip().lower() in ("y", "yes")
+    serials = [serial]
+    ready = [d.target for d in list_devices(adb_path) if d.state == "device"]
+    if len(ready) > 1:
+        answer = input(f"Apply on all {len(ready)} connected devices in parallel? [y/N]: ").strip().lower()
+        if answer in ("y", "yes"):
+            serials = ready
+    results = apply_forwards_on_devices(adb_path, serials, rules, prune)
+    for result in results:
+        _print_forward_result(result, f"[{result.serial}] " if len(results) > 1 else "")
+
+
 def screen_capture_tools(adb_path: str, serial: str) -> None:
     while True:
         print("\nScreen capture tools")
@@ -602,7 +1031,7 @@ def screen_capture_tools(adb_path: str, serial: str) -> None:
             return
         if choice == "1":
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            local = f"screenshot_{serial}_{timestamp}.png"
+            local = f"screenshot_{target_filename(serial)}_{timestamp}.png"
             remote = f"/sdcard/{local}"
             run(adb_cmd(adb_path, serial, "shell", "screencap", "-p", remote), check=False)
             run(adb_cmd(adb_path, serial, "pull", remote, local), check=False)
@@ -616,7 +1045,7 @@ def screen_capture_tools(adb_path: str, serial: str) -> None:
             except ValueError:
                 duration = 15
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            local = f"screenrecord_{serial}_{timestamp}.mp4"
+            local = f"screenrecord_{target_filename(serial)}_{timestamp}.mp4"
             remote = f"/sdcard/{local}"
             run(adb_cmd(adb_path, serial, "shell", "screenrecord", "--time-limit", str(duration), remote), check=False)
             run(adb_cmd(adb_path, serial, "pull", remote, local), check=False)
@@ -635,7 +1064,9 @@ def wireless_pairing(adb_path: str) -> None:
     run([adb_path, "pair", host, code], check=False)
     connect_host = input("Connect host (e.g. 192.168.1.10:5555): ").strip()
     if connect_host:
-        run([adb_path, "connect", connect_host], check=False)
+        error = connect_endpoint(adb_path, connect_host)
+        print(f"Connected to {connect_host}" if not error else f"Connect to {connect_host} failed: {error}")
+        offer_endpoint_registration(connect_host)
 
 
 def multi_device_broadcast(adb_path: str) -> None:
@@ -656,8 +1087,11 @@ def multi_device_broadcast(adb_path: str) -> None:
             print(f"APK path does not exist: {apk}")
             return
         for d in devices:
-            print(f"[{d.serial}] installing...")
-            run(adb_cmd(adb_path, d.serial, "install", "-r", apk), check=False)
+            if DEVICE_BREAKER.state(d.target) == "open":
+                print(f"[{d.target}] skipped (device failing repeatedly, circuit open)")
+                continue
+            print(f"[{d.target}] installing...")
+            run(adb_cmd(adb_path, d.target, "install", "-r", apk), check=False)
         print("Broadcast install complete.")
         return
     if choice == "2":
@@ -666,9 +1100,12 @@ def multi_device_broadcast(adb_path: str) -> None:
             print("Shell command is required.")
             return
         for d in devices:
-            print(f"[{d.serial}] running...")
-            out = run(adb_cmd(adb_path, d.serial, "shell", cmd), check=False)
-            print(f"--- {d.serial} ---")
+            if DEVICE_BREAKER.state(d.target) == "open":
+                print(f"[{d.target}] skipped (device failing repeatedly, circuit open)")
+                continue
+            print(f"[{d.target}] running...")
+            out = run(adb_cmd(adb_path, d.target, "shell", cmd), check=False)
+            print(f"--- {d.target} ---")
             if out.stdout:
                 print(out.stdout.strip())
             if out.stderr:
@@ -677,63 +1114,78 @@ def multi_device_broadcast(adb_path: str) -> None:
     print("Unknown option.")
 
 
-def _load_plugin(path: str):
-    module_name = os.path.splitext(os.path.basename(path))[0]
-    spec = importlib.util.spec_from_file_location(module_name, path)
-    if spec is None or spec.loader is None:
-        return None
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
+def farm_workflow_action(adb_path: str) -> Callable[[str], JobAction]:
+    def for_workflow(name: str) -> JobAction:
+        wf = find_workflow(name)
+        if wf is None:
+            raise AdbWizardError(f"Workflow not found: {name}")
 
+        def action(serial: str) -> str:
+            report = execute_workflow(adb_path, wf, [serial], log=lambda _: None, interactive=False)
+            if not report.ok:
+                raise AdbWizardError(format_workflow_report(report))
+            return format_workflow_report(report)
 
-def run_plugins(adb_path: str, serial: str) -> None:
-    if not os.path.isdir(PLUGINS_DIR):
-        print(f"No plugins directory found: {PLUGINS_DIR}")
-        return
-    plugin_files = sorted(
-        p for p in os.listdir(PLUGINS_DIR) if p.endswith(".py") and not p.startswith("_")
-    )
-    if not plugin_files:
-        print("No plugins found.")
-        return
+        return action
 
-    actions: List[Dict[str, Any]] = []
-    for filename in plugin_files:
-        path = os.path.join(PLUGINS_DIR, filename)
-        try:
-            module = _load_plugin(path)
-        except Exception as e:
-            print(f"Failed loading plugin {filename}: {e}")
-            continue
-        if module is None:
-            continue
-        register: Optional[Callable[[], List[Dict[str, Any]]]] = getattr(module, "register", None)
-        if not callable(register):
-            continue
-        try:
-            for action in register() or []:
-                if callable(action.get("run")) and action.get("name"):
-                    actions.append(action)
-        except Exception as e:
-            print(f"Failed registering actions in plugin {filename}: {e}")
+    return for_workflow
 
-    if not actions:
-        print("No valid plugin actions found.")
-        return
 
-    print("Plugin actions:")
-    for i, action in enumerate(actions, start=1):
-        print(f"{i}) {action['name']}")
-    choice = input("> ").strip()
-    if not choice.isdigit() or not (1 <= int(choice) <= len(actions)):
-        print("Invalid choice.")
-        return
-    selected = actions[int(choice) - 1]
+def load_farm_jobs(adb_path: str, path: str) -> List[FarmJob]:
+    specs = read_json(path, None)
+    if not isinstance(specs, list):
+        raise AdbWizardError(f"Jobs file must hold a JSON list of job objects: {path}")
+    return jobs_from_specs(adb_path, specs, farm_workflow_action(adb_path))
+
+
+def run_farm(adb_path: str, jobs: List[FarmJob], log: Callable[[str], None] = print) -> Dict[str, Any]:
+    ready = [d.target for d in list_devices(adb_path) if d.state == "device"]
+    if not ready:
+        raise AdbWizardError("No authorized devices available.")
+    devices = probe_devices(adb_path, ready, load_aliases())
+    for d in devices:
+        log(f"[{d.serial}] API {d.api_level or '?'} {','.join(d.abis) or '?'} {' '.join(d.aliases)}".rstrip())
+    stats = run_jobs(devices, jobs)
+    stats["results"] = [job.to_dict() for job in jobs]
+    return stats
+
+
+def device_farm_queue(adb_path: str) -> None:
+    path = input("Jobs file (JSON list; blank = one shell command): ").strip().strip('"')
     try:
-        selected["run"](adb_path=adb_path, serial=serial, run=run, adb_cmd=adb_cmd)
-    except Exception as e:
-        print(f"Plugin action failed: {e}")
+        if path:
+            jobs = load_farm_jobs(adb_path, path)
+        else:
+            command = input("shell> ").strip()
+            if not command:
+                print("Shell command is required.")
+                return
+            repeat = int(input("How many runs (default 1): ").strip() or "1")
+            min_api = int(input("Minimum API level (blank = any): ").strip() or "0")
+            abi = input("Required ABI (blank = any): ").strip()
+            alias = input("Alias/serial glob (blank = any): ").strip()
+            requires = Requirements(min_api=min_api, abi=abi, alias=alias)
+            action = shell_action(adb_path, command)
+            jobs = [FarmJob(f"shell {command}", action, requires) for _ in range(max(1, repeat))]
+        stats = run_farm(adb_path, jobs)
+    except ValueError:
+        print("Invalid number.")
+        return
+    except AdbWizardError as e:
+        print(e)
+        return
+    for result in stats["results"]:
+        error = f"  {result['error'].splitlines()[0]}" if result["error"] else ""
+        print(
+            f"#{result['id']} {result['name']}: {result['state']} on {result['serial'] or '-'} "
+            f"(waited {result['wait_sec']:.2f}s, ran {result['run_sec']:.2f}s){error}"
+        )
+    print(
+        f"{stats['done']} done, {stats['failed']} failed in {stats['elapsed_sec']:.1f}s; "
+        f"peak queue {stats['peak_queue_depth']}, avg wait {stats['wait_avg_sec']:.2f}s, steals {stats['steals']}"
+    )
+    for serial, share in stats["utilisation"].items():
+        print(f"[{serial}] utilisation {share * 100:.0f}% ({stats['jobs_per_device'][serial]} jobs)")
 
 
 def apk_insight(adb_path: str, serial: str, signature_check_mode: str = "conservative") -> None:
@@ -1,12 +1,54 @@
+import asyncio
 import json
 import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-
-from .adb import adb_cmd, adb_source_label, ensure_adb, run, set_runtime_options
+from typing import IO, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .adb import (
+    TRANSPORT_PREFIX,
+    adb_cmd,
+    adb_source_label,
+    async_run,
+    ensure_adb,
+    run,
+    run_capture,
+    run_line_stream,
+    set_runtime_options,
+    target_filename,
+)
+from .advanced import find_forward_set, find_workflow, load_aliases, load_farm_jobs, run_farm, run_workflow_on_targets
+from .bugreport import BugreportReader
 from .config import load_settings
-from .devices import get_device_summary_data, list_devices
+from .devices import (
+    Device,
+    DeviceRegistry,
+    async_get_device_summary_data,
+    async_list_devices,
+    get_device_summary_data,
+    list_devices,
+)
+from .discovery import DEFAULT_CONNECT_LIMIT, DEFAULT_PORTS, async_discover, register_connected
 from .errors import AdbWizardError
+from .farm import FarmJob, Requirements, shell_action
+from .forwards import apply_forwards_on_devices, parse_rules
+from .logstore import DEFAULT_QUERY_LIMIT, LOG_DB_FILE, LogClock, LogStore, parse_line, parse_since
+from .transfer import (
+    PROGRESS_INTERVAL_SEC,
+    TransferProgress,
+    TransferStats,
+    install_apk,
+    local_size,
+    pull_file,
+    pull_target,
+    push_file,
+    record_transfer,
+    transfer_stats,
+)
+from .workflows import resolve_targets
 
 
 def _parse_bool(value: str, default: bool = False) -> bool:
@@ -35,55 +77,103 @@ def parse_params(raw: Optional[str]) -> Dict[str, str]:
     return params
 
 
-def _ensure_target_serial(adb_path: str, serial: Optional[str]) -> str:
+def _pick_target(devices: List[Device], serial: Optional[str]) -> str:
+    # --serial may be a serial, alias, model or transport_id:<n>. A name the
+    # listing does not know is passed through so adb reports the error.
     if serial:
-        return serial
-    devices = [d for d in list_devices(adb_path) if d.state == "device"]
-    if len(devices) == 1:
-        return devices[0].serial
-    if not devices:
+        registry = DeviceRegistry(devices, load_aliases())
+        if not registry.matches(serial):
+            return serial
+        return registry.resolve(serial).target
+    ready = [d for d in devices if d.state == "device"]
+    if len(ready) == 1:
+        return ready[0].target
+    if not ready:
         raise AdbWizardError("No authorized connected devices found. Pass --serial to target explicitly.")
     raise AdbWizardError("Multiple devices connected. Pass --serial to target a specific device.")
 
 
-def _devices_list(adb_path: str) -> Dict[str, Any]:
-    devices = list_devices(adb_path)
+def _ensure_target_serial(adb_path: str, serial: Optional[str]) -> str:
+    if serial and serial.startswith(TRANSPORT_PREFIX):
+        return serial
+    return _pick_target(list_devices(adb_path), serial)
+
+
+def _devices_payload(devices: List[Device]) -> Dict[str, Any]:
     return {
         "devices": [
-            {"serial": d.serial, "state": d.state, "description": d.description}
+            {
+                "serial": d.serial,
+                "state": d.state,
+                "target": d.target,
+                "product": d.product,
+                "model": d.model,
+                "device": d.device,
+                "transport_id": d.transport_id,
+                "description": d.description,
+            }
             for d in devices
         ]
     }
 
 
+def _devices_list(adb_path: str) -> Dict[str, Any]:
+    return _devices_payload(list_devices(adb_path))
+
+
 def _device_summary(adb_path: str, serial: str) -> Dict[str, Any]:
     return {"summary": get_device_summary_data(adb_path, serial)}
 
 
-def _shell_run(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+def _proc_payload(proc: subprocess.CompletedProcess) -> Dict[str, Any]:
+    return {"returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr}
+
+
+def _shell_run_cmd(adb_path: str, serial: str, params: Dict[str, str]) -> List[str]:
     cmd = params.get("command", "")
     if not cmd:
         raise AdbWizardError("Missing parameter: command")
-    proc = run(adb_cmd(adb_path, serial, "shell", cmd), check=False)
-    return {"returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr}
+    return adb_cmd(adb_path, serial, "shell", cmd)
 
 
-def _package_list(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
-    third_party = _parse_bool(params.get("third_party", "false"))
+def _shell_run(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    return _proc_payload(run(_shell_run_cmd(adb_path, serial, params), check=False))
+
+
+def _package_list_cmd(adb_path: str, serial: str, params: Dict[str, str]) -> List[str]:
     args: List[str] = ["pm", "list", "packages"]
-    if third_party:
+    if _parse_bool(params.get("third_party", "false")):
         args.append("-3")
-    out = run(adb_cmd(adb_path, serial, "shell", *args)).stdout
+    return adb_cmd(adb_path, serial, "shell", *args)
+
+
+def _package_list_payload(out: str, params: Dict[str, str]) -> Dict[str, Any]:
     packages = [ln.replace("package:", "").strip() for ln in out.splitlines() if ln.strip()]
-    return {"packages": packages, "third_party": third_party}
+    return {"packages": packages, "third_party": _parse_bool(params.get("third_party", "false"))}
 
 
-def _package_info(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+def _package_list(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    # Parsed as the output streams in, so the raw text is never held whole.
+    packages: List[str] = []
+
+    def collect(text: str) -> None:
+        packages.extend(ln.replace("package:", "").strip() for ln in text.splitlines() if ln.strip())
+
+    run_capture(_package_list_cmd(adb_path, serial, params), collect)
+    return {"packages": packages, "third_party": _parse_bool(params.get("third_party", "false"))}
+
+
+def _package_info_cmds(adb_path: str, serial: str, params: Dict[str, str]) -> List[List[str]]:
     package = params.get("package", "")
     if not package:
         raise AdbWizardError("Missing parameter: package")
-    paths = run(adb_cmd(adb_path, serial, "shell", "pm", "path", package), check=False).stdout.strip().splitlines()
-    details = run(adb_cmd(adb_path, serial, "shell", "dumpsys", "package", package), check=False).stdout
+    return [
+        adb_cmd(adb_path, serial, "shell", "pm", "path", package),
+        adb_cmd(adb_path, serial, "shell", "dumpsys", "package", package),
+    ]
+
+
+def _package_info_payload(package: str, paths_out: str, details: str) -> Dict[str, Any]:
     version_name = ""
     version_code = ""
     for line in details.splitlines():
@@ -98,56 +188,277 @@ def _package_info(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[st
         "package": package,
         "version_name": version_name or "unknown",
         "version_code": version_code or "unknown",
-        "paths": paths,
+        "paths": paths_out.strip().splitlines(),
     }
 
 
-def _apk_install(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+def _package_info(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    paths_cmd, details_cmd = _package_info_cmds(adb_path, serial, params)
+    paths = run(paths_cmd, check=False).stdout
+    details = run(details_cmd, check=False).stdout
+    return _package_info_payload(params["package"], paths, details)
+
+
+def _apk_install_cmd(adb_path: str, serial: str, params: Dict[str, str]) -> List[str]:
     apk_path = params.get("apk_path", "")
     if not apk_path:
         raise AdbWizardError("Missing parameter: apk_path")
     if not os.path.exists(apk_path):
         raise AdbWizardError(f"APK path does not exist: {apk_path}")
-    proc = run(adb_cmd(adb_path, serial, "install", "-r", apk_path), check=False)
-    return {"returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr}
+    return adb_cmd(adb_path, serial, "install", "-r", apk_path)
 
 
-def _file_push(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+def _transfer_payload(proc: subprocess.CompletedProcess, stats: TransferStats) -> Dict[str, Any]:
+    payload = _proc_payload(proc)
+    payload["transfer"] = stats.to_dict()
+    return payload
+
+
+def _progress_interval(params: Dict[str, str]) -> float:
+    try:
+        return max(0.0, float(params.get("progress_interval", PROGRESS_INTERVAL_SEC) or 0))
+    except ValueError:
+        raise AdbWizardError("Invalid parameter: progress_interval") from None
+
+
+def _progress_reporter(command: str) -> Callable[[TransferProgress], None]:
+    # Progress goes to stderr as one JSON object per line, so stdout still
+    # holds only the result document.
+    def report(progress: TransferProgress) -> None:
+        record = {"type": "progress", "command": command, **progress.to_dict()}
+        print(json.dumps(record, separators=(",", ":")), file=sys.stderr, flush=True)
+
+    return report
+
+
+def _apk_install(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    _apk_install_cmd(adb_path, serial, params)
+    interval = _progress_interval(params)
+    reporter = _progress_reporter("apk.install")
+    proc, stats = install_apk(adb_path, serial, params["apk_path"], reporter, interval, check=False)
+    return _transfer_payload(proc, stats)
+
+
+def _file_push_cmd(adb_path: str, serial: str, params: Dict[str, str]) -> List[str]:
     src = params.get("src", "")
     dst = params.get("dst", "")
     if not src or not dst:
         raise AdbWizardError("Missing parameters: src,dst")
     if not os.path.exists(src):
         raise AdbWizardError(f"Local source path does not exist: {src}")
-    proc = run(adb_cmd(adb_path, serial, "push", src, dst), check=False)
-    return {"returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr}
+    return adb_cmd(adb_path, serial, "push", src, dst)
 
 
-def _file_pull(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+def _file_push(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    _file_push_cmd(adb_path, serial, params)
+    interval = _progress_interval(params)
+    reporter = _progress_reporter("file.push")
+    proc, stats = push_file(adb_path, serial, params["src"], params["dst"], reporter, interval, check=False)
+    return _transfer_payload(proc, stats)
+
+
+def _file_pull_cmd(adb_path: str, serial: str, params: Dict[str, str]) -> List[str]:
     src = params.get("src", "")
     dst = params.get("dst", ".")
     if not src:
         raise AdbWizardError("Missing parameter: src")
-    proc = run(adb_cmd(adb_path, serial, "pull", src, dst), check=False)
-    return {"returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr}
+    return adb_cmd(adb_path, serial, "pull", src, dst)
+
+
+def _file_pull(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    _file_pull_cmd(adb_path, serial, params)
+    interval = _progress_interval(params)
+    reporter = _progress_reporter("file.pull")
+    proc, stats = pull_file(adb_path, serial, params["src"], params.get("dst", "."), reporter, interval, check=False)
+    return _transfer_payload(proc, stats)
 
 
 def _logcat_snapshot(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
     output = params.get("output", "")
     if not output:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output = f"logcat_{serial}_{timestamp}.txt"
-    out = run(adb_cmd(adb_path, serial, "logcat", "-d"), check=False).stdout
-    with open(output, "w", encoding="utf-8") as f:
-        f.write(out)
-    return {"output": output}
+        output = f"logcat_{target_filename(serial)}_{timestamp}.txt"
+    result = run_capture(adb_cmd(adb_path, serial, "logcat", "-d"), output, check=False)
+    return {
+        "output": output,
+        "returncode": result.returncode,
+        "bytes": result.bytes_read,
+        "lines": result.line_count,
+        "sha256": result.sha256,
+    }
 
 
-def run_json_command(cmd: str, serial: Optional[str], params_raw: Optional[str]) -> Dict[str, Any]:
+def _stream_limits(params: Dict[str, str]) -> Tuple[int, float]:
+    try:
+        max_lines = int(params.get("max_lines", "0") or 0)
+        max_duration = float(params.get("max_duration", "0") or 0)
+    except ValueError:
+        raise AdbWizardError("Invalid parameter: max_lines/max_duration") from None
+    if max_lines < 0 or max_duration < 0:
+        raise AdbWizardError("Invalid parameter: max_lines/max_duration")
+    return max_lines, max_duration
+
+
+def _logcat_stream_cmd(adb_path: str, serial: str, params: Dict[str, str]) -> List[str]:
+    args = ["logcat", "-v", "threadtime"]
+    if params.get("buffers"):
+        args += ["-b", params["buffers"]]
+    if _parse_bool(params.get("dump", "false")):
+        args.append("-d")
+    return adb_cmd(adb_path, serial, *args, *params.get("filter", "").split())
+
+
+def _log_stderr(message: str) -> None:
+    print(message, file=sys.stderr)
+
+
+def _workflow_run(adb_path: str, serial: Optional[str], params: Dict[str, str]) -> Dict[str, Any]:
+    name = params.get("name", "")
+    if not name:
+        raise AdbWizardError("Missing parameter: name")
+    wf = find_workflow(name)
+    if wf is None:
+        raise AdbWizardError(f"Workflow not found: {name}")
+    targets = params.get("targets") or wf.get("targets", "current")
+    current = _ensure_target_serial(adb_path, serial) if targets == "current" else (serial or "")
+    try:
+        max_parallel = int(params.get("max_parallel", "0") or 0)
+    except ValueError:
+        raise AdbWizardError("Invalid parameter: max_parallel") from None
+    report = run_workflow_on_targets(
+        adb_path,
+        wf,
+        current,
+        targets=targets,
+        max_parallel=max_parallel,
+        log=_log_stderr,
+        interactive=False,
+        force=_parse_bool(params.get("force", "false")),
+    )
+    return report.to_dict()
+
+
+def _logs_ingest(params: Dict[str, str]) -> Dict[str, Any]:
+    paths = [p.strip() for p in params.get("paths", ".").split(",") if p.strip()]
+    with LogStore(params.get("db", LOG_DB_FILE)) as store:
+        files = store.ingest_paths(paths, params.get("serial", ""))
+        return {"files": files, "store": store.stats()}
+
+
+def _logs_query(params: Dict[str, str]) -> Dict[str, Any]:
+    db = params.get("db", LOG_DB_FILE)
+    if not os.path.exists(db):
+        raise AdbWizardError(f"Log store not found: {db}")
+    try:
+        pid = int(params["pid"]) if params.get("pid") else None
+        limit = int(params.get("limit", str(DEFAULT_QUERY_LIMIT)) or DEFAULT_QUERY_LIMIT)
+    except ValueError:
+        raise AdbWizardError("Invalid parameter: pid/limit") from None
+    since_sec = parse_since(params["since"]) if params.get("since") else None
+    started = time.perf_counter()
+    with LogStore(db) as store:
+        rows = store.query(
+            text=params.get("text", ""),
+            serial=params.get("serial", ""),
+            package=params.get("package", ""),
+            tag=params.get("tag", ""),
+            level=params.get("level", ""),
+            pid=pid,
+            since_sec=since_sec,
+            limit=limit,
+        )
+    return {"rows": rows, "count": len(rows), "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+def _forward_apply(adb_path: str, serial: Optional[str], params: Dict[str, str]) -> Dict[str, Any]:
+    profile = params.get("profile", "")
+    set_name = params.get("set", "")
+    if not profile or not set_name:
+        raise AdbWizardError("Missing parameter: profile and set")
+    rules = parse_rules(find_forward_set(profile, set_name))
+    targets = params.get("targets") or "current"
+    current = _ensure_target_serial(adb_path, serial) if targets == "current" else (serial or "")
+    connected = [d.target for d in list_devices(adb_path) if d.state == "device"]
+    serials = resolve_targets(targets, current, connected, load_aliases())
+    results = apply_forwards_on_devices(adb_path, serials, rules, _parse_bool(params.get("prune", "false")))
+    return {"ok": all(r.ok for r in results), "devices": [r.to_dict() for r in results]}
+
+
+def _farm_run(adb_path: str, params: Dict[str, str]) -> Dict[str, Any]:
+    if params.get("file"):
+        jobs = load_farm_jobs(adb_path, params["file"])
+    elif params.get("shell"):
+        try:
+            repeat = max(1, int(params.get("repeat", "1") or 1))
+            requires = Requirements(
+                min_api=int(params.get("min_api", "0") or 0),
+                max_api=int(params.get("max_api", "0") or 0),
+                abi=params.get("abi", ""),
+                alias=params.get("alias", ""),
+            )
+        except ValueError:
+            raise AdbWizardError("Invalid parameter: repeat/min_api/max_api") from None
+        action = shell_action(adb_path, params["shell"])
+        jobs = [FarmJob(f"shell {params['shell']}", action, requires) for _ in range(repeat)]
+    else:
+        raise AdbWizardError("Missing parameter: file or shell")
+    stats = run_farm(adb_path, jobs, log=_log_stderr)
+    stats["ok"] = stats["failed"] == 0
+    return stats
+
+
+def _bugreport_sections(params: Dict[str, str]) -> Dict[str, Any]:
+    path = params.get("path", "")
+    if not path:
+        raise AdbWizardError("Missing parameter: path")
+    with BugreportReader(path) as reader:
+        title = params.get("section", "")
+        if not title:
+            return reader.summary()
+        try:
+            occurrence = int(params.get("occurrence", "0") or 0)
+        except ValueError:
+            raise AdbWizardError("Invalid parameter: occurrence") from None
+        out = params.get("out", "")
+        if out:
+            return {"section": title, "out": out, "chars": reader.extract(title, out, occurrence)}
+        return {"section": title, "text": reader.section_text(title, occurrence)}
+
+
+def _discover_kwargs(params: Dict[str, str]) -> Dict[str, Any]:
+    try:
+        limit = int(params.get("limit", str(DEFAULT_CONNECT_LIMIT)) or DEFAULT_CONNECT_LIMIT)
+        timeout_sec = float(params.get("timeout_ms", "500") or 500) / 1000.0
+    except ValueError:
+        raise AdbWizardError("Invalid parameter: limit/timeout_ms") from None
+    return {
+        "subnet": params.get("subnet", ""),
+        "ports": params.get("ports", DEFAULT_PORTS),
+        "use_mdns": _parse_bool(params.get("mdns", "true"), True),
+        "limit": limit,
+        "timeout_sec": timeout_sec,
+        "connect": _parse_bool(params.get("connect", "true"), True),
+    }
+
+
+async def _async_wifi_discover(adb_path: str, params: Dict[str, str]) -> Dict[str, Any]:
+    report = await async_discover(adb_path, **_discover_kwargs(params))
+    if _parse_bool(params.get("register", "false")):
+        await asyncio.to_thread(register_connected, report)
+    return report.to_dict()
+
+
+def _wifi_discover(adb_path: str, params: Dict[str, str]) -> Dict[str, Any]:
+    return asyncio.run(_async_wifi_discover(adb_path, params))
+
+
+def _prepare(cmd: str, params_raw: Optional[str], force: bool) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
     settings = load_settings()
     set_runtime_options(settings)
     adb_path = ensure_adb(force_install=False, prefer_project_local=settings.prefer_project_local_platform_tools)
     params = parse_params(params_raw)
+    if force:
+        params["force"] = "true"
 
     result: Dict[str, Any] = {
         "ok": True,
@@ -155,39 +466,230 @@ def run_json_command(cmd: str, serial: Optional[str], params_raw: Optional[str])
         "adb_path": adb_path,
         "adb_source": adb_source_label(adb_path),
     }
+    return adb_path, params, result
 
-    if cmd == "system.info":
-        result["data"] = {
-            "settings_file_present": os.path.exists(".adb_cli_py_settings.json"),
-            "cwd": os.getcwd(),
-            "adb_path": adb_path,
-            "adb_source": adb_source_label(adb_path),
-        }
-        return result
-
-    if cmd == "devices.list":
-        result["data"] = _devices_list(adb_path)
-        return result
-
-    target_serial = _ensure_target_serial(adb_path, serial)
-    result["serial"] = target_serial
-
-    handlers = {
-        "device.summary": lambda: _device_summary(adb_path, target_serial),
-        "shell.run": lambda: _shell_run(adb_path, target_serial, params),
-        "package.list": lambda: _package_list(adb_path, target_serial, params),
-        "package.info": lambda: _package_info(adb_path, target_serial, params),
-        "apk.install": lambda: _apk_install(adb_path, target_serial, params),
-        "file.push": lambda: _file_push(adb_path, target_serial, params),
-        "file.pull": lambda: _file_pull(adb_path, target_serial, params),
-        "logcat.snapshot": lambda: _logcat_snapshot(adb_path, target_serial, params),
+
+def _system_info(adb_path: str) -> Dict[str, Any]:
+    return {
+        "settings_file_present": os.path.exists(".adb_cli_py_settings.json"),
+        "cwd": os.getcwd(),
+        "adb_path": adb_path,
+        "adb_source": adb_source_label(adb_path),
     }
-    handler = handlers.get(cmd)
-    if handler is None:
-        raise AdbWizardError(
-            "Unknown --cmd. Supported: system.info, devices.list, device.summary, shell.run, "
-            "package.list, package.info, apk.install, file.push, file.pull, logcat.snapshot"
-        )
-    result["data"] = handler()
+
+
+STREAM_COMMANDS = ("logcat.stream", "shell.stream")
+
+
+def write_json(payload: Dict[str, Any], out: IO[str]) -> None:
+    # Same text as json.dumps(payload, indent=2), written piece by piece so a
+    # large payload (e.g. package.list) is never built as one string.
+    for chunk in json.JSONEncoder(indent=2).iterencode(payload):
+        out.write(chunk)
+    out.write("\n")
+
+
+class NdjsonWriter:
+    # One compact JSON object per line, flushed per record. While the reader
+    # is behind, the flush blocks and so does the adb stream feeding it.
+    def __init__(self, out: IO[str]) -> None:
+        self.out = out
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.out.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.out.flush()
+
+
+def stream_json_command(
+    cmd: str, serial: Optional[str], params_raw: Optional[str], out: IO[str], force: bool = False
+) -> int:
+    # NDJSON: a "start" record, one "line" record per output line, then an
+    # "end" record (or a single "error" record). Returns the exit code.
+    writer = NdjsonWriter(out)
+    try:
+        if cmd not in STREAM_COMMANDS:
+            raise AdbWizardError(_UNKNOWN_COMMAND)
+        adb_path, params, _ = _prepare(cmd, params_raw, force)
+        max_lines, max_duration = _stream_limits(params)
+        target_serial = _ensure_target_serial(adb_path, serial)
+        if cmd == "logcat.stream":
+            command = _logcat_stream_cmd(adb_path, target_serial, params)
+        else:
+            command = _shell_run_cmd(adb_path, target_serial, params)
+    except AdbWizardError as e:
+        writer.write({"type": "error", "ok": False, "cmd": cmd, "error": str(e)})
+        return 1
+
+    clock = LogClock(time.time()) if cmd == "logcat.stream" else None
+    start = {"type": "start", "cmd": cmd, "serial": target_serial, "max_lines": max_lines, "max_duration": max_duration}
+    writer.write(start)
+    count = 0
+
+    def emit(line: str) -> None:
+        nonlocal count
+        count += 1
+        record: Dict[str, Any] = {"type": "line", "n": count, "line": line}
+        row = parse_line(line, clock) if clock is not None else None
+        if row is not None:
+            ts, pid, tid, level, tag, message = row
+            record.update(ts=round(ts, 3), pid=pid, tid=tid, level=level, tag=tag, message=message)
+        writer.write(record)
+
+    result = run_line_stream(command, emit, max_lines, max_duration)
+    ok = result.reason in ("max_lines", "max_duration", "dry_run") or result.returncode == 0
+    writer.write(
+        {
+            "type": "end",
+            "ok": ok,
+            "lines": result.lines,
+            "reason": result.reason,
+            "returncode": result.returncode,
+            "duration_sec": round(result.duration_sec, 3),
+            "stderr": result.stderr,
+        }
+    )
+    return 0 if ok else 1
+
+
+# Async counterparts of the handlers above, for driving many devices from one
+# event loop. Commands go through async_run; handlers without one (file
+# streaming, workflows, ...) run their sync version in a worker thread.
+
+
+async def _async_ensure_target_serial(adb_path: str, serial: Optional[str]) -> str:
+    if serial and serial.startswith(TRANSPORT_PREFIX):
+        return serial
+    return _pick_target(await async_list_devices(adb_path), serial)
+
+
+async def async_devices_list(adb_path: str) -> Dict[str, Any]:
+    return _devices_payload(await async_list_devices(adb_path))
+
+
+async def async_device_summary(adb_path: str, serial: str) -> Dict[str, Any]:
+    return {"summary": await async_get_device_summary_data(adb_path, serial)}
+
+
+async def async_shell_run(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    return _proc_payload(await async_run(_shell_run_cmd(adb_path, serial, params), check=False))
+
+
+async def async_package_list(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    out = (await async_run(_package_list_cmd(adb_path, serial, params))).stdout
+    return _package_list_payload(out, params)
+
+
+async def async_package_info(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    cmds = _package_info_cmds(adb_path, serial, params)
+    paths, details = await asyncio.gather(*(async_run(c, check=False) for c in cmds))
+    return _package_info_payload(params["package"], paths.stdout, details.stdout)
+
+
+async def _async_transfer(cmd: List[str], final_size: Callable[[], int]) -> Dict[str, Any]:
+    # Throughput only: there is no progress thread in the async API.
+    started = time.perf_counter()
+    proc = await async_run(cmd, check=False)
+    stats = transfer_stats(proc, final_size(), time.perf_counter() - started)
+    if proc.returncode == 0:
+        record_transfer(cmd, stats)
+    return _transfer_payload(proc, stats)
+
+
+async def async_apk_install(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    cmd = _apk_install_cmd(adb_path, serial, params)
+    return await _async_transfer(cmd, lambda: local_size(params["apk_path"]))
+
+
+async def async_file_push(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    cmd = _file_push_cmd(adb_path, serial, params)
+    return await _async_transfer(cmd, lambda: local_size(params["src"]))
+
+
+async def async_file_pull(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    cmd = _file_pull_cmd(adb_path, serial, params)
+    return await _async_transfer(cmd, lambda: local_size(pull_target(params["src"], params.get("dst", "."))))
+
+
+async def async_logcat_snapshot(adb_path: str, serial: str, params: Dict[str, str]) -> Dict[str, Any]:
+    return await asyncio.to_thread(_logcat_snapshot, adb_path, serial, params)
+
+
+Handler = Callable[[str, Optional[str], Dict[str, str]], Dict[str, Any]]
+AsyncHandler = Callable[[str, Optional[str], Dict[str, str]], Awaitable[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class JsonCommand:
+    # Both run_json_command and async_run_json_command dispatch from
+    # JSON_COMMANDS. Handlers take (adb_path, serial, params); `serial` is the
+    # resolved device when `targeted`, else whatever the caller passed.
+    handler: Handler
+    async_handler: Optional[AsyncHandler] = None
+    targeted: bool = False
+    # data["ok"] becomes the payload's "ok" (partial failures on many devices).
+    reports_ok: bool = False
+
+
+JSON_COMMANDS: Dict[str, JsonCommand] = {
+    "system.info": JsonCommand(lambda a, s, p: _system_info(a)),
+    "devices.list": JsonCommand(lambda a, s, p: _devices_list(a), lambda a, s, p: async_devices_list(a)),
+    "device.summary": JsonCommand(
+        lambda a, s, p: _device_summary(a, s), lambda a, s, p: async_device_summary(a, s), targeted=True
+    ),
+    "shell.run": JsonCommand(_shell_run, async_shell_run, targeted=True),
+    "package.list": JsonCommand(_package_list, async_package_list, targeted=True),
+    "package.info": JsonCommand(_package_info, async_package_info, targeted=True),
+    "apk.install": JsonCommand(_apk_install, async_apk_install, targeted=True),
+    "file.push": JsonCommand(_file_push, async_file_push, targeted=True),
+    "file.pull": JsonCommand(_file_pull, async_file_pull, targeted=True),
+    "logcat.snapshot": JsonCommand(_logcat_snapshot, targeted=True),
+    "workflow.run": JsonCommand(_workflow_run, reports_ok=True),
+    "logs.ingest": JsonCommand(lambda a, s, p: _logs_ingest(p)),
+    "logs.query": JsonCommand(lambda a, s, p: _logs_query(p)),
+    "wifi.discover": JsonCommand(lambda a, s, p: _wifi_discover(a, p), lambda a, s, p: _async_wifi_discover(a, p)),
+    "forward.apply": JsonCommand(_forward_apply, reports_ok=True),
+    "bugreport.sections": JsonCommand(lambda a, s, p: _bugreport_sections(p)),
+    "farm.run": JsonCommand(lambda a, s, p: _farm_run(a, p), reports_ok=True),
+}
+
+_UNKNOWN_COMMAND = "Unknown --cmd. Supported: " + ", ".join([*JSON_COMMANDS, *STREAM_COMMANDS])
+
+
+def _json_command(cmd: str) -> JsonCommand:
+    if cmd in STREAM_COMMANDS:
+        raise AdbWizardError(f"{cmd} streams NDJSON records; use stream_json_command.")
+    command = JSON_COMMANDS.get(cmd)
+    if command is None:
+        raise AdbWizardError(_UNKNOWN_COMMAND)
+    return command
+
+
+def _finish(result: Dict[str, Any], command: JsonCommand, data: Dict[str, Any]) -> Dict[str, Any]:
+    result["data"] = data
+    if command.reports_ok:
+        result["ok"] = data["ok"]
     return result
 
+
+def run_json_command(
+    cmd: str, serial: Optional[str], params_raw: Optional[str], force: bool = False
+) -> Dict[str, Any]:
+    command = _json_command(cmd)
+    adb_path, params, result = _prepare(cmd, params_raw, force)
+    if command.targeted:
+        serial = result["serial"] = _ensure_target_serial(adb_path, serial)
+    return _finish(result, command, command.handler(adb_path, serial, params))
+
+
+async def async_run_json_command(
+    cmd: str, serial: Optional[str], params_raw: Optional[str], force: bool = False
+) -> Dict[str, Any]:
+    command = _json_command(cmd)
+    adb_path, params, result = await asyncio.to_thread(_prepare, cmd, params_raw, force)
+    if command.targeted:
+        serial = result["serial"] = await _async_ensure_target_serial(adb_path, serial)
+    if command.async_handler is not None:
+        data = await command.async_handler(adb_path, serial, params)
+    else:
+        data = await asyncio.to_thread(command.handler, adb_path, serial, params)
+    return _finish(result, command, data)
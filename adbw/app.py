@@ -1,8 +1,9 @@
 from .adb import adb_source_label, ensure_adb, set_runtime_options
-from .config import load_settings, save_settings
-from .devices import list_devices, pick_device, show_preflight
+from .config import Settings, load_settings, save_settings
+from .devices import DeviceTracker, list_devices, pick_device, show_preflight
 from .errors import AdbWizardError
 from .menus import show_basic_menu, show_platform_tools_menu, show_settings_menu
+from .wifi import WifiManager, start_manager
 
 
 def main() -> None:
@@ -16,7 +17,17 @@ def main() -> None:
     )
     print(f"Using adb: {adb_path} [{adb_source_label(adb_path)}]")
     show_preflight(adb_path)
+    tracker = DeviceTracker(adb_path).start()
+    wifi = start_manager(adb_path)
+    try:
+        _main_loop(adb_path, settings, tracker, wifi)
+    finally:
+        wifi.stop()
+        tracker.stop()
 
+
+def _main_loop(adb_path: str, settings: Settings, tracker: DeviceTracker, wifi: WifiManager) -> None:
+    prefer_project_local = settings.prefer_project_local_platform_tools
     while True:
         print("\nMain")
         print("1) ADB menu")
@@ -44,6 +55,8 @@ def main() -> None:
             if show_platform_tools_menu(prefer_project_local=prefer_project_local):
                 adb_path = ensure_adb(force_install=False, prefer_project_local=prefer_project_local)
                 print(f"Using adb: {adb_path} [{adb_source_label(adb_path)}]")
+                tracker.retarget(adb_path)
+                wifi.retarget(adb_path)
             continue
         if choice == "3":
             if show_settings_menu(settings):
@@ -51,6 +64,8 @@ def main() -> None:
                 prefer_project_local = settings.prefer_project_local_platform_tools
                 adb_path = ensure_adb(force_install=False, prefer_project_local=prefer_project_local)
                 print(f"Using adb: {adb_path} [{adb_source_label(adb_path)}]")
+                tracker.retarget(adb_path)
+                wifi.retarget(adb_path)
             continue
         print("Unknown option.")
 
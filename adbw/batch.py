@@ -0,0 +1,202 @@
+import re
+import subprocess
+import threading
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .adb import adb_cmd, log_debug, run_capture
+from .errors import AdbWizardError
+from .session import SESSION_CLOSED_RETURNCODE
+
+# Keeps each `adb shell` argument under the command-line limit of older
+# devices; longer batches are split over several invocations.
+MAX_SCRIPT_CHARS = 4000
+
+LineSink = Callable[[str], object]
+
+
+class BatchFuture(Future):
+    # result() on a command that is still queued flushes its batch first, so
+    # callers can enqueue everything up front and then read in any order.
+    def __init__(self, batch: "ShellBatch") -> None:
+        super().__init__()
+        self._batch = batch
+
+    def result(self, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        if not self.done():
+            self._batch.flush()
+        return super().result(timeout)
+
+
+@dataclass
+class _Pending:
+    command: str
+    future: BatchFuture
+    sink: Optional[LineSink] = None
+    transform: Optional[Callable[[str], str]] = None
+    check: bool = False
+    stdout: List[str] = field(default_factory=list)
+    returncode: Optional[int] = None
+
+    def emit(self, text: str) -> None:
+        if self.transform is not None:
+            text = self.transform(text)
+        if self.sink is not None:
+            self.sink(text)
+        else:
+            self.stdout.append(text)
+
+
+class ShellBatch:
+    # Coalesces independent shell commands for one device into a single
+    # `adb shell` call. Each command runs in its own subshell and is followed
+    # by a marker with its exit code on stdout and a marker on stderr, so both
+    # streams can be split back per command. Commands with a sink get their
+    # stdout streamed line by line instead of buffered. Commands submitted
+    # with `check` (default: the batch's) behave like run(check=True): adb
+    # failures are retried and a non-zero exit makes the future raise.
+    def __init__(self, adb_path: str, serial: str, check: bool = False) -> None:
+        self.adb_path = adb_path
+        self.serial = serial
+        self.check = check
+        self.invocations = 0
+        self._pending: List[_Pending] = []
+        self._lock = threading.Lock()
+        self._token = f"__adbw_b{uuid.uuid4().hex[:12]}"
+
+    def __enter__(self) -> "ShellBatch":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.flush()
+
+    def submit(
+        self,
+        command: str,
+        sink: Optional[LineSink] = None,
+        transform: Optional[Callable[[str], str]] = None,
+        check: Optional[bool] = None,
+    ) -> BatchFuture:
+        future = BatchFuture(self)
+        item = _Pending(command, future, sink, transform, self.check if check is None else check)
+        with self._lock:
+            self._pending.append(item)
+        return future
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            chunk: List[_Pending] = []
+            size = 0
+            for item in pending:
+                if chunk and size + len(item.command) > MAX_SCRIPT_CHARS:
+                    self._execute(chunk)
+                    chunk, size = [], 0
+                chunk.append(item)
+                size += len(item.command) + 2 * len(self._token) + 40
+            if chunk:
+                self._execute(chunk)
+
+    def _script(self, items: List[_Pending]) -> str:
+        parts = []
+        for i, item in enumerate(items):
+            parts.append(f'(\n{item.command}\n); echo "{self._token}_{i}_o $?"; echo "{self._token}_{i}_e" >&2')
+        return "\n".join(parts)
+
+    def _execute(self, items: List[_Pending]) -> None:
+        cmd = adb_cmd(self.adb_path, self.serial, "shell", self._script(items))
+        self.invocations += 1
+        log_debug(f"RUN shell batch serial={self.serial} commands={len(items)}")
+        out_marker = re.compile(re.escape(self._token) + r"_(\d+)_o (\d+)")
+        err_marker = re.compile(re.escape(self._token) + r"_(\d+)_e")
+        state: Dict[str, Any] = {"index": 0, "partial": ""}
+
+        def feed(text: str) -> None:
+            text = state["partial"] + text
+            lines = text.split("\n")
+            state["partial"] = lines.pop()
+            for line in lines:
+                handle(line)
+
+        def emit(text: str) -> None:
+            if state["index"] < len(items):
+                items[state["index"]].emit(text)
+
+        def handle(line: str) -> None:
+            m = out_marker.search(line)
+            if m is None:
+                # Shells without a separate stderr stream put its markers here.
+                e = err_marker.search(line)
+                if e is None:
+                    emit(line + "\n")
+                elif e.start():
+                    emit(line[: e.start()])
+                return
+            # Output without a trailing newline shares the marker's line.
+            if m.start():
+                emit(line[: m.start()])
+            done = int(m.group(1))
+            if done < len(items):
+                items[done].returncode = int(m.group(2))
+            state["index"] = done + 1
+
+        try:
+            result = run_capture(cmd, feed, check=any(item.check for item in items))
+        except AdbWizardError as e:
+            # Retries are exhausted; unchecked commands get a failed result.
+            for item in items:
+                if item.check:
+                    item.future.set_exception(e)
+                else:
+                    single = adb_cmd(self.adb_path, self.serial, "shell", item.command)
+                    item.future.set_result(subprocess.CompletedProcess(single, 1, "".join(item.stdout), str(e)))
+            return
+        except Exception as e:
+            for item in items:
+                item.future.set_exception(e)
+            return
+        if state["partial"]:
+            handle(state["partial"])
+        stderr_parts = _split_stderr(result.stderr, err_marker, len(items))
+        for i, item in enumerate(items):
+            returncode = item.returncode
+            stderr = stderr_parts[i]
+            if returncode is None:
+                # The shell never reached this command: adb failed outright or
+                # the session died. Dry runs produce no output at all.
+                if result.returncode != 0:
+                    returncode, stderr = result.returncode, result.stderr
+                else:
+                    returncode = 0 if result.bytes_read == 0 else SESSION_CLOSED_RETURNCODE
+            single = adb_cmd(self.adb_path, self.serial, "shell", item.command)
+            if item.check and returncode != 0:
+                item.future.set_exception(
+                    AdbWizardError(f"Command failed ({returncode}): {' '.join(single)}\nSTDERR:\n{stderr}")
+                )
+                continue
+            item.future.set_result(subprocess.CompletedProcess(single, returncode, "".join(item.stdout), stderr))
+
+
+def _split_stderr(text: str, marker: "re.Pattern[str]", count: int) -> List[str]:
+    parts = [""] * count
+    index = 0
+    for line in text.splitlines(keepends=True):
+        m = marker.search(line)
+        if m is None:
+            if index < count:
+                parts[index] += line
+            continue
+        if m.start() and index < count:
+            parts[index] += line[: m.start()]
+        index = int(m.group(1)) + 1
+    return parts
+
+
+def run_shell_batch(
+    adb_path: str, serial: str, commands: List[str], check: bool = False
+) -> List[subprocess.CompletedProcess]:
+    with ShellBatch(adb_path, serial, check) as batch:
+        futures = [batch.submit(command) for command in commands]
+    return [future.result() for future in futures]
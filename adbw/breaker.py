@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+def backoff_delay(attempt: int, base_sec: float, max_sec: float, rng: Optional[random.Random] = None) -> float:
+    # Full jitter: uniform in [0, min(cap, base * 2^(attempt-1))].
+    ceiling = min(max_sec, base_sec * (2 ** max(0, attempt - 1)))
+    return (rng or random).uniform(0.0, ceiling)
+
+
+@dataclass
+class _BreakerState:
+    failures: int = 0
+    opened_at: float = 0.0
+    is_open: bool = False
+    trial_in_flight: bool = False
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 3, cooldown_sec: float = 30.0) -> None:
+        self.threshold = threshold
+        self.cooldown_sec = cooldown_sec
+        self._states: Dict[str, _BreakerState] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, threshold: int, cooldown_sec: float) -> None:
+        with self._lock:
+            self.threshold = threshold
+            self.cooldown_sec = cooldown_sec
+
+    def state(self, serial: str) -> str:
+        with self._lock:
+            st = self._states.get(serial)
+            if st is None or not st.is_open:
+                return "closed"
+            if time.monotonic() - st.opened_at >= self.cooldown_sec:
+                return "half_open"
+            return "open"
+
+    def allow(self, serial: str) -> bool:
+        if not serial or self.threshold <= 0:
+            return True
+        with self._lock:
+            st = self._states.get(serial)
+            if st is None or not st.is_open:
+                return True
+            if time.monotonic() - st.opened_at < self.cooldown_sec:
+                return False
+            # Half-open: let a single trial call through after the cool-down.
+            if st.trial_in_flight:
+                return False
+            st.trial_in_flight = True
+            return True
+
+    def record_success(self, serial: str) -> None:
+        if not serial:
+            return
+        with self._lock:
+            self._states.pop(serial, None)
+
+    def record_failure(self, serial: str) -> bool:
+        if not serial or self.threshold <= 0:
+            return False
+        with self._lock:
+            st = self._states.setdefault(serial, _BreakerState())
+            st.failures += 1
+            st.trial_in_flight = False
+            if st.is_open or st.failures >= self.threshold:
+                st.is_open = True
+                st.opened_at = time.monotonic()
+            return st.is_open
+
+    def trip(self, serial: str) -> None:
+        # Open immediately, e.g. when a health probe already knows the
+        # transport is gone.
+        if not serial or self.threshold <= 0:
+            return
+        with self._lock:
+            st = self._states.setdefault(serial, _BreakerState())
+            st.failures = max(st.failures, self.threshold)
+            st.trial_in_flight = False
+            st.is_open = True
+            st.opened_at = time.monotonic()
+
+    def reset(self, serial: str) -> None:
+        self.record_success(serial)
+
+    def open_serials(self) -> List[str]:
+        with self._lock:
+            return sorted(s for s, st in self._states.items() if st.is_open)
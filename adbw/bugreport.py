@@ -0,0 +1,211 @@
+import fnmatch
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import zipfile
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .errors import AdbWizardError
+from .state import atomic_write_text
+from .watch import file_signature
+
+INDEX_VERSION = 1
+CACHE_SUFFIX = ".txt"
+INDEX_SUFFIX = ".index.json"
+
+# dumpstate frames each section as "------ TITLE (command) ------" and most end
+# with "------ 0.123s was the duration of 'TITLE' ------". Inside DUMPSYS,
+# every service starts with "DUMP OF SERVICE [PRIORITY ]name:".
+_MARKER = re.compile(rb"^------ (.*?) ------\r?$", re.MULTILINE)
+_SERVICE = re.compile(rb"^DUMP OF SERVICE (?:(?:CRITICAL|HIGH|NORMAL) )?(\S+):\r?$", re.MULTILINE)
+_DURATION = re.compile(r"^[\d.]+s was the duration of '")
+_TITLE = re.compile(r"^(.*?)(?: \((.*)\))?$")
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+@dataclass
+class Section:
+    title: str
+    command: str
+    start: int
+    end: int
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+def main_entry_name(archive: zipfile.ZipFile) -> str:
+    # main_entry.txt names the dumpstate text in current bugreports; older
+    # ones only have the bugreport-*.txt itself.
+    names = archive.namelist()
+    if "main_entry.txt" in names:
+        name = archive.read("main_entry.txt").decode("utf-8", "replace").strip()
+        if name in names:
+            return name
+    candidates = [i for i in archive.infolist() if fnmatch.fnmatch(os.path.basename(i.filename), "bugreport*.txt")]
+    if not candidates:
+        raise AdbWizardError("No bugreport-*.txt entry in archive.")
+    return max(candidates, key=lambda i: i.file_size).filename
+
+
+def index_sections(data: Any, start: int = 0, end: Optional[int] = None) -> List[Section]:
+    # `data` is anything re can scan in place (mmap, bytes); offsets in the
+    # result are relative to `start`. A top-level section runs to the next
+    # "------" line, a service to the next marker of either kind.
+    end = len(data) if end is None else end
+    markers: List[Tuple[int, int, bool, str]] = []
+    for m in _MARKER.finditer(data, start, end):
+        markers.append((m.start(), m.end(), True, m.group(1).decode("utf-8", "replace")))
+    for m in _SERVICE.finditer(data, start, end):
+        markers.append((m.start(), m.end(), False, m.group(1).decode("utf-8", "replace")))
+    markers.sort()
+    sections: List[Section] = []
+    for i, (_, marker_end, top_level, text) in enumerate(markers):
+        if top_level and _DURATION.match(text):
+            continue
+        following = (m[0] for m in markers[i + 1 :] if m[2] or not top_level)
+        body_start = min(marker_end + 1, end)
+        body_end = max(body_start, next(following, end))
+        if top_level:
+            title, command = _TITLE.match(text).groups()
+            sections.append(Section(title, command or "", body_start - start, body_end - start))
+        else:
+            sections.append(Section(f"DUMP OF SERVICE {text}", "", body_start - start, body_end - start))
+    return sections
+
+
+def _stored_data_offset(path: str, info: zipfile.ZipInfo) -> int:
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+    if header[0] != b"PK\x03\x04":
+        raise AdbWizardError(f"Corrupt zip local header for {info.filename}")
+    return info.header_offset + _LOCAL_HEADER.size + header[9] + header[10]
+
+
+class BugreportReader:
+    # Random access to sections of a bugreport zip. Opening only reads the
+    # central directory. The main text entry is mmapped in place when it is
+    # stored; a deflated one is inflated once into `<zip>.txt`. The section
+    # index is saved to `<zip>.index.json` and reused while the zip's
+    # signature is unchanged, so later lookups never rescan or inflate.
+    def __init__(self, path: str) -> None:
+        self.path = path
+        try:
+            with zipfile.ZipFile(path) as archive:
+                self.entry = main_entry_name(archive)
+                self.info = archive.getinfo(self.entry)
+                self.entries = [(i.filename, i.file_size, i.compress_size) for i in archive.infolist()]
+        except zipfile.BadZipFile as e:
+            raise AdbWizardError(f"Not a bugreport zip: {path} ({e})") from None
+        self._file: Optional[Any] = None
+        self._map: Optional[mmap.mmap] = None
+        self._base = 0
+        self._sections: Optional[List[Section]] = None
+
+    def __enter__(self) -> "BugreportReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def cache_path(self) -> str:
+        return f"{self.path}{CACHE_SUFFIX}"
+
+    @property
+    def index_path(self) -> str:
+        return f"{self.path}{INDEX_SUFFIX}"
+
+    def _signature(self) -> List[Any]:
+        return [INDEX_VERSION, self.entry, list(file_signature(self.path) or ())]
+
+    def _cache_fresh(self) -> bool:
+        # Inflated copy must match the entry size and be newer than the zip.
+        cache, source = file_signature(self.cache_path), file_signature(self.path)
+        if cache is None or source is None:
+            return False
+        return cache[1] == self.info.file_size and cache[2] >= source[2]
+
+    def _open_map(self) -> mmap.mmap:
+        if self._map is not None:
+            return self._map
+        if self.info.compress_type == zipfile.ZIP_STORED:
+            target, self._base = self.path, _stored_data_offset(self.path, self.info)
+        else:
+            if not self._cache_fresh():
+                tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+                with zipfile.ZipFile(self.path) as archive, archive.open(self.entry) as src, open(tmp, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.replace(tmp, self.cache_path)
+            target, self._base = self.cache_path, 0
+        self._file = open(target, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _load_index(self) -> Optional[List[Section]]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("signature") != self._signature():
+                return None
+            return [Section(**s) for s in data["sections"]]
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def sections(self) -> List[Section]:
+        if self._sections is None:
+            self._sections = self._load_index()
+        if self._sections is None:
+            data = self._open_map()
+            self._sections = index_sections(data, self._base, self._base + self.info.file_size)
+            payload = {"signature": self._signature(), "sections": [asdict(s) for s in self._sections]}
+            try:
+                atomic_write_text(self.index_path, json.dumps(payload))
+            except OSError:
+                pass
+        return self._sections
+
+    def find(self, title: str) -> List[Section]:
+        wanted = title.strip().lower()
+        return [s for s in self.sections() if s.title.lower() == wanted]
+
+    def read(self, section: Section) -> bytes:
+        data = self._open_map()
+        return data[self._base + section.start : self._base + section.end]
+
+    def section_text(self, title: str, occurrence: int = 0) -> str:
+        matches = self.find(title)
+        if not matches:
+            raise AdbWizardError(f"Section not found: {title}")
+        if not 0 <= occurrence < len(matches):
+            raise AdbWizardError(f"Section {title} occurs {len(matches)} time(s)")
+        return self.read(matches[occurrence]).decode("utf-8", "replace")
+
+    def extract(self, title: str, out_path: str, occurrence: int = 0) -> int:
+        text = self.section_text(title, occurrence)
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return len(text)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "entry": self.entry,
+            "entry_size": self.info.file_size,
+            "compressed": self.info.compress_type != zipfile.ZIP_STORED,
+            "sections": [{"title": s.title, "command": s.command, "size": s.size} for s in self.sections()],
+        }
@@ -1,8 +1,7 @@
-import json
-import os
 from dataclasses import dataclass
 
 from .errors import AdbWizardError
+from .state import read_json, write_json
 
 SETTINGS_FILE = ".adb_cli_py_settings.json"
 LOCAL_PLATFORM_TOOLS_DIR = "platform-tools"
@@ -23,14 +22,25 @@ class Settings:
     action_transcript_file: str = "adb_cli_py_transcript.log"
     adb_retry_count: int = 3
     command_timeout_sec: int = 120
+    adb_retry_backoff_base_sec: float = 0.5
+    adb_retry_backoff_max_sec: float = 8.0
+    circuit_breaker_threshold: int = 3
+    circuit_breaker_cooldown_sec: int = 30
+    adb_max_concurrent: int = 16
+    adb_max_per_device: int = 4
+    adb_max_heavy: int = 8
+    adb_max_heavy_per_device: int = 2
+    adb_rate_per_device: float = 0.0
+    metrics_enabled: bool = False
+    metrics_textfile: str = "adb_cli_py_metrics.prom"
+    plugin_timeout_sec: int = 300
 
 
 def load_settings() -> Settings:
-    if not os.path.exists(SETTINGS_FILE):
+    raw = read_json(SETTINGS_FILE, None)
+    if not isinstance(raw, dict):
         return Settings()
     try:
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            raw = json.load(f)
         mode = str(raw.get("apk_signature_check_mode", "conservative")).lower()
         if mode not in ("off", "conservative", "strict"):
             mode = "conservative"
@@ -44,6 +54,16 @@ def load_settings() -> Settings:
             timeout_sec = 5
         if timeout_sec > 3600:
             timeout_sec = 3600
+        backoff_base = max(0.0, min(60.0, float(raw.get("adb_retry_backoff_base_sec", 0.5))))
+        backoff_max = max(backoff_base, min(300.0, float(raw.get("adb_retry_backoff_max_sec", 8.0))))
+        breaker_threshold = max(0, min(100, int(raw.get("circuit_breaker_threshold", 3))))
+        breaker_cooldown = max(1, min(3600, int(raw.get("circuit_breaker_cooldown_sec", 30))))
+        max_concurrent = max(0, min(256, int(raw.get("adb_max_concurrent", 16))))
+        max_per_device = max(0, min(64, int(raw.get("adb_max_per_device", 4))))
+        max_heavy = max(0, min(64, int(raw.get("adb_max_heavy", 8))))
+        max_heavy_per_device = max(0, min(16, int(raw.get("adb_max_heavy_per_device", 2))))
+        rate_per_device = max(0.0, min(1000.0, float(raw.get("adb_rate_per_device", 0.0))))
+        plugin_timeout = max(1, min(3600, int(raw.get("plugin_timeout_sec", 300))))
         return Settings(
             prefer_project_local_platform_tools=bool(raw.get("prefer_project_local_platform_tools", False)),
             remember_last_device=bool(raw.get("remember_last_device", True)),
@@ -58,8 +78,20 @@ def load_settings() -> Settings:
             action_transcript_file=str(raw.get("action_transcript_file", "adb_cli_py_transcript.log")),
             adb_retry_count=retry_count,
             command_timeout_sec=timeout_sec,
+            adb_retry_backoff_base_sec=backoff_base,
+            adb_retry_backoff_max_sec=backoff_max,
+            circuit_breaker_threshold=breaker_threshold,
+            circuit_breaker_cooldown_sec=breaker_cooldown,
+            adb_max_concurrent=max_concurrent,
+            adb_max_per_device=max_per_device,
+            adb_max_heavy=max_heavy,
+            adb_max_heavy_per_device=max_heavy_per_device,
+            adb_rate_per_device=rate_per_device,
+            metrics_enabled=bool(raw.get("metrics_enabled", False)),
+            metrics_textfile=str(raw.get("metrics_textfile", "adb_cli_py_metrics.prom")),
+            plugin_timeout_sec=plugin_timeout,
         )
-    except (OSError, json.JSONDecodeError):
+    except (TypeError, ValueError):
         return Settings()
 
 
@@ -78,10 +110,20 @@ def save_settings(settings: Settings) -> None:
         "action_transcript_file": settings.action_transcript_file,
         "adb_retry_count": settings.adb_retry_count,
         "command_timeout_sec": settings.command_timeout_sec,
+        "adb_retry_backoff_base_sec": settings.adb_retry_backoff_base_sec,
+        "adb_retry_backoff_max_sec": settings.adb_retry_backoff_max_sec,
+        "circuit_breaker_threshold": settings.circuit_breaker_threshold,
+        "circuit_breaker_cooldown_sec": settings.circuit_breaker_cooldown_sec,
+        "adb_max_concurrent": settings.adb_max_concurrent,
+        "adb_max_per_device": settings.adb_max_per_device,
+        "adb_max_heavy": settings.adb_max_heavy,
+        "adb_max_heavy_per_device": settings.adb_max_heavy_per_device,
+        "adb_rate_per_device": settings.adb_rate_per_device,
+        "metrics_enabled": settings.metrics_enabled,
+        "metrics_textfile": settings.metrics_textfile,
+        "plugin_timeout_sec": settings.plugin_timeout_sec,
     }
     try:
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2)
-            f.write("\n")
+        write_json(SETTINGS_FILE, payload)
     except OSError as e:
         raise AdbWizardError(f"Failed to write settings file ({SETTINGS_FILE}): {e}") from e
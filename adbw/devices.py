@@ -1,48 +1,256 @@
-from dataclasses import dataclass
-from typing import List
+import asyncio
+import subprocess
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from .adb import adb_cmd, run
+from .adb import TRANSPORT_PREFIX, adb_cmd, async_run, log_debug, note_device_state, note_transports, run
+from .batch import ShellBatch
 from .errors import AdbWizardError
 
+# `devices -l` fields kept as attributes; anything else (usb:..., features)
+# stays in `extra`, in its original order.
+_DEVICE_FIELDS = ("product", "model", "device", "transport_id")
+
 
-@dataclass
 class Device:
-    serial: str
-    state: str
-    description: str = ""
+    # One `adb devices -l` row. Slotted because fleet listings are rebuilt on
+    # every refresh. `target` is what commands pass to adb_cmd: the serial, or
+    # "transport_id:<n>" when another attached device reports the same serial.
+    __slots__ = ("serial", "state", "product", "model", "device", "transport_id", "extra", "target")
+
+    def __init__(
+        self,
+        serial: str,
+        state: str,
+        product: str = "",
+        model: str = "",
+        device: str = "",
+        transport_id: str = "",
+        extra: str = "",
+        target: str = "",
+    ) -> None:
+        self.serial = serial
+        self.state = state
+        self.product = product
+        self.model = model
+        self.device = device
+        self.transport_id = transport_id
+        self.extra = extra
+        self.target = target or serial
+
+    @property
+    def description(self) -> str:
+        parts = [self.extra] if self.extra else []
+        parts += [f"{name}:{getattr(self, name)}" for name in _DEVICE_FIELDS if getattr(self, name)]
+        return " ".join(parts)
+
+    @property
+    def label(self) -> str:
+        return self.serial if self.target == self.serial else f"{self.serial} ({self.target})"
+
+    def _key(self) -> Tuple[str, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Device) and self._key() == other._key()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__ if getattr(self, name))
+        return f"Device({fields})"
+
+
+def parse_device_line(line: str) -> Optional[Device]:
+    parts = line.split()
+    if not parts:
+        return None
+    fields: Dict[str, str] = {}
+    extra: List[str] = []
+    for token in parts[2:]:
+        name, sep, value = token.partition(":")
+        if sep and name in _DEVICE_FIELDS:
+            fields[name] = value
+        else:
+            extra.append(token)
+    state = parts[1] if len(parts) > 1 else "unknown"
+    return Device(parts[0], state, extra=" ".join(extra), **fields)
+
+
+class DeviceRegistry:
+    # One device listing indexed by serial, transport id, model and alias, so
+    # resolving a name is a few dict lookups however many devices are attached.
+    # Aliases map to a serial or a "transport_id:<n>" target.
+    def __init__(self, devices: Iterable[Device], aliases: Optional[Dict[str, str]] = None) -> None:
+        self.devices = list(devices)
+        self.by_serial: Dict[str, List[Device]] = {}
+        self.by_transport: Dict[str, Device] = {}
+        self.by_model: Dict[str, List[Device]] = {}
+        for d in self.devices:
+            self.by_serial.setdefault(d.serial, []).append(d)
+            if d.transport_id:
+                self.by_transport[d.transport_id] = d
+            if d.model:
+                self.by_model.setdefault(d.model.lower(), []).append(d)
+        self.aliases = dict(aliases or {})
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def ready(self) -> List[Device]:
+        return [d for d in self.devices if d.state == "device"]
+
+    def find_model(self, model: str) -> List[Device]:
+        return list(self.by_model.get(model.strip().replace(" ", "_").lower(), []))
+
+    def matches(self, name: str) -> List[Device]:
+        name = self.aliases.get(name, name)
+        if name.startswith(TRANSPORT_PREFIX):
+            device = self.by_transport.get(name[len(TRANSPORT_PREFIX) :])
+            return [device] if device else []
+        return self.by_serial.get(name) or self.find_model(name)
+
+    def get(self, name: str) -> Optional[Device]:
+        # Alias, then transport id, then serial, then model; None if the name
+        # is unknown or matches several devices.
+        found = self.matches(name.strip())
+        return found[0] if len(found) == 1 else None
+
+    def resolve(self, name: str) -> Device:
+        name = name.strip()
+        found = self.matches(name)
+        if not found:
+            raise AdbWizardError(f"Device not found: {name}")
+        if len(found) > 1:
+            targets = ", ".join(d.target for d in found)
+            raise AdbWizardError(f"{name} matches {len(found)} devices ({targets}); pick one by transport id.")
+        return found[0]
 
 
 def list_devices(adb_path: str) -> List[Device]:
     run([adb_path, "start-server"], check=False)
-    out = run([adb_path, "devices", "-l"]).stdout.strip().splitlines()
+    return _parse_devices(run([adb_path, "devices", "-l"]).stdout)
+
+
+async def async_list_devices(adb_path: str) -> List[Device]:
+    await async_run([adb_path, "start-server"], check=False)
+    return _parse_devices((await async_run([adb_path, "devices", "-l"])).stdout)
+
+
+def device_registry(adb_path: str, aliases: Optional[Dict[str, str]] = None) -> DeviceRegistry:
+    return DeviceRegistry(list_devices(adb_path), aliases)
+
 
+def _parse_devices(output: str) -> List[Device]:
     devices: List[Device] = []
-    for line in out[1:]:
-        line = line.strip()
-        if not line:
-            continue
-        parts = line.split()
-        serial = parts[0]
-        state = parts[1] if len(parts) > 1 else "unknown"
-        desc = " ".join(parts[2:]) if len(parts) > 2 else ""
-        devices.append(Device(serial=serial, state=state, description=desc))
+    for line in output.strip().splitlines()[1:]:
+        device = parse_device_line(line)
+        if device is not None:
+            devices.append(device)
+    counts: Dict[str, int] = {}
+    for d in devices:
+        counts[d.serial] = counts.get(d.serial, 0) + 1
+    for d in devices:
+        if counts[d.serial] > 1 and d.transport_id:
+            # `-s` is ambiguous for a shared serial; only `-t` reaches it.
+            d.target = f"{TRANSPORT_PREFIX}{d.transport_id}"
+        note_device_state(d.target, d.state)
+    note_transports({d.transport_id: d.target for d in devices if d.transport_id})
     return devices
 
 
+def parse_device_states(payload: str) -> Dict[str, str]:
+    states: Dict[str, str] = {}
+    for line in payload.splitlines():
+        parts = line.strip().split()
+        if len(parts) >= 2:
+            states[parts[0]] = parts[1]
+    return states
+
+
+class DeviceTracker:
+    # Follows `adb track-devices` in a background thread. Every update closes
+    # the circuit breaker for devices that are back in `device` state.
+    def __init__(self, adb_path: str, on_change: Optional[Callable[[Dict[str, str]], None]] = None) -> None:
+        self.adb_path = adb_path
+        self.on_change = on_change
+        self.states: Dict[str, str] = {}
+        self._stop = threading.Event()
+        self._proc: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "DeviceTracker":
+        self._thread = threading.Thread(target=self._loop, name="adbw-device-tracker", daemon=True)
+        self._thread.start()
+        return self
+
+    def retarget(self, adb_path: str) -> None:
+        if adb_path == self.adb_path:
+            return
+        self.adb_path = adb_path
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+    def stop(self) -> None:
+        self._stop.set()
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _loop(self) -> None:
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self._proc = subprocess.Popen(
+                    [self.adb_path, "track-devices"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+                )
+                self._read_updates(self._proc)
+                delay = 1.0
+            except OSError as e:
+                log_debug(f"TRACKER failed: {e}")
+                delay = min(30.0, delay * 2)
+            finally:
+                if self._proc is not None and self._proc.poll() is None:
+                    self._proc.kill()
+                    self._proc.wait()
+            self._stop.wait(delay)
+
+    def _read_updates(self, proc: subprocess.Popen) -> None:
+        assert proc.stdout is not None
+        while not self._stop.is_set():
+            header = proc.stdout.read(4)
+            if len(header) < 4:
+                return
+            try:
+                length = int(header, 16)
+            except ValueError:
+                return
+            payload = proc.stdout.read(length).decode("utf-8", errors="replace") if length else ""
+            self._apply(parse_device_states(payload))
+
+    def _apply(self, states: Dict[str, str]) -> None:
+        self.states = states
+        for serial, state in states.items():
+            note_device_state(serial, state)
+        if self.on_change is not None:
+            self.on_change(states)
+
+
 def pick_device(devices: List[Device], preferred_serial: str = "") -> Device:
     if not devices:
         raise AdbWizardError("No devices found. Plug in device, enable USB debugging, and try again.")
     if len(devices) == 1:
         return devices[0]
     if preferred_serial:
-        for device in devices:
-            if device.serial == preferred_serial:
-                print(f"Using remembered device: {device.serial}")
-                return device
+        device = DeviceRegistry(devices).get(preferred_serial)
+        if device is not None:
+            print(f"Using remembered device: {device.target}")
+            return device
 
     print("Multiple devices detected:")
     for i, d in enumerate(devices, start=1):
-        print(f"{i}) {d.serial} [{d.state}] {d.description}")
+        print(f"{i}) {d.label} [{d.state}] {d.description}")
 
     while True:
         choice = input("Select device number: ").strip()
@@ -52,7 +260,10 @@ def pick_device(devices: List[Device], preferred_serial: str = "") -> Device:
 
 
 def get_device_ip(adb_path: str, serial: str) -> str:
-    out = run(adb_cmd(adb_path, serial, "shell", "ip", "route"), check=False).stdout
+    return _parse_route_src(run(adb_cmd(adb_path, serial, "shell", "ip", "route"), check=False).stdout)
+
+
+def _parse_route_src(out: str) -> str:
     for line in out.splitlines():
         parts = line.strip().split()
         if "src" in parts:
@@ -70,20 +281,45 @@ def show_device_summary(adb_path: str, serial: str) -> None:
     )
 
 
+_SUMMARY_PROPS = (
+    "ro.product.model",
+    "ro.product.brand",
+    "ro.build.version.release",
+    "ro.build.version.sdk",
+    "ro.product.cpu.abi",
+)
+
+
 def get_device_summary_data(adb_path: str, serial: str) -> dict:
-    model = run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.product.model")).stdout.strip()
-    brand = run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.product.brand")).stdout.strip()
-    android_ver = run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.build.version.release")).stdout.strip()
-    api_level = run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.build.version.sdk")).stdout.strip()
-    abi = run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.product.cpu.abi")).stdout.strip()
-    battery = run(adb_cmd(adb_path, serial, "shell", "dumpsys", "battery"), check=False).stdout
+    # One `adb shell` for all seven queries.
+    with ShellBatch(adb_path, serial) as batch:
+        props = [batch.submit(f"getprop {p}", check=True) for p in _SUMMARY_PROPS]
+        battery = batch.submit("dumpsys battery")
+        route = batch.submit("ip route")
+    ip = _parse_route_src(route.result().stdout)
+    return _summary(serial, [p.result().stdout for p in props], battery.result().stdout, ip)
+
+
+async def async_get_device_summary_data(adb_path: str, serial: str) -> dict:
+    # The seven queries are independent, so they run concurrently.
+    results = await asyncio.gather(
+        *(async_run(adb_cmd(adb_path, serial, "shell", "getprop", p)) for p in _SUMMARY_PROPS),
+        async_run(adb_cmd(adb_path, serial, "shell", "dumpsys", "battery"), check=False),
+        async_run(adb_cmd(adb_path, serial, "shell", "ip", "route"), check=False),
+    )
+    props = [r.stdout for r in results[: len(_SUMMARY_PROPS)]]
+    return _summary(serial, props, results[-2].stdout, _parse_route_src(results[-1].stdout))
+
+
+def _summary(serial: str, props: List[str], battery: str, ip: str) -> dict:
+    model, brand, android_ver, api_level, abi = (p.strip() for p in props)
     level = "unknown"
     for line in battery.splitlines():
         line = line.strip()
         if line.startswith("level:"):
             level = line.split(":", 1)[1].strip()
             break
-    ip = get_device_ip(adb_path, serial) or "unknown"
+    ip = ip or "unknown"
     return {
         "serial": serial,
         "brand": brand,
@@ -0,0 +1,202 @@
+import asyncio
+import ipaddress
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .adb import async_run, async_run_many
+from .errors import AdbWizardError
+from .wifi import connect_error, register_endpoint
+
+DEFAULT_PORTS = "5555"
+DEFAULT_CONNECT_LIMIT = 256
+DEFAULT_PROBE_TIMEOUT_SEC = 0.5
+MAX_SCAN_TARGETS = 65536
+
+# `adb mdns services` lines: "<instance>\t<service type>\t<ip>:<port>".
+_MDNS_LINE = re.compile(r"^(\S+)\s+(_adb[\w.-]*)\s+(\[?[0-9a-fA-F.:]+\]?):(\d+)\s*$")
+
+
+@dataclass
+class DiscoveredEndpoint:
+    endpoint: str
+    source: str
+    name: str = ""
+    latency_ms: Optional[float] = None
+    connected: bool = False
+    error: str = ""
+
+
+@dataclass
+class DiscoveryReport:
+    endpoints: List[DiscoveredEndpoint] = field(default_factory=list)
+    scanned: int = 0
+    scan_sec: float = 0.0
+    connect_sec: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "scanned": self.scanned,
+            "scan_sec": round(self.scan_sec, 3),
+            "connect_sec": round(self.connect_sec, 3),
+            "connected": sum(1 for e in self.endpoints if e.connected),
+            "endpoints": [asdict(e) for e in self.endpoints],
+        }
+
+
+def parse_mdns_services(text: str) -> List[DiscoveredEndpoint]:
+    # Pairing services need a code and are not connectable, so they are skipped.
+    found: List[DiscoveredEndpoint] = []
+    for line in text.splitlines():
+        m = _MDNS_LINE.match(line.strip())
+        if not m or "pairing" in m.group(2):
+            continue
+        found.append(DiscoveredEndpoint(f"{m.group(3)}:{m.group(4)}", "mdns", name=m.group(1)))
+    return found
+
+
+def parse_ports(spec: str) -> List[int]:
+    ports: List[int] = []
+    for part in (spec or DEFAULT_PORTS).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                low, high = (int(p) for p in part.split("-", 1))
+                ports.extend(range(low, high + 1))
+            else:
+                ports.append(int(part))
+        except ValueError:
+            raise AdbWizardError(f"Invalid port range: {part}") from None
+    if not ports or any(not 0 < p < 65536 for p in ports):
+        raise AdbWizardError(f"Invalid port range: {spec}")
+    return sorted(set(ports))
+
+
+def format_endpoint(host: str, port: int) -> str:
+    return f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+
+def subnet_hosts(subnet: str) -> List[str]:
+    try:
+        network = ipaddress.ip_network(subnet, strict=False)
+    except ValueError:
+        raise AdbWizardError(f"Invalid subnet: {subnet}") from None
+    if network.num_addresses == 1:
+        return [str(network.network_address)]
+    return [str(host) for host in network.hosts()]
+
+
+async def probe_endpoint(host: str, port: int, timeout_sec: float) -> Optional[float]:
+    # TCP connect time in ms, or None if nothing accepted within the timeout.
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout_sec)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    latency = (time.perf_counter() - started) * 1000.0
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return round(latency, 1)
+
+
+async def scan_endpoints(
+    hosts: Sequence[str],
+    ports: Sequence[int],
+    limit: int = DEFAULT_CONNECT_LIMIT,
+    timeout_sec: float = DEFAULT_PROBE_TIMEOUT_SEC,
+) -> List[DiscoveredEndpoint]:
+    # At most `limit` connection attempts are in flight at once, so a /24
+    # sweep takes about (hosts * ports / limit) * timeout.
+    if len(hosts) * len(ports) > MAX_SCAN_TARGETS:
+        raise AdbWizardError(f"Scan too large: {len(hosts) * len(ports)} targets (max {MAX_SCAN_TARGETS}).")
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def one(host: str, port: int) -> Optional[DiscoveredEndpoint]:
+        async with semaphore:
+            latency = await probe_endpoint(host, port, timeout_sec)
+        if latency is None:
+            return None
+        return DiscoveredEndpoint(format_endpoint(host, port), "scan", latency_ms=latency)
+
+    results = await asyncio.gather(*(one(h, p) for h in hosts for p in ports))
+    return [r for r in results if r is not None]
+
+
+async def connect_endpoints(adb_path: str, endpoints: List[DiscoveredEndpoint], limit: int = 32) -> None:
+    procs = await async_run_many([[adb_path, "connect", e.endpoint] for e in endpoints], check=False, limit=limit)
+    for endpoint, proc in zip(endpoints, procs):
+        if isinstance(proc, BaseException):
+            endpoint.error = str(proc)
+            continue
+        endpoint.error = connect_error(proc)
+        endpoint.connected = not endpoint.error
+
+
+async def async_discover(
+    adb_path: str,
+    subnet: str = "",
+    ports: str = DEFAULT_PORTS,
+    use_mdns: bool = True,
+    limit: int = DEFAULT_CONNECT_LIMIT,
+    timeout_sec: float = DEFAULT_PROBE_TIMEOUT_SEC,
+    connect: bool = True,
+) -> DiscoveryReport:
+    report = DiscoveryReport()
+    started = time.perf_counter()
+    tasks: List["asyncio.Future[Any]"] = []
+    if use_mdns:
+        tasks.append(asyncio.ensure_future(async_run([adb_path, "mdns", "services"], check=False)))
+    hosts: List[str] = subnet_hosts(subnet) if subnet else []
+    port_list = parse_ports(ports)
+    if hosts:
+        tasks.append(asyncio.ensure_future(scan_endpoints(hosts, port_list, limit, timeout_sec)))
+    report.scanned = len(hosts) * len(port_list)
+    found: Dict[str, DiscoveredEndpoint] = {}
+    for result in await asyncio.gather(*tasks):
+        if isinstance(result, list):
+            entries = result
+        else:
+            entries = parse_mdns_services(result.stdout)
+        for entry in entries:
+            known = found.get(entry.endpoint)
+            if known is None:
+                found[entry.endpoint] = entry
+            else:
+                known.source = "mdns+scan"
+                known.name = known.name or entry.name
+                known.latency_ms = known.latency_ms if known.latency_ms is not None else entry.latency_ms
+    report.endpoints = sorted(found.values(), key=lambda e: _sort_key(e.endpoint))
+    report.scan_sec = time.perf_counter() - started
+    if connect and report.endpoints:
+        started = time.perf_counter()
+        await connect_endpoints(adb_path, report.endpoints)
+        report.connect_sec = time.perf_counter() - started
+    return report
+
+
+def _sort_key(endpoint: str) -> Tuple[int, bytes, int]:
+    host, _, port = endpoint.rpartition(":")
+    try:
+        address = ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return 99, host.encode("utf-8"), 0
+    return address.version, address.packed, int(port)
+
+
+def register_connected(report: DiscoveryReport) -> None:
+    for endpoint in report.endpoints:
+        if endpoint.connected:
+            register_endpoint(endpoint.endpoint, endpoint.name)
+
+
+def discover(adb_path: str, register: bool = False, **kwargs: Any) -> DiscoveryReport:
+    report = asyncio.run(async_discover(adb_path, **kwargs))
+    if register:
+        register_connected(report)
+    return report
@@ -0,0 +1,386 @@
+import fnmatch
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from . import metrics
+from .adb import DEVICE_BREAKER, adb_cmd, device_key, log_debug, run
+from .batch import ShellBatch
+from .errors import AdbWizardError
+from .wifi import active_manager
+
+DEFAULT_MAX_ATTEMPTS = 2
+HEALTH_POLL_SEC = 0.5
+# A queued job whose every eligible device stays unhealthy this long fails
+# instead of waiting forever.
+PLACEMENT_TIMEOUT_SEC = 300.0
+
+JobAction = Callable[[str], str]
+
+
+@dataclass
+class Requirements:
+    min_api: int = 0
+    max_api: int = 0
+    abi: str = ""
+    # Glob over the device's aliases and serial, e.g. "rack-a-*".
+    alias: str = ""
+
+    def matches(self, device: "FarmDevice") -> bool:
+        if self.min_api and device.api_level < self.min_api:
+            return False
+        if self.max_api and device.api_level > self.max_api:
+            return False
+        if self.abi and self.abi not in device.abis:
+            return False
+        if self.alias and not any(fnmatch.fnmatch(name, self.alias) for name in [device.serial] + device.aliases):
+            return False
+        return True
+
+
+@dataclass
+class FarmDevice:
+    serial: str
+    api_level: int = 0
+    abis: List[str] = field(default_factory=list)
+    aliases: List[str] = field(default_factory=list)
+    busy_sec: float = 0.0
+    jobs_run: int = 0
+
+
+@dataclass
+class FarmJob:
+    name: str
+    action: JobAction
+    requires: Requirements = field(default_factory=Requirements)
+    job_id: int = 0
+    state: str = "new"
+    serial: str = ""
+    output: str = ""
+    error: str = ""
+    attempts: int = 0
+    submitted_at: float = 0.0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    excluded: Set[str] = field(default_factory=set)
+    # When the job last had no healthy eligible device (0: it has one).
+    unplaceable_since: float = 0.0
+
+    @property
+    def wait_sec(self) -> float:
+        return max(0.0, (self.started_at or self.finished_at) - self.submitted_at)
+
+    @property
+    def run_sec(self) -> float:
+        return max(0.0, self.finished_at - self.started_at) if self.started_at else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.job_id,
+            "name": self.name,
+            "state": self.state,
+            "serial": self.serial,
+            "attempts": self.attempts,
+            "wait_sec": round(self.wait_sec, 3),
+            "run_sec": round(self.run_sec, 3),
+            "error": self.error,
+        }
+
+
+def probe_devices(adb_path: str, serials: List[str], aliases: Optional[Dict[str, str]] = None) -> List[FarmDevice]:
+    # API level and ABI list per device, one coalesced shell each, all in parallel.
+    by_serial: Dict[str, List[str]] = {}
+    for alias, serial in (aliases or {}).items():
+        by_serial.setdefault(serial, []).append(alias)
+
+    def probe(serial: str) -> FarmDevice:
+        with ShellBatch(adb_path, serial) as batch:
+            sdk = batch.submit("getprop ro.build.version.sdk")
+            abilist = batch.submit("getprop ro.product.cpu.abilist")
+            abi = batch.submit("getprop ro.product.cpu.abi")
+        level = sdk.result().stdout.strip()
+        abis = [a for a in abilist.result().stdout.strip().split(",") if a] or [abi.result().stdout.strip()]
+        api_level = int(level) if level.isdigit() else 0
+        return FarmDevice(serial, api_level, [a for a in abis if a], sorted(by_serial.get(serial, [])))
+
+    if not serials:
+        return []
+    with ThreadPoolExecutor(max_workers=len(serials)) as pool:
+        return list(pool.map(probe, serials))
+
+
+def device_healthy(serial: str) -> bool:
+    if DEVICE_BREAKER.state(device_key(serial)) == "open":
+        return False
+    manager = active_manager()
+    return manager is None or manager.is_live(serial)
+
+
+class DeviceFarm:
+    # One worker thread per device, so a device never runs two jobs at once.
+    # A job is queued on the least loaded device that meets its requirements;
+    # a worker whose own queue is empty steals the newest eligible job from
+    # the longest other queue. Workers on unhealthy devices (circuit open,
+    # Wi-Fi endpoint down) take nothing, so their queued jobs drain to healthy
+    # peers. A job that fails while its device's breaker opens is retried on
+    # another device, up to `max_attempts`. A queued job that no healthy
+    # device could take for `placement_timeout_sec` fails.
+    def __init__(
+        self,
+        devices: List[FarmDevice],
+        health: Callable[[str], bool] = device_healthy,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        poll_sec: float = HEALTH_POLL_SEC,
+        placement_timeout_sec: float = PLACEMENT_TIMEOUT_SEC,
+    ) -> None:
+        self.devices = {d.serial: d for d in devices}
+        self.health = health
+        self.max_attempts = max(1, max_attempts)
+        self.poll_sec = poll_sec
+        self.placement_timeout_sec = placement_timeout_sec
+        self._healthy: Dict[str, bool] = {d.serial: True for d in devices}
+        self.jobs: List[FarmJob] = []
+        self._queues: Dict[str, Deque[FarmJob]] = {d.serial: deque() for d in devices}
+        self._running: Dict[str, Optional[FarmJob]] = {d.serial: None for d in devices}
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._started_at = 0.0
+        self.peak_queue_depth = 0
+        self.steals = 0
+
+    def _eligible(self, job: FarmJob) -> List[str]:
+        return [s for s, d in self.devices.items() if s not in job.excluded and job.requires.matches(d)]
+
+    def _queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _enqueue(self, job: FarmJob) -> None:
+        eligible = self._eligible(job)
+        if not eligible:
+            job.state = "failed"
+            job.error = job.error or "no connected device meets the job's requirements"
+            job.finished_at = time.monotonic()
+            return
+        load = {s: len(self._queues[s]) + (self._running[s] is not None) for s in eligible}
+        target = min(eligible, key=lambda s: load[s])
+        job.state = "queued"
+        self._queues[target].append(job)
+        self.peak_queue_depth = max(self.peak_queue_depth, self._queue_depth())
+
+    def submit(self, job: FarmJob) -> FarmJob:
+        with self._cond:
+            job.job_id = next(self._ids)
+            job.submitted_at = time.monotonic()
+            self.jobs.append(job)
+            self._enqueue(job)
+            self._cond.notify_all()
+        return job
+
+    def _take(self, serial: str) -> Optional[FarmJob]:
+        own = self._queues[serial]
+        if own:
+            return own.popleft()
+        device = self.devices[serial]
+        for other in sorted(self._queues, key=lambda s: len(self._queues[s]), reverse=True):
+            if other == serial:
+                continue
+            queue = self._queues[other]
+            for job in reversed(queue):
+                if serial not in job.excluded and job.requires.matches(device):
+                    queue.remove(job)
+                    self.steals += 1
+                    return job
+        return None
+
+    def _worker(self, serial: str) -> None:
+        device = self.devices[serial]
+        while True:
+            healthy = self.health(serial)
+            with self._cond:
+                self._healthy[serial] = healthy
+                job = self._take(serial) if healthy else None
+                if job is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait(self.poll_sec)
+                    continue
+                job.state = "running"
+                job.serial = serial
+                job.attempts += 1
+                job.started_at = time.monotonic()
+                self._running[serial] = job
+            log_debug(f"FARM start job={job.job_id} name={job.name} serial={serial} attempt={job.attempts}")
+            output, error = "", ""
+            try:
+                output = job.action(serial) or ""
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            finished = time.monotonic()
+            retry = bool(error) and not self.health(serial) and job.attempts < self.max_attempts
+            with self._cond:
+                self._running[serial] = None
+                device.busy_sec += finished - job.started_at
+                device.jobs_run += 1
+                self._record(job, serial, finished, error)
+                if retry:
+                    job.excluded.add(serial)
+                    job.error = f"{serial}: {error}"
+                    self._enqueue(job)
+                else:
+                    job.output, job.error = output, error
+                    job.state = "failed" if error else "done"
+                    job.finished_at = finished
+                self._cond.notify_all()
+
+    def _record(self, job: FarmJob, serial: str, finished: float, error: str) -> None:
+        if not metrics.ENABLED:
+            return
+        metrics.observe("adbw_farm_job_wait_seconds", {"serial": serial}, job.started_at - job.submitted_at)
+        metrics.observe("adbw_farm_job_duration_seconds", {"serial": serial}, finished - job.started_at)
+        metrics.inc("adbw_farm_jobs_total", {"serial": serial, "status": "failed" if error else "done"})
+
+    def start(self) -> "DeviceFarm":
+        self._started_at = time.monotonic()
+        for serial in self.devices:
+            thread = threading.Thread(target=self._worker, args=(serial,), name=f"adbw-farm-{serial}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._queue_depth() + sum(1 for j in self._running.values() if j is not None)
+
+    def _fail_unplaceable(self) -> None:
+        now = time.monotonic()
+        for queue in self._queues.values():
+            for job in list(queue):
+                if any(self._healthy[s] for s in self._eligible(job)):
+                    job.unplaceable_since = 0.0
+                    continue
+                job.unplaceable_since = job.unplaceable_since or now
+                if now - job.unplaceable_since >= self.placement_timeout_sec:
+                    queue.remove(job)
+                    job.state = "failed"
+                    reason = f"no healthy device took the job within {self.placement_timeout_sec:g}s"
+                    job.error = f"{job.error}; {reason}" if job.error else reason
+                    job.finished_at = now
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._fail_unplaceable()
+                if not self._queue_depth() and not any(j is not None for j in self._running.values()):
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, self.poll_sec) if remaining is not None else self.poll_sec)
+        return True
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            elapsed = max(1e-9, time.monotonic() - self._started_at) if self._started_at else 0.0
+            finished = [j for j in self.jobs if j.state in ("done", "failed")]
+            waits = sorted(j.wait_sec for j in finished)
+            return {
+                "jobs": len(self.jobs),
+                "done": sum(1 for j in finished if j.state == "done"),
+                "failed": sum(1 for j in finished if j.state == "failed"),
+                "queue_depth": self._queue_depth(),
+                "peak_queue_depth": self.peak_queue_depth,
+                "steals": self.steals,
+                "wait_avg_sec": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "wait_max_sec": round(waits[-1], 3) if waits else 0.0,
+                "elapsed_sec": round(elapsed, 3),
+                "utilisation": {
+                    s: round(d.busy_sec / elapsed, 3) if elapsed else 0.0 for s, d in sorted(self.devices.items())
+                },
+                "jobs_per_device": {s: d.jobs_run for s, d in sorted(self.devices.items())},
+            }
+
+
+def run_jobs(devices: List[FarmDevice], jobs: List[FarmJob], **kwargs: Any) -> Dict[str, Any]:
+    farm = DeviceFarm(devices, **kwargs).start()
+    try:
+        for job in jobs:
+            farm.submit(job)
+        farm.wait()
+    finally:
+        farm.stop()
+    return farm.stats()
+
+
+def shell_action(adb_path: str, command: str) -> JobAction:
+    def action(serial: str) -> str:
+        proc = run(adb_cmd(adb_path, serial, "shell", command), check=False)
+        if proc.returncode != 0:
+            raise AdbWizardError((proc.stderr or proc.stdout).strip() or f"exit {proc.returncode}")
+        return proc.stdout
+
+    return action
+
+
+def install_action(adb_path: str, apk: str) -> JobAction:
+    def action(serial: str) -> str:
+        proc = run(adb_cmd(adb_path, serial, "install", "-r", apk), check=False)
+        if proc.returncode != 0 or "Failure" in proc.stdout:
+            raise AdbWizardError((proc.stderr or proc.stdout).strip() or f"exit {proc.returncode}")
+        return proc.stdout
+
+    return action
+
+
+def parse_requirements(raw: Any) -> Requirements:
+    if not isinstance(raw, dict):
+        return Requirements()
+    try:
+        return Requirements(
+            min_api=int(raw.get("min_api", 0) or 0),
+            max_api=int(raw.get("max_api", 0) or 0),
+            abi=str(raw.get("abi", "") or ""),
+            alias=str(raw.get("alias", "") or ""),
+        )
+    except (TypeError, ValueError):
+        raise AdbWizardError(f"Invalid job requirements: {raw}") from None
+
+
+def jobs_from_specs(
+    adb_path: str, specs: List[Dict[str, Any]], workflow_action: Optional[Callable[[str], JobAction]] = None
+) -> List[FarmJob]:
+    # Spec: {"name": ..., "shell": "cmd" | "install": "app.apk" | "workflow": "name",
+    #        "repeat": N, "requires": {"min_api", "max_api", "abi", "alias"}}
+    jobs: List[FarmJob] = []
+    for i, spec in enumerate(specs, start=1):
+        if not isinstance(spec, dict):
+            raise AdbWizardError(f"Job {i} is not an object.")
+        if spec.get("shell"):
+            action, label = shell_action(adb_path, str(spec["shell"])), f"shell {spec['shell']}"
+        elif spec.get("install"):
+            action, label = install_action(adb_path, str(spec["install"])), f"install {spec['install']}"
+        elif spec.get("workflow") and workflow_action is not None:
+            action, label = workflow_action(str(spec["workflow"])), f"workflow {spec['workflow']}"
+        else:
+            raise AdbWizardError(f"Job {i} needs one of: shell, install, workflow.")
+        requires = parse_requirements(spec.get("requires"))
+        try:
+            repeat = max(1, int(spec.get("repeat", 1) or 1))
+        except (TypeError, ValueError):
+            raise AdbWizardError(f"Job {i} has an invalid repeat count.") from None
+        for _ in range(repeat):
+            jobs.append(FarmJob(str(spec.get("name") or label), action, requires))
+    return jobs
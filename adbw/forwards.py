@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from .adb import TRANSPORT_PREFIX, adb_cmd, run
+from .errors import AdbWizardError
+
+KINDS = ("forward", "reverse")
+
+# A rule is written the way adb takes it: "forward <local> <remote>" or
+# "reverse <remote> <local>". `source` is the side that listens, and each
+# listening socket maps to exactly one target, so (kind, source) is the key.
+
+
+@dataclass(frozen=True)
+class ForwardRule:
+    kind: str
+    source: str
+    target: str
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.kind, self.source
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.source} {self.target}"
+
+
+@dataclass
+class ForwardPlan:
+    add: List[ForwardRule] = field(default_factory=list)
+    remove: List[ForwardRule] = field(default_factory=list)
+    unchanged: List[ForwardRule] = field(default_factory=list)
+    # Kinds whose every current rule goes; one --remove-all instead of N calls.
+    remove_all: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ForwardResult:
+    serial: str
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ok": self.ok, **asdict(self)}
+
+
+def parse_rule(text: str) -> ForwardRule:
+    parts = text.split()
+    if len(parts) != 3 or parts[0] not in KINDS or ":" not in parts[1] or ":" not in parts[2]:
+        raise AdbWizardError(f"Invalid forward rule (expected 'forward|reverse <spec> <spec>'): {text}")
+    return ForwardRule(parts[0], parts[1], parts[2])
+
+
+def parse_rules(lines: List[str]) -> List[ForwardRule]:
+    return [parse_rule(line) for line in lines if line.strip()]
+
+
+def parse_forward_list(kind: str, text: str, serial: str = "") -> List[ForwardRule]:
+    # `forward --list` covers every device ("<serial> <local> <remote>");
+    # `reverse --list` is per device and its first column is the transport.
+    rules: List[ForwardRule] = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) != 3:
+            continue
+        if kind == "forward" and serial and parts[0] != serial:
+            continue
+        rules.append(ForwardRule(kind, parts[1], parts[2]))
+    return rules
+
+
+def _listed_serial(adb_path: str, target: str) -> str:
+    # `forward --list` names devices by serial, so a transport id target is
+    # resolved first; filtering by "transport_id:<n>" would match nothing.
+    if not target.startswith(TRANSPORT_PREFIX):
+        return target
+    proc = run(adb_cmd(adb_path, target, "get-serialno"), check=False)
+    serial = proc.stdout.strip()
+    if proc.returncode != 0 or not serial:
+        raise AdbWizardError(f"Cannot resolve serial of {target}: {(proc.stderr or proc.stdout).strip()}")
+    return serial
+
+
+def current_rules(adb_path: str, serial: str) -> List[ForwardRule]:
+    rules: List[ForwardRule] = []
+    listed_serial = _listed_serial(adb_path, serial)
+    for kind in KINDS:
+        proc = run(adb_cmd(adb_path, serial, kind, "--list"), check=False)
+        if proc.returncode != 0:
+            raise AdbWizardError(f"adb {kind} --list failed: {(proc.stderr or proc.stdout).strip()}")
+        rules.extend(parse_forward_list(kind, proc.stdout, listed_serial))
+    return rules
+
+
+def plan_forwards(desired: List[ForwardRule], current: List[ForwardRule], prune: bool = False) -> ForwardPlan:
+    # Rules whose source is bound to another target are re-added: adb
+    # rebinds in place, so no remove is needed first. With `prune`, rules
+    # not in the set are removed.
+    plan = ForwardPlan()
+    wanted = {rule.key: rule for rule in desired}
+    existing = {rule.key: rule for rule in current}
+    for key, rule in wanted.items():
+        if existing.get(key) == rule:
+            plan.unchanged.append(rule)
+        else:
+            plan.add.append(rule)
+    if prune:
+        stale = [rule for key, rule in existing.items() if key not in wanted]
+        for kind in KINDS:
+            kind_stale = [rule for rule in stale if rule.kind == kind]
+            if kind_stale and not any(key[0] == kind for key in wanted):
+                plan.remove_all.append(kind)
+            plan.remove.extend(kind_stale)
+    return plan
+
+
+def apply_plan(adb_path: str, serial: str, plan: ForwardPlan) -> ForwardResult:
+    result = ForwardResult(serial, unchanged=len(plan.unchanged))
+
+    def call(args: List[str], label: str) -> bool:
+        proc = run(adb_cmd(adb_path, serial, *args), check=False)
+        if proc.returncode != 0:
+            result.errors.append(f"{label}: {(proc.stderr or proc.stdout).strip() or f'exit {proc.returncode}'}")
+            return False
+        return True
+
+    for kind in plan.remove_all:
+        if call([kind, "--remove-all"], f"{kind} --remove-all"):
+            result.removed.extend(str(rule) for rule in plan.remove if rule.kind == kind)
+    for rule in plan.remove:
+        if rule.kind not in plan.remove_all and call([rule.kind, "--remove", rule.source], f"remove {rule}"):
+            result.removed.append(str(rule))
+    for rule in plan.add:
+        if call([rule.kind, rule.source, rule.target], f"add {rule}"):
+            result.added.append(str(rule))
+    return result
+
+
+def apply_forwards(adb_path: str, serial: str, rules: List[ForwardRule], prune: bool = False) -> ForwardResult:
+    try:
+        plan = plan_forwards(rules, current_rules(adb_path, serial), prune)
+    except AdbWizardError as e:
+        return ForwardResult(serial, errors=[str(e)])
+    return apply_plan(adb_path, serial, plan)
+
+
+def apply_forwards_on_devices(
+    adb_path: str, serials: List[str], rules: List[ForwardRule], prune: bool = False
+) -> List[ForwardResult]:
+    if not serials:
+        return []
+    with ThreadPoolExecutor(max_workers=len(serials)) as pool:
+        return list(pool.map(lambda serial: apply_forwards(adb_path, serial, rules, prune), serials))
@@ -0,0 +1,220 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+HEAVY = "heavy"
+LIGHT = "light"
+
+# Commands that move whole files over the transport. They saturate USB hubs
+# and the adb server far more than a getprop, so they get their own lane.
+HEAVY_KINDS = frozenset(
+    {"install", "install-multiple", "install-multi-package", "push", "pull", "sync", "bugreport", "sideload",
+     "backup", "restore"}
+)
+
+
+def lane_for_kind(kind: str) -> str:
+    return HEAVY if kind in HEAVY_KINDS else LIGHT
+
+
+@dataclass
+class _Waiter:
+    serial: str
+    lane: str
+    wake: Callable[[], None]
+    granted: bool = False
+
+
+class ConcurrencyGovernor:
+    # Slots for adb commands: a global cap, a per-serial cap and, for the heavy
+    # lane, a tighter global and per-serial cap of its own (0 = unlimited).
+    # Waiters are served in arrival order, but one stuck behind a cap that a
+    # later waiter does not need (a busy device, a full heavy lane) does not
+    # hold that waiter up. Optionally each serial also has a token bucket that
+    # lets at most `rate_per_serial` commands start per second.
+    def __init__(
+        self,
+        max_total: int = 16,
+        max_per_serial: int = 4,
+        max_heavy: int = 8,
+        max_heavy_per_serial: int = 2,
+        rate_per_serial: float = 0.0,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+        self._active = 0
+        self._heavy = 0
+        self._per_serial: Dict[str, int] = {}
+        self._heavy_per_serial: Dict[str, int] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.peak = 0
+        self.queued = 0
+        self.configure(max_total, max_per_serial, max_heavy, max_heavy_per_serial, rate_per_serial)
+
+    def configure(
+        self,
+        max_total: int,
+        max_per_serial: int,
+        max_heavy: int,
+        max_heavy_per_serial: int,
+        rate_per_serial: float = 0.0,
+    ) -> None:
+        with self._lock:
+            self.max_total = max(0, max_total)
+            self.max_per_serial = max(0, max_per_serial)
+            self.max_heavy = max(0, max_heavy)
+            self.max_heavy_per_serial = max(0, max_heavy_per_serial)
+            self.rate_per_serial = max(0.0, rate_per_serial)
+            self._buckets.clear()
+            # Raised limits may admit commands that are already waiting.
+            self._grant_waiters()
+
+    def _fits(self, serial: str, lane: str) -> bool:
+        if self.max_total and self._active >= self.max_total:
+            return False
+        if serial and self.max_per_serial and self._per_serial.get(serial, 0) >= self.max_per_serial:
+            return False
+        if lane == HEAVY:
+            if self.max_heavy and self._heavy >= self.max_heavy:
+                return False
+            limit = self.max_heavy_per_serial
+            if serial and limit and self._heavy_per_serial.get(serial, 0) >= limit:
+                return False
+        return True
+
+    def _take(self, serial: str, lane: str) -> None:
+        self._active += 1
+        self.peak = max(self.peak, self._active)
+        if serial:
+            self._per_serial[serial] = self._per_serial.get(serial, 0) + 1
+        if lane == HEAVY:
+            self._heavy += 1
+            if serial:
+                self._heavy_per_serial[serial] = self._heavy_per_serial.get(serial, 0) + 1
+
+    def _grant_waiters(self) -> None:
+        # Grants only raise the counts, so a waiter that did not fit earlier
+        # in this pass cannot fit later in it: one pass is enough.
+        for waiter in list(self._waiters):
+            if self._fits(waiter.serial, waiter.lane):
+                self._waiters.remove(waiter)
+                self._take(waiter.serial, waiter.lane)
+                waiter.granted = True
+                waiter.wake()
+
+    def _enqueue(self, serial: str, lane: str, wake: Callable[[], None]) -> Optional[_Waiter]:
+        # None when the slot was taken right away. Nobody queued can fit at
+        # this point, so taking a free slot never jumps a waiter that could use it.
+        with self._lock:
+            if self._fits(serial, lane):
+                self._take(serial, lane)
+                return None
+            waiter = _Waiter(serial, lane, wake)
+            self._waiters.append(waiter)
+            self.queued += 1
+            return waiter
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                return
+        self.release(waiter.serial, waiter.lane)
+
+    def _reserve(self, serial: str) -> float:
+        # Seconds until this serial's bucket has a token for the caller. A
+        # negative balance is tokens already promised to earlier callers.
+        rate = self.rate_per_serial
+        if not serial or rate <= 0:
+            return 0.0
+        burst = max(1.0, rate)
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(serial, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate) - 1.0
+            self._buckets[serial] = (tokens, now)
+        return max(0.0, -tokens / rate)
+
+    def acquire(self, serial: str, lane: str) -> float:
+        # Blocks until a slot is free; returns the seconds spent waiting.
+        started = time.monotonic()
+        event = threading.Event()
+        waiter = self._enqueue(serial, lane, event.set)
+        if waiter is not None:
+            try:
+                event.wait()
+            except BaseException:
+                self._abandon(waiter)
+                raise
+        delay = self._reserve(serial)
+        if delay > 0:
+            time.sleep(delay)
+        return time.monotonic() - started
+
+    async def async_acquire(self, serial: str, lane: str) -> float:
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[None]" = loop.create_future()
+
+        def resolve() -> None:
+            if not future.done():
+                future.set_result(None)
+
+        waiter = self._enqueue(serial, lane, lambda: loop.call_soon_threadsafe(resolve))
+        if waiter is not None:
+            try:
+                await future
+            except BaseException:
+                # Cancelled: give back a slot granted in the meantime.
+                self._abandon(waiter)
+                raise
+        delay = self._reserve(serial)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return time.monotonic() - started
+
+    def release(self, serial: str, lane: str) -> None:
+        with self._lock:
+            self._active -= 1
+            if serial:
+                self._per_serial[serial] -= 1
+                if not self._per_serial[serial]:
+                    del self._per_serial[serial]
+            if lane == HEAVY:
+                self._heavy -= 1
+                if serial:
+                    self._heavy_per_serial[serial] -= 1
+                    if not self._heavy_per_serial[serial]:
+                        del self._heavy_per_serial[serial]
+            self._grant_waiters()
+
+    @contextmanager
+    def slot(self, serial: str, lane: str) -> Iterator[float]:
+        waited = self.acquire(serial, lane)
+        try:
+            yield waited
+        finally:
+            self.release(serial, lane)
+
+    @asynccontextmanager
+    async def async_slot(self, serial: str, lane: str) -> AsyncIterator[float]:
+        waited = await self.async_acquire(serial, lane)
+        try:
+            yield waited
+        finally:
+            self.release(serial, lane)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active": self._active,
+                "heavy_active": self._heavy,
+                "waiting": len(self._waiters),
+                "peak": self.peak,
+                "queued": self.queued,
+                "per_serial": dict(self._per_serial),
+            }
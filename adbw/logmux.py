@@ -0,0 +1,145 @@
+import heapq
+import itertools
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, List, Optional, Tuple
+
+from .adb import adb_cmd, run, spawn_streaming, stop_streaming
+from .logstore import LogClock
+
+DEFAULT_REORDER_WINDOW_SEC = 0.5
+MAX_BUFFERED_LINES = 50000
+CLOCK_SAMPLES = 3
+
+_TIMESTAMP = re.compile(r"^(?:(\d{4})-)?(\d\d)-(\d\d)\s+(\d\d):(\d\d):(\d\d)\.(\d{3})\s+")
+
+
+def measure_clock_offset(adb_path: str, serial: str, samples: int = CLOCK_SAMPLES) -> float:
+    # Device clock minus host clock, from the sample with the smallest round
+    # trip. Older toybox `date` lacks %N, which limits accuracy to 1s.
+    best: Optional[Tuple[float, float]] = None
+    for _ in range(max(1, samples)):
+        sent = time.time()
+        out = run(adb_cmd(adb_path, serial, "shell", "date", "+%s.%N"), check=False).stdout.strip()
+        received = time.time()
+        try:
+            device_time = float(out)
+        except ValueError:
+            try:
+                device_time = float(out.split(".")[0])
+            except ValueError:
+                continue
+        rtt = received - sent
+        if best is None or rtt < best[0]:
+            best = (rtt, device_time - (sent + received) / 2)
+    return best[1] if best else 0.0
+
+
+class LogcatMux:
+    # Merges `adb logcat` from several devices into one stream ordered by
+    # host-corrected timestamp. Each line is held for `window_sec` after it
+    # arrives so late lines from slower transports can still sort ahead of it.
+    def __init__(
+        self,
+        adb_path: str,
+        devices: List[Tuple[str, str]],
+        window_sec: float = DEFAULT_REORDER_WINDOW_SEC,
+        out: IO[str] = sys.stdout,
+        logcat_args: Optional[List[str]] = None,
+    ) -> None:
+        self.adb_path = adb_path
+        self.devices = devices
+        self.window_sec = max(0.0, window_sec)
+        self.out = out
+        self.logcat_args = list(logcat_args or [])
+        self.offsets: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {serial: 0 for serial, _ in devices}
+        self.reordered = 0
+        self._heap: List[Tuple[float, int, float, str, str]] = []
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._procs: List[subprocess.Popen] = []
+        self._readers: List[threading.Thread] = []
+        self._label_width = max((len(label) for _, label in devices), default=0)
+        self._last_emitted = 0.0
+        self._stamp_cache: Tuple[int, str] = (-1, "")
+
+    def _reader(self, serial: str, label: str, proc: subprocess.Popen, offset: float) -> None:
+        clock = LogClock(time.time() + offset)
+        last_ts = time.time()
+        assert proc.stdout is not None
+        with proc.stdout:
+            for raw in proc.stdout:
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                m = _TIMESTAMP.match(line)
+                if m:
+                    year, month, day, hour, minute, sec, ms = m.groups()
+                    day_ts = clock.epoch(year, int(month), int(day), int(hour), int(minute))
+                    last_ts = day_ts + int(sec) + int(ms) / 1000.0 - offset
+                    body = line[m.end():]
+                else:
+                    body = line
+                entry = (last_ts, next(self._seq), time.monotonic(), label, body)
+                with self._lock:
+                    heapq.heappush(self._heap, entry)
+                self.counts[serial] += 1
+
+    def _stamp(self, ts: float) -> str:
+        whole = int(ts)
+        if self._stamp_cache[0] != whole:
+            self._stamp_cache = (whole, time.strftime("%m-%d %H:%M:%S", time.localtime(whole)))
+        return f"{self._stamp_cache[1]}.{int((ts - whole) * 1000):03d}"
+
+    def _drain(self, final: bool = False) -> None:
+        now = time.monotonic()
+        lines: List[str] = []
+        with self._lock:
+            while self._heap:
+                ts, _, arrived, label, body = self._heap[0]
+                if not final and arrived + self.window_sec > now and len(self._heap) <= MAX_BUFFERED_LINES:
+                    break
+                heapq.heappop(self._heap)
+                if ts < self._last_emitted:
+                    self.reordered += 1
+                self._last_emitted = max(self._last_emitted, ts)
+                lines.append(f"{label:<{self._label_width}} {self._stamp(ts)} {body}\n")
+        if lines:
+            self.out.write("".join(lines))
+            self.out.flush()
+
+    def start(self) -> None:
+        with ThreadPoolExecutor(max_workers=max(1, len(self.devices))) as pool:
+            offsets = pool.map(lambda d: measure_clock_offset(self.adb_path, d[0]), self.devices)
+            self.offsets = {serial: offset for (serial, _), offset in zip(self.devices, offsets)}
+        for serial, label in self.devices:
+            cmd = adb_cmd(self.adb_path, serial, "logcat", "-v", "threadtime", *self.logcat_args)
+            proc = spawn_streaming(cmd, stdout=subprocess.PIPE)
+            if proc is None:
+                continue
+            self._procs.append(proc)
+            reader = threading.Thread(
+                target=self._reader, args=(serial, label, proc, self.offsets[serial]), daemon=True
+            )
+            reader.start()
+            self._readers.append(reader)
+
+    def run(self, duration_sec: Optional[float] = None) -> None:
+        deadline = time.monotonic() + duration_sec if duration_sec else None
+        tick = max(0.01, min(0.1, self.window_sec / 4 or 0.05))
+        self.start()
+        try:
+            while any(r.is_alive() for r in self._readers):
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                time.sleep(tick)
+                self._drain()
+        finally:
+            for proc in self._procs:
+                stop_streaming(proc)
+            for reader in self._readers:
+                reader.join(timeout=2)
+            self._drain(final=True)
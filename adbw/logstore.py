@@ -0,0 +1,301 @@
+import gzip
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from .errors import AdbWizardError
+
+LOG_DB_FILE = "adb_cli_py_logs.sqlite3"
+BATCH_SIZE = 5000
+DEFAULT_QUERY_LIMIT = 200
+
+_THREADTIME = re.compile(
+    r"^(?:(\d{4})-)?(\d\d)-(\d\d)\s+(\d\d):(\d\d):(\d\d)\.(\d{3})\s+(\d+)\s+(\d+)\s+([VDIWEFA])\s+(.*?)\s*: ?(.*)$"
+)
+# Lines that tie a pid to a package name, so crashes can be queried by package.
+_PROC_PATTERNS = {
+    "AndroidRuntime": re.compile(r"^Process: ([\w.:]+), PID: (\d+)"),
+    "ActivityManager": re.compile(r"^Start proc (\d+):([\w.:]+)/"),
+}
+# Capture files are named <kind>_<serial>_<YYYYmmdd>_<HHMMSS>; the serial is
+# taken from the nearest path component that matches.
+_SERIAL_FROM_PATH = re.compile(r"^(?:logcat|adb_bundle|scheduled_logs)_(.+)_\d{8}_\d{6}(?:\.txt(?:\.gz)?)?$")
+_FILENAME_COLON = re.compile(r"^(transport_id|\d{1,3}(?:\.\d{1,3}){3})_(\d+)$")
+_SINCE = re.compile(r"^(\d+(?:\.\d+)?)\s*([smhdw]?)$")
+_SINCE_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    serial TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    lines INTEGER NOT NULL DEFAULT 0,
+    ingested_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    serial TEXT NOT NULL,
+    ts REAL NOT NULL,
+    pid INTEGER NOT NULL,
+    tid INTEGER NOT NULL,
+    level TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_serial_ts ON logs(serial, ts);
+CREATE INDEX IF NOT EXISTS logs_ts ON logs(ts);
+CREATE INDEX IF NOT EXISTS logs_tag_ts ON logs(tag, ts);
+CREATE INDEX IF NOT EXISTS logs_level_ts ON logs(level, ts);
+CREATE INDEX IF NOT EXISTS logs_source_pid ON logs(source_id, pid);
+CREATE TABLE IF NOT EXISTS procs (
+    source_id INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    package TEXT NOT NULL,
+    PRIMARY KEY (source_id, pid, package)
+);
+CREATE INDEX IF NOT EXISTS procs_package ON procs(package);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(message, content='logs', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS logs_ad AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+"""
+
+
+def serial_from_path(path: str) -> str:
+    parts = os.path.normpath(os.path.abspath(path)).split(os.sep)
+    for part in reversed(parts):
+        m = _SERIAL_FROM_PATH.match(part)
+        if m:
+            # Undo target_filename for transport targets and Wi-Fi serials.
+            return _FILENAME_COLON.sub(r"\1:\2", m.group(1))
+    return ""
+
+
+def parse_since(value: str) -> float:
+    m = _SINCE.match(value.strip().lower())
+    if not m:
+        raise AdbWizardError(f"Invalid time window: {value} (use e.g. 30m, 12h, 1d)")
+    return float(m.group(1)) * _SINCE_UNITS[m.group(2)]
+
+
+def _open_text(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+class LogClock:
+    # logcat's default format has no year and mktime is slow per line, so
+    # epoch bases are cached per minute and the year is inferred from the
+    # capture file's mtime.
+    def __init__(self, reference: float) -> None:
+        ref = datetime.fromtimestamp(reference)
+        self.year = ref.year
+        self.ref_md = (ref.month, ref.day)
+        self._bases: Dict[Tuple[int, int, int, int, int], float] = {}
+
+    def epoch(self, year: Optional[str], month: int, day: int, hour: int, minute: int) -> float:
+        if year:
+            y = int(year)
+        else:
+            y = self.year - 1 if (month, day) > self.ref_md else self.year
+        key = (y, month, day, hour, minute)
+        base = self._bases.get(key)
+        if base is None:
+            base = time.mktime((y, month, day, hour, minute, 0, 0, 0, -1))
+            self._bases[key] = base
+        return base
+
+
+def parse_line(line: str, clock: LogClock) -> Optional[Tuple[float, int, int, str, str, str]]:
+    m = _THREADTIME.match(line.rstrip("\r\n"))
+    if not m:
+        return None
+    year, month, day, hour, minute, sec, ms, pid, tid, level, tag, message = m.groups()
+    ts = clock.epoch(year, int(month), int(day), int(hour), int(minute)) + int(sec) + int(ms) / 1000.0
+    return ts, int(pid), int(tid), level, tag, message
+
+
+def parse_lines(lines: Iterator[str], reference: float) -> Iterator[Tuple[float, int, int, str, str, str]]:
+    clock = LogClock(reference)
+    for line in lines:
+        row = parse_line(line, clock)
+        if row is not None:
+            yield row
+
+
+class LogStore:
+    def __init__(self, path: str = LOG_DB_FILE) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: text search falls back to LIKE.
+            self.fts = False
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "LogStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def ingest_file(self, path: str, serial: str = "") -> Dict[str, Any]:
+        st = os.stat(path)
+        abspath = os.path.abspath(path)
+        serial = serial or serial_from_path(path) or "unknown"
+        row = self.conn.execute("SELECT id, size, mtime_ns, lines FROM sources WHERE path = ?", (abspath,)).fetchone()
+        if row and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+            return {"path": path, "serial": serial, "lines": row[3], "skipped": True}
+        started = time.perf_counter()
+        with self.conn:
+            if row:
+                self.conn.execute("DELETE FROM logs WHERE source_id = ?", (row[0],))
+                self.conn.execute("DELETE FROM procs WHERE source_id = ?", (row[0],))
+                self.conn.execute("DELETE FROM sources WHERE id = ?", (row[0],))
+            # Size/mtime are recorded only once ingest completes, so an
+            # interrupted ingest is redone on the next run.
+            source_id = self.conn.execute(
+                "INSERT INTO sources (path, serial, size, mtime_ns, ingested_at) VALUES (?, ?, -1, -1, ?)",
+                (abspath, serial, time.time()),
+            ).lastrowid
+        count = 0
+        batch: List[Tuple[Any, ...]] = []
+        procs = set()
+        with _open_text(path) as f:
+            for ts, pid, tid, level, tag, message in parse_lines(f, st.st_mtime):
+                batch.append((source_id, serial, ts, pid, tid, level, tag, message))
+                pattern = _PROC_PATTERNS.get(tag)
+                if pattern is not None:
+                    m = pattern.match(message)
+                    if m:
+                        a, b = m.groups()
+                        procs.add((source_id, int(b), a) if tag == "AndroidRuntime" else (source_id, int(a), b))
+                if len(batch) >= BATCH_SIZE:
+                    count += self._flush(batch)
+        count += self._flush(batch)
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO procs (source_id, pid, package) VALUES (?, ?, ?)", procs)
+            self.conn.execute(
+                "UPDATE sources SET size = ?, mtime_ns = ?, lines = ? WHERE id = ?",
+                (st.st_size, st.st_mtime_ns, count, source_id),
+            )
+        return {
+            "path": path,
+            "serial": serial,
+            "lines": count,
+            "skipped": False,
+            "duration_sec": round(time.perf_counter() - started, 3),
+        }
+
+    def _flush(self, batch: List[Tuple[Any, ...]]) -> int:
+        if not batch:
+            return 0
+        with self.conn:
+            # Take the write lock before reading MAX(id): otherwise another
+            # ingest could insert in between, and both would index its rows.
+            self.conn.execute("BEGIN IMMEDIATE")
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM logs").fetchone()[0]
+            self.conn.executemany(
+                "INSERT INTO logs (source_id, serial, ts, pid, tid, level, tag, message) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            # Indexing the batch in one statement is several times faster
+            # than a per-row AFTER INSERT trigger.
+            if self.fts:
+                self.conn.execute("INSERT INTO logs_fts (rowid, message) SELECT id, message FROM logs WHERE id > ?", (last_id,))
+        n = len(batch)
+        batch.clear()
+        return n
+
+    def ingest_paths(self, paths: List[str], serial: str = "") -> List[Dict[str, Any]]:
+        results = []
+        for path in paths:
+            for file_path in find_log_files(path):
+                results.append(self.ingest_file(file_path, serial))
+        return results
+
+    def query(
+        self,
+        text: str = "",
+        serial: str = "",
+        package: str = "",
+        tag: str = "",
+        level: str = "",
+        pid: Optional[int] = None,
+        since_sec: Optional[float] = None,
+        limit: int = DEFAULT_QUERY_LIMIT,
+    ) -> List[Dict[str, Any]]:
+        clauses: List[str] = []
+        args: List[Any] = []
+        sql = "SELECT logs.serial, logs.ts, logs.pid, logs.tid, logs.level, logs.tag, logs.message FROM logs"
+        if text and self.fts:
+            sql += " JOIN logs_fts ON logs_fts.rowid = logs.id"
+            clauses.append("logs_fts MATCH ?")
+            args.append('"' + text.replace('"', '""') + '"')
+        elif text:
+            clauses.append("logs.message LIKE ?")
+            args.append(f"%{text}%")
+        for column, value in (("serial", serial), ("tag", tag), ("level", level.upper())):
+            if value:
+                clauses.append(f"logs.{column} = ?")
+                args.append(value)
+        if pid is not None:
+            clauses.append("logs.pid = ?")
+            args.append(pid)
+        if since_sec is not None:
+            clauses.append("logs.ts >= ?")
+            args.append(time.time() - since_sec)
+        if package:
+            clauses.append(
+                "EXISTS (SELECT 1 FROM procs WHERE procs.source_id = logs.source_id "
+                "AND procs.pid = logs.pid AND procs.package = ?)"
+            )
+            args.append(package)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY logs.ts DESC LIMIT ?"
+        args.append(max(1, limit))
+        rows = self.conn.execute(sql, args).fetchall()
+        return [
+            {"serial": r[0], "ts": r[1], "pid": r[2], "tid": r[3], "level": r[4], "tag": r[5], "message": r[6]}
+            for r in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        sources, lines = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(lines), 0) FROM sources").fetchone()
+        serials = [r[0] for r in self.conn.execute("SELECT DISTINCT serial FROM sources ORDER BY serial")]
+        return {"path": self.path, "sources": sources, "lines": lines, "serials": serials, "fts": self.fts}
+
+
+def find_log_files(path: str) -> List[str]:
+    if os.path.isfile(path):
+        return [path]
+    found: List[str] = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if name.endswith((".txt", ".txt.gz")) and "logcat" in name:
+                found.append(os.path.join(root, name))
+    return found
+
+
+def format_log_row(row: Dict[str, Any]) -> str:
+    stamp = datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    return f"{row['serial']} {stamp} {row['pid']:>5} {row['tid']:>5} {row['level']} {row['tag']}: {row['message']}"
@@ -5,32 +5,40 @@ from .actions import (
     collect_bugreport_bundle,
     connect_over_wifi,
     disconnect_wifi,
+    discover_wifi_devices,
+    manage_wifi_endpoints,
     install_split_apks,
     launch_app,
     list_packages,
     save_logcat_snapshot,
     show_package_info,
     tail_filtered_logcat,
+    view_bugreport_sections,
 )
 from .advanced import (
     app_permission_manager,
+    device_farm_queue,
     apk_insight,
+    battery_thermal_recorder,
     build_workflow,
     create_or_update_profile,
     delete_profile,
     intent_deeplink_runner,
     interactive_package_search,
     export_health_report,
+    ingest_logs_to_store,
     list_workflows,
     manage_port_forwarding,
     manage_device_aliases,
     multi_device_broadcast,
+    multi_device_logcat,
     network_diagnostics_pack,
     prerequisite_health_check,
+    process_resource_sampler,
     process_service_inspector,
+    query_log_store,
     restore_device_state,
     run_dev_loop,
-    run_plugins,
     run_workflow,
     scheduled_log_capture,
     screen_capture_tools,
@@ -43,6 +51,8 @@ from .advanced import (
 from .adb import adb_cmd, ensure_adb, run, run_streaming
 from .config import SETTINGS_FILE, Settings, save_settings
 from .devices import Device, list_devices, pick_device, show_device_summary
+from .plugins import run_plugins
+from .transfer import TransferProgress, install_apk, pull_file, push_file
 from .ui_strings import (
     ADB_MENU_LINES,
     ADVANCED_MENU_LINES,
@@ -96,6 +106,10 @@ def _handle_shell_command(adb_path: str, serial: str, shell_history: List[str])
         print(proc.stderr)
 
 
+def _print_progress(progress: TransferProgress) -> None:
+    print(f"\r{progress.describe():<60}", end="", flush=True)
+
+
 def _handle_install_apk(adb_path: str, serial: str) -> None:
     apk = _non_empty_input("Path to APK: ")
     if not apk:
@@ -104,8 +118,8 @@ def _handle_install_apk(adb_path: str, serial: str) -> None:
     if not os.path.exists(apk):
         print(f"APK path does not exist: {apk}")
         return
-    run(adb_cmd(adb_path, serial, "install", "-r", apk))
-    print("Installed.")
+    _, stats = install_apk(adb_path, serial, apk, _print_progress)
+    print(f"\r{'Installed: ' + stats.describe():<60}")
 
 
 def _handle_push(adb_path: str, serial: str) -> None:
@@ -120,8 +134,8 @@ def _handle_push(adb_path: str, serial: str) -> None:
     if not dst:
         print("Destination path is required.")
         return
-    run(adb_cmd(adb_path, serial, "push", src, dst))
-    print("Push complete.")
+    _, stats = push_file(adb_path, serial, src, dst, _print_progress)
+    print(f"\r{'Push complete: ' + stats.describe():<60}")
 
 
 def _handle_pull(adb_path: str, serial: str) -> None:
@@ -130,8 +144,8 @@ def _handle_pull(adb_path: str, serial: str) -> None:
         print("Source path is required.")
         return
     dst = _non_empty_input("Local destination path (default: current directory): ") or "."
-    run(adb_cmd(adb_path, serial, "pull", src, dst))
-    print("Pull complete.")
+    _, stats = pull_file(adb_path, serial, src, dst, _print_progress)
+    print(f"\r{'Pull complete: ' + stats.describe():<60}")
 
 
 def _handle_package_action(adb_path: str, serial: str, prompt: str, command: List[str], success: str) -> None:
@@ -166,14 +180,14 @@ def _handle_reboot_menu(adb_path: str, serial: str) -> None:
 def _show_device_session_menu(adb_path: str, device: Device, settings: Settings) -> Device:
     while True:
         print("\nDevice and session")
-        print(f"Device: {device.serial} [{device.state}]")
+        print(f"Device: {device.label} [{device.state}]")
         _print_menu(DEVICE_SESSION_MENU_LINES)
         choice = input("> ").strip()
 
         if choice == "0":
             return device
         if choice == "1":
-            show_device_summary(adb_path, device.serial)
+            show_device_summary(adb_path, device.target)
             continue
         if choice == "2":
             devices = list_devices(adb_path)
@@ -185,55 +199,61 @@ def _show_device_session_menu(adb_path: str, device: Device, settings: Settings)
             if settings.remember_last_device:
                 settings.last_device_serial = device.serial
                 save_settings(settings)
-            print(f"Switched to {device.serial}.")
+            print(f"Switched to {device.target}.")
             continue
         if choice == "3":
-            _handle_reboot_menu(adb_path, device.serial)
+            _handle_reboot_menu(adb_path, device.target)
             continue
         if choice == "4":
             if not confirm("Connect this device over Wi-Fi now?"):
                 continue
-            connect_over_wifi(adb_path, device.serial)
+            connect_over_wifi(adb_path, device.target)
             continue
         if choice == "5":
             if not confirm("Disconnect Wi-Fi adb endpoint(s) now?"):
                 continue
             disconnect_wifi(adb_path)
             continue
+        if choice == "6":
+            manage_wifi_endpoints(adb_path)
+            continue
+        if choice == "7":
+            discover_wifi_devices(adb_path, device.target)
+            continue
         print("Unknown option.")
 
 
 def _show_app_package_menu(adb_path: str, device: Device, settings: Settings) -> None:
     while True:
         print("\nApp and package")
-        print(f"Device: {device.serial} [{device.state}]")
+        print(f"Device: {device.label} [{device.state}]")
         _print_menu(APP_PACKAGE_MENU_LINES)
         choice = input("> ").strip()
 
         if choice == "0":
             return
         if choice == "1":
-            _handle_install_apk(adb_path, device.serial)
+            _handle_install_apk(adb_path, device.target)
             continue
         if choice == "2":
-            install_split_apks(adb_path, device.serial)
+            install_split_apks(adb_path, device.target)
             continue
         if choice == "3":
-            apk_insight(adb_path, device.serial, signature_check_mode=settings.apk_signature_check_mode)
+            apk_insight(adb_path, device.target, signature_check_mode=settings.apk_signature_check_mode)
             continue
         if choice == "4":
-            list_packages(adb_path, device.serial)
+            list_packages(adb_path, device.target)
             continue
         if choice == "5":
-            show_package_info(adb_path, device.serial)
+            show_package_info(adb_path, device.target)
             continue
         if choice == "6":
-            launch_app(adb_path, device.serial)
+            launch_app(adb_path, device.target)
             continue
         if choice == "7":
             _handle_package_action(
                 adb_path,
-                device.serial,
+                device.target,
                 "Package name to uninstall: ",
                 ["Uninstall {package}?", "uninstall"],
                 "Uninstall command sent.",
@@ -242,7 +262,7 @@ def _show_app_package_menu(adb_path: str, device: Device, settings: Settings) ->
         if choice == "8":
             _handle_package_action(
                 adb_path,
-                device.serial,
+                device.target,
                 "Package name to force-stop: ",
                 ["Force-stop {package}?", "shell", "am", "force-stop"],
                 "Force-stop command sent.",
@@ -251,7 +271,7 @@ def _show_app_package_menu(adb_path: str, device: Device, settings: Settings) ->
         if choice == "9":
             _handle_package_action(
                 adb_path,
-                device.serial,
+                device.target,
                 "Package name to clear app data: ",
                 ["Clear app data for {package}?", "shell", "pm", "clear"],
                 "Clear data command sent.",
@@ -263,17 +283,17 @@ def _show_app_package_menu(adb_path: str, device: Device, settings: Settings) ->
 def _show_file_transfer_menu(adb_path: str, device: Device) -> None:
     while True:
         print("\nFile transfer")
-        print(f"Device: {device.serial} [{device.state}]")
+        print(f"Device: {device.label} [{device.state}]")
         _print_menu(FILE_TRANSFER_MENU_LINES)
         choice = input("> ").strip()
 
         if choice == "0":
             return
         if choice == "1":
-            _handle_push(adb_path, device.serial)
+            _handle_push(adb_path, device.target)
             continue
         if choice == "2":
-            _handle_pull(adb_path, device.serial)
+            _handle_pull(adb_path, device.target)
             continue
         print("Unknown option.")
 
@@ -281,7 +301,7 @@ def _show_file_transfer_menu(adb_path: str, device: Device) -> None:
 def _show_logging_menu(adb_path: str, device: Device) -> None:
     while True:
         print("\nLogging and diagnostics")
-        print(f"Device: {device.serial} [{device.state}]")
+        print(f"Device: {device.label} [{device.state}]")
         _print_menu(LOGGING_MENU_LINES)
         choice = input("> ").strip()
 
@@ -289,23 +309,35 @@ def _show_logging_menu(adb_path: str, device: Device) -> None:
             return
         if choice == "1":
             try:
-                run_streaming(adb_cmd(adb_path, device.serial, "logcat"))
+                run_streaming(adb_cmd(adb_path, device.target, "logcat"))
             except KeyboardInterrupt:
                 print()
             continue
         if choice == "2":
-            save_logcat_snapshot(adb_path, device.serial)
+            save_logcat_snapshot(adb_path, device.target)
             continue
         if choice == "3":
-            tail_filtered_logcat(adb_path, device.serial)
+            tail_filtered_logcat(adb_path, device.target)
             continue
         if choice == "4":
             if not confirm("Collect diagnostics bundle now? This may take a while."):
                 continue
-            collect_bugreport_bundle(adb_path, device.serial)
+            collect_bugreport_bundle(adb_path, device.target)
             continue
         if choice == "5":
-            export_health_report(adb_path, device.serial)
+            export_health_report(adb_path, device.target)
+            continue
+        if choice == "6":
+            ingest_logs_to_store()
+            continue
+        if choice == "7":
+            query_log_store()
+            continue
+        if choice == "8":
+            multi_device_logcat(adb_path)
+            continue
+        if choice == "9":
+            view_bugreport_sections()
             continue
         print("Unknown option.")
 
@@ -369,35 +401,38 @@ def _show_profile_manager(settings: Settings) -> None:
 def _show_utilities_menu(adb_path: str, device: Device, shell_history: List[str], settings: Settings) -> None:
     while True:
         print("\nUtilities")
-        print(f"Device: {device.serial} [{device.state}]")
+        print(f"Device: {device.label} [{device.state}]")
         _print_menu(UTILITIES_MENU_LINES)
         choice = input("> ").strip()
 
         if choice == "0":
             return
         if choice == "1":
-            _handle_shell_command(adb_path, device.serial, shell_history)
+            _handle_shell_command(adb_path, device.target, shell_history)
             continue
         if choice == "2":
-            _show_workflow_manager(adb_path, device.serial)
+            _show_workflow_manager(adb_path, device.target)
             continue
         if choice == "3":
             _show_profile_manager(settings)
             continue
         if choice == "4":
-            run_dev_loop(adb_path, device.serial, active_profile=settings.active_profile)
+            run_dev_loop(adb_path, device.target, active_profile=settings.active_profile)
             continue
         if choice == "5":
-            run_plugins(adb_path, device.serial)
+            run_plugins(adb_path, device.target, timeout_sec=settings.plugin_timeout_sec)
             continue
         if choice == "6":
             multi_device_broadcast(adb_path)
             continue
         if choice == "7":
-            interactive_package_search(adb_path, device.serial)
+            interactive_package_search(adb_path, device.target)
             continue
         if choice == "8":
-            scheduled_log_capture(adb_path, device.serial)
+            scheduled_log_capture(adb_path, device.target)
+            continue
+        if choice == "9":
+            device_farm_queue(adb_path)
             continue
         print("Unknown option.")
 
@@ -405,17 +440,17 @@ def _show_utilities_menu(adb_path: str, device: Device, shell_history: List[str]
 def _show_advanced_menu(adb_path: str, device: Device) -> None:
     while True:
         print("\nAdvanced")
-        print(f"Device: {device.serial} [{device.state}]")
+        print(f"Device: {device.label} [{device.state}]")
         _print_menu(ADVANCED_MENU_LINES)
         choice = input("> ").strip()
 
         if choice == "0":
             return
         if choice == "1":
-            manage_port_forwarding(adb_path, device.serial)
+            manage_port_forwarding(adb_path, device.target)
             continue
         if choice == "2":
-            screen_capture_tools(adb_path, device.serial)
+            screen_capture_tools(adb_path, device.target)
             continue
         if choice == "3":
             wireless_pairing(adb_path)
@@ -425,23 +460,23 @@ def _show_advanced_menu(adb_path: str, device: Device) -> None:
             print("2) Restore snapshot")
             action = input("> ").strip()
             if action == "1":
-                snapshot_device_state(adb_path, device.serial)
+                snapshot_device_state(adb_path, device.target)
             elif action == "2":
-                restore_device_state(adb_path, device.serial)
+                restore_device_state(adb_path, device.target)
             else:
                 print("Unknown option.")
             continue
         if choice == "5":
-            app_permission_manager(adb_path, device.serial)
+            app_permission_manager(adb_path, device.target)
             continue
         if choice == "6":
-            intent_deeplink_runner(adb_path, device.serial)
+            intent_deeplink_runner(adb_path, device.target)
             continue
         if choice == "7":
-            process_service_inspector(adb_path, device.serial)
+            process_service_inspector(adb_path, device.target)
             continue
         if choice == "8":
-            network_diagnostics_pack(adb_path, device.serial)
+            network_diagnostics_pack(adb_path, device.target)
             continue
         if choice == "9":
             manage_device_aliases(adb_path)
@@ -449,6 +484,12 @@ def _show_advanced_menu(adb_path: str, device: Device) -> None:
         if choice == "10":
             prerequisite_health_check(adb_path)
             continue
+        if choice == "11":
+            process_resource_sampler(adb_path, device.target)
+            continue
+        if choice == "12":
+            battery_thermal_recorder(adb_path, device.target)
+            continue
         print("Unknown option.")
 
 
@@ -457,7 +498,7 @@ def show_basic_menu(adb_path: str, device: Device, settings: Settings) -> Device
 
     while True:
         print("\nADB CLI Py")
-        print(f"Device: {device.serial} [{device.state}]")
+        print(f"Device: {device.label} [{device.state}]")
         _print_menu(ADB_MENU_LINES)
         choice = input("> ").strip()
 
@@ -519,6 +560,20 @@ def show_settings_menu(settings: Settings) -> bool:
         print(f"8) ADB retry count (currently: {settings.adb_retry_count})")
         print(f"9) Command timeout seconds (currently: {settings.command_timeout_sec})")
         print(f"10) Clear remembered device (currently: {settings.last_device_serial or 'none'})")
+        metrics_state = "ON" if settings.metrics_enabled else "OFF"
+        print(f"11) Prometheus metrics textfile (currently: {metrics_state}, {settings.metrics_textfile})")
+        print(
+            f"12) Retry backoff and circuit breaker (currently: backoff {settings.adb_retry_backoff_base_sec:g}-"
+            f"{settings.adb_retry_backoff_max_sec:g}s, open after {settings.circuit_breaker_threshold} failures "
+            f"for {settings.circuit_breaker_cooldown_sec}s)"
+        )
+        print(f"13) Plugin action timeout seconds (currently: {settings.plugin_timeout_sec})")
+        rate = f"{settings.adb_rate_per_device:g}/s" if settings.adb_rate_per_device else "no rate limit"
+        print(
+            f"14) ADB concurrency limits (currently: {settings.adb_max_concurrent} total, "
+            f"{settings.adb_max_per_device} per device, transfers {settings.adb_max_heavy} total/"
+            f"{settings.adb_max_heavy_per_device} per device, {rate})"
+        )
         print("0) Back")
         choice = input("> ").strip()
 
@@ -593,4 +648,63 @@ def show_settings_menu(settings: Settings) -> bool:
             save_settings(settings)
             print(f"Saved {SETTINGS_FILE}: last_device_serial cleared.")
             return True
+        if choice == "11":
+            settings.metrics_enabled = not settings.metrics_enabled
+            if settings.metrics_enabled:
+                path = input(f"Metrics textfile path [{settings.metrics_textfile}]: ").strip()
+                settings.metrics_textfile = path or settings.metrics_textfile
+            save_settings(settings)
+            state = "ON" if settings.metrics_enabled else "OFF"
+            print(f"Saved {SETTINGS_FILE}: metrics_enabled={state}")
+            return True
+        if choice == "12":
+            try:
+                base = float(input(f"Backoff base seconds [{settings.adb_retry_backoff_base_sec:g}]: ").strip() or settings.adb_retry_backoff_base_sec)
+                cap = float(input(f"Backoff max seconds [{settings.adb_retry_backoff_max_sec:g}]: ").strip() or settings.adb_retry_backoff_max_sec)
+                threshold = int(input(f"Open circuit after N consecutive failures, 0 = off [{settings.circuit_breaker_threshold}]: ").strip() or settings.circuit_breaker_threshold)
+                cooldown = int(input(f"Circuit cool-down seconds [{settings.circuit_breaker_cooldown_sec}]: ").strip() or settings.circuit_breaker_cooldown_sec)
+            except ValueError:
+                print("Invalid value.")
+                continue
+            if not (0 <= base <= 60 and base <= cap <= 300 and 0 <= threshold <= 100 and 1 <= cooldown <= 3600):
+                print("Values out of range.")
+                continue
+            settings.adb_retry_backoff_base_sec = base
+            settings.adb_retry_backoff_max_sec = cap
+            settings.circuit_breaker_threshold = threshold
+            settings.circuit_breaker_cooldown_sec = cooldown
+            save_settings(settings)
+            print(f"Saved {SETTINGS_FILE}: retry backoff and circuit breaker settings")
+            return True
+        if choice == "13":
+            val = input("Plugin action timeout seconds (1-3600): ").strip()
+            if val.isdigit() and 1 <= int(val) <= 3600:
+                settings.plugin_timeout_sec = int(val)
+                save_settings(settings)
+                print(f"Saved {SETTINGS_FILE}: plugin_timeout_sec={settings.plugin_timeout_sec}")
+                return True
+            print("Invalid timeout value.")
+            continue
+        if choice == "14":
+            print("0 = unlimited. Transfers are install/push/pull/bugreport.")
+            try:
+                total = int(input(f"Max concurrent adb commands [{settings.adb_max_concurrent}]: ").strip() or settings.adb_max_concurrent)
+                per_device = int(input(f"Max concurrent per device [{settings.adb_max_per_device}]: ").strip() or settings.adb_max_per_device)
+                heavy = int(input(f"Max concurrent transfers [{settings.adb_max_heavy}]: ").strip() or settings.adb_max_heavy)
+                heavy_per_device = int(input(f"Max concurrent transfers per device [{settings.adb_max_heavy_per_device}]: ").strip() or settings.adb_max_heavy_per_device)
+                rate = float(input(f"Max commands started per second per device [{settings.adb_rate_per_device:g}]: ").strip() or settings.adb_rate_per_device)
+            except ValueError:
+                print("Invalid value.")
+                continue
+            if not (0 <= total <= 256 and 0 <= per_device <= 64 and 0 <= heavy <= 64 and 0 <= heavy_per_device <= 16 and 0 <= rate <= 1000):
+                print("Values out of range.")
+                continue
+            settings.adb_max_concurrent = total
+            settings.adb_max_per_device = per_device
+            settings.adb_max_heavy = heavy
+            settings.adb_max_heavy_per_device = heavy_per_device
+            settings.adb_rate_per_device = rate
+            save_settings(settings)
+            print(f"Saved {SETTINGS_FILE}: adb concurrency limits")
+            return True
         print("Unknown option.")
@@ -0,0 +1,203 @@
+import atexit
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .state import acquire_file_lock, atomic_write_text, release_file_lock
+
+ENABLED = False
+TEXTFILE = "adb_cli_py_metrics.prom"
+FLUSH_INTERVAL_SEC = 5.0
+LOCK_TIMEOUT_SEC = 5.0
+STALE_LOCK_SEC = 30.0
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+HELP = {
+    "adbw_command_duration_seconds": ("histogram", "Wall time of a single adb/subprocess attempt."),
+    "adbw_command_retries_total": ("counter", "Retries after transient adb failures."),
+    "adbw_command_timeouts_total": ("counter", "Attempts killed by the command timeout."),
+    "adbw_command_stdout_bytes_total": ("counter", "Bytes of stdout captured from commands."),
+    "adbw_command_stderr_bytes_total": ("counter", "Bytes of stderr captured from commands."),
+    "adbw_adb_queue_wait_seconds": ("histogram", "Time a command waited for an adb concurrency slot, by lane."),
+    "adbw_circuit_open_rejections_total": ("counter", "Commands rejected because the device circuit breaker was open."),
+    "adbw_farm_jobs_total": ("counter", "Device farm job attempts by device and outcome."),
+    "adbw_farm_job_wait_seconds": ("histogram", "Time a farm job spent queued before a device picked it up."),
+    "adbw_farm_job_duration_seconds": ("histogram", "Time a farm job occupied its device."),
+    "adbw_transfer_bytes_total": ("counter", "Bytes moved by successful push/pull/install commands."),
+    "adbw_transfer_seconds_total": ("counter", "Transfer time of successful push/pull/install commands."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+_LOCK = threading.Lock()
+_pending_counters: Dict[Key, float] = {}
+_pending_histograms: Dict[Key, List[float]] = {}
+_last_flush = 0.0
+_atexit_registered = False
+
+
+def configure(enabled: bool, textfile: str) -> None:
+    global ENABLED
+    global TEXTFILE
+    global _atexit_registered
+    ENABLED = enabled
+    TEXTFILE = textfile or "adb_cli_py_metrics.prom"
+    if enabled and not _atexit_registered:
+        atexit.register(flush, True)
+        _atexit_registered = True
+
+
+def _key(name: str, labels: Dict[str, str]) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, labels: Dict[str, str], value: float = 1.0) -> None:
+    key = _key(name, labels)
+    with _LOCK:
+        _pending_counters[key] = _pending_counters.get(key, 0.0) + value
+
+
+def observe(name: str, labels: Dict[str, str], value: float) -> None:
+    key = _key(name, labels)
+    with _LOCK:
+        hist = _pending_histograms.get(key)
+        if hist is None:
+            hist = [0.0] * (len(DURATION_BUCKETS) + 2)
+            _pending_histograms[key] = hist
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                hist[i] += 1
+        hist[-2] += value
+        hist[-1] += 1
+
+
+def record_command(
+    kind: str,
+    serial: str,
+    returncode: int,
+    duration: float,
+    stdout_len: int = 0,
+    stderr_len: int = 0,
+    timed_out: bool = False,
+) -> None:
+    labels = {"kind": kind, "serial": serial, "rc": str(returncode)}
+    observe("adbw_command_duration_seconds", labels, duration)
+    if stdout_len:
+        inc("adbw_command_stdout_bytes_total", labels, stdout_len)
+    if stderr_len:
+        inc("adbw_command_stderr_bytes_total", labels, stderr_len)
+    if timed_out:
+        inc("adbw_command_timeouts_total", {"kind": kind, "serial": serial})
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL_SEC:
+        flush()
+
+
+def record_retry(kind: str, serial: str) -> None:
+    inc("adbw_command_retries_total", {"kind": kind, "serial": serial})
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render(counters: Dict[Key, float], histograms: Dict[Key, List[float]]) -> str:
+    names = sorted({k[0] for k in counters} | {k[0] for k in histograms})
+    lines: List[str] = []
+    for name in names:
+        kind, help_text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key in sorted(k for k in counters if k[0] == name):
+            lines.append(f"{name}{_label_text(key[1])} {counters[key]:g}")
+        for key in sorted(k for k in histograms if k[0] == name):
+            hist = histograms[key]
+            for bound, count in zip(DURATION_BUCKETS, hist):
+                lines.append(f"{name}_bucket{_label_text(key[1], ('le', f'{bound:g}'))} {count:g}")
+            lines.append(f"{name}_bucket{_label_text(key[1], ('le', '+Inf'))} {hist[-1]:g}")
+            lines.append(f"{name}_sum{_label_text(key[1])} {hist[-2]:.6f}")
+            lines.append(f"{name}_count{_label_text(key[1])} {hist[-1]:g}")
+    return "\n".join(lines) + "\n"
+
+
+def _load_state(path: str) -> Tuple[Dict[Key, float], Dict[Key, List[float]]]:
+    counters: Dict[Key, float] = {}
+    histograms: Dict[Key, List[float]] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return counters, histograms
+    for item in raw.get("counters", []):
+        counters[_key(item["name"], item["labels"])] = float(item["value"])
+    for item in raw.get("histograms", []):
+        if len(item["values"]) == len(DURATION_BUCKETS) + 2:
+            histograms[_key(item["name"], item["labels"])] = [float(v) for v in item["values"]]
+    return counters, histograms
+
+
+def _dump_state(counters: Dict[Key, float], histograms: Dict[Key, List[float]]) -> str:
+    payload = {
+        "counters": [{"name": k[0], "labels": dict(k[1]), "value": v} for k, v in counters.items()],
+        "histograms": [{"name": k[0], "labels": dict(k[1]), "values": v} for k, v in histograms.items()],
+    }
+    return json.dumps(payload)
+
+
+# Totals live in a JSON sidecar next to the textfile so counters keep
+# accumulating across separate --json invocations on the same host.
+def flush(force: bool = False) -> bool:
+    global _last_flush
+    if not ENABLED and not force:
+        return False
+    with _LOCK:
+        if not _pending_counters and not _pending_histograms:
+            return False
+        pending_counters = dict(_pending_counters)
+        pending_histograms = {k: list(v) for k, v in _pending_histograms.items()}
+        _pending_counters.clear()
+        _pending_histograms.clear()
+        _last_flush = time.monotonic()
+
+    state_path = f"{TEXTFILE}.json"
+    lock_path = f"{TEXTFILE}.lock"
+    try:
+        acquired = acquire_file_lock(lock_path, LOCK_TIMEOUT_SEC, STALE_LOCK_SEC)
+    except OSError:
+        acquired = False
+    if not acquired:
+        _requeue(pending_counters, pending_histograms)
+        return False
+    try:
+        counters, histograms = _load_state(state_path)
+        for key, value in pending_counters.items():
+            counters[key] = counters.get(key, 0.0) + value
+        for key, values in pending_histograms.items():
+            current = histograms.get(key)
+            histograms[key] = values if current is None else [a + b for a, b in zip(current, values)]
+        atomic_write_text(state_path, _dump_state(counters, histograms))
+        atomic_write_text(TEXTFILE, render(counters, histograms))
+        return True
+    except OSError:
+        _requeue(pending_counters, pending_histograms)
+        return False
+    finally:
+        release_file_lock(lock_path)
+
+
+def _requeue(counters: Dict[Key, float], histograms: Dict[Key, List[float]]) -> None:
+    with _LOCK:
+        for key, value in counters.items():
+            _pending_counters[key] = _pending_counters.get(key, 0.0) + value
+        for key, values in histograms.items():
+            current = _pending_histograms.get(key)
+            _pending_histograms[key] = values if current is None else [a + b for a, b in zip(current, values)]
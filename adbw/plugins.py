@@ -0,0 +1,316 @@
+import importlib.util
+import inspect
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .adb import adb_cmd, run
+from .devices import list_devices
+from .session import DeviceHandle
+from .watch import file_signature
+
+PLUGINS_DIR = "plugins"
+MANIFEST_FILE = "plugins.json"
+SLOW_PLUGIN_SEC = 0.5
+DEFAULT_PLUGIN_TIMEOUT_SEC = 300
+CANCEL_GRACE_SEC = 2.0
+
+Signature = Tuple[int, int, int]
+
+
+@dataclass
+class PluginAction:
+    name: str
+    plugin: str
+    run: Optional[Callable[..., Any]] = None
+    # "module:function" for manifest actions; resolved when first selected.
+    entry: str = ""
+
+
+@dataclass
+class PluginTiming:
+    plugin: str
+    load_sec: float = 0.0
+    register_sec: float = 0.0
+    loads: int = 0
+    cache_hits: int = 0
+    error: str = ""
+
+
+@dataclass
+class PluginRunResult:
+    serial: str
+    ok: bool
+    duration_sec: float
+    error: str = ""
+    timed_out: bool = False
+
+
+@dataclass
+class _Entry:
+    signature: Signature
+    module: Optional[ModuleType] = None
+    actions: Optional[List[PluginAction]] = None
+    error: str = ""
+
+
+@dataclass
+class _Manifest:
+    signature: Optional[Signature] = None
+    actions: List[PluginAction] = field(default_factory=list)
+    plugins: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+def _load_plugin(path: str) -> Optional[ModuleType]:
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    if spec is None or spec.loader is None:
+        return None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class PluginCache:
+    # Keeps executed plugin modules and their registered actions keyed by file
+    # signature, so reopening the menu only re-imports files that changed.
+    def __init__(self) -> None:
+        self._entries: Dict[str, _Entry] = {}
+        self._manifest = _Manifest()
+        self.timings: Dict[str, PluginTiming] = {}
+
+    def _timing(self, filename: str) -> PluginTiming:
+        return self.timings.setdefault(filename, PluginTiming(filename))
+
+    def _entry(self, path: str) -> _Entry:
+        signature = file_signature(path)
+        entry = self._entries.get(path)
+        timing = self._timing(os.path.basename(path))
+        if entry is not None and entry.signature == signature:
+            timing.cache_hits += 1
+            return entry
+        entry = _Entry(signature)
+        started = time.perf_counter()
+        try:
+            entry.module = _load_plugin(path)
+            timing.error = ""
+        except Exception as e:
+            entry.error = f"Failed loading plugin {os.path.basename(path)}: {e}"
+            timing.error = str(e)
+        timing.load_sec = time.perf_counter() - started
+        timing.loads += 1
+        self._entries[path] = entry
+        return entry
+
+    def module(self, path: str) -> Optional[ModuleType]:
+        return self._entry(path).module
+
+    def actions(self, path: str) -> Tuple[List[PluginAction], str]:
+        entry = self._entry(path)
+        if entry.error:
+            return [], entry.error
+        if entry.actions is not None:
+            return entry.actions, ""
+        entry.actions = []
+        filename = os.path.basename(path)
+        register: Optional[Callable[[], List[Dict[str, Any]]]] = getattr(entry.module, "register", None)
+        if not callable(register):
+            return entry.actions, ""
+        timing = self._timing(filename)
+        started = time.perf_counter()
+        try:
+            for action in register() or []:
+                if callable(action.get("run")) and action.get("name"):
+                    entry.actions.append(PluginAction(action["name"], filename, action["run"]))
+        except Exception as e:
+            entry.error = f"Failed registering actions in plugin {filename}: {e}"
+            timing.error = str(e)
+        timing.register_sec = time.perf_counter() - started
+        return entry.actions, entry.error
+
+    def manifest(self, plugins_dir: str) -> _Manifest:
+        path = os.path.join(plugins_dir, MANIFEST_FILE)
+        if not os.path.isfile(path):
+            self._manifest = _Manifest()
+            return self._manifest
+        signature = file_signature(path)
+        if self._manifest.signature == signature:
+            return self._manifest
+        manifest = _Manifest(signature)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            manifest.errors.append(f"Failed reading {MANIFEST_FILE}: {e}")
+            data = {}
+        for item in data.get("actions", []) if isinstance(data, dict) else []:
+            name = item.get("name") if isinstance(item, dict) else None
+            entry = item.get("entry", "") if isinstance(item, dict) else ""
+            module_name, _, func = entry.partition(":")
+            if not name or not module_name or not func:
+                manifest.errors.append(f"Invalid {MANIFEST_FILE} action (needs name and module:function entry): {item}")
+                continue
+            filename = f"{module_name}.py"
+            manifest.actions.append(PluginAction(name, filename, entry=entry))
+            if filename not in manifest.plugins:
+                manifest.plugins.append(filename)
+        self._manifest = manifest
+        return manifest
+
+    def discover(self, plugins_dir: str) -> Tuple[List[PluginAction], List[str]]:
+        # Files listed in the manifest are not imported until one of their
+        # actions is picked; everything else goes through register().
+        manifest = self.manifest(plugins_dir)
+        actions = list(manifest.actions)
+        errors = list(manifest.errors)
+        plugin_files = sorted(p for p in os.listdir(plugins_dir) if p.endswith(".py") and not p.startswith("_"))
+        for filename in plugin_files:
+            if filename in manifest.plugins:
+                continue
+            found, error = self.actions(os.path.join(plugins_dir, filename))
+            actions.extend(found)
+            if error:
+                errors.append(error)
+        return actions, errors
+
+    def resolve(self, plugins_dir: str, action: PluginAction) -> Callable[..., Any]:
+        if action.run is not None:
+            return action.run
+        path = os.path.join(plugins_dir, action.plugin)
+        if not os.path.isfile(path):
+            raise RuntimeError(f"plugin file not found: {path}")
+        entry = self._entry(path)
+        if entry.error:
+            raise RuntimeError(entry.error)
+        func = getattr(entry.module, action.entry.partition(":")[2], None)
+        if not callable(func):
+            raise RuntimeError(f"{action.entry} is not callable")
+        return func
+
+
+_CACHE = PluginCache()
+
+
+def plugin_timings() -> List[PluginTiming]:
+    return sorted(_CACHE.timings.values(), key=lambda t: t.load_sec + t.register_sec, reverse=True)
+
+
+def _print_timings() -> None:
+    timings = plugin_timings()
+    if not timings:
+        print("No plugins loaded yet.")
+        return
+    for t in timings:
+        slow = "  SLOW" if t.load_sec + t.register_sec >= SLOW_PLUGIN_SEC else ""
+        error = f"  error: {t.error}" if t.error else ""
+        print(
+            f"{t.plugin}: load {t.load_sec * 1000:.1f} ms, register {t.register_sec * 1000:.1f} ms, "
+            f"loads {t.loads}, cache hits {t.cache_hits}{slow}{error}"
+        )
+
+
+def wants_handle(func: Callable[..., Any]) -> bool:
+    # New-style actions take a `handle` argument; older ones get the raw
+    # adb_path/serial/run/adb_cmd keyword arguments.
+    try:
+        return "handle" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def run_action(
+    func: Callable[..., Any], adb_path: str, serial: str, timeout_sec: float = DEFAULT_PLUGIN_TIMEOUT_SEC
+) -> PluginRunResult:
+    # Runs the action in a worker thread with a deadline. On overrun the
+    # device handle is cancelled, which kills its shell session and makes
+    # further handle calls raise; a legacy action that never returns is left
+    # behind as a daemon thread.
+    handle = DeviceHandle(adb_path, serial)
+    errors: List[BaseException] = []
+
+    def target() -> None:
+        try:
+            if wants_handle(func):
+                func(handle=handle)
+            else:
+                func(adb_path=adb_path, serial=serial, run=run, adb_cmd=adb_cmd)
+        except BaseException as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=target, name=f"adbw-plugin-{serial}", daemon=True)
+    started = time.perf_counter()
+    worker.start()
+    worker.join(timeout_sec if timeout_sec > 0 else None)
+    timed_out = worker.is_alive()
+    if timed_out:
+        handle.cancel()
+        worker.join(CANCEL_GRACE_SEC)
+    handle.close()
+    duration = time.perf_counter() - started
+    if timed_out:
+        return PluginRunResult(serial, False, duration, f"timed out after {timeout_sec:g}s", True)
+    if errors:
+        return PluginRunResult(serial, False, duration, str(errors[0]) or type(errors[0]).__name__)
+    return PluginRunResult(serial, True, duration)
+
+
+def run_action_on_devices(
+    func: Callable[..., Any], adb_path: str, serials: List[str], timeout_sec: float = DEFAULT_PLUGIN_TIMEOUT_SEC
+) -> List[PluginRunResult]:
+    if not serials:
+        return []
+    with ThreadPoolExecutor(max_workers=len(serials)) as pool:
+        return list(pool.map(lambda serial: run_action(func, adb_path, serial, timeout_sec), serials))
+
+
+def run_plugins(adb_path: str, serial: str, timeout_sec: float = DEFAULT_PLUGIN_TIMEOUT_SEC) -> None:
+    if not os.path.isdir(PLUGINS_DIR):
+        print(f"No plugins directory found: {PLUGINS_DIR}")
+        return
+    if not any(p.endswith(".py") and not p.startswith("_") for p in os.listdir(PLUGINS_DIR)):
+        print("No plugins found.")
+        return
+    actions, errors = _CACHE.discover(PLUGINS_DIR)
+    for error in errors:
+        print(error)
+    if not actions:
+        print("No valid plugin actions found.")
+        return
+
+    print("Plugin actions:")
+    for i, action in enumerate(actions, start=1):
+        print(f"{i}) {action.name}")
+    print("t) Show plugin load/register timings")
+    choice = input("> ").strip().lower()
+    if choice == "t":
+        _print_timings()
+        return
+    if not choice.isdigit() or not (1 <= int(choice) <= len(actions)):
+        print("Invalid choice.")
+        return
+    selected = actions[int(choice) - 1]
+    try:
+        func = _CACHE.resolve(PLUGINS_DIR, selected)
+    except Exception as e:
+        print(f"Plugin action failed: {e}")
+        return
+    serials = [serial]
+    ready = [d.target for d in list_devices(adb_path) if d.state == "device"]
+    if len(ready) > 1:
+        answer = input(f"Run on all {len(ready)} connected devices in parallel? [y/N]: ").strip().lower()
+        if answer in ("y", "yes"):
+            serials = ready
+    results = run_action_on_devices(func, adb_path, serials, timeout_sec)
+    for result in results:
+        prefix = f"[{result.serial}] " if len(results) > 1 else ""
+        if result.ok:
+            if len(results) > 1:
+                print(f"{prefix}done in {result.duration_sec:.1f}s")
+        else:
+            print(f"{prefix}Plugin action failed: {result.error}")
@@ -0,0 +1,177 @@
+import csv
+import json
+import subprocess
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .adb import adb_cmd, run, spawn_streaming, stop_streaming
+
+BLOCK_MARKER = "@@"
+DEFAULT_RING_SIZE = 3600
+
+
+class ShellLoop:
+    # One long-lived `adb shell` running a sampling loop. The script prints a
+    # marker line before each sample; blocks() yields the lines in between
+    # together with the host time the marker arrived.
+    def __init__(self, adb_path: str, serial: str, script: str) -> None:
+        self.cmd = adb_cmd(adb_path, serial, "shell", script)
+        self.proc: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "ShellLoop":
+        self.proc = spawn_streaming(self.cmd, stdout=subprocess.PIPE)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        stop_streaming(self.proc)
+        if self.proc is not None and self.proc.stdout is not None:
+            self.proc.stdout.close()
+
+    def blocks(self) -> Iterator[Tuple[float, List[str], List[str]]]:
+        if self.proc is None or self.proc.stdout is None:
+            return
+        header: Optional[List[str]] = None
+        received = 0.0
+        lines: List[str] = []
+        for raw in self.proc.stdout:
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            if line.startswith(BLOCK_MARKER):
+                if header is not None:
+                    yield received, header, lines
+                header = line[len(BLOCK_MARKER):].split()
+                received = time.time()
+                lines = []
+            elif header is not None:
+                lines.append(line)
+        if header is not None:
+            yield received, header, lines
+
+
+def loop_script(body: str, interval_sec: float, count: int) -> str:
+    # count <= 0 loops until the shell is killed.
+    guard = f"[ $n -lt {count} ]" if count > 0 else "true"
+    return f"n=0; while {guard}; do echo '{BLOCK_MARKER}' $n; {body} n=$((n+1)); sleep {interval_sec:g}; done"
+
+
+@dataclass
+class ProcSample:
+    ts: float
+    pid: int
+    cpu_pct: float
+    rss_kb: int
+    pss_kb: int
+    threads: int
+    state: str
+
+
+def process_sampler_script(package: str, interval_sec: float, count: int) -> str:
+    body = (
+        f"p=$(pidof -s {package}); echo pid ${{p:-0}}; head -n 1 /proc/stat; "
+        'if [ -n "$p" ]; then cat /proc/$p/stat; grep "^VmRSS:" /proc/$p/status; '
+        'grep "^Pss:" /proc/$p/smaps_rollup 2>/dev/null; fi;'
+    )
+    return loop_script(body, interval_sec, count)
+
+
+def _kb(line: str) -> int:
+    parts = line.split()
+    return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+
+class ProcessSampler:
+    def __init__(self, cpu_count: int = 1, capacity: int = DEFAULT_RING_SIZE) -> None:
+        self.cpu_count = max(1, cpu_count)
+        self.samples: Deque[ProcSample] = deque(maxlen=max(1, capacity))
+        self._prev: Optional[Tuple[int, int, int]] = None
+
+    def add_block(self, ts: float, lines: List[str]) -> Optional[ProcSample]:
+        pid = 0
+        cpu_total = 0
+        proc_ticks = 0
+        threads = 0
+        state = ""
+        rss_kb = 0
+        pss_kb = 0
+        for line in lines:
+            if line.startswith("pid "):
+                pid = int(line.split()[1]) if line.split()[1].isdigit() else 0
+            elif line.startswith("cpu "):
+                cpu_total = sum(int(v) for v in line.split()[1:9])
+            elif line.startswith("VmRSS:"):
+                rss_kb = _kb(line)
+            elif line.startswith("Pss:"):
+                pss_kb = _kb(line)
+            elif pid and line.startswith(f"{pid} ("):
+                # comm may contain spaces, so split after its closing paren.
+                rest = line[line.rfind(")") + 2:].split()
+                state = rest[0]
+                proc_ticks = int(rest[11]) + int(rest[12])
+                threads = int(rest[17])
+        if not pid:
+            self._prev = None
+            return None
+        cpu_pct = 0.0
+        if self._prev is not None and self._prev[0] == pid and cpu_total > self._prev[1]:
+            cpu_pct = 100.0 * self.cpu_count * (proc_ticks - self._prev[2]) / (cpu_total - self._prev[1])
+        self._prev = (pid, cpu_total, proc_ticks)
+        sample = ProcSample(ts, pid, round(cpu_pct, 2), rss_kb, pss_kb, threads, state)
+        self.samples.append(sample)
+        return sample
+
+    def export_csv(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([fl.name for fl in fields(ProcSample)])
+            for s in self.samples:
+                writer.writerow([getattr(s, fl.name) for fl in fields(ProcSample)])
+
+    def export_json(self, path: str, meta: Optional[Dict[str, object]] = None) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta or {}, "summary": self.summary(), "samples": [asdict(s) for s in self.samples]}, f)
+
+    def summary(self) -> Dict[str, object]:
+        if not self.samples:
+            return {"samples": 0}
+        cpu = [s.cpu_pct for s in self.samples]
+        rss = [s.rss_kb for s in self.samples]
+        return {
+            "samples": len(self.samples),
+            "pids": sorted({s.pid for s in self.samples}),
+            "cpu_pct_avg": round(sum(cpu) / len(cpu), 2),
+            "cpu_pct_max": max(cpu),
+            "rss_kb_max": max(rss),
+            "pss_kb_max": max(s.pss_kb for s in self.samples),
+            "threads_max": max(s.threads for s in self.samples),
+        }
+
+
+def device_cpu_count(adb_path: str, serial: str) -> int:
+    out = run(adb_cmd(adb_path, serial, "shell", "cat", "/proc/stat"), check=False).stdout
+    count = sum(1 for ln in out.splitlines() if ln.startswith("cpu") and ln[3:4].isdigit())
+    return max(1, count)
+
+
+def sample_process(
+    adb_path: str,
+    serial: str,
+    package: str,
+    interval_sec: float = 1.0,
+    count: int = 0,
+    capacity: int = DEFAULT_RING_SIZE,
+    on_sample: Optional[Callable[[Optional[ProcSample]], None]] = None,
+) -> ProcessSampler:
+    sampler = ProcessSampler(device_cpu_count(adb_path, serial), capacity)
+    with ShellLoop(adb_path, serial, process_sampler_script(package, interval_sec, count)) as loop:
+        try:
+            for ts, _, lines in loop.blocks():
+                sample = sampler.add_block(ts, lines)
+                if on_sample is not None:
+                    on_sample(sample)
+        except KeyboardInterrupt:
+            pass
+    return sampler
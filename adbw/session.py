@@ -0,0 +1,186 @@
+import asyncio
+import queue
+import re
+import subprocess
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from .adb import adb_cmd, async_run, command_timeout_sec, log_debug, record_command_result, run, spawn_streaming, stop_streaming
+from .errors import AdbWizardError
+
+SESSION_CLOSED_RETURNCODE = 255
+
+_PROP_LINE = re.compile(r"^\[([^\]]+)\]: \[(.*)\]$")
+
+
+class ShellSession:
+    # One interactive `adb shell` reused for many commands. Each command is
+    # followed by an echo of a per-session marker and `$?`, which ends its
+    # output and carries the exit code. Falls back to one-shot `run()` in
+    # dry-run mode or when the breaker refuses the device.
+    def __init__(self, adb_path: str, serial: str) -> None:
+        self.adb_path = adb_path
+        self.serial = serial
+        self.proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._token = f"__adbw_{uuid.uuid4().hex[:12]}"
+        self._seq = 0
+        self.commands = 0
+
+    def __enter__(self) -> "ShellSession":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _reader(self, proc: subprocess.Popen, lines: "queue.Queue[Optional[str]]") -> None:
+        # Owns proc.stdout: closes it at EOF, i.e. once the shell has exited
+        # or been stopped, so no other thread closes it under a read.
+        assert proc.stdout is not None
+        try:
+            for raw in proc.stdout:
+                lines.put(raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        finally:
+            proc.stdout.close()
+            lines.put(None)
+
+    @staticmethod
+    def _discard(proc: subprocess.Popen) -> None:
+        try:
+            if proc.stdin is not None:
+                proc.stdin.close()
+        except OSError:
+            pass
+        stop_streaming(proc)
+
+    def _ensure_started(self) -> bool:
+        if self.proc is not None and self.proc.poll() is None:
+            return True
+        if self.proc is not None:
+            self._discard(self.proc)
+        self.proc = spawn_streaming(
+            adb_cmd(self.adb_path, self.serial, "shell"),
+            stdout=subprocess.PIPE,
+            stdin=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        if self.proc is None:
+            return False
+        self._lines = queue.Queue()
+        threading.Thread(target=self._reader, args=(self.proc, self._lines), daemon=True).start()
+        return True
+
+    def run(self, command: str, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        cmd = adb_cmd(self.adb_path, self.serial, "shell", command)
+        with self._lock:
+            if not self._ensure_started():
+                return run(cmd, check=False)
+            # close() may drop self.proc from another thread (cancel) while
+            # this command runs; keep using the process it was started on.
+            session = self.proc
+            assert session is not None and session.stdin is not None
+            self._seq += 1
+            self.commands += 1
+            marker = f"{self._token}_{self._seq}"
+            limit = timeout or command_timeout_sec()
+            log_debug(f"RUN session command={command}")
+            started = time.perf_counter()
+            out: List[str] = []
+            returncode: Optional[int] = None
+            stderr = ""
+            timed_out = False
+            try:
+                session.stdin.write(f'{command}\necho "{marker} $?"\n'.encode("utf-8"))
+                session.stdin.flush()
+            except (OSError, ValueError) as e:
+                returncode, stderr = SESSION_CLOSED_RETURNCODE, f"shell session closed: {e}"
+            deadline = time.monotonic() + limit
+            while returncode is None:
+                try:
+                    line = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    returncode, stderr, timed_out = 124, f"Command timed out after {limit:g}s", True
+                    break
+                if line is None:
+                    returncode, stderr = SESSION_CLOSED_RETURNCODE, "shell session ended"
+                    break
+                at = line.find(marker)
+                if at < 0:
+                    out.append(line + "\n")
+                    continue
+                # Output without a trailing newline shares the marker's line.
+                if at:
+                    out.append(line[:at])
+                status = line[at + len(marker):].strip()
+                returncode = int(status) if status.isdigit() else SESSION_CLOSED_RETURNCODE
+            if returncode in (124, SESSION_CLOSED_RETURNCODE):
+                # The session state is unknown; start a fresh one next time.
+                self._discard(session)
+                if self.proc is session:
+                    self.proc = None
+            proc = subprocess.CompletedProcess(cmd, returncode, "".join(out), stderr)
+            record_command_result(cmd, proc, started, timed_out)
+            return proc
+
+    def close(self) -> None:
+        proc, self.proc = self.proc, None
+        if proc is not None:
+            self._discard(proc)
+
+
+class DeviceHandle:
+    # What new-style plugins get instead of raw run/adb_cmd: a reused shell
+    # session, cached properties, and awaitable variants. cancel() is called
+    # when the action overruns its deadline; further calls then raise.
+    def __init__(self, adb_path: str, serial: str) -> None:
+        self.adb_path = adb_path
+        self.serial = serial
+        self.cancelled = threading.Event()
+        self.session = ShellSession(adb_path, serial)
+        self._props: Optional[Dict[str, str]] = None
+
+    def _check_cancelled(self) -> None:
+        if self.cancelled.is_set():
+            raise AdbWizardError(f"Plugin action on {self.serial} was cancelled.")
+
+    def shell(self, command: str, check: bool = False, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        self._check_cancelled()
+        proc = self.session.run(command, timeout)
+        self._check_cancelled()
+        if check and proc.returncode != 0:
+            raise AdbWizardError(f"Command failed ({proc.returncode}) on {self.serial}: {command}\n{proc.stdout}{proc.stderr}")
+        return proc
+
+    def adb(self, *args: str, check: bool = True) -> subprocess.CompletedProcess:
+        self._check_cancelled()
+        return run(adb_cmd(self.adb_path, self.serial, *args), check=check)
+
+    def props(self, refresh: bool = False) -> Dict[str, str]:
+        if self._props is None or refresh:
+            props: Dict[str, str] = {}
+            for line in self.shell("getprop").stdout.splitlines():
+                m = _PROP_LINE.match(line.strip())
+                if m:
+                    props[m.group(1)] = m.group(2)
+            self._props = props
+        return self._props
+
+    def prop(self, name: str, default: str = "") -> str:
+        return self.props().get(name, default)
+
+    async def async_shell(self, command: str, check: bool = False) -> subprocess.CompletedProcess:
+        return await asyncio.to_thread(self.shell, command, check)
+
+    async def async_adb(self, *args: str, check: bool = True) -> subprocess.CompletedProcess:
+        self._check_cancelled()
+        return await async_run(adb_cmd(self.adb_path, self.serial, *args), check=check)
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        self.session.close()
+
+    def close(self) -> None:
+        self.session.close()
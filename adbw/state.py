@@ -0,0 +1,166 @@
+import copy
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .errors import AdbWizardError
+
+# Parsed JSON state files (settings, profiles, workflows, aliases, step cache)
+# are cached per absolute path and revalidated against (inode, size, mtime)
+# at most once per STAT_INTERVAL_SEC. Writes go through a temp file and
+# os.replace, and read-modify-write cycles hold a lock file so parallel
+# --json processes cannot lose each other's updates.
+STAT_INTERVAL_SEC = 1.0
+LOCK_TIMEOUT_SEC = 10.0
+STALE_LOCK_SEC = 30.0
+
+Signature = Optional[Tuple[int, int, int]]
+
+_LOCK = threading.RLock()
+_cache: Dict[str, Tuple[Signature, float, Any]] = {}
+_path_locks: Dict[str, threading.Lock] = {}
+_MISSING = object()
+
+
+def _signature(path: str) -> Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _break_stale_lock(path: str, stale_sec: float) -> bool:
+    # Moves a stale lock aside rather than removing it in place: of several
+    # processes that found it stale, only the one whose rename took the file
+    # it judged (same inode and mtime) deletes it. A later one may have moved
+    # the fresh lock its winner took meanwhile, and puts it back.
+    try:
+        st = os.stat(path)
+        if time.time() - st.st_mtime <= stale_sec:
+            return False
+        aside = f"{path}.{os.getpid()}.{threading.get_ident()}.stale"
+        os.replace(path, aside)
+    except OSError:
+        return False
+    moved = os.stat(aside)
+    if (moved.st_ino, moved.st_mtime_ns) != (st.st_ino, st.st_mtime_ns):
+        os.replace(aside, path)
+        return False
+    os.remove(aside)
+    return True
+
+
+def acquire_file_lock(path: str, timeout_sec: float = LOCK_TIMEOUT_SEC, stale_sec: float = STALE_LOCK_SEC) -> bool:
+    # False on timeout. Other OS errors (missing directory, no permission)
+    # are raised: waiting would not fix them.
+    deadline = time.monotonic() + timeout_sec
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            if _break_stale_lock(path, stale_sec):
+                continue
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+
+def release_file_lock(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    # Cross-process lock for `path`, plus the in-process lock so threads of
+    # one process queue up instead of polling the lock file.
+    lock_path = f"{path}.lock"
+    with _LOCK:
+        path_lock = _path_locks.setdefault(os.path.abspath(path), threading.Lock())
+    with path_lock:
+        if not acquire_file_lock(lock_path):
+            raise AdbWizardError(f"Timed out waiting for lock on {path} (remove {lock_path} if it is stale).")
+        try:
+            yield
+        finally:
+            release_file_lock(lock_path)
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _load(path: str, default: Any, force: bool) -> Any:
+    # A missing or unreadable file is cached as _MISSING, never as the
+    # caller's default: another caller may pass a different one.
+    key = os.path.abspath(path)
+    now = time.monotonic()
+    with _LOCK:
+        cached = _cache.get(key)
+        if cached is not None and not force and now - cached[1] < STAT_INTERVAL_SEC:
+            data = cached[2]
+        else:
+            signature = _signature(path)
+            if cached is not None and cached[0] == signature:
+                data = cached[2]
+            else:
+                data = _MISSING
+                if signature is not None:
+                    try:
+                        with open(path, "r", encoding="utf-8") as f:
+                            data = json.load(f)
+                    except (OSError, json.JSONDecodeError):
+                        pass
+            _cache[key] = (signature, now, data)
+        return default if data is _MISSING else data
+
+
+def _store(path: str, data: Any) -> None:
+    atomic_write_text(path, json.dumps(data, indent=2) + "\n")
+    with _LOCK:
+        _cache[os.path.abspath(path)] = (_signature(path), time.monotonic(), copy.deepcopy(data))
+
+
+def read_json(path: str, default: Any) -> Any:
+    # Returns a private copy; callers may mutate it freely.
+    return copy.deepcopy(_load(path, default, force=False))
+
+
+def write_json(path: str, data: Any) -> None:
+    with locked(path):
+        _store(path, data)
+
+
+def update_json(path: str, default: Any, mutate: Callable[[Any], None]) -> Any:
+    # Read-modify-write under the lock, always against the file's current
+    # contents. `mutate` edits the data in place; the written data is returned.
+    with locked(path):
+        data = copy.deepcopy(_load(path, default, force=True))
+        mutate(data)
+        _store(path, data)
+        return copy.deepcopy(data)
+
+
+def invalidate(path: Optional[str] = None) -> None:
+    with _LOCK:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(path), None)
@@ -0,0 +1,222 @@
+import glob
+import gzip
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from .sampler import ShellLoop, loop_script
+
+DEFAULT_CHUNK_ROWS = 600
+POWER_SUPPLY_NODES = ("capacity", "current_now", "voltage_now", "temp", "charge_counter")
+
+_TEMPERATURE = re.compile(r"mValue=([-\d.]+).*?mName=([^,}]+)")
+_BATTERY_FIELDS = {
+    "level": "level",
+    "scale": "scale",
+    "voltage": "voltage_mv",
+    "temperature": "temperature_c",
+    "status": "status",
+    "AC powered": "ac_powered",
+    "USB powered": "usb_powered",
+    "Wireless powered": "wireless_powered",
+}
+
+
+def telemetry_script(interval_sec: float, count: int) -> str:
+    body = (
+        "dumpsys battery; echo '##thermal'; dumpsys thermalservice | grep -E 'Thermal Status|mValue'; "
+        "echo '##sys'; for d in /sys/class/power_supply/*; do "
+        f"for k in {' '.join(POWER_SUPPLY_NODES)}; do "
+        '[ -r $d/$k ] && echo "$d/$k $(cat $d/$k 2>/dev/null)"; done; done;'
+    )
+    return loop_script(body, interval_sec, count)
+
+
+def _number(value: str) -> Optional[float]:
+    value = value.strip().lower()
+    if value in ("true", "false"):
+        return 1.0 if value == "true" else 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_telemetry_block(ts: float, lines: List[str]) -> Dict[str, Optional[float]]:
+    record: Dict[str, Optional[float]] = {"ts": round(ts, 3)}
+    section = "battery"
+    for raw in lines:
+        line = raw.strip()
+        if line.startswith("##"):
+            section = line[2:]
+            continue
+        if section == "battery" and ":" in line:
+            key, value = line.split(":", 1)
+            column = _BATTERY_FIELDS.get(key.strip())
+            if column:
+                number = _number(value)
+                if column == "temperature_c" and number is not None:
+                    number /= 10.0
+                record[column] = number
+        elif section == "thermal":
+            if line.startswith("Thermal Status:") and "thermal_status" not in record:
+                record["thermal_status"] = _number(line.split(":", 1)[1])
+            for value, name in _TEMPERATURE.findall(line):
+                # dumpsys repeats sensors in cached sections; the first is the HAL reading.
+                record.setdefault(f"thermal.{name.strip()}", _number(value))
+        elif section == "sys":
+            parts = line.split()
+            if len(parts) == 2:
+                supply, node = parts[0].split("/")[-2:]
+                record[f"psu.{supply}.{node}"] = _number(parts[1])
+    return record
+
+
+class TelemetryRecorder:
+    # Buffers rows and writes them as gzip-compressed column-oriented JSON
+    # chunks, so hours of samples never sit in memory. The summary is kept
+    # incrementally.
+    def __init__(self, out_dir: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+        self.out_dir = out_dir
+        self.chunk_rows = max(1, chunk_rows)
+        self.rows: List[Dict[str, Optional[float]]] = []
+        self.chunks = 0
+        self.samples = 0
+        self._first: Optional[Dict[str, Optional[float]]] = None
+        self._last: Optional[Dict[str, Optional[float]]] = None
+        self._drain_sums = [0.0, 0.0, 0.0, 0.0, 0]
+        self._status = 0.0
+        self._status_since = 0.0
+        self.time_in_status: Dict[str, float] = {}
+        self.throttling_events: List[Dict[str, float]] = []
+        self.max_temperature_c: Optional[float] = None
+        self.max_thermal_status = 0.0
+        self._current_sums: Dict[str, List[float]] = {}
+        os.makedirs(out_dir, exist_ok=True)
+
+    def add(self, record: Dict[str, Optional[float]]) -> None:
+        ts = float(record["ts"] or 0.0)
+        if self._first is None:
+            self._first = record
+            self._status_since = ts
+        self._last = record
+        self.samples += 1
+        level = record.get("level")
+        if level is not None and not record.get("ac_powered") and not record.get("usb_powered"):
+            hours = (ts - float(self._first["ts"] or 0.0)) / 3600.0
+            sums = self._drain_sums
+            sums[0] += hours
+            sums[1] += level
+            sums[2] += hours * hours
+            sums[3] += hours * level
+            sums[4] += 1
+        for name, value in record.items():
+            if value is not None and name.startswith("psu.") and name.endswith(".current_now"):
+                sums_for = self._current_sums.setdefault(name[4:-12], [0.0, 0])
+                sums_for[0] += value
+                sums_for[1] += 1
+        temperature = record.get("temperature_c")
+        if temperature is not None:
+            self.max_temperature_c = max(temperature, self.max_temperature_c or temperature)
+        status = record.get("thermal_status")
+        if status is not None:
+            if status != self._status:
+                key = f"{int(self._status)}"
+                self.time_in_status[key] = self.time_in_status.get(key, 0.0) + ts - self._status_since
+                if status > self._status and status >= 1:
+                    self.throttling_events.append({"ts": ts, "from": self._status, "to": status})
+                self._status = status
+                self._status_since = ts
+            self.max_thermal_status = max(self.max_thermal_status, status)
+        self.rows.append(record)
+        if len(self.rows) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        names: List[str] = []
+        for row in self.rows:
+            for name in row:
+                if name not in names:
+                    names.append(name)
+        columns = {name: [row.get(name) for row in self.rows] for name in names}
+        self.chunks += 1
+        path = os.path.join(self.out_dir, f"telemetry_{self.chunks:04d}.json.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump({"rows": len(self.rows), "columns": columns}, f, separators=(",", ":"))
+        self.rows = []
+
+    def drain_rate_pct_per_hour(self) -> Optional[float]:
+        # Least-squares slope of level over time while unplugged; needs at
+        # least a minute of data to mean anything.
+        st, sl, stt, stl, n = self._drain_sums
+        denominator = n * stt - st * st
+        if n < 2 or denominator <= 0 or self._last is None or self._first is None:
+            return None
+        if float(self._last["ts"] or 0.0) - float(self._first["ts"] or 0.0) < 60:
+            return None
+        return round(-(n * stl - st * sl) / denominator, 3)
+
+    def summary(self) -> Dict[str, Any]:
+        if self._first is None or self._last is None:
+            return {"samples": 0}
+        end = float(self._last["ts"] or 0.0)
+        time_in_status = dict(self.time_in_status)
+        key = f"{int(self._status)}"
+        time_in_status[key] = round(time_in_status.get(key, 0.0) + end - self._status_since, 3)
+        return {
+            "samples": self.samples,
+            "chunks": self.chunks,
+            "duration_sec": round(end - float(self._first["ts"] or 0.0), 3),
+            "level_start": self._first.get("level"),
+            "level_end": self._last.get("level"),
+            "drain_pct_per_hour": self.drain_rate_pct_per_hour(),
+            # current_now is in microamps; the sign convention varies by vendor.
+            "avg_current_ma": {k: round(v[0] / v[1] / 1000.0, 1) for k, v in self._current_sums.items() if v[1]},
+            "max_temperature_c": self.max_temperature_c,
+            "max_thermal_status": self.max_thermal_status,
+            "throttling_events": self.throttling_events,
+            "time_in_thermal_status_sec": {k: round(v, 3) for k, v in time_in_status.items()},
+        }
+
+
+def load_telemetry(out_dir: str) -> Dict[str, List[Optional[float]]]:
+    merged: Dict[str, List[Optional[float]]] = {}
+    total = 0
+    for path in sorted(glob.glob(os.path.join(out_dir, "telemetry_*.json.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            chunk = json.load(f)
+        for name, values in chunk["columns"].items():
+            merged.setdefault(name, [None] * total).extend(values)
+        total += chunk["rows"]
+        for values in merged.values():
+            values.extend([None] * (total - len(values)))
+    return merged
+
+
+def record_telemetry(
+    adb_path: str,
+    serial: str,
+    out_dir: str,
+    interval_sec: float = 10.0,
+    count: int = 0,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    on_record: Optional[Callable[[Dict[str, Optional[float]]], None]] = None,
+) -> TelemetryRecorder:
+    recorder = TelemetryRecorder(out_dir, chunk_rows)
+    with ShellLoop(adb_path, serial, telemetry_script(interval_sec, count)) as loop:
+        try:
+            for ts, _, lines in loop.blocks():
+                record = parse_telemetry_block(ts, lines)
+                recorder.add(record)
+                if on_record is not None:
+                    on_record(record)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            recorder.flush()
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(recorder.summary(), f, indent=2)
+    return recorder
@@ -0,0 +1,304 @@
+import os
+import posixpath
+import re
+import shlex
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from . import metrics
+from .adb import adb_cmd, command_kind, command_serial, run
+
+MB = 1024 * 1024
+PROGRESS_INTERVAL_SEC = 1.0
+RATE_WINDOW_SEC = 5.0
+STALL_SEC = 5.0
+
+# adb ends each push/pull argument with a line such as
+# "a.bin: 1 file pushed, 0 skipped. 35.2 MB/s (1048576 bytes in 0.028s)".
+_SUMMARY = re.compile(r"\((\d+) bytes in ([\d.]+)s\)")
+
+SizeProbe = Callable[[], Optional[int]]
+
+
+@dataclass
+class TransferProgress:
+    bytes_done: Optional[int]
+    total_bytes: int
+    elapsed_sec: float
+    rate_bps: float = 0.0
+    stalled_sec: float = 0.0
+
+    @property
+    def percent(self) -> Optional[float]:
+        if self.bytes_done is None or not self.total_bytes:
+            return None
+        return min(100.0, 100.0 * self.bytes_done / self.total_bytes)
+
+    @property
+    def eta_sec(self) -> Optional[float]:
+        if self.bytes_done is None or not self.total_bytes or self.rate_bps <= 0:
+            return None
+        return max(0.0, (self.total_bytes - self.bytes_done) / self.rate_bps)
+
+    def to_dict(self) -> Dict[str, Any]:
+        eta = self.eta_sec
+        return {
+            "bytes": self.bytes_done,
+            "total_bytes": self.total_bytes,
+            "percent": None if self.percent is None else round(self.percent, 1),
+            "elapsed_sec": round(self.elapsed_sec, 3),
+            "mb_per_sec": round(self.rate_bps / MB, 3),
+            "eta_sec": None if eta is None else round(eta, 1),
+            "stalled_sec": round(self.stalled_sec, 1),
+        }
+
+    def describe(self) -> str:
+        if self.bytes_done is None:
+            return f"{self.elapsed_sec:.0f}s elapsed"
+        text = f"{self.bytes_done / MB:.1f}"
+        if self.total_bytes:
+            text += f"/{self.total_bytes / MB:.1f} MB ({self.percent:.0f}%)"
+        else:
+            text += " MB"
+        text += f" {self.rate_bps / MB:.1f} MB/s"
+        if self.eta_sec is not None:
+            text += f" ETA {self.eta_sec:.0f}s"
+        if self.stalled_sec >= STALL_SEC:
+            text += f" stalled {self.stalled_sec:.0f}s"
+        return text
+
+
+@dataclass
+class TransferStats:
+    bytes: int
+    duration_sec: float
+    # "adb" when taken from adb's summary line (pure transfer time),
+    # "measured" when it is the size over the command's wall time.
+    source: str = "measured"
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes / self.duration_sec / MB if self.duration_sec > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bytes": self.bytes,
+            "duration_sec": round(self.duration_sec, 3),
+            "mb_per_sec": round(self.mb_per_sec, 3),
+            "source": self.source,
+        }
+
+    def describe(self) -> str:
+        return f"{self.bytes / MB:.1f} MB in {self.duration_sec:.1f}s ({self.mb_per_sec:.1f} MB/s)"
+
+
+def parse_summary(text: str) -> Optional[Tuple[int, float]]:
+    # Totals over every summary line; None when adb printed none.
+    matches = _SUMMARY.findall(text)
+    if not matches:
+        return None
+    return sum(int(b) for b, _ in matches), sum(float(s) for _, s in matches)
+
+
+def transfer_stats(proc: subprocess.CompletedProcess, size: int, duration_sec: float) -> TransferStats:
+    parsed = parse_summary(proc.stdout or "")
+    if parsed is not None and parsed[1] > 0:
+        return TransferStats(parsed[0], parsed[1], "adb")
+    return TransferStats(size, duration_sec)
+
+
+def record_transfer(cmd: List[str], stats: TransferStats) -> None:
+    # Two counters rather than a histogram, so the rate per device (and thus
+    # a slow port or cable) is bytes_total / seconds_total over any window.
+    if not metrics.ENABLED:
+        return
+    labels = {"kind": command_kind(cmd), "serial": command_serial(cmd)}
+    metrics.inc("adbw_transfer_bytes_total", labels, stats.bytes)
+    metrics.inc("adbw_transfer_seconds_total", labels, stats.duration_sec)
+
+
+def local_size(path: str) -> int:
+    if os.path.isdir(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def remote_size(adb_path: str, serial: str, path: str) -> int:
+    # Sum of regular file sizes under `path` (a file or a directory); 0
+    # while it does not exist yet, which is not a failure. Polled for
+    # progress, so it has its own metrics kind.
+    script = f"find {shlex.quote(path)} -type f -exec stat -c %s {{}} + 2>/dev/null || true"
+    proc = run(adb_cmd(adb_path, serial, "shell", script), check=False, kind="transfer_probe")
+    return sum(int(word) for word in proc.stdout.split() if word.isdigit())
+
+
+def push_target(adb_path: str, serial: str, src: str, dst: str) -> str:
+    # Where `adb push src dst` will write: into an existing directory it
+    # keeps the source name. Resolved once, before dst starts to exist.
+    proc = run(adb_cmd(adb_path, serial, "shell", f"stat -c %F {shlex.quote(dst)}"), check=False)
+    if proc.stdout.strip() == "directory":
+        return posixpath.join(dst, os.path.basename(os.path.normpath(src)))
+    return dst
+
+
+def pull_target(src: str, dst: str) -> str:
+    if os.path.isdir(dst):
+        return os.path.join(dst, posixpath.basename(src.rstrip("/")))
+    return dst
+
+
+class TransferMonitor:
+    # Samples `probe` (bytes written so far, None when unknown) every
+    # `interval` seconds on a thread and reports progress: the rate over the
+    # last RATE_WINDOW_SEC, the ETA, and for how long the count has not moved,
+    # which is what tells a stuck transfer apart from a slow one.
+    def __init__(
+        self,
+        total_bytes: int,
+        probe: Optional[SizeProbe],
+        on_progress: Callable[[TransferProgress], None],
+        interval: float = PROGRESS_INTERVAL_SEC,
+    ) -> None:
+        self.total_bytes = total_bytes
+        self.probe = probe
+        self.on_progress = on_progress
+        self.interval = interval
+        self._samples: Deque[Tuple[float, int]] = deque()
+        self._last_change = 0.0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "TransferMonitor":
+        self._started = self._last_change = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, name="adbw-transfer-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def sample(self, bytes_done: Optional[int], now: float) -> TransferProgress:
+        progress = TransferProgress(bytes_done, self.total_bytes, now - self._started)
+        if bytes_done is None:
+            return progress
+        if not self._samples or bytes_done != self._samples[-1][1]:
+            self._last_change = now
+        self._samples.append((now, bytes_done))
+        while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW_SEC:
+            self._samples.popleft()
+        first_at, first_bytes = self._samples[0]
+        if now > first_at:
+            progress.rate_bps = max(0.0, (bytes_done - first_bytes) / (now - first_at))
+        progress.stalled_sec = now - self._last_change
+        return progress
+
+    def _loop(self) -> None:
+        if self.probe is not None:
+            # Baseline, so the first report already has a rate.
+            self.sample(self.probe(), time.monotonic())
+        while not self._stop.wait(self.interval):
+            bytes_done = self.probe() if self.probe is not None else None
+            if self._stop.is_set():
+                break
+            self.on_progress(self.sample(bytes_done, time.monotonic()))
+
+
+def run_transfer(
+    cmd: List[str],
+    total_bytes: int,
+    probe: Optional[SizeProbe] = None,
+    on_progress: Optional[Callable[[TransferProgress], None]] = None,
+    interval: float = PROGRESS_INTERVAL_SEC,
+    check: bool = True,
+    final_size: Optional[Callable[[], int]] = None,
+) -> Tuple[subprocess.CompletedProcess, TransferStats]:
+    # run() with progress reports while it is in flight and throughput once
+    # it is done. `final_size` stands in for total_bytes when adb printed no
+    # summary and the size is only known afterwards (pull).
+    monitor = None
+    if on_progress is not None and interval > 0:
+        monitor = TransferMonitor(total_bytes, probe, on_progress, interval).start()
+    started = time.perf_counter()
+    try:
+        proc = run(cmd, check=check)
+    finally:
+        if monitor is not None:
+            monitor.stop()
+    duration = time.perf_counter() - started
+    stats = transfer_stats(proc, final_size() if final_size is not None else total_bytes, duration)
+    if proc.returncode == 0:
+        record_transfer(cmd, stats)
+    return proc, stats
+
+
+def push_file(
+    adb_path: str,
+    serial: str,
+    src: str,
+    dst: str,
+    on_progress: Optional[Callable[[TransferProgress], None]] = None,
+    interval: float = PROGRESS_INTERVAL_SEC,
+    check: bool = True,
+) -> Tuple[subprocess.CompletedProcess, TransferStats]:
+    probe = None
+    if on_progress is not None and interval > 0:
+        target = push_target(adb_path, serial, src, dst)
+
+        def probe() -> Optional[int]:
+            return remote_size(adb_path, serial, target)
+
+    cmd = adb_cmd(adb_path, serial, "push", src, dst)
+    return run_transfer(cmd, local_size(src), probe, on_progress, interval, check)
+
+
+def pull_file(
+    adb_path: str,
+    serial: str,
+    src: str,
+    dst: str,
+    on_progress: Optional[Callable[[TransferProgress], None]] = None,
+    interval: float = PROGRESS_INTERVAL_SEC,
+    check: bool = True,
+) -> Tuple[subprocess.CompletedProcess, TransferStats]:
+    target = pull_target(src, dst)
+    total = 0
+    if on_progress is not None and interval > 0:
+        total = remote_size(adb_path, serial, src)
+
+    def probe() -> int:
+        return local_size(target)
+
+    cmd = adb_cmd(adb_path, serial, "pull", src, dst)
+    return run_transfer(cmd, total, probe, on_progress, interval, check, probe)
+
+
+def install_apk(
+    adb_path: str,
+    serial: str,
+    apk_path: str,
+    on_progress: Optional[Callable[[TransferProgress], None]] = None,
+    interval: float = PROGRESS_INTERVAL_SEC,
+    check: bool = True,
+) -> Tuple[subprocess.CompletedProcess, TransferStats]:
+    # A streamed install goes straight into the package manager, so there is
+    # nothing to poll: progress reports only the elapsed time, and the
+    # throughput includes install time on the device.
+    cmd = adb_cmd(adb_path, serial, "install", "-r", apk_path)
+    return run_transfer(cmd, local_size(apk_path), None, on_progress, interval, check)
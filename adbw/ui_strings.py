@@ -14,6 +14,8 @@ DEVICE_SESSION_MENU_LINES = [
     "3) Reboot device",
     "4) Connect over Wi-Fi (tcpip/connect)",
     "5) Disconnect Wi-Fi device",
+    "6) Wi-Fi endpoints (keepalive/auto-reconnect)",
+    "7) Discover Wi-Fi devices (mDNS + subnet scan)",
     "0) Back",
 ]
 
@@ -42,6 +44,10 @@ LOGGING_MENU_LINES = [
     "3) Tail filtered logcat",
     "4) Collect logcat + bugreport bundle",
     "5) Export health report (JSON + TXT)",
+    "6) Ingest logs into log store",
+    "7) Query log store",
+    "8) Merged logcat from multiple devices",
+    "9) Bugreport section viewer",
     "0) Back",
 ]
 
@@ -54,6 +60,7 @@ UTILITIES_MENU_LINES = [
     "6) Multi-device broadcast",
     "7) Interactive package search",
     "8) Scheduled log capture",
+    "9) Device farm job queue",
     "0) Back",
 ]
 
@@ -68,6 +75,8 @@ ADVANCED_MENU_LINES = [
     "8) Network diagnostics pack",
     "9) Device aliases",
     "10) Prerequisite health check",
+    "11) Process CPU/memory sampler",
+    "12) Battery/thermal telemetry recorder",
     "0) Back",
 ]
 
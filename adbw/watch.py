@@ -0,0 +1,57 @@
+import os
+import time
+import zipfile
+from typing import Optional, Tuple
+
+DEFAULT_POLL_SEC = 0.5
+DEFAULT_SETTLE_SEC = 1.0
+
+Signature = Tuple[int, int, int]
+
+
+def file_signature(path: str) -> Optional[Signature]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class BuildWatcher:
+    # Polls a build output and reports a new build only once its size/mtime
+    # has stopped changing for `settle_sec` (and, for APKs, the zip central
+    # directory is readable), so half-written files from Gradle are ignored.
+    def __init__(self, path: str, poll_sec: float = DEFAULT_POLL_SEC, settle_sec: float = DEFAULT_SETTLE_SEC) -> None:
+        self.path = path
+        self.poll_sec = poll_sec
+        self.settle_sec = settle_sec
+        self.last = file_signature(path)
+        self._candidate: Optional[Signature] = None
+        self._candidate_since = 0.0
+        self.first_change_at = 0.0
+        self.settle_duration = 0.0
+
+    def poll(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        sig = file_signature(self.path)
+        if sig is None or sig == self.last:
+            self._candidate = None
+            return False
+        if sig != self._candidate:
+            if self._candidate is None:
+                self.first_change_at = now
+            self._candidate = sig
+            self._candidate_since = now
+            return False
+        if now - self._candidate_since < self.settle_sec:
+            return False
+        if self.path.lower().endswith(".apk") and not zipfile.is_zipfile(self.path):
+            return False
+        self.last = sig
+        self._candidate = None
+        self.settle_duration = now - self.first_change_at
+        return True
+
+    def wait(self) -> None:
+        while not self.poll():
+            time.sleep(self.poll_sec)
@@ -0,0 +1,236 @@
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from .adb import DEVICE_BREAKER, adb_cmd, log_debug, note_device_state, record_command_result, run
+from .breaker import backoff_delay
+from .devices import parse_device_states
+from .state import read_json, update_json
+
+ENDPOINTS_FILE = ".adb_cli_py_endpoints.json"
+PROBE_INTERVAL_SEC = 10.0
+RECONNECT_BACKOFF_BASE_SEC = 2.0
+RECONNECT_BACKOFF_MAX_SEC = 60.0
+PROBE_TIMEOUT_SEC = 5.0
+TICK_SEC = 1.0
+
+
+@dataclass
+class EndpointStatus:
+    endpoint: str
+    label: str = ""
+    state: str = "unknown"
+    latency_ms: Optional[float] = None
+    failures: int = 0
+    reconnects: int = 0
+    last_seen: float = 0.0
+    last_error: str = ""
+    next_attempt: float = 0.0
+
+
+def load_endpoints() -> Dict[str, Dict[str, str]]:
+    data = read_json(ENDPOINTS_FILE, {})
+    return data if isinstance(data, dict) else {}
+
+
+def register_endpoint(endpoint: str, label: str = "") -> None:
+    entry = {"label": label, "added": time.strftime("%Y-%m-%d %H:%M:%S")}
+    update_json(ENDPOINTS_FILE, {}, lambda endpoints: endpoints.__setitem__(endpoint, entry))
+
+
+def unregister_endpoint(endpoint: str) -> None:
+    update_json(ENDPOINTS_FILE, {}, lambda endpoints: endpoints.pop(endpoint, None))
+
+
+def connect_endpoint(adb_path: str, endpoint: str) -> str:
+    # Returns "" on success, otherwise adb's message.
+    return connect_error(run([adb_path, "connect", endpoint], check=False))
+
+
+def connect_error(proc: subprocess.CompletedProcess) -> str:
+    # `adb connect` exits 0 on some failures, so the message decides.
+    text = (proc.stdout + proc.stderr).strip()
+    lowered = text.lower()
+    if proc.returncode == 0 and "connected to" in lowered and "failed" not in lowered and "cannot" not in lowered:
+        return ""
+    return text or f"adb connect exited with {proc.returncode}"
+
+
+class WifiManager:
+    # Keeps registered Wi-Fi endpoints connected. A background thread checks
+    # `adb devices` every probe interval, measures a shell round trip for each
+    # live endpoint and reconnects dropped ones with jittered exponential
+    # backoff. While an endpoint is down its circuit breaker is tripped, so
+    # commands fail fast instead of walking the retry loop; a successful
+    # reconnect resets it.
+    def __init__(
+        self,
+        adb_path: str,
+        probe_interval_sec: float = PROBE_INTERVAL_SEC,
+        backoff_base_sec: float = RECONNECT_BACKOFF_BASE_SEC,
+        backoff_max_sec: float = RECONNECT_BACKOFF_MAX_SEC,
+    ) -> None:
+        self.adb_path = adb_path
+        self.probe_interval_sec = probe_interval_sec
+        self.backoff_base_sec = backoff_base_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.statuses: Dict[str, EndpointStatus] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "WifiManager":
+        self._thread = threading.Thread(target=self._loop, name="adbw-wifi-manager", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def retarget(self, adb_path: str) -> None:
+        self.adb_path = adb_path
+        self._wake.set()
+
+    def probe_now(self) -> None:
+        self._wake.set()
+
+    def _sync_registry(self) -> Dict[str, EndpointStatus]:
+        endpoints = load_endpoints()
+        with self._lock:
+            for endpoint in list(self.statuses):
+                if endpoint not in endpoints:
+                    self.statuses.pop(endpoint)
+            for endpoint, meta in endpoints.items():
+                status = self.statuses.setdefault(endpoint, EndpointStatus(endpoint))
+                status.label = str(meta.get("label", "")) if isinstance(meta, dict) else ""
+            return dict(self.statuses)
+
+    def _latency_ms(self, endpoint: str) -> Optional[float]:
+        # Bypasses run() on purpose: the probe must reach a tripped endpoint
+        # and must not sit in the full command timeout on a dead socket.
+        cmd = adb_cmd(self.adb_path, endpoint, "shell", "echo", "ok")
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=PROBE_TIMEOUT_SEC)
+        except subprocess.TimeoutExpired:
+            proc = subprocess.CompletedProcess(cmd, 124, "", f"Probe timed out after {PROBE_TIMEOUT_SEC:g}s")
+            timed_out = True
+        except OSError as e:
+            proc = subprocess.CompletedProcess(cmd, 127, "", str(e))
+        elapsed = time.perf_counter() - started
+        record_command_result(cmd, proc, started, timed_out)
+        if proc.returncode != 0 or "ok" not in proc.stdout:
+            return None
+        return round(elapsed * 1000.0, 1)
+
+    def _mark_down(self, status: EndpointStatus, error: str, now: float) -> None:
+        if status.state != "down":
+            log_debug(f"WIFI down endpoint={status.endpoint} error={error}")
+            DEVICE_BREAKER.trip(status.endpoint)
+        status.state = "down"
+        status.latency_ms = None
+        status.last_error = error
+        if status.next_attempt <= now:
+            status.next_attempt = now
+
+    def probe(self) -> List[EndpointStatus]:
+        # One health round: which endpoints are live, and how fast.
+        statuses = self._sync_registry()
+        if not statuses:
+            return []
+        states = parse_device_states(run([self.adb_path, "devices"], check=False).stdout)
+        live = [e for e in statuses if states.get(e) == "device"]
+        with ThreadPoolExecutor(max_workers=max(1, len(live))) as pool:
+            latencies = dict(zip(live, pool.map(self._latency_ms, live)))
+        now = time.monotonic()
+        with self._lock:
+            for endpoint, status in statuses.items():
+                latency = latencies.get(endpoint)
+                if latency is not None:
+                    if status.state != "live":
+                        note_device_state(endpoint, "device")
+                    status.state = "live"
+                    status.latency_ms = latency
+                    status.last_seen = time.time()
+                    status.failures = 0
+                    status.last_error = ""
+                else:
+                    self._mark_down(status, states.get(endpoint, "not connected"), now)
+        return self.status()
+
+    def reconnect_due(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            due = [s for s in self.statuses.values() if s.state == "down" and s.next_attempt <= now]
+        for status in due:
+            # Drop a half-open transport first; `adb connect` would otherwise
+            # answer "already connected" and keep the dead socket.
+            run([self.adb_path, "disconnect", status.endpoint], check=False)
+            error = connect_endpoint(self.adb_path, status.endpoint)
+            latency = None if error else self._latency_ms(status.endpoint)
+            with self._lock:
+                if latency is not None:
+                    note_device_state(status.endpoint, "device")
+                    status.state = "live"
+                    status.latency_ms = latency
+                    status.failures = 0
+                    status.reconnects += 1
+                    status.last_error = ""
+                    status.last_seen = time.time()
+                    log_debug(f"WIFI reconnected endpoint={status.endpoint}")
+                    continue
+                DEVICE_BREAKER.trip(status.endpoint)
+                status.failures += 1
+                status.last_error = error or "connected but not responding"
+                delay = backoff_delay(status.failures, self.backoff_base_sec, self.backoff_max_sec)
+                # Keep at least the base delay so a flapping endpoint is not hammered.
+                status.next_attempt = time.monotonic() + max(self.backoff_base_sec, delay)
+
+    def status(self) -> List[EndpointStatus]:
+        with self._lock:
+            return [EndpointStatus(**asdict(s)) for s in sorted(self.statuses.values(), key=lambda s: s.endpoint)]
+
+    def live_endpoints(self) -> List[str]:
+        # Fastest first, so callers that need one transport can take [0].
+        with self._lock:
+            live = [s for s in self.statuses.values() if s.state == "live"]
+        return [s.endpoint for s in sorted(live, key=lambda s: s.latency_ms or 0.0)]
+
+    def is_live(self, endpoint: str) -> bool:
+        with self._lock:
+            status = self.statuses.get(endpoint)
+            return status is None or status.state == "live"
+
+    def _loop(self) -> None:
+        next_probe = 0.0
+        while not self._stop.is_set():
+            try:
+                if self._wake.is_set() or time.monotonic() >= next_probe:
+                    self._wake.clear()
+                    self.probe()
+                    next_probe = time.monotonic() + self.probe_interval_sec
+                self.reconnect_due()
+            except Exception as e:
+                log_debug(f"WIFI manager error: {e}")
+            self._wake.wait(TICK_SEC)
+
+
+_ACTIVE: Optional[WifiManager] = None
+
+
+def start_manager(adb_path: str) -> WifiManager:
+    global _ACTIVE
+    _ACTIVE = WifiManager(adb_path).start()
+    return _ACTIVE
+
+
+def active_manager() -> Optional[WifiManager]:
+    return _ACTIVE
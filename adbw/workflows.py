@@ -0,0 +1,585 @@
+import hashlib
+import json
+import os
+import shlex
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .adb import adb_cmd, device_key, run, run_streaming, target_filename
+from .breaker import backoff_delay
+from .errors import AdbWizardError
+from .state import read_json, update_json
+
+StepAction = Callable[[str, str, Dict[str, Any]], Optional[str]]
+
+FOREGROUND_ACTIONS = {"tail_filtered_logcat"}
+DEFAULT_MAX_PARALLEL_STEPS = 4
+DEFAULT_MAX_PARALLEL_DEVICES = 8
+STEP_CACHE_FILE = ".adb_cli_py_step_cache.json"
+STEP_CACHE_MAX_ENTRIES = 200
+CACHEABLE_ACTIONS = {"install_apk", "push_file", "grant_permission"}
+# Keys that describe scheduling, not what a step does to the device.
+_NON_INPUT_KEYS = {"id", "needs", "retries", "retry_delay_sec", "cache"}
+
+
+class StepSkipped(Exception):
+    pass
+
+
+def _require(step: Dict[str, Any], key: str) -> str:
+    value = str(step.get(key, "") or "")
+    if not value:
+        raise StepSkipped(f"missing {key}")
+    return value
+
+
+def _install_apk(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    apk_path = _require(step, "apk_path")
+    if not os.path.exists(apk_path):
+        raise AdbWizardError(f"APK path does not exist: {apk_path}")
+    run(adb_cmd(adb_path, serial, "install", "-r", apk_path))
+    return apk_path
+
+
+def _clear_data(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    package = _require(step, "package")
+    run(adb_cmd(adb_path, serial, "shell", "pm", "clear", package))
+    return package
+
+
+def _launch_app(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    package = _require(step, "package")
+    activity = str(step.get("activity", "") or "")
+    if activity:
+        run(adb_cmd(adb_path, serial, "shell", "am", "start", "-n", f"{package}/{activity}"))
+        return f"{package}/{activity}"
+    run(adb_cmd(adb_path, serial, "shell", "monkey", "-p", package, "-c", "android.intent.category.LAUNCHER", "1"))
+    return package
+
+
+def _force_stop(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    package = _require(step, "package")
+    run(adb_cmd(adb_path, serial, "shell", "am", "force-stop", package))
+    return package
+
+
+def _push_file(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    src = _require(step, "src")
+    dst = _require(step, "dst")
+    if not os.path.exists(src):
+        raise AdbWizardError(f"Local source path does not exist: {src}")
+    run(adb_cmd(adb_path, serial, "push", src, dst))
+    return f"{src} -> {dst}"
+
+
+def _pull_file(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    src = _require(step, "src")
+    dst = str(step.get("dst", "") or ".").replace("{serial}", target_filename(serial))
+    run(adb_cmd(adb_path, serial, "pull", src, dst))
+    return f"{src} -> {dst}"
+
+
+def _shell(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    command = _require(step, "command")
+    out = run(adb_cmd(adb_path, serial, "shell", command)).stdout.strip()
+    return out.splitlines()[-1][:120] if out else ""
+
+
+def _grant_permission(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    package = _require(step, "package")
+    permission = _require(step, "permission")
+    run(adb_cmd(adb_path, serial, "shell", "pm", "grant", package, permission))
+    return f"{package} {permission}"
+
+
+def _wait(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    seconds = float(step.get("seconds", 1) or 0)
+    time.sleep(max(0.0, seconds))
+    return f"{seconds:g}s"
+
+
+def _tail_filtered_logcat(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    tag = step.get("tag", "*") or "*"
+    priority = step.get("priority", "I") or "I"
+    try:
+        run_streaming(adb_cmd(adb_path, serial, "logcat", f"{tag}:{priority}", "*:S"))
+    except KeyboardInterrupt:
+        print()
+    return f"{tag}:{priority}"
+
+
+STEP_ACTIONS: Dict[str, StepAction] = {
+    "install_apk": _install_apk,
+    "clear_data": _clear_data,
+    "launch_app": _launch_app,
+    "force_stop": _force_stop,
+    "push_file": _push_file,
+    "pull_file": _pull_file,
+    "shell": _shell,
+    "grant_permission": _grant_permission,
+    "wait": _wait,
+    "tail_filtered_logcat": _tail_filtered_logcat,
+}
+
+# Parameters the interactive workflow builder asks for, per action.
+STEP_PARAMS: Dict[str, List[str]] = {
+    "install_apk": ["apk_path"],
+    "clear_data": ["package"],
+    "launch_app": ["package", "activity"],
+    "force_stop": ["package"],
+    "push_file": ["src", "dst"],
+    "pull_file": ["src", "dst"],
+    "shell": ["command"],
+    "grant_permission": ["package", "permission"],
+    "wait": ["seconds"],
+    "tail_filtered_logcat": ["tag", "priority"],
+}
+
+
+def register_step_action(name: str, action: StepAction, params: Optional[List[str]] = None) -> None:
+    STEP_ACTIONS[name] = action
+    STEP_PARAMS[name] = list(params or [])
+
+
+_file_hashes: Dict[Any, str] = {}
+_file_hashes_lock = threading.Lock()
+
+
+def _file_sha256(path: str) -> str:
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _file_hashes_lock:
+        if key in _file_hashes:
+            return _file_hashes[key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    with _file_hashes_lock:
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+def _apk_package(apk_path: str) -> str:
+    try:
+        out = run(["aapt", "dump", "badging", apk_path], check=False).stdout
+    except Exception:
+        return ""
+    for line in out.splitlines():
+        if line.startswith("package:"):
+            for part in line.split():
+                if part.startswith("name="):
+                    return part.split("=", 1)[1].strip("'\"")
+    return ""
+
+
+def _probe(adb_path: str, serial: str, command: str) -> str:
+    proc = run(adb_cmd(adb_path, serial, "shell", command), check=False)
+    return f"{proc.returncode}:{proc.stdout.strip()}"
+
+
+def _device_state(adb_path: str, serial: str, step: Dict[str, Any]) -> Optional[str]:
+    # Returns None when a step's effect on the device cannot be observed; such
+    # steps are never served from the cache.
+    action = str(step.get("action", ""))
+    state_command = str(step.get("state_command", "") or "")
+    if state_command:
+        return _probe(adb_path, serial, state_command)
+    if action == "install_apk":
+        package = str(step.get("package", "") or "") or _apk_package(str(step.get("apk_path", "")))
+        if not package:
+            return None
+        package = shlex.quote(package)
+        return _probe(
+            adb_path, serial,
+            f"pm path {package}; dumpsys package {package} | grep -E 'versionCode=|lastUpdateTime='",
+        )
+    if action == "push_file":
+        return _probe(adb_path, serial, f"stat -c '%s %Y' {shlex.quote(str(step.get('dst', '')))}")
+    if action == "grant_permission":
+        package = shlex.quote(str(step.get("package", "")))
+        granted = shlex.quote(f"{step.get('permission', '')}: granted=true")
+        return _probe(adb_path, serial, f"dumpsys package {package} | grep -F -e {granted}")
+    return "" if step.get("cache") else None
+
+
+# Why _device_state returned None, for the run log.
+_UNCACHEABLE = {"install_apk": 'set "package" on the step or put aapt on PATH'}
+
+
+def is_cacheable(step: Dict[str, Any]) -> bool:
+    if "cache" in step:
+        return bool(step["cache"])
+    return step.get("action") in CACHEABLE_ACTIONS
+
+
+def step_fingerprint(step: Dict[str, Any]) -> str:
+    inputs = {k: v for k, v in step.items() if k not in _NON_INPUT_KEYS}
+    for key in ("apk_path", "src"):
+        path = str(step.get(key, "") or "")
+        if path and os.path.isfile(path):
+            inputs[f"{key}_sha256"] = _file_sha256(path)
+    encoded = json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _put_entry(data: Dict[str, Any], serial: str, fingerprint: str, entry: Dict[str, Any]) -> None:
+    entries = data.get(serial)
+    if not isinstance(entries, dict):
+        entries = data[serial] = {}
+    entries.pop(fingerprint, None)
+    entries[fingerprint] = entry
+    while len(entries) > STEP_CACHE_MAX_ENTRIES:
+        entries.pop(next(iter(entries)))
+
+
+class StepCache:
+    def __init__(self, path: str = STEP_CACHE_FILE) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        data = read_json(path, {})
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] = data if isinstance(data, dict) else {}
+        # Entries stored by this run; save() merges them into whatever the
+        # file holds by then, so concurrent runs keep each other's results.
+        self._pending: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def lookup(self, serial: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get(serial, {}).get(fingerprint)
+            return dict(entry) if isinstance(entry, dict) else None
+
+    def store(self, serial: str, fingerprint: str, state: str, step: Dict[str, Any]) -> None:
+        with self._lock:
+            entry = {
+                "step_id": step.get("id", ""),
+                "action": step.get("action", ""),
+                "state": state,
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            _put_entry(self._data, serial, fingerprint, entry)
+            self._pending.setdefault(serial, {})[fingerprint] = entry
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            pending = self._pending
+
+            def merge(data: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+                if not isinstance(data, dict):
+                    return
+                for serial, entries in pending.items():
+                    for fingerprint, entry in entries.items():
+                        _put_entry(data, serial, fingerprint, entry)
+
+            merged = update_json(self.path, {}, merge)
+            self._data = merged if isinstance(merged, dict) else self._data
+            self._pending = {}
+
+
+@dataclass
+class StepResult:
+    serial: str
+    step_id: str
+    action: str
+    status: str
+    attempts: int = 0
+    duration_sec: float = 0.0
+    detail: str = ""
+
+
+@dataclass
+class WorkflowReport:
+    name: str
+    serials: List[str]
+    duration_sec: float = 0.0
+    results: List[StepResult] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return all(r.status in ("ok", "skipped", "cached") for r in self.results)
+
+    def to_dict(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for r in self.results:
+            counts[r.status] = counts.get(r.status, 0) + 1
+        return {
+            "name": self.name,
+            "serials": self.serials,
+            "ok": self.ok,
+            "duration_sec": round(self.duration_sec, 3),
+            "counts": counts,
+            "steps": [asdict(r) for r in self.results],
+        }
+
+
+def normalize_steps(workflow: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Legacy workflows have neither ids nor `needs`; they become a linear chain.
+    raw_steps = [dict(s) for s in workflow.get("steps", []) if isinstance(s, dict)]
+    explicit = any("needs" in s for s in raw_steps)
+    steps: List[Dict[str, Any]] = []
+    seen: Set[str] = set()
+    for i, step in enumerate(raw_steps, start=1):
+        step_id = str(step.get("id") or f"step{i}")
+        if step_id in seen:
+            raise AdbWizardError(f"Duplicate workflow step id: {step_id}")
+        seen.add(step_id)
+        if explicit:
+            needs = step.get("needs", [])
+            if isinstance(needs, str):
+                needs = [n.strip() for n in needs.split(",") if n.strip()]
+        else:
+            needs = [steps[-1]["id"]] if steps else []
+        step["id"] = step_id
+        step["needs"] = [str(n) for n in needs]
+        _check_numbers(step)
+        steps.append(step)
+    _check_graph(steps)
+    return steps
+
+
+def _check_numbers(step: Dict[str, Any]) -> None:
+    for key, kind in (("retries", int), ("retry_delay_sec", float), ("seconds", float)):
+        value = step.get(key)
+        if value in (None, ""):
+            continue
+        try:
+            kind(value)
+        except (TypeError, ValueError):
+            raise AdbWizardError(f"Step {step['id']}: {key} must be a number, got {value!r}") from None
+
+
+def _check_graph(steps: List[Dict[str, Any]]) -> None:
+    ids = {s["id"] for s in steps}
+    for step in steps:
+        missing = [n for n in step["needs"] if n not in ids]
+        if missing:
+            raise AdbWizardError(f"Step {step['id']} depends on unknown step(s): {', '.join(missing)}")
+    indegree = {s["id"]: len(s["needs"]) for s in steps}
+    dependents: Dict[str, List[str]] = {s["id"]: [] for s in steps}
+    for step in steps:
+        for need in step["needs"]:
+            dependents[need].append(step["id"])
+    ready = [i for i, d in indegree.items() if d == 0]
+    visited = 0
+    while ready:
+        current = ready.pop()
+        visited += 1
+        for dep in dependents[current]:
+            indegree[dep] -= 1
+            if indegree[dep] == 0:
+                ready.append(dep)
+    if visited != len(steps):
+        raise AdbWizardError("Workflow steps contain a dependency cycle.")
+
+
+class _DeviceRun:
+    def __init__(
+        self,
+        adb_path: str,
+        serial: str,
+        steps: List[Dict[str, Any]],
+        max_parallel: int,
+        allow_foreground: bool,
+        log: Callable[[str], None],
+        cache: Optional[StepCache] = None,
+        force: bool = False,
+    ) -> None:
+        self.adb_path = adb_path
+        self.serial = serial
+        self.steps = {s["id"]: s for s in steps}
+        self.order = [s["id"] for s in steps]
+        self.max_parallel = max(1, max_parallel)
+        self.allow_foreground = allow_foreground
+        self.log = log
+        self.cache = cache
+        # Cache entries follow the serial, which survives a replug; a
+        # transport id does not. device_key keeps transport_id:<n> only while
+        # another device shares the serial.
+        self.cache_key = device_key(serial)
+        self.force = force
+        self.results: Dict[str, StepResult] = {}
+
+    def _execute(self, step: Dict[str, Any]) -> StepResult:
+        started = time.perf_counter()
+        try:
+            return self._run_step(step)
+        except Exception as e:
+            # A bug or a local I/O error in one step fails that step only,
+            # never the other steps and devices of the run.
+            detail = f"{type(e).__name__}: {e}"
+            action = str(step.get("action", ""))
+            return StepResult(self.serial, step["id"], action, "failed", 1, time.perf_counter() - started, detail)
+
+    def _run_step(self, step: Dict[str, Any]) -> StepResult:
+        action = str(step.get("action", ""))
+        result = StepResult(self.serial, step["id"], action, "failed")
+        func = STEP_ACTIONS.get(action)
+        if func is None:
+            result.status = "skipped"
+            result.detail = f"unknown action: {action}"
+            return result
+        retries = max(0, int(step.get("retries", 0) or 0))
+        retry_delay = max(0.0, float(step.get("retry_delay_sec", 1.0) or 0))
+        started = time.perf_counter()
+        fingerprint = ""
+        if self.cache is not None and is_cacheable(step):
+            fingerprint = step_fingerprint(step)
+            entry = self.cache.lookup(self.cache_key, fingerprint)
+            if entry is not None and not self.force:
+                if _device_state(self.adb_path, self.serial, step) == entry.get("state"):
+                    result.status = "cached"
+                    result.detail = f"unchanged since {entry.get('at', '?')}"
+                    result.duration_sec = time.perf_counter() - started
+                    return result
+        for attempt in range(1, retries + 2):
+            result.attempts = attempt
+            try:
+                result.detail = func(self.adb_path, self.serial, step) or ""
+                result.status = "ok"
+                break
+            except StepSkipped as e:
+                result.status = "skipped"
+                result.detail = str(e)
+                break
+            except AdbWizardError as e:
+                result.detail = str(e).splitlines()[0] if str(e) else "failed"
+                if attempt <= retries:
+                    time.sleep(backoff_delay(attempt, retry_delay, 30.0))
+        if fingerprint and result.status == "ok":
+            # Record the state the step left behind; the next run is a cache
+            # hit only if nothing touched the device in between.
+            state = _device_state(self.adb_path, self.serial, step)
+            if state is not None:
+                self.cache.store(self.cache_key, fingerprint, state, step)
+            else:
+                self.log(f"[{self.serial}] {step['id']} {action}: not cached ({_UNCACHEABLE.get(action, 'no state probe')})")
+        result.duration_sec = time.perf_counter() - started
+        return result
+
+    def _finish(self, result: StepResult) -> None:
+        self.results[result.step_id] = result
+        suffix = f" ({result.detail})" if result.detail and result.status != "ok" else ""
+        self.log(f"[{self.serial}] {result.step_id} {result.action}: {result.status} in {result.duration_sec:.2f}s{suffix}")
+
+    def _state(self, step_id: str) -> str:
+        step = self.steps[step_id]
+        statuses = [self.results[n].status if n in self.results else "" for n in step["needs"]]
+        if any(s in ("failed", "blocked") for s in statuses):
+            return "blocked"
+        if all(s in ("ok", "skipped", "cached") for s in statuses):
+            return "ready"
+        return "waiting"
+
+    def run(self) -> List[StepResult]:
+        pending = [i for i in self.order if self.steps[i].get("action") not in FOREGROUND_ACTIONS]
+        foreground = [i for i in self.order if self.steps[i].get("action") in FOREGROUND_ACTIONS]
+        running: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix=f"wf-{self.serial}") as pool:
+            while pending or running:
+                for step_id in list(pending):
+                    state = self._state(step_id)
+                    if state == "blocked":
+                        pending.remove(step_id)
+                        self._finish(StepResult(self.serial, step_id, self.steps[step_id].get("action", ""), "blocked"))
+                    elif state == "ready" and len(running) < self.max_parallel:
+                        pending.remove(step_id)
+                        running[pool.submit(self._execute, self.steps[step_id])] = step_id
+                if not running:
+                    # Everything left waits on a foreground step or a blocked one.
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    running.pop(fut)
+                    self._finish(fut.result())
+        # Interactive steps (logcat tails) run last on the calling thread so
+        # Ctrl+C reaches them.
+        leftover = set(foreground + pending)
+        for step_id in [i for i in self.order if i in leftover]:
+            action = self.steps[step_id].get("action", "")
+            if self._state(step_id) != "ready":
+                self._finish(StepResult(self.serial, step_id, action, "blocked"))
+            elif action in FOREGROUND_ACTIONS and not self.allow_foreground:
+                self._finish(StepResult(self.serial, step_id, action, "skipped", detail="interactive step; single target only"))
+            else:
+                self._finish(self._execute(self.steps[step_id]))
+        return [self.results[i] for i in self.order if i in self.results]
+
+
+def execute_workflow(
+    adb_path: str,
+    workflow: Dict[str, Any],
+    serials: List[str],
+    max_parallel_steps: int = DEFAULT_MAX_PARALLEL_STEPS,
+    max_parallel_devices: int = DEFAULT_MAX_PARALLEL_DEVICES,
+    log: Callable[[str], None] = print,
+    interactive: bool = True,
+    force: bool = False,
+    cache: Optional[StepCache] = None,
+) -> WorkflowReport:
+    if not serials:
+        raise AdbWizardError("Workflow has no target devices.")
+    steps = normalize_steps(workflow)
+    report = WorkflowReport(name=str(workflow.get("name", "unnamed")), serials=list(serials))
+    print_lock = threading.Lock()
+
+    def locked_log(message: str) -> None:
+        with print_lock:
+            log(message)
+
+    single = len(serials) == 1
+    if cache is None:
+        cache = StepCache()
+    started = time.perf_counter()
+    runs = [
+        _DeviceRun(adb_path, s, steps, max_parallel_steps, single and interactive, locked_log, cache, force)
+        for s in serials
+    ]
+    try:
+        if single:
+            report.results.extend(runs[0].run())
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, max_parallel_devices), thread_name_prefix="wf-device") as pool:
+                for results in pool.map(lambda r: r.run(), runs):
+                    report.results.extend(results)
+    finally:
+        try:
+            cache.save()
+        except OSError as e:
+            log(f"Could not save step cache: {e}")
+    report.duration_sec = time.perf_counter() - started
+    return report
+
+
+def resolve_targets(
+    targets: Any, current_serial: str, connected: List[str], aliases: Dict[str, str]
+) -> List[str]:
+    if targets in (None, "", "current"):
+        return [current_serial] if current_serial else []
+    if targets == "all":
+        return list(connected)
+    if isinstance(targets, str):
+        targets = [t.strip() for t in targets.split(",") if t.strip()]
+    serials: List[str] = []
+    for target in targets:
+        serial = aliases.get(str(target), str(target))
+        if serial not in connected:
+            raise AdbWizardError(f"Workflow target is not connected: {target}")
+        if serial not in serials:
+            serials.append(serial)
+    return serials
+
+
+def format_workflow_report(report: WorkflowReport) -> str:
+    lines = [f"Workflow {report.name}: {'OK' if report.ok else 'FAILED'} in {report.duration_sec:.2f}s on {len(report.serials)} device(s)"]
+    for serial in report.serials:
+        rows = [r for r in report.results if r.serial == serial]
+        total = sum(r.duration_sec for r in rows)
+        lines.append(f"  {serial}: step time {total:.2f}s")
+        for r in rows:
+            retry = f" attempts={r.attempts}" if r.attempts > 1 else ""
+            lines.append(f"    {r.step_id:<16} {r.action:<20} {r.status:<8} {r.duration_sec:7.2f}s{retry}")
+    return "\n".join(lines)
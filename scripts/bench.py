@@ -0,0 +1,213 @@
+"""Benchmark adbw code paths against the fake adb from tests/fake_adb.py.
+
+Each scenario runs in its own worker process so peak RSS is attributable,
+optionally under `strace -f -c` to count syscalls (Linux only).
+
+    python scripts/bench.py --devices 8 --iterations 5 --latency-ms 20
+"""
+
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+from adbw import actions, advanced, devices  # noqa: E402
+from adbw.adb import adb_cmd, run, set_runtime_options  # noqa: E402
+from adbw.config import Settings  # noqa: E402
+from fake_adb import device_serials, write_fake_adb  # noqa: E402
+
+
+@contextlib.contextmanager
+def _scripted_input(answers: List[str]):
+    pending = list(answers)
+    original = builtins.input
+    builtins.input = lambda prompt="": pending.pop(0) if pending else ""
+    try:
+        yield
+    finally:
+        builtins.input = original
+
+
+def _scenarios(adb_path: str, serial: str) -> Dict[str, Callable[[], Any]]:
+    def broadcast() -> None:
+        with _scripted_input(["2", "getprop ro.product.model"]):
+            advanced.multi_device_broadcast(adb_path)
+
+    return {
+        "run_getprop": lambda: run(adb_cmd(adb_path, serial, "shell", "getprop", "ro.product.model")),
+        "list_devices": lambda: devices.list_devices(adb_path),
+        "device_summary": lambda: devices.get_device_summary_data(adb_path, serial),
+        "broadcast_shell": broadcast,
+        "logcat_snapshot": lambda: actions.save_logcat_snapshot(adb_path, serial),
+        "health_report": lambda: advanced.export_health_report(adb_path, serial),
+        "snapshot": lambda: advanced.snapshot_device_state(adb_path, serial),
+        "bundle": lambda: actions.collect_bugreport_bundle(adb_path, serial),
+    }
+
+
+SCENARIOS = list(_scenarios("adb", "serial").keys())
+
+
+def _max_rss_mb(who: int) -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_worker(args: argparse.Namespace) -> int:
+    set_runtime_options(Settings(redact_exports=not args.no_redact))
+    os.chdir(args.workdir)
+    scenario = _scenarios(args.adb, args.serial)[args.worker]
+    timings: List[float] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            scenario()
+            timings.append(time.perf_counter() - start)
+    result: Dict[str, Any] = {
+        "scenario": args.worker,
+        "timings": timings,
+        "peak_rss_mb": _max_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "children_peak_rss_mb": _max_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        result["ctx_switches"] = usage.ru_nvcsw + usage.ru_nivcsw
+    print(json.dumps(result))
+    return 0
+
+
+def _strace_calls(path: str) -> Optional[int]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        fields = line.split()
+        if fields and fields[-1] == "total" and len(fields) >= 4:
+            try:
+                return int(fields[3])
+            except ValueError:
+                return None
+    return None
+
+
+def run_scenario(name: str, args: argparse.Namespace, adb_path: str, serial: str, workdir: str) -> Dict[str, Any]:
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--worker", name,
+        "--adb", adb_path, "--serial", serial, "--workdir", workdir,
+        "--iterations", str(args.iterations),
+    ]
+    if args.no_redact:
+        cmd.append("--no-redact")
+    strace_out = ""
+    if args.strace:
+        strace_out = os.path.join(workdir, f"strace_{name}.txt")
+        cmd = ["strace", "-f", "-c", "-o", strace_out] + cmd
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"scenario": name, "error": proc.stderr.strip().splitlines()[-1:] or ["worker failed"]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if strace_out:
+        result["syscalls"] = _strace_calls(strace_out)
+    timings = result["timings"]
+    result["median_ms"] = statistics.median(timings) * 1000
+    result["min_ms"] = min(timings) * 1000
+    result["max_ms"] = max(timings) * 1000
+    return result
+
+
+def _fmt(value: Any, spec: str) -> str:
+    return "n/a" if value is None else format(value, spec)
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<16} {'median ms':>10} {'min ms':>9} {'max ms':>9} {'rss MB':>8} {'child MB':>9} {'syscalls':>9}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['scenario']:<16} error: {r['error'][0]}")
+            continue
+        print(
+            f"{r['scenario']:<16} {r['median_ms']:>10.1f} {r['min_ms']:>9.1f} {r['max_ms']:>9.1f} "
+            f"{_fmt(r.get('peak_rss_mb'), '.1f'):>8} {_fmt(r.get('children_peak_rss_mb'), '.1f'):>9} "
+            f"{_fmt(r.get('syscalls'), 'd'):>9}"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark adbw against a fake adb.")
+    parser.add_argument("--devices", type=int, default=4, help="Number of simulated devices.")
+    parser.add_argument("--iterations", type=int, default=3, help="Iterations per scenario.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Per-command latency.")
+    parser.add_argument("--logcat-lines", type=int, default=20000, help="Lines returned by logcat -d.")
+    parser.add_argument("--line-bytes", type=int, default=120, help="Approximate logcat line length.")
+    parser.add_argument("--getprop-lines", type=int, default=1500, help="Lines returned by getprop.")
+    parser.add_argument("--transient-rate", type=float, default=0.0, help="Probability of a transient error.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of a hard failure.")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to run (repeatable).")
+    parser.add_argument("--strace", action="store_true", help="Count syscalls with strace -f -c.")
+    parser.add_argument("--no-redact", action="store_true", help="Disable export redaction.")
+    parser.add_argument("--json", dest="json_out", help="Write results as JSON to this path.")
+    parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--adb", help=argparse.SUPPRESS)
+    parser.add_argument("--serial", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.worker:
+        return run_worker(args)
+    if args.strace and shutil.which("strace") is None:
+        print("strace not found; syscall counts will be reported as n/a.")
+        args.strace = False
+
+    config = {
+        "devices": args.devices,
+        "latency_ms": args.latency_ms,
+        "logcat_lines": args.logcat_lines,
+        "line_bytes": args.line_bytes,
+        "getprop_lines": args.getprop_lines,
+        "transient_rate": args.transient_rate,
+        "failure_rate": args.failure_rate,
+    }
+    workdir = tempfile.mkdtemp(prefix="adbw_bench_")
+    try:
+        adb_path = write_fake_adb(os.path.join(workdir, "bin"), config)
+        serial = device_serials(config)[0]
+        results = [run_scenario(name, args, adb_path, serial, workdir) for name in (args.scenario or SCENARIOS)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"devices={args.devices} iterations={args.iterations} latency_ms={args.latency_ms} logcat_lines={args.logcat_lines}")
+    print_table(results)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
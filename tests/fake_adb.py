@@ -0,0 +1,654 @@
+"""Scriptable stand-in for the `adb` executable and the adb host server.
+
+Run as a script it behaves like a (very small) `adb` binary that simulates N
+devices. Behaviour is driven by a JSON config whose path is given in the
+FAKE_ADB_CONFIG environment variable; see DEFAULT_CONFIG for the knobs.
+
+`write_fake_adb()` drops an executable wrapper named `adb` (or `adb.cmd` on
+Windows) into a directory so the real adbw code paths can be pointed at it.
+`FakeAdbServer` speaks the adb smart-socket protocol on a local TCP port.
+"""
+
+import json
+import os
+import random
+import re
+import shlex
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+CONFIG_ENV = "FAKE_ADB_CONFIG"
+
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "devices": 2,
+    "serial_prefix": "FAKE",
+    "serials": [],
+    "offline": [],
+    "latency_ms": 0.0,
+    "latency_by_kind": {},
+    "logcat_lines": 200,
+    "line_bytes": 100,
+    "getprop_lines": 150,
+    "package_count": 80,
+    "failure_rate": 0.0,
+    "transient_rate": 0.0,
+    "track_hold_sec": 0.0,
+    "logcat_follow_ms": 0.0,
+    "device_root": "",
+    "transfer_kbps": 0.0,
+    "pull_bytes": 1024,
+    "clock_skew": {},
+    "wifi_endpoints": [],
+    "mdns_services": [],
+    "seed": None,
+}
+
+LEVELS = "VDIWE"
+TAGS = ("ActivityManager", "PackageManager", "WindowManager", "chatty", "ExampleTag", "AndroidRuntime")
+
+
+def load_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_CONFIG)
+    path = os.environ.get(CONFIG_ENV, "")
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    return config
+
+
+def device_serials(config: Dict[str, Any]) -> List[str]:
+    # Transport ids are positions in this list (from 1); an explicit
+    # "serials" list may repeat a serial, as cloned devices do.
+    if config.get("serials"):
+        return [str(s) for s in config["serials"]]
+    prefix = config.get("serial_prefix", DEFAULT_CONFIG["serial_prefix"])
+    return [f"{prefix}{i:04d}" for i in range(int(config.get("devices", DEFAULT_CONFIG["devices"])))]
+
+
+def command_kind(args: List[str]) -> str:
+    if not args:
+        return "none"
+    if args[0] == "shell" and len(args) > 1:
+        return args[1].split()[0]
+    return args[0]
+
+
+def logcat_lines(serial: str, count: int, line_bytes: int, start: int = 0, skew: float = 0.0) -> List[str]:
+    lines = []
+    base = time.time() + skew - count * 0.01
+    for i in range(start, start + count):
+        ts = time.localtime(base + i * 0.01)
+        millis = int((base + i * 0.01) * 1000) % 1000
+        pid = 1000 + (i % 7)
+        if i % 97 == 96:
+            level, tag, body = "E", "AndroidRuntime", "FATAL EXCEPTION: main"
+        else:
+            level, tag, body = LEVELS[i % len(LEVELS)], TAGS[i % len(TAGS)], f"{serial} message {i} "
+        prefix = f"{time.strftime('%m-%d %H:%M:%S', ts)}.{millis:03d}  {pid:5d}  {pid + 3:5d} {level} {tag}: "
+        pad = max(0, line_bytes - len(prefix) - len(body))
+        lines.append(prefix + body + ("x" * pad))
+    return lines
+
+
+def _proc_stat(tick: int) -> str:
+    busy = 1000 + tick * 40
+    lines = [f"cpu  {busy} 0 {busy // 2} {50000 + tick * 760} 0 0 0 0 0 0"]
+    lines += [f"cpu{i} {busy // 8} 0 {busy // 16} {6250 + tick * 95} 0 0 0 0 0 0" for i in range(8)]
+    return "\n".join(lines)
+
+
+def _sampling_loop(serial: str, text: str) -> str:
+    # Replays the on-device sampling loops used by adbw.sampler without the
+    # sleeps: `count` marker-delimited blocks of synthetic /proc data.
+    m = re.search(r"-lt (\d+)", text)
+    count = int(m.group(1)) if m else 5
+    out = []
+    for n in range(count):
+        out.append(f"@@ {n}")
+        if "pidof" in text:
+            pid = 4321
+            out.append(f"pid {pid}")
+            out.append(_proc_stat(n).splitlines()[0])
+            out.append(f"{pid} (com.fake.app) S 1 0 0 0 -1 0 0 0 0 0 {100 + n * 20} {50 + n * 10} 0 0 20 0 {40 + n} 0 0 0 {30000 + n}")
+            out.append(f"VmRSS:\t  {120000 + n * 512} kB")
+            out.append(f"Pss:   {90000 + n * 256} kB")
+        if "dumpsys battery" in text:
+            out += ["Current Battery Service state:", "  AC powered: false", "  USB powered: false"]
+            out += [f"  level: {87 - n // 2}", "  scale: 100", "  voltage: 4012", f"  temperature: {301 + n * 3}"]
+            out += ["##thermal", f"Thermal Status: {1 if n >= 3 else 0}"]
+            out.append(f"Temperature{{mValue={35.0 + n}, mType=0, mName=CPU0, mStatus=0}}")
+            out.append("Temperature{mValue=30.0, mType=0, mName=CPU0, mStatus=0}")
+            out += ["##sys", f"/sys/class/power_supply/battery/current_now {-350000 - n * 1000}"]
+            out.append(f"/sys/class/power_supply/battery/capacity {87 - n // 2}")
+    return "\n".join(out) + "\n"
+
+
+def _shell_output(serial: str, command: List[str], config: Dict[str, Any]) -> Tuple[str, str, int]:
+    text = " ".join(command)
+    words = text.split()
+    if not words:
+        return "", "", 0
+    head = words[0]
+    if "while" in words and "'@@'" in text:
+        return _sampling_loop(serial, text), "", 0
+    if head in ("stat", "find") and config.get("device_root"):
+        args = shlex.split(text)
+        if args[-2:] == ["||", "true"]:
+            out, err, _ = _device_fs(args[:-2], str(config["device_root"]))
+            return out, err, 0
+        return _device_fs(args, str(config["device_root"]))
+    if head == "cat" and len(words) > 1 and words[1] == "/proc/stat":
+        return _proc_stat(0) + "\n", "", 0
+    props = {
+        "ro.product.model": "Pixel Fake",
+        "ro.product.brand": "fake",
+        "ro.build.version.release": "14",
+        "ro.build.version.sdk": "34",
+        "ro.product.cpu.abi": "arm64-v8a",
+        "ro.serialno": serial,
+    }
+    if head == "getprop":
+        if len(words) > 1:
+            return props.get(words[1], "") + "\n", "", 0
+        lines = [f"[{k}]: [{v}]" for k, v in props.items()]
+        lines += [f"[ro.fake.prop{i}]: [value-{i}]" for i in range(int(config["getprop_lines"]))]
+        return "\n".join(lines) + "\n", "", 0
+    if head == "echo":
+        return " ".join(words[1:]) + "\n", "", 0
+    if head == "dumpsys" and len(words) > 1 and words[1] == "battery":
+        return "Current Battery Service state:\n  AC powered: false\n  USB powered: true\n  level: 87\n  temperature: 301\n", "", 0
+    if head == "dumpsys":
+        body = "\n".join(f"  {words[1] if len(words) > 1 else 'dump'} line {i}" for i in range(50))
+        return f"DUMP OF SERVICE {words[1] if len(words) > 1 else ''}:\n{body}\n", "", 0
+    if head == "ip" and len(words) > 1 and words[1] == "route":
+        octet = 10 + (sum(ord(c) for c in serial) % 200)
+        return f"192.168.1.0/24 dev wlan0 proto kernel scope link src 192.168.1.{octet}\n", "", 0
+    if head == "pm" and len(words) > 2 and words[1] == "list" and words[2] == "packages":
+        count = int(config["package_count"])
+        if "-3" in words:
+            count = max(1, count // 4)
+        return "\n".join(f"package:com.fake.app{i}" for i in range(count)) + "\n", "", 0
+    if head == "pm" and len(words) > 1 and words[1] == "path":
+        return f"package:/data/app/{words[-1]}/base.apk\n", "", 0
+    if head == "settings" and len(words) > 2 and words[1] == "list":
+        return "\n".join(f"{words[2]}_key{i}={i}" for i in range(40)) + "\n", "", 0
+    if head == "df":
+        return "Filesystem Size Used Avail Use% Mounted on\n/dev/block/dm-0 100G 40G 60G 40% /data\n", "", 0
+    if head == "ps":
+        return "USER PID PPID VSZ RSS WCHAN ADDR S NAME\n" + "\n".join(
+            f"u0_a{i} {1000 + i} 1 100000 20000 0 0 S com.fake.app{i}" for i in range(30)
+        ) + "\n", "", 0
+    if head == "pidof":
+        return "1001\n", "", 0
+    if head == "sleep" and len(words) > 1:
+        time.sleep(float(words[1]))
+        return "", "", 0
+    if head == "false":
+        return "", "", 1
+    if head == "ls" and len(words) > 1 and words[1].startswith("/nonexistent"):
+        return "", f"ls: {words[1]}: No such file or directory\n", 1
+    if head == "printf" and len(words) > 1:
+        return words[1], "", 0
+    if head == "date":
+        return f"{time.time() + float(config.get('clock_skew', {}).get(serial, 0.0)):.6f}\n", "", 0
+    return "", "", 0
+
+
+_BATCH_BLOCK = re.compile(r'\(\n(.*?)\n\); echo "(\S+) \$\?"; echo "(\S+)" >&2', re.S)
+
+
+def _batch_script(serial: str, script: str, config: Dict[str, Any]) -> Tuple[str, str, int]:
+    # A coalesced `adb shell` from adbw.batch: run each framed command and
+    # echo its markers the way sh would.
+    out: List[str] = []
+    err: List[str] = []
+    for command, out_marker, err_marker in _BATCH_BLOCK.findall(script):
+        stdout, stderr, status = _shell_output(serial, command.split(), config)
+        out.append(f"{stdout}{out_marker} {status}\n")
+        err.append(f"{stderr}{err_marker}\n")
+    return "".join(out), "".join(err), 0
+
+
+def _interactive_shell(serial: str, config: Dict[str, Any]) -> Tuple[str, str, int]:
+    # `adb shell` with commands on stdin (no pty), as driven by adbw.session.
+    status = 0
+    for line in sys.stdin:
+        text = line.strip()
+        m = re.fullmatch(r'echo "(\S+) \$\?"', text)
+        if m:
+            sys.stdout.write(f"{m.group(1)} {status}\n")
+        elif text == "exit":
+            break
+        else:
+            out, err, status = _shell_output(serial, text.split(), config)
+            sys.stdout.write(out + err)
+        sys.stdout.flush()
+    return "", "", 0
+
+
+def _connected_file() -> str:
+    # Endpoints joined with `adb connect` persist across fake invocations
+    # next to the config, like the real adb server's transport list.
+    return os.path.join(os.path.dirname(os.environ.get(CONFIG_ENV, "")) or ".", "fake_adb_connected.json")
+
+
+def connected_endpoints() -> List[str]:
+    try:
+        with open(_connected_file(), "r", encoding="utf-8") as f:
+            return list(json.load(f))
+    except (OSError, ValueError):
+        return []
+
+
+def set_connected_endpoints(endpoints: List[str]) -> None:
+    with open(_connected_file(), "w", encoding="utf-8") as f:
+        json.dump(sorted(set(endpoints)), f)
+
+
+def _wifi_command(kind: str, target: str, config: Dict[str, Any]) -> Tuple[str, str, int]:
+    reachable = list(config.get("wifi_endpoints") or [])
+    if not reachable or kind == "pair":
+        return f"{kind}ed to {target}\n", "", 0
+    connected = connected_endpoints()
+    if kind == "disconnect":
+        set_connected_endpoints([e for e in connected if target and e != target])
+        return f"disconnected {target or 'everything'}\n", "", 0
+    if target not in reachable:
+        return f"failed to connect to '{target}': Connection refused\n", "", 1
+    if target in connected:
+        return f"already connected to {target}\n", "", 0
+    set_connected_endpoints(connected + [target])
+    return f"connected to {target}\n", "", 0
+
+
+def _forwards_file(serial: str) -> str:
+    # One file per device so parallel fake invocations never share one.
+    directory = os.path.dirname(os.environ.get(CONFIG_ENV, "")) or "."
+    return os.path.join(directory, f"fake_adb_forwards_{serial}.json")
+
+
+def load_forwards(serial: str) -> Dict[str, Any]:
+    # {"forward": {source: target}, "reverse": {source: target}, "mutations": [...]}
+    try:
+        with open(_forwards_file(serial), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"forward": {}, "reverse": {}, "mutations": []}
+
+
+def _forward_command(kind: str, serial: str, serials: List[str], args: List[str]) -> Tuple[str, str, int]:
+    state = load_forwards(serial)
+    rules = state[kind]
+    if args == ["--list"]:
+        if kind == "forward":
+            # The host lists forwards of every device.
+            lines = [f"{s} {src} {dst}" for s in serials for src, dst in load_forwards(s)["forward"].items()]
+        else:
+            lines = [f"UsbFfs {src} {dst}" for src, dst in rules.items()]
+        return "".join(f"{line}\n" for line in lines), "", 0
+    if args == ["--remove-all"]:
+        rules.clear()
+    elif len(args) == 2 and args[0] == "--remove":
+        if args[1] not in rules:
+            return "", f"adb: error: listener '{args[1]}' not found\n", 1
+        rules.pop(args[1])
+    elif len(args) == 2:
+        rules[args[0]] = args[1]
+    else:
+        return "", f"fake adb: unsupported {kind} arguments: {' '.join(args)}\n", 1
+    state["mutations"].append(" ".join([kind] + args))
+    with open(_forwards_file(serial), "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    return "", "", 0
+
+
+def bugreport_text(serial: str) -> str:
+    # Minimal dumpstate layout: framed sections with duration footers and
+    # per-service headers inside DUMPSYS.
+    return (
+        "========================================================\n"
+        f"== dumpstate: 2024-01-01 00:00:00 ({serial})\n"
+        "========================================================\n"
+        "------ SYSTEM LOG (logcat -v threadtime -d *:v) ------\n"
+        + "".join(f"01-01 00:00:{i % 60:02d}.000  100  100 I ExampleTag: line {i}\n" for i in range(50))
+        + "------ 0.050s was the duration of 'SYSTEM LOG' ------\n"
+        "------ DUMPSYS MEMINFO (/system/bin/dumpsys -T 30000 meminfo -a) ------\n"
+        "Applications Memory Usage (in Kilobytes):\n"
+        "Total RAM: 3,000,000K\n"
+        "------ 0.200s was the duration of 'DUMPSYS MEMINFO' ------\n"
+        "------ DUMPSYS (/system/bin/dumpsys) ------\n"
+        "DUMP OF SERVICE activity:\n"
+        "ACTIVITY MANAGER STATE\n"
+        "DUMP OF SERVICE CRITICAL battery:\n"
+        "Current Battery Service state:\n"
+        "  level: 80\n"
+        "------ 1.000s was the duration of 'DUMPSYS' ------\n"
+    )
+
+
+def _write_bugreport(path: str, serial: str, compression: int = zipfile.ZIP_DEFLATED) -> None:
+    entry = f"bugreport-{serial}-2024-01-01-00-00-00.txt"
+    with zipfile.ZipFile(path, "w", compression) as archive:
+        archive.writestr("main_entry.txt", entry)
+        archive.writestr("version.txt", "2.0")
+        archive.writestr(entry, bugreport_text(serial))
+
+
+def _device_path(root: str, path: str) -> str:
+    return os.path.join(root, path.lstrip("/"))
+
+
+def _device_fs(words: List[str], root: str) -> Tuple[str, str, int]:
+    # `stat -c %F PATH` and `find PATH -type f -exec stat -c %s {} +` against
+    # a local directory standing in for the device's storage.
+    local = _device_path(root, words[-1] if words[0] == "stat" else words[1])
+    if not os.path.exists(local):
+        return "", f"{words[0]}: No such file or directory\n", 1
+    if words[0] == "stat":
+        return ("directory" if os.path.isdir(local) else "regular file") + "\n", "", 0
+    files = [local] if os.path.isfile(local) else [os.path.join(d, f) for d, _, fs in os.walk(local) for f in fs]
+    return "".join(f"{os.path.getsize(f)}\n" for f in files), "", 0
+
+
+def _copy_slowly(src: str, dst: str, size: int, kbps: float) -> int:
+    # Writes `src` (or `size` zero bytes) to `dst` in small flushed chunks at
+    # roughly `kbps`, so observers see the file grow.
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    data = b"\0" * size
+    if src and os.path.isfile(src):
+        with open(src, "rb") as f:
+            data = f.read()
+    chunk = max(1, int(kbps * 1024 / 20)) if kbps else len(data) or 1
+    with open(dst, "wb") as f:
+        for i in range(0, len(data), chunk):
+            f.write(data[i : i + chunk])
+            f.flush()
+            if kbps:
+                time.sleep(0.05)
+    return len(data)
+
+
+def _transfer_summary(path: str, verb: str, size: int, seconds: float) -> str:
+    rate = size / max(seconds, 1e-6) / (1024 * 1024)
+    return f"{path}: 1 file {verb}, 0 skipped. {rate:.1f} MB/s ({size} bytes in {seconds:.3f}s)\n"
+
+
+def handle(argv: List[str], config: Dict[str, Any], rng: random.Random) -> Tuple[str, str, int]:
+    args = list(argv)
+    serial: Optional[str] = None
+    transport: Optional[int] = None
+    if len(args) >= 2 and args[0] in ("-s", "-t"):
+        if args[0] == "-s":
+            serial = args[1]
+        else:
+            transport = int(args[1]) if args[1].isdigit() else 0
+        args = args[2:]
+    serials = device_serials(config)
+    if config.get("wifi_endpoints"):
+        serials += connected_endpoints()
+    kind = command_kind(args)
+
+    latency = config.get("latency_by_kind", {}).get(kind, config["latency_ms"])
+    if latency:
+        time.sleep(float(latency) / 1000.0)
+
+    if kind in ("start-server", "kill-server"):
+        return "", "", 0
+    if kind == "version":
+        return "Android Debug Bridge version 1.0.41\nVersion 35.0.0-fake\n", "", 0
+    if kind == "devices":
+        lines = ["List of devices attached"]
+        for i, s in enumerate(serials, start=1):
+            state = "offline" if s in config["offline"] else "device"
+            if "-l" in args:
+                lines.append(f"{s}\t{state} usb:1-{i} product:fake model:Pixel_Fake device:fake transport_id:{i}")
+            else:
+                lines.append(f"{s}\t{state}")
+        return "\n".join(lines) + "\n\n", "", 0
+    if kind == "track-devices":
+        body = "".join(f"{s}\t{'offline' if s in config['offline'] else 'device'}\n" for s in serials)
+        sys.stdout.write(f"{len(body.encode('utf-8')):04x}{body}")
+        sys.stdout.flush()
+        time.sleep(float(config["track_hold_sec"]))
+        return "", "", 0
+    if kind == "mdns":
+        lines = ["List of discovered mdns services"] + list(config.get("mdns_services") or [])
+        return "\n".join(lines) + "\n", "", 0
+    if kind in ("connect", "disconnect", "pair"):
+        return _wifi_command(kind, args[1] if len(args) > 1 else "", config)
+
+    if transport is not None:
+        if not 0 < transport <= len(serials):
+            return "", f"adb: no device with transport id '{transport}'\n", 1
+        serial = serials[transport - 1]
+    elif serial is not None and serials.count(serial) > 1:
+        return "", "adb: more than one device/emulator\n", 1
+    if serial is None:
+        if not serials:
+            return "", "adb: no devices/emulators found\n", 1
+        if len(serials) > 1:
+            return "", "adb: more than one device/emulator\n", 1
+        serial = serials[0]
+    if serial not in serials:
+        return "", f"adb: device '{serial}' not found\n", 1
+    if serial in config["offline"]:
+        return "", "adb: device offline\n", 1
+
+    if config["transient_rate"] and rng.random() < float(config["transient_rate"]):
+        return "", "error: device offline\n", 1
+    if config["failure_rate"] and rng.random() < float(config["failure_rate"]):
+        return "", "error: injected failure\n", 1
+
+    if kind == "get-state":
+        return "device\n", "", 0
+    if kind == "get-serialno":
+        return f"{serial}\n", "", 0
+    if kind == "get-devpath":
+        return f"usb:1-{transport or serials.index(serial) + 1}\n", "", 0
+    if args == ["shell"]:
+        return _interactive_shell(serial, config)
+    if args[0] == "shell" and len(args) == 2 and _BATCH_BLOCK.search(args[1]):
+        return _batch_script(serial, args[1], config)
+    if args[0] == "shell":
+        return _shell_output(serial, args[1:], config)
+    if kind == "logcat":
+        if "-c" in args:
+            return "", "", 0
+        skew = float(config.get("clock_skew", {}).get(serial, 0.0))
+        lines = logcat_lines(serial, int(config["logcat_lines"]), int(config["line_bytes"]), skew=skew)
+        text = "--------- beginning of main\n" + "\n".join(lines) + "\n"
+        follow_ms = float(config.get("logcat_follow_ms", 0.0))
+        if not follow_ms or "-d" in args:
+            return text, "", 0
+        # Like a real `adb logcat`: keep printing new lines until killed.
+        sys.stdout.write(text)
+        n = int(config["logcat_lines"])
+        while True:
+            sys.stdout.write(logcat_lines(serial, 1, int(config["line_bytes"]), start=n, skew=skew)[0] + "\n")
+            sys.stdout.flush()
+            n += 1
+            time.sleep(follow_ms / 1000.0)
+    if kind in ("install", "install-multiple"):
+        return "Performing Streamed Install\nSuccess\n", "", 0
+    if kind == "push" and config.get("device_root"):
+        dst = _device_path(str(config["device_root"]), args[2])
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(args[1]))
+        started = time.perf_counter()
+        size = _copy_slowly(args[1], dst, 0, float(config["transfer_kbps"]))
+        return _transfer_summary(args[1], "pushed", size, time.perf_counter() - started), "", 0
+    if kind == "push":
+        return f"{args[1]}: 1 file pushed, 0 skipped. 25.0 MB/s (1024 bytes in 0.001s)\n", "", 0
+    if kind == "pull":
+        dst = args[2] if len(args) > 2 else "."
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(args[1]))
+        src = _device_path(str(config["device_root"]), args[1]) if config.get("device_root") else ""
+        started = time.perf_counter()
+        size = _copy_slowly(src, dst, int(config["pull_bytes"]), float(config["transfer_kbps"]))
+        return _transfer_summary(args[1], "pulled", size, time.perf_counter() - started), "", 0
+    if kind == "bugreport":
+        out_dir = args[1] if len(args) > 1 else "."
+        _write_bugreport(os.path.join(out_dir, f"bugreport-{serial}.zip"), serial)
+        return "", "", 0
+    if kind in ("forward", "reverse"):
+        return _forward_command(kind, serial, serials, args[1:])
+    if kind in ("tcpip", "reboot", "uninstall"):
+        return "", "", 0
+    return "", f"fake adb: unsupported command: {' '.join(args)}\n", 1
+
+
+def main(argv: List[str]) -> int:
+    config = load_config()
+    seed = config.get("seed")
+    rng = random.Random(None if seed is None else f"{seed}:{' '.join(argv)}:{os.getpid()}")
+    stdout, stderr, code = handle(argv, config, rng)
+    if stdout:
+        sys.stdout.write(stdout)
+    if stderr:
+        sys.stderr.write(stderr)
+    return code
+
+
+def write_fake_adb(directory: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Write a config file and an executable `adb` wrapper into `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    merged = dict(DEFAULT_CONFIG)
+    merged.update(config or {})
+    config_path = os.path.join(directory, "fake_adb_config.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2)
+    script = os.path.abspath(__file__)
+    if os.name == "nt":
+        path = os.path.join(directory, "adb.cmd")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'@echo off\r\nset {CONFIG_ENV}={config_path}\r\n"{sys.executable}" "{script}" %*\r\n')
+        return path
+    path = os.path.join(directory, "adb")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'#!/bin/sh\n{CONFIG_ENV}="{config_path}" exec "{sys.executable}" "{script}" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("client closed connection")
+        data += chunk
+    return data
+
+
+def _encode(message: str) -> bytes:
+    payload = message.encode("utf-8")
+    return f"{len(payload):04x}".encode("ascii") + payload
+
+
+class _AdbRequestHandler(socketserver.BaseRequestHandler):
+    server: "FakeAdbServer"
+
+    def handle(self) -> None:
+        sock = self.request
+        transport: Optional[str] = None
+        try:
+            while True:
+                length = int(_recv_exact(sock, 4).decode("ascii"), 16)
+                service = _recv_exact(sock, length).decode("utf-8")
+                if not self._dispatch(sock, service, transport):
+                    return
+                if service.startswith("host:transport"):
+                    transport = self.server.resolve_transport(service)
+        except (ConnectionError, ValueError, OSError):
+            return
+
+    def _dispatch(self, sock: socket.socket, service: str, transport: Optional[str]) -> bool:
+        fake = self.server
+        fake.requests.append(service)
+        if fake.latency_ms:
+            time.sleep(fake.latency_ms / 1000.0)
+        if service == "host:version":
+            sock.sendall(b"OKAY" + _encode("0029"))
+            return False
+        if service in ("host:devices", "host:devices-l"):
+            stdout, _, _ = handle(["devices", "-l"] if service.endswith("-l") else ["devices"], fake.config, fake.rng)
+            body = "\n".join(stdout.splitlines()[1:]).strip() + "\n"
+            sock.sendall(b"OKAY" + _encode(body))
+            return False
+        if service == "host:track-devices":
+            stdout, _, _ = handle(["devices"], fake.config, fake.rng)
+            body = "\n".join(stdout.splitlines()[1:]).strip() + "\n"
+            sock.sendall(b"OKAY" + _encode(body))
+            fake.wait_closed()
+            return False
+        if service.startswith("host:transport"):
+            if fake.resolve_transport(service) is None:
+                sock.sendall(b"FAIL" + _encode("device not found"))
+                return False
+            sock.sendall(b"OKAY")
+            return True
+        if service.startswith("shell:") and transport:
+            stdout, stderr, _ = _shell_output(transport, service[len("shell:"):].split(), fake.config)
+            sock.sendall(b"OKAY" + (stdout + stderr).encode("utf-8"))
+            return False
+        sock.sendall(b"FAIL" + _encode(f"unsupported service: {service}"))
+        return False
+
+
+class FakeAdbServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Minimal adb host server: host:version, host:devices[-l], host:track-devices,
+    host:transport[-any]:<serial> and shell:<cmd>."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, latency_ms: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", 0), _AdbRequestHandler)
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update(config or {})
+        self.latency_ms = latency_ms
+        self.rng = random.Random(self.config.get("seed"))
+        self.requests: List[str] = []
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return int(self.server_address[1])
+
+    def resolve_transport(self, service: str) -> Optional[str]:
+        serials = [s for s in device_serials(self.config) if s not in self.config["offline"]]
+        if service == "host:transport-any":
+            return serials[0] if serials else None
+        serial = service.split(":", 2)[2] if service.count(":") >= 2 else ""
+        return serial if serial in serials else None
+
+    def wait_closed(self) -> None:
+        self._closed.wait()
+
+    def start(self) -> "FakeAdbServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._closed.set()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeAdbServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -3,7 +3,7 @@ import tempfile
 import unittest
 
 from adbw import config
-from adbw.adb import command_failure_suggestion, is_transient_adb_failure
+from adbw.adb import command_failure_suggestion, command_kind, command_serial, is_transient_adb_failure
 from adbw.config import Settings, load_settings, save_settings
 
 
@@ -18,6 +18,15 @@ class TestAdbHelpers(unittest.TestCase):
         self.assertIn("connect a device", command_failure_suggestion("", "no devices/emulators found"))
         self.assertIn("verify the source/destination path", command_failure_suggestion("", "failed to stat"))
 
+    def test_command_kind_and_serial(self) -> None:
+        self.assertEqual(command_kind(["/opt/adb", "-s", "X1", "shell", "getprop", "ro.x"]), "getprop")
+        self.assertEqual(command_kind(["adb", "-s", "X1", "shell", "dumpsys battery"]), "dumpsys")
+        self.assertEqual(command_kind(["adb", "-s", "X1", "install", "-r", "a.apk"]), "install")
+        self.assertEqual(command_kind(["adb", "devices", "-l"]), "devices")
+        self.assertEqual(command_kind(["aapt", "dump", "badging"]), "aapt")
+        self.assertEqual(command_serial(["adb", "-s", "X1", "push", "a", "b"]), "X1")
+        self.assertEqual(command_serial(["adb", "devices"]), "")
+
 
 class TestSettingsRoundTrip(unittest.TestCase):
     def test_save_and_load_settings(self) -> None:
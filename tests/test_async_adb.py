@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from adbw.adb import adb_cmd, async_run, async_run_many, async_run_streaming, set_runtime_options
+from adbw.api import async_device_summary, async_package_info, async_run_json_command, run_json_command
+from adbw.config import Settings
+from adbw.errors import AdbWizardError
+from fake_adb import write_fake_adb
+
+
+class TestAsyncRun(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        set_runtime_options(Settings(adb_retry_count=1))
+
+    def tearDown(self) -> None:
+        set_runtime_options(Settings())
+        self.tmpdir.cleanup()
+
+    def test_fleet_commands_share_one_loop(self) -> None:
+        adb_path = write_fake_adb(self.tmpdir.name, {"devices": 8, "latency_ms": 300})
+        cmds = [adb_cmd(adb_path, f"FAKE{i:04d}", "shell", "echo", str(i)) for i in range(8)]
+        started = time.perf_counter()
+        results = asyncio.run(async_run_many(cmds))
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertEqual([r.stdout.strip() for r in results], [str(i) for i in range(8)])
+
+    def test_failures_and_handlers(self) -> None:
+        adb_path = write_fake_adb(self.tmpdir.name, {"devices": 1, "transient_rate": 1.0})
+        with self.assertRaises(AdbWizardError):
+            asyncio.run(async_run(adb_cmd(adb_path, "FAKE0000", "shell", "echo", "hi")))
+        adb_path = write_fake_adb(self.tmpdir.name, {"devices": 1})
+        summary = asyncio.run(async_device_summary(adb_path, "FAKE0000"))["summary"]
+        self.assertEqual(summary["model"], "Pixel Fake")
+        info = asyncio.run(async_package_info(adb_path, "FAKE0000", {"package": "com.fake.app1"}))
+        self.assertEqual(info["paths"], ["package:/data/app/com.fake.app1/base.apk"])
+
+    def test_json_dispatch_matches_the_blocking_one(self) -> None:
+        adb_path = write_fake_adb(self.tmpdir.name, {"devices": 1})
+        calls = [
+            ("shell.run", "FAKE0000", "command=echo hi"),
+            ("package.info", None, "package=com.fake.app1"),
+            ("devices.list", None, None),
+        ]
+        with mock.patch("adbw.api.ensure_adb", return_value=adb_path):
+            for cmd, serial, params in calls:
+                expected = run_json_command(cmd, serial, params)
+                self.assertEqual(asyncio.run(async_run_json_command(cmd, serial, params)), expected)
+            for cmd in ("no.such", "logcat.stream"):
+                with self.assertRaises(AdbWizardError):
+                    asyncio.run(async_run_json_command(cmd, None, None))
+
+    @unittest.skipIf(os.name == "nt", "uses a POSIX shell")
+    def test_cancellation_kills_child(self) -> None:
+        pid_file = os.path.join(self.tmpdir.name, "child.pid")
+        script = f"echo $$ > {pid_file}; exec sleep 30"
+
+        async def scenario() -> None:
+            task = asyncio.ensure_future(async_run_streaming(["sh", "-c", script], on_line=lambda line: None))
+            for _ in range(100):
+                await asyncio.sleep(0.05)
+                if os.path.exists(pid_file) and os.path.getsize(pid_file):
+                    break
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        with open(pid_file, encoding="utf-8") as f:
+            pid = int(f.read().strip())
+        with self.assertRaises(OSError):
+            os.kill(pid, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from adbw import advanced, batch
+from adbw.batch import ShellBatch, run_shell_batch
+from adbw.devices import get_device_summary_data
+from adbw.errors import AdbWizardError
+from fake_adb import write_fake_adb
+
+SERIAL = "FAKE0000"
+
+
+class TestShellBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.adb_path = write_fake_adb(self.tmp.name, {"devices": 1})
+
+    def test_commands_share_one_invocation_and_keep_their_results(self) -> None:
+        lines = []
+        with mock.patch.object(batch, "run_capture", wraps=batch.run_capture) as capture:
+            with ShellBatch(self.adb_path, SERIAL) as b:
+                model = b.submit("getprop ro.product.model")
+                missing = b.submit("ls /nonexistent")
+                partial = b.submit("printf no-newline")
+                streamed = b.submit("dumpsys battery", sink=lines.append)
+                failed = b.submit("false")
+            self.assertEqual(b.invocations, 1)
+            self.assertEqual(capture.call_count, 1)
+        self.assertEqual((model.result().stdout, model.result().returncode), ("Pixel Fake\n", 0))
+        self.assertEqual(missing.result().returncode, 1)
+        self.assertEqual(missing.result().stdout, "")
+        self.assertIn("No such file or directory", missing.result().stderr)
+        self.assertEqual(model.result().stderr, "")
+        self.assertEqual(partial.result().stdout, "no-newline")
+        self.assertEqual(streamed.result().stdout, "")
+        self.assertIn("  level: 87\n", lines)
+        self.assertEqual(failed.result().returncode, 1)
+        self.assertEqual(model.result().args[-1], "getprop ro.product.model")
+
+    def test_result_flushes_pending_and_long_batches_are_split(self) -> None:
+        b = ShellBatch(self.adb_path, SERIAL)
+        future = b.submit("echo hello")
+        self.assertEqual(future.result().stdout, "hello\n")
+        with mock.patch.object(batch, "MAX_SCRIPT_CHARS", 100):
+            results = run_shell_batch(self.adb_path, SERIAL, [f"echo {i}" for i in range(10)])
+        self.assertEqual([r.stdout for r in results], [f"{i}\n" for i in range(10)])
+
+    def test_checked_commands_raise(self) -> None:
+        with ShellBatch(self.adb_path, SERIAL) as b:
+            checked = b.submit("false", check=True)
+            unchecked = b.submit("false")
+        with self.assertRaises(AdbWizardError):
+            checked.result()
+        self.assertEqual(unchecked.result().returncode, 1)
+
+        offline = run_shell_batch(self.adb_path, "NOPE", ["echo a", "echo b"])
+        self.assertEqual([r.returncode for r in offline], [1, 1])
+        self.assertIn("not found", offline[0].stderr)
+
+    def test_ported_collectors(self) -> None:
+        summary = get_device_summary_data(self.adb_path, SERIAL)
+        self.assertEqual((summary["model"], summary["api_level"], summary["battery_level"]), ("Pixel Fake", "34", "87"))
+        self.assertTrue(summary["ip"].startswith("192.168.1."))
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            with mock.patch("builtins.print"):
+                advanced.export_health_report(self.adb_path, SERIAL)
+            (json_path,) = [p for p in os.listdir(".") if p.startswith("health_report_") and p.endswith(".json")]
+            with open(json_path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+            with open(json_path[:-5] + ".txt", "r", encoding="utf-8") as f:
+                text = f.read()
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(report["getprop_model"], "Pixel Fake")
+        self.assertEqual(report["api_level"], "34")
+        self.assertIn("level: 87", report["battery"])
+        self.assertIn("dev wlan0", report["ip_route"])
+        self.assertEqual(list(report)[:2], ["serial", "timestamp"])
+        self.assertIn("## api_level\n34\n\n## storage_df\nFilesystem", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
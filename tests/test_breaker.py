@@ -0,0 +1,59 @@
+import random
+import tempfile
+import time
+import unittest
+
+from adbw import adb
+from adbw.adb import CIRCUIT_OPEN_RETURNCODE, DEVICE_BREAKER, adb_cmd, run, set_runtime_options
+from adbw.breaker import CircuitBreaker, backoff_delay
+from adbw.config import Settings
+from adbw.devices import list_devices
+from fake_adb import write_fake_adb
+
+
+class TestBackoff(unittest.TestCase):
+    def test_backoff_is_jittered_and_capped(self) -> None:
+        rng = random.Random(1)
+        delays = [backoff_delay(attempt, 0.5, 4.0, rng) for attempt in range(1, 10)]
+        self.assertTrue(all(0.0 <= d <= 4.0 for d in delays))
+        self.assertLessEqual(backoff_delay(1, 0.5, 4.0, rng), 0.5)
+        self.assertGreater(len(set(delays)), 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold_and_half_opens(self) -> None:
+        breaker = CircuitBreaker(threshold=2, cooldown_sec=0.05)
+        self.assertFalse(breaker.record_failure("A"))
+        self.assertTrue(breaker.record_failure("A"))
+        self.assertFalse(breaker.allow("A"))
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow("A"))
+        self.assertFalse(breaker.allow("A"))
+        breaker.record_success("A")
+        self.assertEqual(breaker.state("A"), "closed")
+
+    def test_run_fails_fast_and_tracker_state_closes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            adb_path = write_fake_adb(tmpdir, {"devices": 1, "transient_rate": 1.0})
+            set_runtime_options(
+                Settings(adb_retry_count=5, adb_retry_backoff_base_sec=0.0, circuit_breaker_threshold=2)
+            )
+            try:
+                first = run(adb_cmd(adb_path, "FAKE0000", "shell", "echo", "hi"), check=False)
+                second = run(adb_cmd(adb_path, "FAKE0000", "shell", "echo", "hi"), check=False)
+                started = time.perf_counter()
+                rejected = run(adb_cmd(adb_path, "FAKE0000", "shell", "echo", "hi"), check=False)
+                self.assertLess(time.perf_counter() - started, 0.05)
+                self.assertEqual(first.returncode, 1)
+                self.assertEqual(second.returncode, 1)
+                self.assertEqual(rejected.returncode, CIRCUIT_OPEN_RETURNCODE)
+                list_devices(adb_path)
+                self.assertEqual(DEVICE_BREAKER.state("FAKE0000"), "closed")
+            finally:
+                set_runtime_options(Settings())
+                DEVICE_BREAKER.reset("FAKE0000")
+        self.assertEqual(adb.RUNTIME_BACKOFF_BASE_SEC, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import time
+import unittest
+import zipfile
+from unittest import mock
+
+from adbw import actions, bugreport
+from adbw.bugreport import BugreportReader
+from fake_adb import _write_bugreport, bugreport_text, write_fake_adb
+
+SERIAL = "FAKE0000"
+
+
+class TestBugreportReader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _zip(self, compression: int) -> str:
+        path = os.path.join(self.tmp.name, f"bugreport-{compression}.zip")
+        _write_bugreport(path, SERIAL, compression)
+        return path
+
+    def test_sections_from_stored_entry_are_mapped_in_place(self) -> None:
+        path = self._zip(zipfile.ZIP_STORED)
+        with BugreportReader(path) as reader:
+            titles = [s.title for s in reader.sections()]
+            self.assertEqual(
+                titles,
+                ["SYSTEM LOG", "DUMPSYS MEMINFO", "DUMPSYS", "DUMP OF SERVICE activity", "DUMP OF SERVICE battery"],
+            )
+            self.assertEqual(reader.find("SYSTEM LOG")[0].command, "logcat -v threadtime -d *:v")
+            meminfo = reader.section_text("dumpsys meminfo")
+            self.assertEqual(meminfo, "Applications Memory Usage (in Kilobytes):\nTotal RAM: 3,000,000K\n")
+            battery = reader.section_text("DUMP OF SERVICE battery")
+            self.assertEqual(battery, "Current Battery Service state:\n  level: 80\n")
+            self.assertEqual(reader.section_text("SYSTEM LOG").count("\n"), 50)
+        self.assertFalse(os.path.exists(f"{path}.txt"))
+
+    def test_deflated_entry_is_inflated_once_and_index_reused(self) -> None:
+        path = self._zip(zipfile.ZIP_DEFLATED)
+        with BugreportReader(path) as reader:
+            self.assertIn("level: 80", reader.section_text("DUMP OF SERVICE battery"))
+        with open(f"{path}.txt", "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), bugreport_text(SERIAL))
+        cached_mtime = os.path.getmtime(f"{path}.txt")
+
+        with mock.patch.object(bugreport, "index_sections", side_effect=AssertionError("rescanned")):
+            with BugreportReader(path) as reader:
+                self.assertEqual(len(reader.sections()), 5)
+                self.assertIn("Total RAM", reader.section_text("DUMPSYS MEMINFO"))
+        self.assertEqual(os.path.getmtime(f"{path}.txt"), cached_mtime)
+
+        # A replaced zip invalidates the saved index.
+        time.sleep(0.01)
+        _write_bugreport(path, "OTHER", zipfile.ZIP_STORED)
+        with BugreportReader(path) as reader:
+            self.assertEqual(len(reader.sections()), 5)
+
+
+class TestBugreportBundle(unittest.TestCase):
+    def test_logcat_runs_alongside_bugreport(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            adb_path = write_fake_adb(
+                tmp, {"devices": 1, "logcat_lines": 10, "latency_by_kind": {"bugreport": 800, "logcat": 800}}
+            )
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                started = time.perf_counter()
+                with mock.patch("builtins.print"):
+                    actions.collect_bugreport_bundle(adb_path, SERIAL)
+                elapsed = time.perf_counter() - started
+                (bundle,) = [d for d in os.listdir(tmp) if d.startswith("adb_bundle_")]
+                self.assertTrue(os.path.getsize(os.path.join(bundle, "logcat.txt")) > 0)
+                with BugreportReader(os.path.join(bundle, f"bugreport-{SERIAL}.zip")) as reader:
+                    self.assertIn("Total RAM", reader.section_text("DUMPSYS MEMINFO"))
+            finally:
+                os.chdir(cwd)
+        self.assertLess(elapsed, 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from adbw import advanced
+from adbw.adb import adb_cmd, run, run_capture, set_runtime_options
+from adbw.config import Settings
+from fake_adb import write_fake_adb
+
+
+class TestRunCapture(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.adb_path = write_fake_adb(self.tmpdir.name, {"devices": 1, "logcat_lines": 3000})
+        self.old_cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        os.chdir(self.old_cwd)
+        set_runtime_options(Settings())
+        self.tmpdir.cleanup()
+
+    def test_capture_matches_buffered_run(self) -> None:
+        cmd = adb_cmd(self.adb_path, "FAKE0000", "shell", "getprop")
+        expected = run(cmd).stdout
+        sink = io.StringIO()
+        result = run_capture(cmd, sink)
+        self.assertEqual(sink.getvalue(), expected)
+        self.assertEqual(result.line_count, expected.count("\n"))
+        self.assertEqual(result.sha256, hashlib.sha256(expected.encode("utf-8")).hexdigest())
+
+    def test_binary_capture_and_transform(self) -> None:
+        cmd = adb_cmd(self.adb_path, "FAKE0000", "logcat", "-d")
+        chunks = []
+        result = run_capture(cmd, chunks.append, binary=True)
+        self.assertEqual(sum(len(c) for c in chunks), result.bytes_read)
+        self.assertTrue(all(isinstance(c, bytes) for c in chunks))
+        out = io.StringIO()
+        run_capture(cmd, out, transform=lambda text: text.replace("FAKE0000", "[S]"))
+        self.assertNotIn("FAKE0000", out.getvalue())
+        self.assertEqual(out.getvalue().count("\n"), result.line_count)
+
+    def test_streamed_exports_are_valid_json(self) -> None:
+        advanced.export_health_report(self.adb_path, "FAKE0000")
+        advanced.snapshot_device_state(self.adb_path, "FAKE0000")
+        health = [f for f in os.listdir(".") if f.startswith("health_report_") and f.endswith(".json")][0]
+        snapshot = [f for f in os.listdir(".") if f.startswith("device_snapshot_")][0]
+        with open(health, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(data["getprop_model"], "Pixel Fake")
+        self.assertIn("level: 87", data["battery"])
+        self.assertIn("[REDACTED_IP]", data["ip_route"])
+        with open(snapshot, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(list(data)[:3], ["serial", "timestamp", "packages_all"])
+        self.assertIn("package:com.fake.app1\n", data["packages_all"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from adbw.adb import (
+    CIRCUIT_OPEN_RETURNCODE,
+    DEVICE_BREAKER,
+    adb_cmd,
+    command_serial,
+    note_transports,
+    run,
+    set_runtime_options,
+    target_filename,
+    transport_target,
+)
+from adbw.api import run_json_command
+from adbw.config import Settings
+from adbw.devices import Device, DeviceRegistry, list_devices, parse_device_line, pick_device
+from adbw.errors import AdbWizardError
+from fake_adb import write_fake_adb
+
+
+class TestDeviceRecord(unittest.TestCase):
+    def test_devices_l_fields_are_parsed(self) -> None:
+        d = parse_device_line("R58M123  device usb:1-1.2 product:beyond1 model:SM_G973F device:beyond1 transport_id:7")
+        self.assertEqual((d.serial, d.state, d.model, d.device), ("R58M123", "device", "SM_G973F", "beyond1"))
+        self.assertEqual((d.product, d.transport_id, d.extra, d.target), ("beyond1", "7", "usb:1-1.2", "R58M123"))
+        self.assertEqual(d.description, "usb:1-1.2 product:beyond1 model:SM_G973F device:beyond1 transport_id:7")
+        self.assertFalse(hasattr(d, "__dict__"))
+        self.assertEqual(parse_device_line("emulator-5554 offline"), Device("emulator-5554", "offline"))
+
+    def test_transport_targets_become_dash_t(self) -> None:
+        self.assertEqual(adb_cmd("adb", "transport_id:3", "shell", "id"), ["adb", "-t", "3", "shell", "id"])
+        self.assertEqual(adb_cmd("adb", "10.0.0.5:5555", "shell", "id"), ["adb", "-s", "10.0.0.5:5555", "shell", "id"])
+        self.assertEqual(command_serial(["adb", "-t", "42", "push", "a", "b"]), "transport_id:42")
+        self.assertEqual(target_filename("transport_id:3"), "transport_id_3")
+        self.assertEqual(target_filename("10.0.0.5:5555"), "10.0.0.5_5555")
+        with self.assertRaises(AdbWizardError):
+            transport_target("3; reboot")
+
+
+class TestDeviceRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.adb_path = write_fake_adb(self.tmpdir.name, {"serials": ["CLONE", "UNIQUE1", "CLONE"]})
+        set_runtime_options(Settings(adb_retry_count=1))
+
+    def tearDown(self) -> None:
+        set_runtime_options(Settings())
+        note_transports({})
+        self.tmpdir.cleanup()
+
+    def test_duplicate_serials_are_targeted_by_transport_id(self) -> None:
+        devices = list_devices(self.adb_path)
+        self.assertEqual([d.target for d in devices], ["transport_id:1", "UNIQUE1", "transport_id:3"])
+        self.assertEqual(devices[2].label, "CLONE (transport_id:3)")
+        registry = DeviceRegistry(devices, {"bench": "transport_id:3", "solo": "UNIQUE1"})
+        self.assertIs(registry.get("bench"), devices[2])
+        self.assertIs(registry.get("solo"), devices[1])
+        self.assertIs(registry.get("UNIQUE1"), devices[1])
+        self.assertIsNone(registry.get("CLONE"))
+        self.assertIsNone(registry.get("Pixel_Fake"))
+        self.assertEqual(len(registry.find_model("pixel fake")), 3)
+        with self.assertRaisesRegex(AdbWizardError, "transport_id:1, transport_id:3"):
+            registry.resolve("CLONE")
+        with self.assertRaises(AdbWizardError):
+            registry.resolve("missing")
+        # Each clone is reachable on its own transport; `-s CLONE` is not.
+        paths = [run(adb_cmd(self.adb_path, d.target, "get-devpath")).stdout.strip() for d in devices]
+        self.assertEqual(paths, ["usb:1-1", "usb:1-2", "usb:1-3"])
+        self.assertNotEqual(run(adb_cmd(self.adb_path, "CLONE", "get-devpath"), check=False).returncode, 0)
+
+    def test_transport_ids_share_slots_and_breaker_with_the_serial(self) -> None:
+        list_devices(self.adb_path)
+        # `-t 2` is UNIQUE1; the clones keep a key per transport.
+        self.assertEqual(command_serial(adb_cmd(self.adb_path, "transport_id:2", "shell", "id")), "UNIQUE1")
+        self.assertEqual(command_serial(adb_cmd(self.adb_path, "transport_id:3", "shell", "id")), "transport_id:3")
+        DEVICE_BREAKER.trip("UNIQUE1")
+        try:
+            rejected = run(adb_cmd(self.adb_path, "transport_id:2", "shell", "id"), check=False)
+            self.assertEqual(rejected.returncode, CIRCUIT_OPEN_RETURNCODE)
+        finally:
+            DEVICE_BREAKER.reset("UNIQUE1")
+
+    def test_pick_device_reuses_remembered_device_only_when_unambiguous(self) -> None:
+        devices = list_devices(self.adb_path)
+        self.assertIs(pick_device(devices, preferred_serial="UNIQUE1"), devices[1])
+        with mock.patch("builtins.input", return_value="3"):
+            self.assertIs(pick_device(devices, preferred_serial="CLONE"), devices[2])
+
+    def test_json_mode_resolves_aliases_and_transport_ids(self) -> None:
+        with mock.patch("adbw.api.ensure_adb", return_value=self.adb_path), mock.patch(
+            "adbw.api.load_aliases", return_value={"bench": "transport_id:3"}
+        ):
+            listing = run_json_command("devices.list", None, None)["data"]["devices"]
+            self.assertEqual([d["transport_id"] for d in listing], ["1", "2", "3"])
+            self.assertEqual(listing[0]["model"], "Pixel_Fake")
+            result = run_json_command("shell.run", "bench", '{"command": "echo hi"}')
+            self.assertEqual(result["serial"], "transport_id:3")
+            self.assertEqual(result["data"]["stdout"].strip(), "hi")
+            result = run_json_command("shell.run", "transport_id:1", '{"command": "echo hi"}')
+            self.assertEqual(result["serial"], "transport_id:1")
+            with self.assertRaisesRegex(AdbWizardError, "pick one by transport id"):
+                run_json_command("shell.run", "CLONE", '{"command": "echo hi"}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import socket
+import tempfile
+import time
+import unittest
+
+from adbw.discovery import discover, parse_mdns_services, parse_ports
+from fake_adb import write_fake_adb
+
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self) -> None:
+        # Listening sockets complete TCP handshakes from their backlog, which
+        # is all the probe needs; nothing has to accept().
+        self.listeners = []
+        for _ in range(3):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", 0))
+            sock.listen(16)
+            self.listeners.append(sock)
+        self.ports = [s.getsockname()[1] for s in self.listeners]
+
+    def tearDown(self) -> None:
+        for sock in self.listeners:
+            sock.close()
+
+    def test_parse_helpers(self) -> None:
+        text = (
+            "List of discovered mdns services\n"
+            "adb-R58M-abc\t_adb-tls-connect._tcp\t192.168.1.20:37011\n"
+            "adb-R58M-abc\t_adb-tls-pairing._tcp\t192.168.1.20:40123\n"
+            "adb-emu\t_adb._tcp.\t192.168.1.21:5555\n"
+        )
+        found = parse_mdns_services(text)
+        self.assertEqual([e.endpoint for e in found], ["192.168.1.20:37011", "192.168.1.21:5555"])
+        self.assertEqual(found[0].name, "adb-R58M-abc")
+        self.assertEqual(parse_ports("5555,5560-5562"), [5555, 5560, 5561, 5562])
+
+    def test_scan_and_connect_in_parallel(self) -> None:
+        first, second, third = (f"127.0.0.1:{p}" for p in self.ports)
+        with tempfile.TemporaryDirectory() as tmp:
+            adb_path = write_fake_adb(
+                tmp,
+                {
+                    "devices": 0,
+                    # The third listener answers TCP but is not an adb daemon.
+                    "wifi_endpoints": [first, second],
+                    "mdns_services": [f"adb-lab\t_adb-tls-connect._tcp\t{first}"],
+                },
+            )
+            started = time.perf_counter()
+            report = discover(adb_path, subnet="127.0.0.0/24", ports=",".join(str(p) for p in self.ports))
+            elapsed = time.perf_counter() - started
+        by_endpoint = {e.endpoint: e for e in report.endpoints}
+        self.assertEqual(set(by_endpoint), {first, second, third})
+        self.assertEqual(report.scanned, 254 * 3)
+        self.assertEqual((by_endpoint[first].source, by_endpoint[first].name), ("mdns+scan", "adb-lab"))
+        self.assertTrue(by_endpoint[first].connected and by_endpoint[second].connected)
+        self.assertFalse(by_endpoint[third].connected)
+        self.assertIn("Connection refused", by_endpoint[third].error)
+        self.assertLess(elapsed, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
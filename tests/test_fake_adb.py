@@ -0,0 +1,52 @@
+import socket
+import tempfile
+import unittest
+
+from adbw.adb import adb_cmd, run, set_runtime_options
+from adbw.config import Settings
+from adbw.devices import get_device_summary_data, list_devices
+from adbw.errors import AdbWizardError
+from fake_adb import FakeAdbServer, write_fake_adb
+
+
+class TestFakeAdbExecutable(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        set_runtime_options(Settings(adb_retry_count=1))
+
+    def tearDown(self) -> None:
+        set_runtime_options(Settings())
+        self.tmpdir.cleanup()
+
+    def test_list_devices_and_summary(self) -> None:
+        adb_path = write_fake_adb(self.tmpdir.name, {"devices": 3})
+        devices = list_devices(adb_path)
+        self.assertEqual([d.serial for d in devices], ["FAKE0000", "FAKE0001", "FAKE0002"])
+        summary = get_device_summary_data(adb_path, "FAKE0001")
+        self.assertEqual(summary["model"], "Pixel Fake")
+        self.assertEqual(summary["battery_level"], "87")
+
+    def test_transient_failure_injection(self) -> None:
+        adb_path = write_fake_adb(self.tmpdir.name, {"devices": 1, "transient_rate": 1.0})
+        with self.assertRaises(AdbWizardError) as ctx:
+            run(adb_cmd(adb_path, "FAKE0000", "shell", "echo", "hi"))
+        self.assertIn("device offline", str(ctx.exception))
+
+
+class TestFakeAdbServer(unittest.TestCase):
+    def test_host_devices(self) -> None:
+        with FakeAdbServer({"devices": 2}) as server:
+            with socket.create_connection(("127.0.0.1", server.port)) as sock:
+                sock.sendall(b"000chost:devices")
+                data = b""
+                while True:
+                    chunk = sock.recv(4096)
+                    if not chunk:
+                        break
+                    data += chunk
+        self.assertTrue(data.startswith(b"OKAY"))
+        self.assertIn(b"FAKE0001\tdevice", data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import tempfile
+import threading
+import time
+import unittest
+
+from adbw.farm import DeviceFarm, FarmDevice, FarmJob, Requirements, probe_devices, run_jobs, shell_action
+from fake_adb import write_fake_adb
+
+
+def rack() -> list:
+    return [
+        FarmDevice("A", 30, ["arm64-v8a"], ["rack-a-1"]),
+        FarmDevice("B", 34, ["arm64-v8a", "armeabi-v7a"], ["rack-b-1"]),
+        FarmDevice("C", 34, ["x86_64"], []),
+    ]
+
+
+class TestDeviceFarm(unittest.TestCase):
+    def test_requirements_exclusivity_and_stats(self) -> None:
+        lock = threading.Lock()
+        active = {"A": 0, "B": 0, "C": 0}
+        peak = dict(active)
+
+        def work(serial: str) -> str:
+            with lock:
+                active[serial] += 1
+                peak[serial] = max(peak[serial], active[serial])
+            time.sleep(0.02)
+            with lock:
+                active[serial] -= 1
+            return serial
+
+        jobs = (
+            [FarmJob("x86", work, Requirements(abi="x86_64")) for _ in range(3)]
+            + [FarmJob("rack-b", work, Requirements(alias="rack-b-*")) for _ in range(3)]
+            + [FarmJob("api34", work, Requirements(min_api=34)) for _ in range(6)]
+            + [FarmJob("any", work) for _ in range(6)]
+            + [FarmJob("none", work, Requirements(min_api=99))]
+        )
+        stats = run_jobs(rack(), jobs, poll_sec=0.01)
+        self.assertEqual({j.serial for j in jobs if j.name == "x86"}, {"C"})
+        self.assertEqual({j.serial for j in jobs if j.name == "rack-b"}, {"B"})
+        self.assertTrue({j.serial for j in jobs if j.name == "api34"} <= {"B", "C"})
+        self.assertEqual(jobs[-1].state, "failed")
+        self.assertIn("requirements", jobs[-1].error)
+        self.assertEqual(peak, {"A": 1, "B": 1, "C": 1})
+        self.assertEqual((stats["done"], stats["failed"], stats["jobs"]), (18, 1, 19))
+        self.assertGreater(stats["peak_queue_depth"], 0)
+        self.assertEqual(set(stats["utilisation"]), {"A", "B", "C"})
+        self.assertTrue(all(0 < share <= 1 for share in stats["utilisation"].values()))
+
+    def test_unhealthy_devices_are_skipped_and_failures_retried(self) -> None:
+        healthy = {"A": False, "B": True, "C": True}
+
+        def work(serial: str) -> str:
+            if serial == "C":
+                healthy["C"] = False
+                raise RuntimeError("device offline")
+            time.sleep(0.01)
+            return "ok"
+
+        jobs = [FarmJob(f"job{i}", work) for i in range(6)]
+        stats = run_jobs(rack(), jobs, health=lambda s: healthy[s], poll_sec=0.01)
+        self.assertEqual(stats["done"], 6)
+        self.assertEqual({j.serial for j in jobs}, {"B"})
+        self.assertEqual(stats["jobs_per_device"]["A"], 0)
+        # The job that hit C when it dropped ran again on B.
+        self.assertEqual(sorted(j.attempts for j in jobs)[-1], 2)
+
+    def test_jobs_without_a_healthy_device_fail_after_the_placement_timeout(self) -> None:
+        healthy = {"A": False, "B": False, "C": True}
+        jobs = [FarmJob("arm", lambda s: s, Requirements(abi="arm64-v8a")), FarmJob("x86", lambda s: s)]
+        started = time.monotonic()
+        stats = run_jobs(rack(), jobs, health=lambda s: healthy[s], poll_sec=0.01, placement_timeout_sec=0.2)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual((jobs[0].state, jobs[1].state), ("failed", "done"))
+        self.assertIn("no healthy device", jobs[0].error)
+        self.assertEqual((stats["done"], stats["failed"]), (1, 1))
+
+    def test_idle_device_steals_queued_work(self) -> None:
+        def work(serial: str) -> str:
+            time.sleep(0.2 if serial == "A" else 0.01)
+            return serial
+
+        farm = DeviceFarm([FarmDevice("A"), FarmDevice("B")], poll_sec=0.01)
+        jobs = [farm.submit(FarmJob(f"job{i}", work)) for i in range(10)]
+        farm.start()
+        self.assertTrue(farm.wait(timeout=10))
+        farm.stop()
+        self.assertGreater(farm.stats()["steals"], 0)
+        self.assertGreaterEqual(sum(1 for j in jobs if j.serial == "B"), 8)
+
+
+class TestFarmOnFakeAdb(unittest.TestCase):
+    def test_throughput_scales_with_devices(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            adb_path = write_fake_adb(tmp, {"devices": 4})
+            serials = [f"FAKE{i:04d}" for i in range(4)]
+            devices = probe_devices(adb_path, serials, {"lab-0": "FAKE0000"})
+            first = devices[0]
+            self.assertEqual((first.api_level, first.abis, first.aliases), (34, ["arm64-v8a"], ["lab-0"]))
+
+            # Long sleeps, so the fake adb's start-up cost (which does not
+            # shrink with more devices on a single core) stays minor.
+            def timed(pool: list) -> float:
+                jobs = [FarmJob("sleep", shell_action(adb_path, "sleep 0.4")) for _ in range(8)]
+                started = time.perf_counter()
+                stats = run_jobs(pool, jobs, poll_sec=0.01)
+                self.assertEqual(stats["done"], 8)
+                return time.perf_counter() - started
+
+            one = timed(devices[:1])
+            four = timed(devices)
+        self.assertLess(four, one / 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from adbw import advanced
+from adbw.adb import adb_cmd, run
+from adbw.forwards import apply_forwards_on_devices, current_rules, parse_forward_list, parse_rules, plan_forwards
+from adbw.state import invalidate
+from fake_adb import write_fake_adb
+
+METRO = [
+    "reverse tcp:8081 tcp:8081",
+    "reverse tcp:8097 tcp:8097",
+    "reverse tcp:3000 tcp:3000",
+    "forward tcp:9222 localabstract:chrome_devtools_remote",
+    "forward tcp:5005 jdwp:1234",
+    "forward tcp:8888 tcp:8888",
+]
+
+
+class TestForwardPlan(unittest.TestCase):
+    def test_plan_adds_rebinds_and_prunes(self) -> None:
+        current = parse_forward_list("forward", "A tcp:9222 tcp:1\nB tcp:7000 tcp:7000\nA tcp:5005 jdwp:1234\n", "A")
+        current += parse_forward_list("reverse", "UsbFfs tcp:4000 tcp:4000\n")
+        plan = plan_forwards(parse_rules(METRO), current, prune=True)
+        self.assertEqual([str(r) for r in plan.unchanged], ["forward tcp:5005 jdwp:1234"])
+        # tcp:9222 points elsewhere, so it is re-added (adb rebinds in place).
+        self.assertIn("forward tcp:9222 localabstract:chrome_devtools_remote", [str(r) for r in plan.add])
+        self.assertEqual(len(plan.add), 5)
+        self.assertEqual([str(r) for r in plan.remove], ["reverse tcp:4000 tcp:4000"])
+        self.assertEqual(plan.remove_all, [])
+        self.assertEqual(plan_forwards([], current, prune=True).remove_all, ["forward", "reverse"])
+
+
+class TestApplyForwards(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.adb_path = write_fake_adb(self.tmp.name, {"devices": 2})
+        self.serials = ["FAKE0000", "FAKE0001"]
+        patcher = mock.patch.object(advanced, "PROFILES_FILE", os.path.join(self.tmp.name, "profiles.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(invalidate)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _state(self, serial: str) -> dict:
+        with open(os.path.join(self.tmp.name, f"fake_adb_forwards_{serial}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_applies_only_the_difference_on_all_devices(self) -> None:
+        advanced.save_forward_set("rn", "metro", METRO)
+        rules = parse_rules(advanced.find_forward_set("rn", "metro"))
+        run(adb_cmd(self.adb_path, "FAKE0000", "forward", "tcp:8888", "tcp:8888"))
+        run(adb_cmd(self.adb_path, "FAKE0000", "reverse", "tcp:4000", "tcp:4000"))
+
+        results = apply_forwards_on_devices(self.adb_path, self.serials, rules, prune=True)
+        self.assertTrue(all(r.ok for r in results))
+        first, second = results
+        self.assertEqual((len(first.added), first.removed, first.unchanged), (5, ["reverse tcp:4000 tcp:4000"], 1))
+        self.assertEqual((len(second.added), second.removed), (6, []))
+        for serial in self.serials:
+            state = self._state(serial)
+            self.assertEqual(len(state["forward"]) + len(state["reverse"]), 6)
+            self.assertNotIn("tcp:4000", state["reverse"])
+
+        # Reconciling again is two list calls per device and no changes.
+        before = [len(self._state(s)["mutations"]) for s in self.serials]
+        results = apply_forwards_on_devices(self.adb_path, self.serials, rules, prune=True)
+        self.assertEqual([(r.added, r.removed, r.unchanged) for r in results], [([], [], 6)] * 2)
+        self.assertEqual([len(self._state(s)["mutations"]) for s in self.serials], before)
+
+    def test_transport_id_targets_see_their_own_forwards(self) -> None:
+        rules = parse_rules(["forward tcp:9222 tcp:9222", "forward tcp:8888 tcp:8888"])
+        run(adb_cmd(self.adb_path, "FAKE0000", "forward", "tcp:7000", "tcp:7000"))
+        current = current_rules(self.adb_path, "transport_id:1")
+        self.assertEqual([str(r) for r in current], ["forward tcp:7000 tcp:7000"])
+        first = apply_forwards_on_devices(self.adb_path, ["transport_id:1"], rules, prune=True)[0]
+        self.assertEqual((len(first.added), first.removed), (2, ["forward tcp:7000 tcp:7000"]))
+        again = apply_forwards_on_devices(self.adb_path, ["transport_id:1"], rules, prune=True)[0]
+        self.assertEqual((again.added, again.removed, again.unchanged), ([], [], 2))
+
+    def test_profile_edit_keeps_forward_sets(self) -> None:
+        advanced.save_forward_set("rn", "metro", METRO)
+        with mock.patch("builtins.input", side_effect=["rn", "com.example", "", "", ""]):
+            advanced.create_or_update_profile()
+        self.assertEqual(advanced.find_forward_set("rn", "metro"), METRO)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from adbw import metrics
+from adbw.adb import ADB_GOVERNOR, adb_cmd, async_run_many, command_lane, run, set_runtime_options
+from adbw.config import Settings
+from adbw.governor import HEAVY, LIGHT, ConcurrencyGovernor
+from fake_adb import write_fake_adb
+
+
+class TestConcurrencyGovernor(unittest.TestCase):
+    def test_caps_per_serial_and_heavy_lane(self) -> None:
+        gov = ConcurrencyGovernor(max_total=3, max_per_serial=2, max_heavy=1, max_heavy_per_serial=1)
+        gov.acquire("A", HEAVY)
+        gov.acquire("A", LIGHT)
+        order = []
+
+        def take(serial: str, lane: str) -> None:
+            gov.acquire(serial, lane)
+            order.append((serial, lane))
+
+        heavy_b = threading.Thread(target=take, args=("B", HEAVY))
+        light_a = threading.Thread(target=take, args=("A", LIGHT))
+        heavy_b.start()
+        light_a.start()
+        time.sleep(0.05)
+        # B's transfer waits for the heavy lane and A is at its per-serial cap,
+        # but a light command on another device still gets the last slot.
+        self.assertEqual(order, [])
+        take("C", LIGHT)
+        self.assertEqual(gov.stats()["waiting"], 2)
+        gov.release("A", HEAVY)
+        heavy_b.join(timeout=2)
+        self.assertEqual(order[-1], ("B", HEAVY))
+        gov.release("C", LIGHT)
+        light_a.join(timeout=2)
+        self.assertEqual(order[-1], ("A", LIGHT))
+        stats = gov.stats()
+        self.assertEqual((stats["active"], stats["peak"], stats["queued"]), (3, 3, 2))
+
+    def test_cancelled_async_waiter_gives_its_slot_back(self) -> None:
+        gov = ConcurrencyGovernor(max_total=1)
+
+        async def scenario() -> float:
+            await gov.async_acquire("A", LIGHT)
+            waiter = asyncio.ensure_future(gov.async_acquire("A", LIGHT))
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            follower = asyncio.ensure_future(gov.async_acquire("B", LIGHT))
+            await asyncio.sleep(0.05)
+            gov.release("A", LIGHT)
+            return await asyncio.wait_for(follower, 1)
+
+        waited = asyncio.run(scenario())
+        self.assertGreaterEqual(waited, 0.04)
+        self.assertEqual(gov.stats()["waiting"], 0)
+
+    def test_rate_limit_spaces_command_starts(self) -> None:
+        gov = ConcurrencyGovernor(max_total=0, max_per_serial=0, rate_per_serial=20.0)
+        started = time.monotonic()
+        for _ in range(30):
+            with gov.slot("A", LIGHT):
+                pass
+        # 20 tokens of burst, then one every 50 ms.
+        self.assertGreater(time.monotonic() - started, 0.4)
+        with gov.slot("B", LIGHT) as waited:
+            self.assertLess(waited, 0.01)
+
+
+class TestAdbGovernor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.adb_path = write_fake_adb(self.tmpdir.name, {"devices": 2, "latency_ms": 150})
+        self.textfile = os.path.join(self.tmpdir.name, "adbw.prom")
+
+    def tearDown(self) -> None:
+        set_runtime_options(Settings())
+        self.tmpdir.cleanup()
+
+    def test_command_lanes(self) -> None:
+        self.assertEqual(command_lane(adb_cmd("adb", "S", "push", "a", "/sdcard/a")), HEAVY)
+        self.assertEqual(command_lane(adb_cmd("adb", "S", "install", "-r", "a.apk")), HEAVY)
+        self.assertEqual(command_lane(adb_cmd("adb", "S", "shell", "pm", "install", "x")), LIGHT)
+
+    def test_transfers_queue_per_device_and_wait_is_recorded(self) -> None:
+        settings = Settings(adb_retry_count=1, adb_max_heavy_per_device=1)
+        settings.metrics_enabled, settings.metrics_textfile = True, self.textfile
+        set_runtime_options(settings)
+        pushes = [adb_cmd(self.adb_path, "FAKE0000", "push", "a", f"/sdcard/{i}") for i in range(3)]
+        other = [adb_cmd(self.adb_path, "FAKE0001", "shell", "getprop", "ro.serialno")]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda cmd: (cmd, run(cmd), time.perf_counter() - started), pushes + other))
+        elapsed = [r[2] for r in results]
+        self.assertTrue(all(r[1].returncode == 0 for r in results))
+        self.assertGreater(max(elapsed[:3]), 0.4)
+        self.assertLess(elapsed[3], 0.35)
+        self.assertEqual(ADB_GOVERNOR.stats()["active"], 0)
+        metrics.flush(force=True)
+        with open(self.textfile, "r", encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn('adbw_adb_queue_wait_seconds_count{lane="heavy",serial="FAKE0000"} 3', text)
+        self.assertIn('adbw_adb_queue_wait_seconds_count{lane="light",serial="FAKE0001"} 1', text)
+
+    def test_async_commands_respect_the_global_cap(self) -> None:
+        set_runtime_options(Settings(adb_retry_count=1, adb_max_concurrent=2))
+        cmds = [adb_cmd(self.adb_path, f"FAKE000{i % 2}", "shell", "echo", str(i)) for i in range(4)]
+        started = time.perf_counter()
+        results = asyncio.run(async_run_many(cmds))
+        self.assertGreater(time.perf_counter() - started, 0.3)
+        self.assertEqual([r.stdout.strip() for r in results], ["0", "1", "2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
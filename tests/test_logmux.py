@@ -0,0 +1,39 @@
+import io
+import tempfile
+import unittest
+
+from adbw.adb import set_runtime_options
+from adbw.config import Settings
+from adbw.logmux import LogcatMux
+from fake_adb import write_fake_adb
+
+
+class TestLogcatMux(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        set_runtime_options(Settings(adb_retry_count=1))
+
+    def tearDown(self) -> None:
+        set_runtime_options(Settings())
+        self.tmpdir.cleanup()
+
+    def test_skewed_devices_merge_in_time_order(self) -> None:
+        adb_path = write_fake_adb(
+            self.tmpdir.name,
+            {"devices": 2, "logcat_lines": 500, "clock_skew": {"FAKE0001": 3600.0}},
+        )
+        out = io.StringIO()
+        mux = LogcatMux(adb_path, [("FAKE0000", "phone"), ("FAKE0001", "watch")], window_sec=0.05, out=out)
+        mux.run(duration_sec=30)
+        self.assertAlmostEqual(mux.offsets["FAKE0001"] - mux.offsets["FAKE0000"], 3600.0, delta=1.0)
+        lines = [ln for ln in out.getvalue().splitlines() if "beginning of" not in ln]
+        self.assertEqual(len(lines), 1000)
+        labels = [ln.split()[0] for ln in lines]
+        # Both devices logged over the same real interval, so after offset
+        # correction their lines interleave instead of one block per device.
+        self.assertGreater(sum(1 for a, b in zip(labels, labels[1:]) if a != b), 100)
+        self.assertEqual(mux.reordered, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from adbw.logstore import LogStore, parse_since, serial_from_path
+
+
+def _line(stamp: str, pid: int, level: str, tag: str, message: str) -> str:
+    return f"{stamp}  {pid:5d}  {pid:5d} {level} {tag}: {message}\n"
+
+
+class TestLogStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = LogStore(os.path.join(self.tmpdir.name, "logs.sqlite3"))
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_ingest_and_query_crashes_by_package_across_devices(self) -> None:
+        stamp = time.strftime("%m-%d %H:%M:%S.000", time.localtime(time.time() - 60))
+        snapshot = os.path.join(self.tmpdir.name, "logcat_DEV1_20260101_120000.txt")
+        with open(snapshot, "w", encoding="utf-8") as f:
+            f.write("--------- beginning of main\n")
+            f.write(_line(stamp, 4321, "I", "ActivityManager", "Start proc 4321:com.example.app/u0a55 for activity"))
+            f.write(_line(stamp, 4321, "E", "AndroidRuntime", "FATAL EXCEPTION: main"))
+            f.write(_line(stamp, 4321, "E", "AndroidRuntime", "Process: com.example.app, PID: 4321"))
+            f.write(_line(stamp, 999, "E", "AndroidRuntime", "FATAL EXCEPTION: worker"))
+            f.write(_line(stamp, 999, "E", "AndroidRuntime", "Process: com.other, PID: 999"))
+        chunk_dir = os.path.join(self.tmpdir.name, "scheduled_logs_DEV2_20260101_120000")
+        os.makedirs(chunk_dir)
+        with gzip.open(os.path.join(chunk_dir, "logcat_chunk_001.txt.gz"), "wt", encoding="utf-8") as f:
+            f.write(_line(stamp, 77, "E", "AndroidRuntime", "FATAL EXCEPTION: main"))
+            f.write(_line(stamp, 77, "E", "AndroidRuntime", "Process: com.example.app, PID: 77"))
+
+        results = self.store.ingest_paths([self.tmpdir.name])
+        self.assertEqual(sorted(r["serial"] for r in results), ["DEV1", "DEV2"])
+        self.assertEqual(sum(r["lines"] for r in results), 7)
+
+        rows = self.store.query(text="FATAL EXCEPTION", package="com.example.app", since_sec=86400)
+        self.assertEqual(sorted(r["serial"] for r in rows), ["DEV1", "DEV2"])
+        self.assertTrue(all(r["message"].startswith("FATAL EXCEPTION") for r in rows))
+        self.assertEqual(self.store.query(text="FATAL EXCEPTION", since_sec=1), [])
+
+        # Unchanged files are not re-ingested.
+        self.assertTrue(all(r["skipped"] for r in self.store.ingest_paths([self.tmpdir.name])))
+
+    def test_flush_reads_max_id_under_the_write_lock(self) -> None:
+        if not self.store.fts:
+            self.skipTest("SQLite built without FTS5")
+        store = self.store
+        with store.conn:
+            source_id = store.conn.execute(
+                "INSERT INTO sources (path, serial, size, mtime_ns, ingested_at) VALUES ('x', 'DEV1', 0, 0, 0)"
+            ).lastrowid
+        blocked = []
+
+        class Conn:
+            # Tries a concurrent writer right after _flush reads MAX(id).
+            def __enter__(self) -> sqlite3.Connection:
+                return store_conn.__enter__()
+
+            def __exit__(self, *exc: object) -> bool:
+                return store_conn.__exit__(*exc)
+
+            def execute(self, sql: str, *args: object) -> sqlite3.Cursor:
+                cursor = store_conn.execute(sql, *args)
+                if "MAX(id)" in sql:
+                    other = sqlite3.connect(store.path, timeout=0)
+                    try:
+                        other.execute("BEGIN IMMEDIATE")
+                        other.rollback()
+                    except sqlite3.OperationalError:
+                        blocked.append(True)
+                    finally:
+                        other.close()
+                return cursor
+
+            def executemany(self, sql: str, rows: object) -> sqlite3.Cursor:
+                return store_conn.executemany(sql, rows)
+
+        store_conn = store.conn
+        store.conn = Conn()  # type: ignore[assignment]
+        try:
+            store._flush([(source_id, "DEV1", 0.0, 1, 1, "I", "Tag", "hello")])
+        finally:
+            store.conn = store_conn
+        self.assertEqual(blocked, [True])
+        self.assertEqual(store.query(text="hello"), store.query(tag="Tag"))
+
+    def test_helpers(self) -> None:
+        self.assertEqual(parse_since("1d"), 86400)
+        self.assertEqual(parse_since("30m"), 1800)
+        self.assertEqual(serial_from_path("adb_bundle_192.168.1.5:5555_20260101_120000/logcat.txt"), "192.168.1.5:5555")
+        # Names built with target_filename map back to the target.
+        self.assertEqual(serial_from_path("adb_bundle_192.168.1.5_5555_20260101_120000/logcat.txt"), "192.168.1.5:5555")
+        self.assertEqual(serial_from_path("logcat_transport_id_3_20260101_120000.txt"), "transport_id:3")
+        self.assertEqual(serial_from_path("logcat_R58M_1_20260101_120000.txt"), "R58M_1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+
+from adbw import metrics
+from adbw.adb import _record_attempt
+
+
+class TestMetricsTextfile(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        metrics.configure(True, os.path.join(self.tmpdir.name, "adbw.prom"))
+
+    def tearDown(self) -> None:
+        metrics.configure(False, "")
+        self.tmpdir.cleanup()
+
+    def test_flush_writes_histogram_and_accumulates(self) -> None:
+        metrics.record_command("getprop", "ABC", 0, 0.2, stdout_len=10)
+        metrics.record_retry("getprop", "ABC")
+        self.assertTrue(metrics.flush(force=True))
+        metrics.record_command("getprop", "ABC", 0, 3.0, stdout_len=5)
+        self.assertTrue(metrics.flush(force=True))
+        with open(metrics.TEXTFILE, "r", encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn("# TYPE adbw_command_duration_seconds histogram", text)
+        self.assertIn('adbw_command_duration_seconds_bucket{kind="getprop",rc="0",serial="ABC",le="0.25"} 1', text)
+        self.assertIn('adbw_command_duration_seconds_count{kind="getprop",rc="0",serial="ABC"} 2', text)
+        self.assertIn('adbw_command_stdout_bytes_total{kind="getprop",rc="0",serial="ABC"} 15', text)
+        self.assertIn('adbw_command_retries_total{kind="getprop",serial="ABC"} 1', text)
+        self.assertFalse(os.path.exists(f"{metrics.TEXTFILE}.lock"))
+
+    def test_output_counters_count_utf8_bytes(self) -> None:
+        proc = subprocess.CompletedProcess(["adb", "-s", "ABC", "shell", "echo"], 0, "h\u00e9\u20ac\n", "")
+        _record_attempt(proc.args, "ABC", 1, proc, time.perf_counter(), False)
+        self.assertTrue(metrics.flush(force=True))
+        with open(metrics.TEXTFILE, "r", encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn('adbw_command_stdout_bytes_total{kind="echo",rc="0",serial="ABC"} 7', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
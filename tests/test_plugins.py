@@ -0,0 +1,122 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from adbw.plugins import PluginCache, run_action, run_action_on_devices
+from adbw.session import SESSION_CLOSED_RETURNCODE, DeviceHandle, ShellSession
+from fake_adb import write_fake_adb
+
+PLUGIN = """
+LOADS = []
+LOADS.append(1)
+
+def register():
+    return [{"name": "Echo %s", "run": lambda **kw: "%s"}]
+"""
+
+
+class TestPluginCache(unittest.TestCase):
+    def test_modules_reload_only_when_file_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "echo.py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(PLUGIN % ("v1", "v1"))
+            cache = PluginCache()
+            first, errors = cache.discover(tmp)
+            second, _ = cache.discover(tmp)
+            self.assertEqual(errors, [])
+            self.assertEqual([a.name for a in second], ["Echo v1"])
+            self.assertIs(first[0].run, second[0].run)
+            self.assertEqual(cache.timings["echo.py"].loads, 1)
+            self.assertEqual(cache.timings["echo.py"].cache_hits, 1)
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(PLUGIN % ("v2", "v2"))
+            os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1_000_000_000))
+            third, _ = cache.discover(tmp)
+            self.assertEqual([a.name for a in third], ["Echo v2"])
+            self.assertEqual(cache.timings["echo.py"].loads, 2)
+
+    def test_manifest_lists_actions_without_importing(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "heavy.py"), "w", encoding="utf-8") as f:
+                f.write("def run_it(**kw):\n    return 'ran'\n")
+            with open(os.path.join(tmp, "plugins.json"), "w", encoding="utf-8") as f:
+                json.dump({"actions": [{"name": "Heavy", "entry": "heavy:run_it"}, {"name": "Broken"}]}, f)
+            cache = PluginCache()
+            actions, errors = cache.discover(tmp)
+            self.assertEqual([a.name for a in actions], ["Heavy"])
+            self.assertEqual(len(errors), 1)
+            self.assertNotIn("heavy.py", cache.timings)
+            self.assertEqual(cache.resolve(tmp, actions[0])(), "ran")
+            self.assertEqual(cache.timings["heavy.py"].loads, 1)
+
+
+class TestPluginExecution(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.adb_path = write_fake_adb(self.tmp.name, {"devices": 2})
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_handle_reuses_one_shell_session(self) -> None:
+        handle = DeviceHandle(self.adb_path, "FAKE0000")
+        try:
+            outputs = [handle.shell(f"echo n{i}").stdout for i in range(5)]
+            self.assertEqual(outputs, [f"n{i}\n" for i in range(5)])
+            self.assertEqual(handle.shell("false").returncode, 1)
+            self.assertEqual(handle.prop("ro.serialno"), "FAKE0000")
+            self.assertEqual(handle.prop("ro.product.model"), "Pixel Fake")
+            self.assertEqual(handle.session.commands, 7)
+        finally:
+            handle.close()
+
+    def test_close_during_a_command_ends_it_and_releases_the_pipes(self) -> None:
+        session = ShellSession(self.adb_path, "FAKE0000")
+        self.assertEqual(session.run("echo warm").returncode, 0)
+        proc = session.proc
+        results = []
+        worker = threading.Thread(target=lambda: results.append(session.run("sleep 10")))
+        worker.start()
+        time.sleep(0.3)
+        session.close()
+        worker.join(timeout=5)
+        self.assertEqual(results[0].returncode, SESSION_CLOSED_RETURNCODE)
+        deadline = time.monotonic() + 5
+        while not proc.stdout.closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(proc.stdout.closed and proc.stdin.closed)
+        # The next command starts a fresh shell.
+        self.assertEqual(session.run("echo again").stdout, "again\n")
+        session.close()
+
+    def test_new_and_legacy_actions_across_devices(self) -> None:
+        seen = {}
+
+        def new_style(handle):
+            seen[handle.serial] = handle.shell("echo hi").stdout.strip()
+
+        def legacy(adb_path, serial, run, adb_cmd):
+            seen["legacy"] = run(adb_cmd(adb_path, serial, "shell", "echo", "old"), check=False).stdout.strip()
+
+        results = run_action_on_devices(new_style, self.adb_path, ["FAKE0000", "FAKE0001"], timeout_sec=30)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertTrue(run_action(legacy, self.adb_path, "FAKE0000", timeout_sec=30).ok)
+        self.assertEqual(seen, {"FAKE0000": "hi", "FAKE0001": "hi", "legacy": "old"})
+
+    def test_deadline_cancels_handle(self) -> None:
+        def stuck(handle):
+            handle.shell("sleep 10")
+            handle.shell("echo never")
+
+        result = run_action(stuck, self.adb_path, "FAKE0000", timeout_sec=0.5)
+        self.assertTrue(result.timed_out)
+        self.assertLess(result.duration_sec, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+import unittest
+
+from adbw.adb import set_runtime_options
+from adbw.config import Settings
+from adbw.sampler import ProcessSampler, sample_process
+from fake_adb import write_fake_adb
+
+
+class TestProcessSampler(unittest.TestCase):
+    def test_comm_with_spaces_and_restart(self) -> None:
+        sampler = ProcessSampler(cpu_count=4, capacity=2)
+        stat = "77 (my app) R 1 0 0 0 -1 0 0 0 0 0 {u} 0 0 0 20 0 12 0 0 0 100"
+        sampler.add_block(0.0, ["pid 77", "cpu  100 0 0 900 0 0 0 0", stat.format(u=10), "VmRSS: 2048 kB"])
+        second = sampler.add_block(1.0, ["pid 77", "cpu  200 0 0 1800 0 0 0 0", stat.format(u=110)])
+        self.assertEqual(second.cpu_pct, 40.0)
+        self.assertEqual(second.threads, 12)
+        self.assertIsNone(sampler.add_block(2.0, ["pid 0", "cpu  300 0 0 2700 0 0 0 0"]))
+        restarted = sampler.add_block(3.0, ["pid 77", "cpu  400 0 0 3600 0 0 0 0", stat.format(u=500)])
+        self.assertEqual(restarted.cpu_pct, 0.0)
+        self.assertEqual(len(sampler.samples), 2)
+
+    def test_single_shell_session_export(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            adb_path = write_fake_adb(tmp, {"devices": 1})
+            set_runtime_options(Settings(adb_retry_count=1))
+            try:
+                sampler = sample_process(adb_path, "FAKE0000", "com.fake.app", count=6, capacity=4)
+            finally:
+                set_runtime_options(Settings())
+            self.assertEqual(len(sampler.samples), 4)
+            self.assertTrue(all(s.cpu_pct > 0 for s in sampler.samples))
+            sampler.export_csv(os.path.join(tmp, "s.csv"))
+            sampler.export_json(os.path.join(tmp, "s.json"))
+            with open(os.path.join(tmp, "s.csv"), encoding="utf-8") as f:
+                self.assertEqual(f.readline().strip(), "ts,pid,cpu_pct,rss_kb,pss_kb,threads,state")
+            with open(os.path.join(tmp, "s.json"), encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["summary"]["threads_max"], 45)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from adbw import state
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INCREMENT = """
+import sys
+from adbw.state import update_json
+for _ in range(int(sys.argv[2])):
+    update_json(sys.argv[1], {}, lambda d: d.__setitem__("n", d.get("n", 0) + 1))
+"""
+
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "data.json")
+        state.invalidate()
+
+    def tearDown(self) -> None:
+        state.invalidate()
+        self.tmp.cleanup()
+
+    def test_repeated_reads_hit_memory_and_copies_are_private(self) -> None:
+        state.write_json(self.path, {"a": [1]})
+        with mock.patch("builtins.open", wraps=open) as opened, mock.patch("os.stat", wraps=os.stat) as stat:
+            first = state.read_json(self.path, {})
+            first["a"].append(2)
+            second = state.read_json(self.path, {})
+        self.assertEqual(second, {"a": [1]})
+        self.assertEqual(opened.call_count, 0)
+        self.assertEqual(stat.call_count, 0)
+        self.assertEqual(os.listdir(self.tmp.name), ["data.json"])
+
+    def test_external_replace_is_picked_up(self) -> None:
+        with mock.patch.object(state, "STAT_INTERVAL_SEC", 0.0):
+            state.write_json(self.path, {"v": 1})
+            self.assertEqual(state.read_json(self.path, {}), {"v": 1})
+            tmp = self.path + ".other"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"v": 2}, f)
+            os.replace(tmp, self.path)
+            self.assertEqual(state.read_json(self.path, {}), {"v": 2})
+            os.remove(self.path)
+            self.assertEqual(state.read_json(self.path, {"missing": True}), {"missing": True})
+        # The cached miss does not hand one caller's default to the next.
+        self.assertEqual(state.read_json(self.path, []), [])
+        self.assertIsNone(state.read_json(self.path, None))
+
+    def test_stale_lock_is_broken_once(self) -> None:
+        lock = self.path + ".lock"
+        open(lock, "w").close()
+        os.utime(lock, (0, 0))
+        stale = os.stat(lock)
+        self.assertTrue(state.acquire_file_lock(lock, timeout_sec=0.0))
+        fresh = os.stat(lock)
+        # A second process that judged the old lock stale must not remove
+        # the fresh one: it moves it aside, sees it is not the one it
+        # judged, and puts it back.
+        with mock.patch("os.stat", side_effect=[stale, os.stat(lock)]):
+            self.assertFalse(state._break_stale_lock(lock, 30.0))
+        self.assertEqual(os.stat(lock).st_ino, fresh.st_ino)
+        self.assertFalse(state.acquire_file_lock(lock, timeout_sec=0.0))
+        state.release_file_lock(lock)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_lock_errors_are_not_timeouts(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            state.acquire_file_lock(os.path.join(self.tmp.name, "missing", "x.lock"), timeout_sec=5.0)
+
+    def test_parallel_processes_do_not_lose_updates(self) -> None:
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        procs = [
+            subprocess.Popen([sys.executable, "-c", INCREMENT, self.path, "25"], env=env) for _ in range(4)
+        ]
+        for proc in procs:
+            self.assertEqual(proc.wait(timeout=60), 0)
+        self.assertEqual(state.update_json(self.path, {}, lambda d: None), {"n": 100})
+        self.assertFalse(os.path.exists(self.path + ".lock"))
+
+
+if __name__ == "__main__":
+    unittest.main()
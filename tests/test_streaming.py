@@ -0,0 +1,87 @@
+import io
+import json
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from adbw.adb import adb_cmd, run_line_stream, set_runtime_options
+from adbw.api import run_json_command, stream_json_command, write_json
+from adbw.config import Settings
+from fake_adb import write_fake_adb
+
+
+class TestNdjsonStreaming(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.adb_path = write_fake_adb(self.tmpdir.name, {"devices": 1, "logcat_lines": 20, "logcat_follow_ms": 5})
+        patcher = mock.patch("adbw.api.ensure_adb", return_value=self.adb_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        set_runtime_options(Settings())
+        self.tmpdir.cleanup()
+
+    def stream(self, cmd: str, params: str) -> tuple:
+        out = io.StringIO()
+        rc = stream_json_command(cmd, None, params, out)
+        return rc, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_logcat_stream_parses_lines_and_stops_at_max_lines(self) -> None:
+        rc, records = self.stream("logcat.stream", "max_lines=5")
+        self.assertEqual(rc, 0)
+        self.assertEqual([r["type"] for r in records], ["start"] + ["line"] * 5 + ["end"])
+        self.assertEqual(records[0]["serial"], "FAKE0000")
+        self.assertEqual([r["n"] for r in records[1:6]], [1, 2, 3, 4, 5])
+        self.assertEqual(records[2]["tag"], "ActivityManager")
+        self.assertEqual(records[2]["pid"], 1000)
+        self.assertIn("FAKE0000 message 0", records[2]["message"])
+        self.assertEqual((records[-1]["reason"], records[-1]["lines"], records[-1]["returncode"]), ("max_lines", 5, None))
+
+    def test_follow_stream_stops_at_max_duration(self) -> None:
+        started = time.perf_counter()
+        rc, records = self.stream("logcat.stream", "max_duration=0.4")
+        self.assertLess(time.perf_counter() - started, 3)
+        self.assertEqual(rc, 0)
+        self.assertEqual(records[-1]["reason"], "max_duration")
+        self.assertGreater(records[-1]["lines"], 21)
+
+    def test_shell_stream_runs_to_eof_and_reports_errors(self) -> None:
+        rc, records = self.stream("shell.stream", '{"command": "pm list packages"}')
+        self.assertEqual(rc, 0)
+        self.assertEqual((records[-1]["reason"], records[-1]["returncode"]), ("eof", 0))
+        self.assertEqual(records[1]["line"], "package:com.fake.app0")
+        self.assertEqual(records[-1]["lines"], len(records) - 2)
+        rc, records = self.stream("shell.stream", "max_lines=oops")
+        self.assertEqual((rc, records[0]["type"]), (1, "error"))
+
+    def test_slow_reader_throttles_the_stream(self) -> None:
+        seen = []
+
+        def slow(line: str) -> None:
+            seen.append(line)
+            time.sleep(0.02)
+
+        result = run_line_stream(adb_cmd(self.adb_path, "FAKE0000", "logcat"), slow, max_duration_sec=0.5)
+        # The producer is held to the reader's pace: nothing is buffered up.
+        self.assertEqual(result.reason, "max_duration")
+        self.assertEqual(result.lines, len(seen))
+        self.assertLess(len(seen), 40)
+
+        def closed(line: str) -> None:
+            raise BrokenPipeError()
+
+        with self.assertRaises(BrokenPipeError):
+            run_line_stream(adb_cmd(self.adb_path, "FAKE0000", "logcat"), closed)
+
+    def test_package_list_is_written_incrementally(self) -> None:
+        payload = run_json_command("package.list", None, None)
+        self.assertEqual(len(payload["data"]["packages"]), 80)
+        out = io.StringIO()
+        write_json(payload, out)
+        self.assertEqual(out.getvalue(), json.dumps(payload, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
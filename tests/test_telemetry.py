@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+from adbw.adb import set_runtime_options
+from adbw.config import Settings
+from adbw.telemetry import TelemetryRecorder, load_telemetry, parse_telemetry_block, record_telemetry
+from fake_adb import write_fake_adb
+
+
+class TestTelemetry(unittest.TestCase):
+    def test_drain_rate_and_throttling_summary(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = TelemetryRecorder(tmp, chunk_rows=50)
+            for i in range(121):
+                # One sample per minute for two hours, losing 6% per hour.
+                recorder.add({"ts": i * 60.0, "level": 90 - i * 0.1, "usb_powered": 0.0, "thermal_status": 2.0 if 30 <= i < 60 else 0.0})
+            recorder.flush()
+            summary = recorder.summary()
+            self.assertAlmostEqual(summary["drain_pct_per_hour"], 6.0, places=2)
+            self.assertEqual(len(summary["throttling_events"]), 1)
+            self.assertEqual(summary["time_in_thermal_status_sec"]["2"], 1800.0)
+            self.assertEqual(summary["chunks"], 3)
+            self.assertEqual(len(load_telemetry(tmp)["level"]), 121)
+
+    def test_parse_and_record_over_one_shell(self) -> None:
+        record = parse_telemetry_block(1.0, ["  level: 50", "  temperature: 315", "##sys", "/sys/class/power_supply/bms/temp 300"])
+        self.assertEqual(record["temperature_c"], 31.5)
+        self.assertEqual(record["psu.bms.temp"], 300.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            adb_path = write_fake_adb(tmp, {"devices": 1})
+            set_runtime_options(Settings(adb_retry_count=1))
+            try:
+                recorder = record_telemetry(adb_path, "FAKE0000", os.path.join(tmp, "out"), count=6, chunk_rows=4)
+            finally:
+                set_runtime_options(Settings())
+            columns = load_telemetry(os.path.join(tmp, "out"))
+            self.assertEqual(columns["thermal.CPU0"], [35.0, 36.0, 37.0, 38.0, 39.0, 40.0])
+            self.assertEqual(recorder.summary()["max_thermal_status"], 1.0)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "out", "summary.json")))
+
+
+if __name__ == "__main__":
+    unittest.main()
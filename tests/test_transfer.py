@@ -0,0 +1,109 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from adbw import metrics
+from adbw.adb import set_runtime_options
+from adbw.api import run_json_command
+from adbw.config import Settings
+from adbw.transfer import MB, TransferMonitor, install_apk, parse_summary, push_file, transfer_stats
+from fake_adb import write_fake_adb
+
+
+class TestTransferMath(unittest.TestCase):
+    def test_summary_lines_are_totalled_and_missing_ones_fall_back(self) -> None:
+        out = (
+            "a.bin: 1 file pushed, 0 skipped. 30.5 MB/s (1048576 bytes in 0.033s)\n"
+            "dir/: 3 files pushed, 0 skipped. 12.0 MB/s (3145728 bytes in 0.250s)\n"
+        )
+        total, seconds = parse_summary(out)
+        self.assertEqual(total, 4194304)
+        self.assertAlmostEqual(seconds, 0.283)
+        stats = transfer_stats(subprocess.CompletedProcess([], 0, out, ""), 0, 9.0)
+        self.assertEqual(stats.source, "adb")
+        self.assertAlmostEqual(stats.mb_per_sec, 4 / 0.283)
+        stats = transfer_stats(subprocess.CompletedProcess([], 0, "Success\n", ""), 4 * MB, 2.0)
+        self.assertEqual((stats.source, stats.mb_per_sec), ("measured", 2.0))
+
+    def test_rate_eta_and_stall(self) -> None:
+        monitor = TransferMonitor(10 * MB, None, lambda p: None)
+        self.assertIsNone(monitor.sample(0, 0.0).eta_sec)
+        progress = monitor.sample(2 * MB, 1.0)
+        self.assertEqual((progress.rate_bps, progress.eta_sec, progress.percent), (2 * MB, 4.0, 20.0))
+        for t in range(2, 10):
+            progress = monitor.sample(4 * MB, float(t))
+        # Only the last RATE_WINDOW_SEC count, so a stall drags the rate to 0.
+        self.assertEqual(progress.rate_bps, 0.0)
+        self.assertEqual(progress.stalled_sec, 7.0)
+        self.assertIn("stalled 7s", progress.describe())
+
+
+class TestTransfersOnFakeAdb(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmpdir.name, "device")
+        os.makedirs(os.path.join(self.root, "sdcard"))
+        config = {"devices": 1, "device_root": self.root, "transfer_kbps": 400}
+        self.adb_path = write_fake_adb(os.path.join(self.tmpdir.name, "bin"), config)
+        self.src = os.path.join(self.tmpdir.name, "a.bin")
+        with open(self.src, "wb") as f:
+            f.write(os.urandom(300 * 1024))
+
+    def tearDown(self) -> None:
+        set_runtime_options(Settings())
+        self.tmpdir.cleanup()
+
+    def test_push_reports_progress_and_throughput(self) -> None:
+        settings = Settings()
+        settings.metrics_enabled = True
+        settings.metrics_textfile = os.path.join(self.tmpdir.name, "adbw.prom")
+        set_runtime_options(settings)
+        events = []
+        proc, stats = push_file(self.adb_path, "FAKE0000", self.src, "/sdcard", events.append, interval=0.15)
+        self.assertEqual(proc.returncode, 0)
+        # Pushed into an existing directory: progress follows /sdcard/a.bin.
+        done = [e.bytes_done for e in events]
+        self.assertGreaterEqual(len(done), 3)
+        self.assertEqual(done, sorted(done))
+        self.assertTrue(0 < done[0] < 300 * 1024)
+        self.assertGreater(events[-1].rate_bps, 0)
+        self.assertEqual((stats.bytes, stats.source), (300 * 1024, "adb"))
+        self.assertGreater(stats.duration_sec, 0.5)
+        metrics.flush(force=True)
+        with open(settings.metrics_textfile, "r", encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn('adbw_transfer_bytes_total{kind="push",serial="FAKE0000"} 307200', text)
+        # Progress polls are labelled as probes and do not fail before the file exists.
+        self.assertIn('adbw_command_duration_seconds_count{kind="transfer_probe",rc="0",serial="FAKE0000"}', text)
+        self.assertNotIn('kind="find"', text)
+        self.assertNotIn('kind="transfer_probe",rc="1"', text)
+
+    def test_install_has_elapsed_only_progress(self) -> None:
+        events = []
+        _, stats = install_apk(self.adb_path, "FAKE0000", self.src, events.append, interval=0.05)
+        self.assertTrue(all(e.bytes_done is None for e in events))
+        self.assertEqual((stats.bytes, stats.source), (300 * 1024, "measured"))
+
+    def test_json_pull_streams_progress_to_stderr(self) -> None:
+        with open(os.path.join(self.root, "sdcard", "a.bin"), "wb") as f:
+            f.write(b"x" * 200 * 1024)
+        dst = os.path.join(self.tmpdir.name, "b.bin")
+        err = io.StringIO()
+        with mock.patch("adbw.api.ensure_adb", return_value=self.adb_path), contextlib.redirect_stderr(err):
+            payload = run_json_command("file.pull", None, f"src=/sdcard/a.bin,dst={dst},progress_interval=0.1")
+        transfer = payload["data"]["transfer"]
+        self.assertEqual((transfer["bytes"], transfer["source"]), (200 * 1024, "adb"))
+        self.assertEqual(os.path.getsize(dst), 200 * 1024)
+        events = [json.loads(line) for line in err.getvalue().splitlines() if line.startswith("{")]
+        self.assertTrue(events)
+        kinds = {(e["type"], e["command"], e["total_bytes"]) for e in events}
+        self.assertEqual(kinds, {("progress", "file.pull", 200 * 1024)})
+
+
+if __name__ == "__main__":
+    unittest.main()
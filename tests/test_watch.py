@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+from adbw.watch import BuildWatcher
+
+
+class TestBuildWatcher(unittest.TestCase):
+    def test_new_build_reported_once_after_settling(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            apk = os.path.join(tmp, "app.apk")
+            with zipfile.ZipFile(apk, "w") as z:
+                z.writestr("classes.dex", "v1")
+            watcher = BuildWatcher(apk, settle_sec=1.0)
+            self.assertFalse(watcher.poll(now=0.0))
+
+            # A partial write is not a valid zip yet and keeps changing.
+            with open(apk, "wb") as f:
+                f.write(b"PK\x03\x04partial")
+            self.assertFalse(watcher.poll(now=1.0))
+            self.assertFalse(watcher.poll(now=2.5))
+
+            with zipfile.ZipFile(apk, "w") as z:
+                z.writestr("classes.dex", "v2-longer")
+            self.assertFalse(watcher.poll(now=3.0))
+            self.assertFalse(watcher.poll(now=3.5))
+            self.assertTrue(watcher.poll(now=4.1))
+            self.assertAlmostEqual(watcher.settle_duration, 3.1)
+            self.assertFalse(watcher.poll(now=5.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
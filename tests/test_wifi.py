@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from adbw import wifi
+from adbw.adb import CIRCUIT_OPEN_RETURNCODE, DEVICE_BREAKER, adb_cmd, run
+from adbw.state import invalidate
+from fake_adb import write_fake_adb
+
+ENDPOINT = "127.0.0.1:5555"
+
+
+class TestWifiManager(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.adb_path = write_fake_adb(self.tmp.name, {"devices": 1, "wifi_endpoints": [ENDPOINT]})
+        patcher = mock.patch.object(wifi, "ENDPOINTS_FILE", os.path.join(self.tmp.name, "endpoints.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(DEVICE_BREAKER.reset, ENDPOINT)
+        self.addCleanup(invalidate)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_drop_trips_breaker_and_reconnect_resets_it(self) -> None:
+        wifi.register_endpoint(ENDPOINT, "bench")
+        manager = wifi.WifiManager(self.adb_path, backoff_base_sec=0.0, backoff_max_sec=0.0)
+        self.assertEqual([s.state for s in manager.probe()], ["down"])
+        manager.reconnect_due()
+        status = manager.status()[0]
+        self.assertEqual((status.state, status.label, status.reconnects), ("live", "bench", 1))
+        self.assertIsNotNone(status.latency_ms)
+        self.assertEqual(manager.live_endpoints(), [ENDPOINT])
+
+        # The transport disappears, as when the phone leaves Wi-Fi.
+        with open(os.path.join(self.tmp.name, "fake_adb_connected.json"), "w", encoding="utf-8") as f:
+            f.write("[]")
+        manager.probe()
+        self.assertFalse(manager.is_live(ENDPOINT))
+        self.assertEqual(DEVICE_BREAKER.state(ENDPOINT), "open")
+        proc = run(adb_cmd(self.adb_path, ENDPOINT, "shell", "echo", "hi"), check=False)
+        self.assertEqual(proc.returncode, CIRCUIT_OPEN_RETURNCODE)
+
+        manager.reconnect_due()
+        self.assertTrue(manager.is_live(ENDPOINT))
+        self.assertEqual(manager.status()[0].reconnects, 2)
+        self.assertEqual(DEVICE_BREAKER.state(ENDPOINT), "closed")
+
+    def test_unreachable_endpoint_backs_off(self) -> None:
+        wifi.register_endpoint("10.9.9.9:5555")
+        manager = wifi.WifiManager(self.adb_path, backoff_base_sec=30.0, backoff_max_sec=60.0)
+        manager.probe()
+        manager.reconnect_due()
+        status = manager.status()[0]
+        self.assertEqual((status.state, status.failures), ("down", 1))
+        self.assertIn("Connection refused", status.last_error)
+        manager.reconnect_due()
+        self.assertEqual(manager.status()[0].failures, 1)
+        DEVICE_BREAKER.reset("10.9.9.9:5555")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from adbw.adb import note_transports, set_runtime_options
+from adbw.config import Settings
+from adbw.devices import list_devices
+from adbw.errors import AdbWizardError
+from adbw.workflows import (
+    STEP_ACTIONS,
+    StepCache,
+    _device_state,
+    execute_workflow,
+    normalize_steps,
+    resolve_targets,
+)
+from fake_adb import write_fake_adb
+
+
+class TestWorkflowGraph(unittest.TestCase):
+    def test_legacy_steps_become_linear_chain(self) -> None:
+        steps = normalize_steps({"steps": [{"action": "install_apk"}, {"action": "clear_data"}, {"action": "launch_app"}]})
+        self.assertEqual([s["id"] for s in steps], ["step1", "step2", "step3"])
+        self.assertEqual([s["needs"] for s in steps], [[], ["step1"], ["step2"]])
+
+    def test_cycles_and_unknown_dependencies_are_rejected(self) -> None:
+        with self.assertRaises(AdbWizardError):
+            normalize_steps({"steps": [{"id": "a", "action": "wait", "needs": ["b"]}, {"id": "b", "action": "wait", "needs": ["a"]}]})
+        with self.assertRaises(AdbWizardError):
+            normalize_steps({"steps": [{"id": "a", "action": "wait", "needs": ["missing"]}]})
+        with self.assertRaises(AdbWizardError):
+            normalize_steps({"steps": [{"id": "a", "action": "wait", "retries": "two"}]})
+        with self.assertRaises(AdbWizardError):
+            normalize_steps({"steps": [{"id": "a", "action": "wait", "seconds": "soon"}]})
+
+    def test_state_probes_quote_step_values(self) -> None:
+        seen = []
+
+        def fake_run(cmd, check=True):
+            seen.append(cmd[-1])
+            return subprocess.CompletedProcess(cmd, 0, "", "")
+
+        with mock.patch("adbw.workflows.run", fake_run):
+            _device_state("adb", "S1", {"action": "push_file", "dst": "/sdcard/my file; reboot"})
+            _device_state("adb", "S1", {"action": "grant_permission", "package": "a.b", "permission": "x'y"})
+        self.assertEqual(seen[0], "stat -c '%s %Y' '/sdcard/my file; reboot'")
+        self.assertEqual(seen[1], "dumpsys package a.b | grep -F -e 'x'\"'\"'y: granted=true'")
+
+    def test_resolve_targets(self) -> None:
+        connected = ["S1", "S2"]
+        self.assertEqual(resolve_targets("current", "S1", connected, {}), ["S1"])
+        self.assertEqual(resolve_targets("all", "S1", connected, {}), ["S1", "S2"])
+        self.assertEqual(resolve_targets(["lab"], "S1", connected, {"lab": "S2"}), ["S2"])
+        with self.assertRaises(AdbWizardError):
+            resolve_targets("S9", "S1", connected, {})
+
+
+class TestWorkflowExecution(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.adb_path = write_fake_adb(self.tmpdir.name, {"devices": 3, "latency_by_kind": {"install": 300, "push": 300}})
+        self.apk = os.path.join(self.tmpdir.name, "app.apk")
+        with open(self.apk, "wb") as f:
+            f.write(b"apk")
+        self.cache = StepCache(os.path.join(self.tmpdir.name, "step_cache.json"))
+        set_runtime_options(Settings(adb_retry_count=1))
+
+    def tearDown(self) -> None:
+        set_runtime_options(Settings())
+        note_transports({})
+        self.tmpdir.cleanup()
+
+    def test_independent_steps_and_devices_run_concurrently(self) -> None:
+        workflow = {
+            "name": "parallel",
+            "steps": [
+                {"id": "install", "action": "install_apk", "apk_path": self.apk, "needs": []},
+                {"id": "push", "action": "push_file", "src": self.apk, "dst": "/sdcard/a", "needs": []},
+                {"id": "launch", "action": "launch_app", "package": "com.fake.app1", "needs": ["install", "push"]},
+            ],
+        }
+        spans = {}
+        lock = threading.Lock()
+
+        def timed(name: str):
+            action = STEP_ACTIONS[name]
+
+            def wrapper(adb_path, serial, step):
+                started = time.perf_counter()
+                try:
+                    return action(adb_path, serial, step)
+                finally:
+                    with lock:
+                        spans[(serial, step["id"])] = (started, time.perf_counter())
+
+            return wrapper
+
+        actions = {name: timed(name) for name in ("install_apk", "push_file", "launch_app")}
+        with mock.patch.dict(STEP_ACTIONS, actions):
+            report = execute_workflow(
+                self.adb_path, workflow, ["FAKE0000", "FAKE0001", "FAKE0002"], log=lambda m: None, cache=self.cache
+            )
+        self.assertTrue(report.ok)
+        self.assertEqual(len(report.results), 9)
+
+        def overlap(a, b) -> bool:
+            return spans[a][0] < spans[b][1] and spans[b][0] < spans[a][1]
+
+        # Independent steps of one device overlap, and so do the devices.
+        self.assertTrue(overlap(("FAKE0000", "install"), ("FAKE0000", "push")))
+        self.assertTrue(overlap(("FAKE0000", "install"), ("FAKE0002", "install")))
+        self.assertGreaterEqual(spans[("FAKE0001", "launch")][0], spans[("FAKE0001", "push")][1])
+
+    def test_unexpected_errors_fail_only_their_step(self) -> None:
+        def broken(adb_path, serial, step):
+            raise OSError("disk full")
+
+        workflow = {
+            "steps": [
+                {"id": "bad", "action": "shell", "command": "true", "needs": []},
+                {"id": "after", "action": "launch_app", "package": "com.fake.app1", "needs": ["bad"]},
+                {"id": "other", "action": "launch_app", "package": "com.fake.app1", "needs": []},
+            ]
+        }
+        with mock.patch.dict(STEP_ACTIONS, {"shell": broken}):
+            report = execute_workflow(
+                self.adb_path, workflow, ["FAKE0000", "FAKE0001"], log=lambda m: None, cache=self.cache
+            )
+        statuses = {(r.serial, r.step_id): r.status for r in report.results}
+        self.assertEqual(statuses[("FAKE0001", "bad")], "failed")
+        self.assertEqual(statuses[("FAKE0001", "after")], "blocked")
+        self.assertEqual(statuses[("FAKE0001", "other")], "ok")
+        self.assertIn("OSError: disk full", report.results[0].detail)
+
+    def test_failed_step_blocks_dependents(self) -> None:
+        workflow = {
+            "steps": [
+                {"id": "install", "action": "install_apk", "apk_path": os.path.join(self.tmpdir.name, "missing.apk")},
+                {"id": "launch", "action": "launch_app", "package": "com.fake.app1"},
+            ]
+        }
+        report = execute_workflow(
+            self.adb_path, workflow, ["FAKE0000"], log=lambda m: None, interactive=False, cache=self.cache
+        )
+        self.assertFalse(report.ok)
+        self.assertEqual([r.status for r in report.results], ["failed", "blocked"])
+
+    def test_unchanged_steps_are_cached_until_inputs_change(self) -> None:
+        workflow = {
+            "steps": [
+                {"id": "install", "action": "install_apk", "apk_path": self.apk, "package": "com.fake.app1"},
+                {"id": "launch", "action": "launch_app", "package": "com.fake.app1"},
+            ]
+        }
+
+        def statuses(**kwargs: bool) -> list:
+            report = execute_workflow(
+                self.adb_path, workflow, ["FAKE0000"], log=lambda m: None, cache=self.cache, **kwargs
+            )
+            return [r.status for r in report.results]
+
+        self.assertEqual(statuses(), ["ok", "ok"])
+        self.assertEqual(statuses(), ["cached", "ok"])
+        self.assertEqual(statuses(force=True), ["ok", "ok"])
+        with open(self.apk, "wb") as f:
+            f.write(b"apk v2")
+        self.assertEqual(statuses(), ["ok", "ok"])
+        self.cache = StepCache(self.cache.path)
+        self.assertEqual(statuses(), ["cached", "ok"])
+
+    def test_cache_follows_the_serial_and_reports_uncacheable_steps(self) -> None:
+        list_devices(self.adb_path)
+        step = {"id": "install", "action": "install_apk", "apk_path": self.apk, "package": "com.fake.app1"}
+
+        def run_on(target: str, steps: list, lines: list) -> list:
+            report = execute_workflow(self.adb_path, {"steps": steps}, [target], log=lines.append, cache=self.cache)
+            return [r.status for r in report.results]
+
+        self.assertEqual(run_on("transport_id:1", [step], []), ["ok"])
+        self.assertEqual(run_on("FAKE0000", [step], []), ["cached"])
+        lines: list = []
+        unnamed = dict(step, id="unnamed", package="")
+        with mock.patch("adbw.workflows._apk_package", return_value=""):
+            self.assertEqual(run_on("FAKE0000", [unnamed], lines), ["ok"])
+        self.assertTrue(any("not cached" in line and "aapt" in line for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()